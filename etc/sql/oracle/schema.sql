@@ -1449,6 +1449,25 @@ CREATE TABLE RSE_TRANSFER_LIMITS
     CONSTRAINT RSE_TRANSFER_LIMITS_UPDATED_NN CHECK (UPDATED_AT IS NOT NULL)
 ) ORGANIZATION INDEX COMPRESS 1;
 
+-- 49.3 ) ========================================= REQUEST_COUNTERS table =========================================
+
+CREATE TABLE REQUEST_COUNTERS
+(
+    ID RAW(16),
+    ACCOUNT VARCHAR2(25),
+    DEST_RSE_ID RAW(16),
+    SOURCE_RSE_ID RAW(16),
+    ACTIVITY VARCHAR2(50),
+    WAITING NUMBER(19,0),
+    ACTIVE NUMBER(19,0),
+    UPDATED_AT DATE,
+    CREATED_AT DATE,
+    CONSTRAINT REQUEST_COUNTERS_PK PRIMARY KEY (ID),
+    CONSTRAINT REQUEST_COUNTERS_DEST_RSE_ID_NN CHECK (DEST_RSE_ID IS NOT NULL),
+    CONSTRAINT REQUEST_COUNTERS_CREATED_NN CHECK (CREATED_AT IS NOT NULL),
+    CONSTRAINT REQUEST_COUNTERS_UPDATED_NN CHECK (UPDATED_AT IS NOT NULL)
+) ORGANIZATION INDEX;
+
 -- 50 ) ========================================= QUARANTINED_REPLICAS table =========================================
 
   CREATE TABLE QUARANTINED_REPLICAS
@@ -1996,3 +2015,46 @@ CREATE GLOBAL TEMPORARY TABLE TEMPORARY_ID_4
     id RAW(16),
     CONSTRAINT TEMPORARY_ID_4_PK PRIMARY KEY (id)
 ) ON COMMIT DELETE ROWS;
+
+-- 73 ) ================  Global Temporary Tables TEMPORARY_REPLICA_ACCESS  ================
+
+CREATE GLOBAL TEMPORARY TABLE TEMPORARY_REPLICA_ACCESS_0
+(
+    SCOPE       VARCHAR2(25),
+    NAME        VARCHAR2(255),
+    RSE_ID      RAW(16),
+    ACCESSED_AT DATE,
+    CONSTRAINT TEMPORARY_REPLICA_ACCESS_0_PK PRIMARY KEY (SCOPE, NAME, RSE_ID)
+) ON COMMIT DELETE ROWS;
+CREATE GLOBAL TEMPORARY TABLE TEMPORARY_REPLICA_ACCESS_1
+(
+    SCOPE       VARCHAR2(25),
+    NAME        VARCHAR2(255),
+    RSE_ID      RAW(16),
+    ACCESSED_AT DATE,
+    CONSTRAINT TEMPORARY_REPLICA_ACCESS_1_PK PRIMARY KEY (SCOPE, NAME, RSE_ID)
+) ON COMMIT DELETE ROWS;
+CREATE GLOBAL TEMPORARY TABLE TEMPORARY_REPLICA_ACCESS_2
+(
+    SCOPE       VARCHAR2(25),
+    NAME        VARCHAR2(255),
+    RSE_ID      RAW(16),
+    ACCESSED_AT DATE,
+    CONSTRAINT TEMPORARY_REPLICA_ACCESS_2_PK PRIMARY KEY (SCOPE, NAME, RSE_ID)
+) ON COMMIT DELETE ROWS;
+CREATE GLOBAL TEMPORARY TABLE TEMPORARY_REPLICA_ACCESS_3
+(
+    SCOPE       VARCHAR2(25),
+    NAME        VARCHAR2(255),
+    RSE_ID      RAW(16),
+    ACCESSED_AT DATE,
+    CONSTRAINT TEMPORARY_REPLICA_ACCESS_3_PK PRIMARY KEY (SCOPE, NAME, RSE_ID)
+) ON COMMIT DELETE ROWS;
+CREATE GLOBAL TEMPORARY TABLE TEMPORARY_REPLICA_ACCESS_4
+(
+    SCOPE       VARCHAR2(25),
+    NAME        VARCHAR2(255),
+    RSE_ID      RAW(16),
+    ACCESSED_AT DATE,
+    CONSTRAINT TEMPORARY_REPLICA_ACCESS_4_PK PRIMARY KEY (SCOPE, NAME, RSE_ID)
+) ON COMMIT DELETE ROWS;
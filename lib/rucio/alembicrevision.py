@@ -13,4 +13,4 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-ALEMBIC_REVISION = '4df2c5ddabc0'  # the current alembic head revision
+ALEMBIC_REVISION = '63b0f00a91b4'  # the current alembic head revision
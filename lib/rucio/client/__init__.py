@@ -13,4 +13,48 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from .client import Client  # noqa: F401
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .client import Client  # noqa: F401
+
+# The clients are loaded on first access, so that importing one of them, or the
+# package itself, doesn't pay for the import of all the others.
+_LAZY_CLIENTS = {
+    'Client': 'client',
+    'AccountClient': 'accountclient',
+    'AccountLimitClient': 'accountlimitclient',
+    'ConfigClient': 'configclient',
+    'CredentialClient': 'credentialclient',
+    'DIDClient': 'didclient',
+    'DiracClient': 'diracclient',
+    'DownloadClient': 'downloadclient',
+    'ExportClient': 'exportclient',
+    'ImportClient': 'importclient',
+    'LifetimeClient': 'lifetimeclient',
+    'LockClient': 'lockclient',
+    'MetaClient': 'metaclient',
+    'PingClient': 'pingclient',
+    'ReplicaClient': 'replicaclient',
+    'RequestClient': 'requestclient',
+    'RSEClient': 'rseclient',
+    'RuleClient': 'ruleclient',
+    'ScopeClient': 'scopeclient',
+    'SubscriptionClient': 'subscriptionclient',
+    'TouchClient': 'touchclient',
+    'UploadClient': 'uploadclient',
+}
+
+__all__ = list(_LAZY_CLIENTS)
+
+
+def __getattr__(name):
+    if name in _LAZY_CLIENTS:
+        module = importlib.import_module('.' + _LAZY_CLIENTS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -23,14 +23,17 @@ import os
 import random
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from configparser import NoOptionError, NoSectionError
 from os import environ, fdopen, path, makedirs, geteuid
 from shutil import move
 from tempfile import mkstemp
+from threading import Lock
 from urllib.parse import urlparse
 
 from dogpile.cache import make_region
 from requests import Session, Response
+from requests.adapters import HTTPAdapter
 from requests.exceptions import ConnectionError
 from requests.status_codes import codes
 
@@ -43,11 +46,6 @@ from rucio.common.exception import (CannotAuthenticate, ClientProtocolNotSupport
 from rucio.common.extra import import_extras
 from rucio.common.utils import build_url, get_tmp_dir, my_key_generator, parse_response, ssh_sign, setup_logger
 
-EXTRA_MODULES = import_extras(['requests_kerberos'])
-
-if EXTRA_MODULES['requests_kerberos']:
-    from requests_kerberos import HTTPKerberosAuth  # pylint: disable=import-error
-
 LOG = setup_logger(module_name=__name__)
 
 REGION = make_region(function_key_generator=my_key_generator).configure(
@@ -57,6 +55,7 @@ REGION = make_region(function_key_generator=my_key_generator).configure(
 
 STATUS_CODES_TO_RETRY = [502, 503, 504]
 MAX_RETRY_BACK_OFF_SECONDS = 10
+DEFAULT_MAX_CONCURRENT_REQUESTS = 8
 
 
 @REGION.cache_on_arguments(namespace='host_to_choose')
@@ -100,7 +99,9 @@ class BaseClient(object):
         self.list_hosts = []
         self.auth_host = auth_host
         self.logger = logger or LOG
-        self.session = Session()
+        self.max_concurrent_requests = max(1, config_get_int('client', 'max_concurrent_requests', False, DEFAULT_MAX_CONCURRENT_REQUESTS))
+        self._token_lock = Lock()
+        self.session = self._new_session()
         self.user_agent = "%s/%s" % (user_agent, version.version_string())  # e.g. "rucio-clients/0.2.13"
         sys.argv[0] = sys.argv[0].split('/')[-1]
         self.script_id = '::'.join(sys.argv[0:2])
@@ -341,6 +342,41 @@ class BaseClient(object):
             text = "%s ... %s" % (text[:maxlen - 15], text[-10:])
         return text
 
+    def _new_session(self):
+        """
+        Create a requests session whose connection pool is big enough to serve max_concurrent_requests
+        simultaneous requests to the same host without opening and discarding connections.
+        """
+        session = Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_concurrent_requests)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def map_concurrently(self, function, arguments, max_workers=None):
+        """
+        Call a function for each of the arguments using a bounded pool of threads.
+        All threads share the connection pool and the authentication token of this client,
+        so the function can issue any number of API calls on this client object.
+        Exceptions raised by the API calls are the same as for sequential calls.
+
+        :param function: the function to call with each of the arguments. Streamed responses must be consumed inside the function.
+        :param arguments: iterable of arguments.
+        :param max_workers: (optional) maximum number of concurrent calls. Defaults to the max_concurrent_requests client setting.
+        :return: a list with the return values of the function, in the order of the arguments.
+        :raises: the exception of the first failed call, in the order of the arguments. Pending calls are cancelled.
+        """
+        arguments = list(arguments)
+        max_workers = min(max_workers or self.max_concurrent_requests, len(arguments))
+        if max_workers <= 1:
+            return [function(argument) for argument in arguments]
+
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='rucio-client')
+        try:
+            return list(executor.map(function, arguments))
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
     def _back_off(self, retry_number, reason):
         """
         Sleep a certain amount of time which increases with the retry count
@@ -426,8 +462,11 @@ class BaseClient(object):
                 continue
 
             if result is not None and result.status_code == codes.unauthorized and not get_token:  # pylint: disable-msg=E1101
-                self.session = Session()
-                self.__get_token()
+                with self._token_lock:
+                    # Concurrent requests may fail together; only the first one fetches a new token
+                    if hds['X-Rucio-Auth-Token'] == self.auth_token:
+                        self.session = self._new_session()
+                        self.__get_token()
                 hds['X-Rucio-Auth-Token'] = self.auth_token
             else:
                 break
@@ -757,12 +796,14 @@ class BaseClient(object):
 
         :returns: True if the token was successfully received. False otherwise.
         """
-        if not EXTRA_MODULES['requests_kerberos']:
+        # requests_kerberos is only loaded when needed, to keep the client import fast
+        requests_kerberos = import_extras(['requests_kerberos'])['requests_kerberos']
+        if not requests_kerberos:
             raise MissingModuleException('The requests-kerberos module is not installed.')
 
         url = build_url(self.auth_host, path='auth/gss')
 
-        result = self._send_request(url, get_token=True, auth=HTTPKerberosAuth())
+        result = self._send_request(url, get_token=True, auth=requests_kerberos.HTTPKerberosAuth())
 
         if not result:
             self.logger.error('Cannot retrieve authentication token!')
@@ -389,6 +389,22 @@ class DIDClient(BaseClient):
             exc_cls, exc_msg = self._get_exception(headers=r.headers, status_code=r.status_code, data=r.content)
             raise exc_cls(exc_msg)
 
+    def get_dids(self, dids, dynamic_depth=None, max_workers=None):
+        """
+        Retrieve several data identifiers with concurrent requests.
+
+        :param dids: The list of data identifiers (DIDs) like :
+            [{'scope': <scope1>, 'name': <name1>}, {'scope': <scope2>, 'name': <name2>}, ...]
+        :param dynamic_depth: The DID type as string ('FILE'/'DATASET') at which to stop the dynamic
+        length/bytes calculation. If not set, the size will not be computed dynamically.
+        :param max_workers: The maximum number of concurrent requests. Defaults to the max_concurrent_requests client setting.
+
+        :returns: A list of dictionaries, in the order of the given DIDs.
+        """
+        return self.map_concurrently(lambda did: self.get_did(scope=did['scope'], name=did['name'], dynamic_depth=dynamic_depth),
+                                     dids,
+                                     max_workers=max_workers)
+
     def get_metadata(self, scope, name, plugin='DID_COLUMN'):
         """
         Get data identifier metadata
@@ -31,7 +31,9 @@ from rucio.client.client import Client
 from rucio.common.config import config_get
 from rucio.common.didtype import DID
 from rucio.common.exception import (InputValidationError, NoFilesDownloaded, NotAllFilesDownloaded, RucioException)
+from rucio.common.filecache import FileCache, file_cache_key
 from rucio.common.pcache import Pcache
+from rucio.common.replicacache import KIND_DID, KIND_DIDS, KIND_FILES, ReplicaCache
 from rucio.common.utils import GLOBALLY_SUPPORTED_CHECKSUMS, CHECKSUM_ALGO_DICT, PREFERRED_CHECKSUM
 from rucio.common.utils import adler32, detect_client_location, generate_uuid, parse_replicas_from_string, \
     send_trace, sizefmt, execute, parse_replicas_from_file, extract_scope
@@ -48,6 +50,7 @@ class FileDownloadState(str, enum.Enum):
     DONE = "DONE"
     ALREADY_DONE = "ALREADY_DONE"
     FOUND_IN_PCACHE = "FOUND_IN_PCACHE"
+    FOUND_IN_FILE_CACHE = "FOUND_IN_FILE_CACHE"
     FILE_NOT_FOUND = "FILE_NOT_FOUND"
     FAIL_VALIDATE = "FAIL_VALIDATE"
     FAILED = "FAILED"
@@ -120,13 +123,17 @@ class BaseExtractionTool:
 
 class DownloadClient:
 
-    def __init__(self, client=None, logger=None, tracing=True, check_admin=False, check_pcache=False):
+    def __init__(self, client=None, logger=None, tracing=True, check_admin=False, check_pcache=False, replica_cache=None, file_cache=None):
         """
         Initialises the basic settings for an DownloadClient object
 
         :param client:           Optional: rucio.client.client.Client object. If None, a new object will be created.
         :param external_traces:  Optional: reference to a list where traces can be added
         :param logger:           Optional: logging.Logger object. If None, default logger will be used.
+        :param replica_cache:    Optional: rucio.common.replicacache.ReplicaCache object used to cache DID and replica resolution.
+                                 If None, the cache is created from the [download] configuration section (disabled by default).
+        :param file_cache:       Optional: rucio.common.filecache.FileCache object used to cache downloaded files on the node.
+                                 If None, the cache is created from the [download] configuration section (disabled by default).
         """
         self.check_pcache = check_pcache
         if not logger:
@@ -176,6 +183,9 @@ class DownloadClient:
         self.extraction_tools.append(BaseExtractionTool('tar', '--version', extract_args, logger=self.logger))
         self.extract_scope_convention = config_get('common', 'extract_scope', False, None)
 
+        self.replica_cache = replica_cache if replica_cache is not None else ReplicaCache.from_config(logger=self.logger)
+        self.file_cache = file_cache if file_cache is not None else FileCache.from_config(logger=self.logger)
+
     def download_pfns(self, items, num_threads=2, trace_custom_fields={}, traces_copy_out=None, deactivate_file_download_exceptions=False):
         """
         Download items with a given PFN. This function can only download files, no datasets.
@@ -487,6 +497,7 @@ class DownloadClient:
         """
         logger = self.logger
         pcache = Pcache() if self.check_pcache and len(item.get('archive_items', [])) == 0 else None
+        file_cache_item_key = file_cache_key(item) if self.file_cache and len(item.get('archive_items', [])) == 0 else None
         did_scope = item['scope']
         did_name = item['name']
         did_str = '%s:%s' % (did_scope, did_name)
@@ -533,6 +544,20 @@ class DownloadClient:
                 send_trace(trace, self.client.host, self.client.user_agent)
                 return item
 
+        # checking the local file cache, which does not depend on the replicas
+        if file_cache_item_key:
+            first_dest_file_path = dest_file_paths[0]
+            if self.file_cache.get(file_cache_item_key, first_dest_file_path):
+                logger(logging.INFO, '%sFile found in the local file cache: %s' % (log_prefix, did_str))
+                for cur_dest_file_path in dest_file_paths[1:]:
+                    shutil.copy2(first_dest_file_path, cur_dest_file_path)
+                item['clientState'] = FileDownloadState.FOUND_IN_FILE_CACHE
+                trace['transferStart'] = time.time()
+                trace['transferEnd'] = time.time()
+                trace['clientState'] = FileDownloadState.FOUND_IN_FILE_CACHE
+                self._send_trace(trace)
+                return item
+
         # check if file has replicas
         sources = item.get('sources')
         if not sources or not len(sources):
@@ -680,6 +705,10 @@ class DownloadClient:
             except Exception as e:
                 logger(logging.WARNING, 'Failed to load file to pcache: %s' % str(e))
 
+        # only files whose checksum was verified are cached, as they are served by their checksum afterwards
+        if file_cache_item_key and not item.get('merged_options', {}).get('ignore_checksum', False):
+            self.file_cache.add(file_cache_item_key, first_dest_file_path)
+
         for cur_dest_file_path in dest_file_path_iter:
             logger(logging.DEBUG, "copying '%s' to '%s'" % (first_dest_file_path, cur_dest_file_path))
             shutil.copy2(first_dest_file_path, cur_dest_file_path)
@@ -1032,7 +1061,7 @@ class DownloadClient:
         if dids is None:
             self.logger(logging.DEBUG, 'Resolving DIDs by using filter options')
             scope = filters.pop('scope')
-            for did in self.client.list_dids(scope, filters=filters, did_type='all', long=True):
+            for did in self._list_dids(scope, filters):
                 yield did
             return
 
@@ -1043,7 +1072,7 @@ class DownloadClient:
             scope, did_name = self._split_did_str(did_str)
             filters['name'] = did_name
             any_did_resolved = False
-            for did in self.client.list_dids(scope, filters=filters, did_type='all', long=True):
+            for did in self._list_dids(scope, filters):
                 yield did
                 any_did_resolved = True
 
@@ -1052,6 +1081,114 @@ class DownloadClient:
             if not any_did_resolved and '*' not in did_name:
                 yield {'scope': scope, 'name': did_name}
 
+    def _list_dids(self, scope, filters):
+        """
+        Wrapper around list_dids which consults the replica cache first, if enabled.
+        :param scope: scope of the DIDs
+        :param filters: filters to select the DIDs
+        """
+        if not self.replica_cache:
+            yield from self.client.list_dids(scope, filters=filters, did_type='all', long=True)
+            return
+
+        key = self._replica_cache_key(scope, filters)
+        dids = self.replica_cache.get(KIND_DIDS, key)
+        if dids is None:
+            dids = list(self.client.list_dids(scope, filters=filters, did_type='all', long=True))
+            if dids:
+                self.replica_cache.set(KIND_DIDS, key, dids)
+        else:
+            self.logger(logging.DEBUG, 'Resolved DIDs of scope %s from replica cache' % scope)
+        yield from dids
+
+    def _get_did_with_size(self, scope, name):
+        """
+        Wrapper around get_did with dynamic_depth='FILE' which consults the replica cache first, if enabled.
+        :param scope: scope of the DID
+        :param name: name of the DID
+        """
+        if not self.replica_cache:
+            return self.client.get_did(scope=scope, name=name, dynamic_depth='FILE')
+
+        key = self._replica_cache_key(scope, name)
+        did = self.replica_cache.get(KIND_DID, key)
+        if did is None:
+            did = self.client.get_did(scope=scope, name=name, dynamic_depth='FILE')
+            self.replica_cache.set(KIND_DID, key, did)
+        return did
+
+    def _replica_cache_key(self, *args):
+        """
+        Build a replica cache key which is unique for the rucio server, VO and account in use.
+        """
+        return ReplicaCache.make_key(self.client.host, self.client.vo, self.client.account, *args)
+
+    def _list_replicas(self, input_dids, schemes, rse_expression, sort, resolve_archives, nrandom):
+        """
+        List the replicas of the input DIDs and parse them into file items.
+
+        If the replica cache is enabled, the list of files is cached per input DID and listing option.
+        Only the DIDs which are not found in the cache are sent to the server. Random selections (nrandom)
+        are never cached.
+
+        :param input_dids: dictionary of DIDType objects to the resolved did dictionaries
+        :param schemes: list of schemes or None
+        :param rse_expression: RSE expression to filter the replicas
+        :param sort: the replica sorting algorithm
+        :param resolve_archives: bool indicating whether archives should be resolved
+        :param nrandom: the number of random files to select
+
+        :returns: list of dictionaries, one for each file DID
+        """
+        def _list_replicas_from_server(dids):
+            metalink_str = self.client.list_replicas([{'scope': did.scope, 'name': did.name} for did in dids],
+                                                     schemes=schemes,
+                                                     ignore_availability=False,
+                                                     rse_expression=rse_expression,
+                                                     client_location=self.client_location,
+                                                     sort=sort,
+                                                     resolve_archives=resolve_archives,
+                                                     resolve_parents=True,
+                                                     nrandom=nrandom,
+                                                     metalink=True)
+            return parse_replicas_from_string(metalink_str)
+
+        if not self.replica_cache or nrandom:
+            return _list_replicas_from_server(input_dids)
+
+        options = (schemes, rse_expression, sort, resolve_archives, self.client_location)
+        file_items_by_did = {}
+        missing_dids = []
+        for did in input_dids:
+            cached_file_items = self.replica_cache.get(KIND_FILES, self._replica_cache_key(str(did), *options))
+            if cached_file_items is None:
+                missing_dids.append(did)
+            else:
+                file_items_by_did[did] = cached_file_items
+        self.logger(logging.DEBUG, 'replica cache: %d hit(s), %d miss(es)' % (len(file_items_by_did), len(missing_dids)))
+
+        if missing_dids:
+            file_items = _list_replicas_from_server(missing_dids)
+            for did in missing_dids:
+                did_str = str(did)
+                did_file_items = [f for f in file_items if f['did'] == did_str or did_str in f['parent_dids']]
+                file_items_by_did[did] = did_file_items
+                # Don't cache DIDs which don't exist (yet)
+                if did_file_items:
+                    self.replica_cache.set(KIND_FILES, self._replica_cache_key(did_str, *options), did_file_items)
+
+        # Files reachable from several input DIDs must be listed only once
+        merged_file_items = {}
+        for did_file_items in file_items_by_did.values():
+            for file_item in did_file_items:
+                merged_item = merged_file_items.get(file_item['did'])
+                if merged_item is None:
+                    merged_item = merged_file_items[file_item['did']] = copy.deepcopy(file_item)
+                    merged_item['parent_dids'] = set(file_item.get('parent_dids', []))
+                else:
+                    merged_item['parent_dids'].update(file_item.get('parent_dids', []))
+        return list(merged_file_items.values())
+
     def _resolve_and_merge_input_items(self, input_items, sort=None):
         """
         This function takes the input items given to download_dids etc.
@@ -1109,8 +1246,9 @@ class DownloadClient:
         did_to_input_items = {}
 
         # Resolve DIDs
-        for item in input_items:
-            resolved_dids = list(self._resolve_one_item_dids(item))
+        dids_without_size = []
+        resolved_dids_per_item = self.client.map_concurrently(lambda item: list(self._resolve_one_item_dids(item)), input_items)
+        for item, resolved_dids in zip(input_items, resolved_dids_per_item):
             if not resolved_dids:
                 logger(logging.WARNING, 'An item didnt have any DIDs after resolving the input: %s.' % item.get('did', item))
             item['dids'] = resolved_dids
@@ -1118,9 +1256,12 @@ class DownloadClient:
                 did_to_input_items.setdefault(DID(did), []).append(item)
 
                 if 'CONTAINER' in did.get('did_type', '').upper() or ('length' in did and not did['length']):
-                    did_with_size = self.client.get_did(scope=did['scope'], name=did['name'], dynamic_depth='FILE')
-                    did['length'] = did_with_size['length']
-                    did['bytes'] = did_with_size['bytes']
+                    dids_without_size.append(did)
+
+        dids_with_size = self.client.map_concurrently(lambda did: self._get_did_with_size(did['scope'], did['name']), dids_without_size)
+        for did, did_with_size in zip(dids_without_size, dids_with_size):
+            did['length'] = did_with_size['length']
+            did['bytes'] = did_with_size['bytes']
 
         # group input items by common options to reduce the number of calls to list_replicas
         distinct_keys = ['rse', 'force_scheme', 'no_resolve_archives']
@@ -1138,8 +1279,8 @@ class DownloadClient:
             if not found_compatible_group:
                 item_groups.append([item])
 
-        # List replicas for dids
-        merged_items_with_sources = []
+        # Prepare the list_replicas call of each group
+        group_queries = []
         for item_group in item_groups:
             # Take configuration from the first item in the group; but dids from all items
             item = item_group[0]
@@ -1157,6 +1298,29 @@ class DownloadClient:
             rse_expression = item.get('rse')
             logger(logging.DEBUG, 'rse_expression: %s' % rse_expression)
 
+            # get PFNs of files and datasets
+            logger(logging.DEBUG, 'num DIDs for list_replicas call: %d' % len(item['dids']))
+
+            nrandom = item.get('nrandom')
+            if nrandom:
+                logger(logging.INFO, 'Selecting %d random replicas from DID(s): %s' % (nrandom, [str(did) for did in input_dids]))
+
+            group_queries.append({'input_dids': input_dids,
+                                  'schemes': schemes,
+                                  'rse_expression': rse_expression,
+                                  'sort': sort,
+                                  'resolve_archives': not item.get('no_resolve_archives'),
+                                  'nrandom': nrandom})
+
+        # List replicas for dids; the groups are independent, so they are listed concurrently
+        file_items_per_group = self.client.map_concurrently(lambda query: self._list_replicas(**query), group_queries)
+
+        merged_items_with_sources = []
+        for item_group, query, file_items in zip(item_groups, group_queries, file_items_per_group):
+            item = item_group[0]
+            input_dids = query['input_dids']
+            nrandom = query['nrandom']
+
             # obtaining the choice of Implementation
             impl = item.get('impl')
             if impl:
@@ -1167,24 +1331,6 @@ class DownloadClient:
                     impl = 'rucio.rse.protocols.' + impl
             logger(logging.DEBUG, 'impl: %s' % impl)
 
-            # get PFNs of files and datasets
-            logger(logging.DEBUG, 'num DIDs for list_replicas call: %d' % len(item['dids']))
-
-            nrandom = item.get('nrandom')
-            if nrandom:
-                logger(logging.INFO, 'Selecting %d random replicas from DID(s): %s' % (nrandom, [str(did) for did in input_dids]))
-
-            metalink_str = self.client.list_replicas([{'scope': did.scope, 'name': did.name} for did in input_dids],
-                                                     schemes=schemes,
-                                                     ignore_availability=False,
-                                                     rse_expression=rse_expression,
-                                                     client_location=self.client_location,
-                                                     sort=sort,
-                                                     resolve_archives=not item.get('no_resolve_archives'),
-                                                     resolve_parents=True,
-                                                     nrandom=nrandom,
-                                                     metalink=True)
-            file_items = parse_replicas_from_string(metalink_str)
             for file in file_items:
                 if impl:
                     file['impl'] = impl
@@ -1565,7 +1711,7 @@ class DownloadClient:
         :raises NoFilesDownloaded:
         :raises NotAllFilesDownloaded:
         """
-        success_states = [FileDownloadState.ALREADY_DONE, FileDownloadState.DONE, FileDownloadState.FOUND_IN_PCACHE]
+        success_states = [FileDownloadState.ALREADY_DONE, FileDownloadState.DONE, FileDownloadState.FOUND_IN_PCACHE, FileDownloadState.FOUND_IN_FILE_CACHE]
         num_successful = 0
         num_failed = 0
         for item in output_items:
@@ -207,6 +207,25 @@ class ReplicaClient(BaseClient):
         exc_cls, exc_msg = self._get_exception(headers=r.headers, status_code=r.status_code, data=r.content)
         raise exc_cls(exc_msg)
 
+    def list_replicas_concurrently(self, dids, chunk_size=None, max_workers=None, **kwargs):
+        """
+        List file replicas for a large list of data identifiers (DIDs).
+        The list is split into chunks which are listed with concurrent requests.
+
+        :param dids: The list of data identifiers (DIDs) like :
+            [{'scope': <scope1>, 'name': <name1>}, {'scope': <scope2>, 'name': <name2>}, ...]
+        :param chunk_size: The number of DIDs per request. Defaults to REPLICAS_CHUNK_SIZE.
+        :param max_workers: The maximum number of concurrent requests. Defaults to the max_concurrent_requests client setting.
+        :param kwargs: The other options of list_replicas, except metalink. nrandom is applied per chunk.
+
+        :returns: A list of dictionaries with replica information.
+        """
+        def _list_chunk(chunk):
+            return list(self.list_replicas(chunk, metalink=False, **kwargs))
+
+        for replicas in self.map_concurrently(_list_chunk, chunks(dids, chunk_size or self.REPLICAS_CHUNK_SIZE), max_workers=max_workers):
+            yield from replicas
+
     def list_suspicious_replicas(self, rse_expression=None, younger_than=None, nattempts=None):
         """
         List file replicas tagged as suspicious.
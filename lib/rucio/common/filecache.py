@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+# Copyright European Organization for Nuclear Research (CERN) since 2012
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Worker node file cache with an embedded index.
+
+Files are stored below the cache directory and indexed in a SQLite database,
+which keeps the size and the last access time of every entry and the total
+size of the cache. Lookups, insertions and the eviction of the least recently
+used entries are index operations; the cache tree is never walked.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from rucio.common.config import config_get, config_get_bool, config_get_float, config_get_int
+from rucio.common.utils import get_tmp_dir
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from typing import Any, Optional
+
+    LoggerFunction = Callable[..., Any]
+
+DEFAULT_MAX_BYTES = 10 * 1024 ** 3
+DEFAULT_HYSTERESIS = 0.75
+
+
+class FileCache:
+    """
+    LRU cache of files, safe to be shared by concurrent threads and processes.
+
+    Entries are identified by an arbitrary key, e.g. the DID and checksum of a file.
+    Files are copied into and out of the cache, never hard linked, so that modifying a
+    provided file cannot alter the read-only cache entry. Once the total size exceeds
+    ``max_bytes``, least recently used entries are deleted until it is below
+    ``hysteresis * max_bytes``.
+
+    Every operation is best effort: a failing cache never breaks the caller, it
+    just behaves like an empty cache.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES, hysteresis=DEFAULT_HYSTERESIS, logger: "LoggerFunction" = logging.log):
+        """
+        :param cache_dir:  Directory of the cache. Created if it does not exist.
+        :param max_bytes:  Upper bound of the summed size of all cached files.
+        :param hysteresis: Fraction of max_bytes down to which the cache is cleaned once the bound is exceeded.
+        :param logger:     Optional decorated logger that can be passed from the calling client.
+        """
+        self.cache_dir = cache_dir or os.path.join(get_tmp_dir(), '.rucio_cache', 'files')
+        self.data_dir = os.path.join(self.cache_dir, 'data')
+        self.index_path = os.path.join(self.cache_dir, 'index.db')
+        self.max_bytes = max_bytes
+        self.hysteresis = hysteresis
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @classmethod
+    def from_config(cls, logger: "LoggerFunction" = logging.log):
+        """
+        Create the cache from the [download] section of the configuration.
+
+        :returns: a FileCache if ``file_cache`` is enabled, otherwise None.
+        """
+        if not config_get_bool('download', 'file_cache', False, False):
+            return None
+        return cls(cache_dir=config_get('download', 'file_cache_dir', False, None),
+                   max_bytes=config_get_int('download', 'file_cache_max_bytes', False, DEFAULT_MAX_BYTES),
+                   hysteresis=config_get_float('download', 'file_cache_hysteresis', False, DEFAULT_HYSTERESIS),
+                   logger=logger)
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(self.data_dir, 0o700, exist_ok=True)
+            # Transactions are handled explicitly with BEGIN IMMEDIATE, which serialises writers across processes
+            conn = sqlite3.connect(self.index_path, timeout=60, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS entries ('
+                         'key TEXT PRIMARY KEY, '
+                         'path TEXT NOT NULL, '
+                         'size INTEGER NOT NULL, '
+                         'accessed_at REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_accessed_at_idx ON entries (accessed_at)')
+            conn.execute('CREATE TABLE IF NOT EXISTS usage (id INTEGER PRIMARY KEY CHECK (id = 0), files INTEGER NOT NULL, bytes INTEGER NOT NULL)')
+            conn.execute('INSERT OR IGNORE INTO usage (id, files, bytes) VALUES (0, 0, 0)')
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _path_for_key(key):
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(digest[:2], digest[2:4], digest)
+
+    def get(self, key: str, dst: str) -> bool:
+        """
+        Provide the cached file at the destination path.
+
+        :param key: key of the cache entry.
+        :param dst: destination path of the file. Its directory must exist.
+
+        :returns: True if the file was found in the cache and placed at dst, False otherwise.
+        """
+        with self._lock:
+            try:
+                conn = self._connect()
+                row = conn.execute('SELECT path FROM entries WHERE key = ?', (key, )).fetchone()
+                if row is None:
+                    return False
+                tmp_dst = '%s.%d.%d' % (dst, os.getpid(), threading.get_ident())
+                try:
+                    # the copy gets the default permissions, not the read-only ones of the entry
+                    shutil.copyfile(os.path.join(self.data_dir, row[0]), tmp_dst)
+                    os.replace(tmp_dst, dst)
+                except OSError as error:
+                    self.logger(logging.DEBUG, 'File cache entry %s is not usable: %s' % (key, str(error)))
+                    self._remove_entries(conn, [key])
+                    return False
+                conn.execute('UPDATE entries SET accessed_at = ? WHERE key = ?', (time.time(), key))
+                return True
+            except (sqlite3.Error, OSError) as error:
+                self.logger(logging.DEBUG, 'File cache lookup failed: %s' % str(error))
+                return False
+
+    def add(self, key: str, src: str) -> bool:
+        """
+        Add a file to the cache and evict the least recently used entries if needed.
+
+        :param key: key of the cache entry.
+        :param src: path of the file to cache.
+
+        :returns: True if the file is in the cache afterwards, False otherwise.
+        """
+        relative_path = self._path_for_key(key)
+        path = os.path.join(self.data_dir, relative_path)
+        tmp_path = '%s.%d.%d' % (path, os.getpid(), threading.get_ident())
+        with self._lock:
+            try:
+                size = os.stat(src).st_size
+                if size > self.max_bytes:
+                    return False
+                conn = self._connect()
+                if conn.execute('SELECT 1 FROM entries WHERE key = ?', (key, )).fetchone():
+                    return True
+
+                os.makedirs(os.path.dirname(path), 0o700, exist_ok=True)
+                shutil.copyfile(src, tmp_path)
+                os.chmod(tmp_path, 0o400)
+                os.replace(tmp_path, path)
+
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    cursor = conn.execute('INSERT OR IGNORE INTO entries (key, path, size, accessed_at) VALUES (?, ?, ?, ?)',
+                                          (key, relative_path, size, time.time()))
+                    if cursor.rowcount:
+                        conn.execute('UPDATE usage SET files = files + 1, bytes = bytes + ? WHERE id = 0', (size, ))
+                    conn.execute('COMMIT')
+                except sqlite3.Error:
+                    conn.execute('ROLLBACK')
+                    raise
+                self._evict(conn)
+                return True
+            except (sqlite3.Error, OSError) as error:
+                self.logger(logging.WARNING, 'Failed to add %s to the file cache: %s' % (src, str(error)))
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return False
+
+    def _remove_entries(self, conn, keys):
+        """
+        Remove index entries and their files.
+        """
+        removed = []
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for key in keys:
+                row = conn.execute('SELECT path, size FROM entries WHERE key = ?', (key, )).fetchone()
+                if row is None:
+                    continue
+                conn.execute('DELETE FROM entries WHERE key = ?', (key, ))
+                conn.execute('UPDATE usage SET files = files - 1, bytes = bytes - ? WHERE id = 0', (row[1], ))
+                removed.append(row[0])
+            conn.execute('COMMIT')
+        except sqlite3.Error:
+            conn.execute('ROLLBACK')
+            raise
+        for relative_path in removed:
+            try:
+                os.remove(os.path.join(self.data_dir, relative_path))
+            except FileNotFoundError:
+                pass
+
+    def _evict(self, conn):
+        """
+        Delete least recently used entries until the cache is below its low watermark.
+        """
+        _, total = self._usage(conn)
+        if total <= self.max_bytes:
+            return
+        target = total - self.hysteresis * self.max_bytes
+        freed = 0
+        evicted = []
+        for key, size in conn.execute('SELECT key, size FROM entries ORDER BY accessed_at'):
+            evicted.append(key)
+            freed += size
+            if freed >= target:
+                break
+        self.logger(logging.DEBUG, 'Evicting %d file(s) from the file cache' % len(evicted))
+        self._remove_entries(conn, evicted)
+
+    @staticmethod
+    def _usage(conn):
+        return conn.execute('SELECT files, bytes FROM usage WHERE id = 0').fetchone()
+
+    def usage(self) -> "dict[str, int]":
+        """
+        Return the number of files and bytes in the cache, without walking the cache tree.
+        """
+        with self._lock:
+            files, bytes_ = self._usage(self._connect())
+        return {'files': files, 'bytes': bytes_}
+
+    def remove(self, key: str) -> None:
+        """
+        Remove an entry from the cache.
+        """
+        with self._lock:
+            try:
+                self._remove_entries(self._connect(), [key])
+            except (sqlite3.Error, OSError) as error:
+                self.logger(logging.DEBUG, 'File cache removal failed: %s' % str(error))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def file_cache_key(item: "dict[str, Any]") -> "Optional[str]":
+    """
+    Build the cache key of a file to download. Files are identified by their DID and
+    checksum, so that a re-created file with the same name is never served from the cache.
+
+    :param item: the download item with scope, name and adler32 or md5.
+
+    :returns: the key, or None if the file has no checksum.
+    """
+    checksum = item.get('adler32') or item.get('md5')
+    if not checksum:
+        return None
+    return '%s:%s:%s' % (item['scope'], item['name'], checksum)
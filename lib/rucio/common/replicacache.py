@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+# Copyright European Organization for Nuclear Research (CERN) since 2012
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Persistent, client-side cache of DID resolution and replica listing results.
+
+The download client resolves its input through ``list_dids`` and ``list_replicas``
+calls. Repeated jobs on the same datasets re-resolve identical replica lists, so
+the results can be kept in a small SQLite database on the worker node and be
+reused for a limited time.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from rucio.common.config import config_get, config_get_bool, config_get_int
+from rucio.common.utils import get_tmp_dir
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from typing import Any, Optional
+
+    LoggerFunction = Callable[..., Any]
+
+DEFAULT_TTL = 3600
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+KIND_DIDS = 'dids'
+KIND_DID = 'did'
+KIND_FILES = 'files'
+
+
+class ReplicaCache:
+    """
+    SQLite backed key-value store with a time to live per entry and an upper
+    bound on the total size of the stored values. Least recently used entries
+    are evicted first once the size bound is exceeded.
+
+    Every operation is best effort: a corrupt, locked or unwritable database
+    never breaks the caller, it just behaves like an empty cache.
+    """
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES, logger: "LoggerFunction" = logging.log):
+        """
+        :param path:      Path of the SQLite database. Created if it does not exist.
+        :param ttl:       Number of seconds an entry stays valid.
+        :param max_bytes: Upper bound of the summed size of all cached values.
+        :param logger:    Optional decorated logger that can be passed from the calling client.
+        """
+        self.path = path or os.path.join(get_tmp_dir(), '.rucio_cache', 'replicas.db')
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @classmethod
+    def from_config(cls, logger: "LoggerFunction" = logging.log):
+        """
+        Create the cache from the [download] section of the configuration.
+
+        :returns: a ReplicaCache if ``replica_cache`` is enabled, otherwise None.
+        """
+        if not config_get_bool('download', 'replica_cache', False, False):
+            return None
+        return cls(path=config_get('download', 'replica_cache_path', False, None),
+                   ttl=config_get_int('download', 'replica_cache_ttl', False, DEFAULT_TTL),
+                   max_bytes=config_get_int('download', 'replica_cache_max_bytes', False, DEFAULT_MAX_BYTES),
+                   logger=logger)
+
+    def _connect(self):
+        if self._conn is None:
+            cache_dir = os.path.dirname(self.path)
+            if cache_dir and not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir, 0o700, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS entries ('
+                         'kind TEXT NOT NULL, '
+                         'key TEXT NOT NULL, '
+                         'value TEXT NOT NULL, '
+                         'size INTEGER NOT NULL, '
+                         'expires_at REAL NOT NULL, '
+                         'accessed_at REAL NOT NULL, '
+                         'PRIMARY KEY (kind, key))')
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_accessed_at_idx ON entries (accessed_at)')
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def make_key(*args: "Any") -> str:
+        """
+        Build a deterministic key from JSON serialisable arguments.
+        """
+        return json.dumps(args, sort_keys=True, default=str, separators=(',', ':'))
+
+    def get(self, kind: str, key: str) -> "Optional[Any]":
+        """
+        Return the cached value or None if the entry does not exist or expired.
+
+        :param kind: namespace of the entry, e.g. ``files``.
+        :param key:  key of the entry inside its namespace.
+        """
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connect()
+                row = conn.execute('SELECT value, expires_at FROM entries WHERE kind = ? AND key = ?', (kind, key)).fetchone()
+                if row is None:
+                    return None
+                if row[1] < now:
+                    conn.execute('DELETE FROM entries WHERE kind = ? AND key = ?', (kind, key))
+                    conn.commit()
+                    return None
+                conn.execute('UPDATE entries SET accessed_at = ? WHERE kind = ? AND key = ?', (now, kind, key))
+                conn.commit()
+                return json.loads(row[0])
+            except (sqlite3.Error, OSError, ValueError) as error:
+                self.logger(logging.DEBUG, 'Replica cache lookup failed: %s' % str(error))
+                return None
+
+    def set(self, kind: str, key: str, value: "Any") -> None:
+        """
+        Store a JSON serialisable value and evict entries if the size bound is exceeded.
+
+        :param kind:  namespace of the entry, e.g. ``files``.
+        :param key:   key of the entry inside its namespace.
+        :param value: the value to cache.
+        """
+        now = time.time()
+        with self._lock:
+            try:
+                data = json.dumps(value, default=_json_default)
+                if len(data) > self.max_bytes:
+                    return
+                conn = self._connect()
+                conn.execute('INSERT OR REPLACE INTO entries (kind, key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)',
+                             (kind, key, data, len(data), now + self.ttl, now))
+                self._evict(conn, now)
+                conn.commit()
+            except (sqlite3.Error, OSError, TypeError, ValueError) as error:
+                self.logger(logging.DEBUG, 'Replica cache update failed: %s' % str(error))
+
+    def _evict(self, conn, now):
+        conn.execute('DELETE FROM entries WHERE expires_at < ?', (now, ))
+        total, = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        evicted = []
+        for kind, key, size in conn.execute('SELECT kind, key, size FROM entries ORDER BY accessed_at'):
+            evicted.append((kind, key))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany('DELETE FROM entries WHERE kind = ? AND key = ?', evicted)
+
+    def clear(self) -> None:
+        """
+        Remove all entries from the cache.
+        """
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute('DELETE FROM entries')
+                conn.commit()
+            except (sqlite3.Error, OSError) as error:
+                self.logger(logging.DEBUG, 'Replica cache clear failed: %s' % str(error))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def _json_default(obj):
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    return str(obj)
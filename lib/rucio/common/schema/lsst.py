@@ -179,8 +179,8 @@ IP = {
 CLIENT_STATE = {
     "description": "Client state",
     "type": "string",
-    "enum": ['DONE', 'FAILED', 'PROCESSING', 'ALREADY_DONE', 'FILE_NOT_FOUND', 'FOUND_IN_PCACHE', 'DOWNLOAD_ATTEMPT',
-             'FAIL_VALIDATE', 'FOUND_ROOT']
+    "enum": ['DONE', 'FAILED', 'PROCESSING', 'ALREADY_DONE', 'FILE_NOT_FOUND', 'FOUND_IN_PCACHE', 'FOUND_IN_FILE_CACHE',
+             'DOWNLOAD_ATTEMPT', 'FAIL_VALIDATE', 'FOUND_ROOT']
 }
 
 RULE = {"description": "Replication rule",
@@ -53,14 +53,6 @@ from rucio.common.exception import MissingModuleException, InvalidType, InputVal
 from rucio.common.extra import import_extras
 from rucio.common.types import InternalAccount, InternalScope
 
-EXTRA_MODULES = import_extras(['paramiko'])
-
-if EXTRA_MODULES['paramiko']:
-    try:
-        from paramiko import RSAKey
-    except Exception:
-        EXTRA_MODULES['paramiko'] = False
-
 if TYPE_CHECKING:
     from collections.abc import Callable
     from typing import TypeVar
@@ -974,10 +966,12 @@ def ssh_sign(private_key, message):
     """
     if isinstance(message, str):
         message = message.encode()
-    if not EXTRA_MODULES['paramiko']:
+    # paramiko is slow to import, so it is only loaded when needed
+    paramiko = import_extras(['paramiko'])['paramiko']
+    if not paramiko or not hasattr(paramiko, 'RSAKey'):
         raise MissingModuleException('The paramiko module is not installed or faulty.')
     sio_private_key = StringIO(private_key)
-    priv_k = RSAKey.from_private_key(sio_private_key)
+    priv_k = paramiko.RSAKey.from_private_key(sio_private_key)
     sio_private_key.close()
     signature_stream = priv_k.sign_ssh_data(message)
     signature_stream.rewind()
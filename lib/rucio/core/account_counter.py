@@ -13,19 +13,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import datetime
-from typing import TYPE_CHECKING
 
-from sqlalchemy import literal, insert, select
-from sqlalchemy.orm.exc import NoResultFound
+from sqlalchemy import and_, bindparam, delete, event, func, literal, insert, select, tuple_
+from sqlalchemy.orm import Session
 
+from rucio.common.utils import chunks
 from rucio.db.sqla import models, filter_thread_work
 from rucio.db.sqla.session import read_session, transactional_session
 
-if TYPE_CHECKING:
-    from sqlalchemy.orm import Session
-
 MAX_COUNTERS = 10
 
+# session.info key of the {(rse_id, account): [files, bytes]} deltas not yet written to updated_account_counters
+PENDING_DELTAS_KEY = 'rucio.core.account_counter.pending_deltas'
+
 
 @transactional_session
 def add_counter(rse_id, account, *, session: "Session"):
@@ -45,13 +45,35 @@ def increase(rse_id, account, files, bytes_, *, session: "Session"):
     """
     Increments the specified counter by the specified amount.
 
+    The deltas of one transaction are summed up per RSE and account and
+    written as a single updated_account_counters row when the transaction
+    is committed.
+
     :param rse_id:  The id of the RSE.
     :param account: The account name.
     :param files:   The number of added/removed files.
     :param bytes_:   The corresponding amount in bytes.
     :param session: The database session in use.
     """
-    models.UpdatedAccountCounter(account=account, rse_id=rse_id, files=files, bytes=bytes_).save(session=session)
+    delta = session.info.setdefault(PENDING_DELTAS_KEY, {}).setdefault((rse_id, account), [0, 0])
+    delta[0] += files
+    delta[1] += bytes_
+
+
+@event.listens_for(Session, 'before_commit')
+def _write_pending_deltas(session):
+    """
+    Write the coalesced counter deltas of the committing transaction.
+    """
+    deltas = session.info.pop(PENDING_DELTAS_KEY, None)
+    if deltas:
+        session.add_all([models.UpdatedAccountCounter(account=account, rse_id=rse_id, files=files, bytes=bytes_)
+                         for (rse_id, account), (files, bytes_) in deltas.items() if files or bytes_])
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending_deltas(session):
+    session.info.pop(PENDING_DELTAS_KEY, None)
 
 
 @transactional_session
@@ -113,21 +135,66 @@ def update_account_counter(account, rse_id, *, session: "Session"):
     :param rse_id:   The rse_id to update.
     :param session:  Database session in use.
     """
+    update_account_counters(account_rse_ids=[(account, rse_id)], session=session)
 
-    updated_account_counters = session.query(models.UpdatedAccountCounter).filter_by(account=account, rse_id=rse_id).all()
 
-    try:
-        account_counter = session.query(models.AccountUsage).filter_by(account=account, rse_id=rse_id).one()
-        account_counter.bytes += sum([updated_account_counter.bytes for updated_account_counter in updated_account_counters])
-        account_counter.files += sum([updated_account_counter.files for updated_account_counter in updated_account_counters])
-    except NoResultFound:
-        models.AccountUsage(rse_id=rse_id,
-                            account=account,
-                            files=sum([updated_account_counter.files for updated_account_counter in updated_account_counters]),
-                            bytes=sum([updated_account_counter.bytes for updated_account_counter in updated_account_counters])).save(session=session)
-
-    for update in updated_account_counters:
-        update.delete(flush=False, session=session)
+@transactional_session
+def update_account_counters(account_rse_ids, limit=None, *, session: "Session"):
+    """
+    Apply the updated_account_counters of several accounts and RSEs to their account_counters.
+
+    The deltas are summed up per account and RSE in the database and applied with one
+    UPDATE statement. Consumed deltas are deleted by id, so deltas committed concurrently
+    are kept for the next call.
+
+    :param account_rse_ids: The (account, rse_id) tuples to update, at most 1000.
+    :param limit:           Maximum number of deltas to consume; the others are left for the next call.
+    :param session:         Database session in use.
+    :returns:               The number of consumed deltas.
+    """
+    stmt = select(models.UpdatedAccountCounter.id).\
+        where(tuple_(models.UpdatedAccountCounter.account, models.UpdatedAccountCounter.rse_id).in_(account_rse_ids))
+    if limit:
+        stmt = stmt.limit(limit)
+    delta_ids = session.execute(stmt).scalars().all()
+
+    sums = {}
+    for chunk in chunks(delta_ids, 1000):
+        stmt = select(models.UpdatedAccountCounter.account,
+                      models.UpdatedAccountCounter.rse_id,
+                      func.sum(models.UpdatedAccountCounter.files),
+                      func.sum(models.UpdatedAccountCounter.bytes)).\
+            where(models.UpdatedAccountCounter.id.in_(chunk)).\
+            group_by(models.UpdatedAccountCounter.account, models.UpdatedAccountCounter.rse_id)
+        for account, rse_id, sum_files, sum_bytes in session.execute(stmt):
+            files, bytes_ = sums.get((account, rse_id), (0, 0))
+            sums[(account, rse_id)] = (files + sum_files, bytes_ + sum_bytes)
+        stmt = delete(models.UpdatedAccountCounter).\
+            where(models.UpdatedAccountCounter.id.in_(chunk)).\
+            execution_options(synchronize_session=False)
+        session.execute(stmt)
+
+    if not sums:
+        return len(delta_ids)
+
+    stmt = select(models.AccountUsage.account, models.AccountUsage.rse_id).\
+        where(tuple_(models.AccountUsage.account, models.AccountUsage.rse_id).in_(list(sums)))
+    existing = {(account, rse_id) for account, rse_id in session.execute(stmt)}
+
+    updates = [{'b_account': account, 'b_rse_id': rse_id, 'b_files': files, 'b_bytes': bytes_}
+               for (account, rse_id), (files, bytes_) in sums.items() if (account, rse_id) in existing]
+    if updates:
+        table = models.AccountUsage.__table__
+        stmt = table.update().\
+            where(and_(table.c.account == bindparam('b_account'),
+                       table.c.rse_id == bindparam('b_rse_id'))).\
+            values(bytes=table.c.bytes + bindparam('b_bytes'),
+                   files=table.c.files + bindparam('b_files'))
+        session.execute(stmt, updates)
+
+    session.add_all([models.AccountUsage(rse_id=rse_id, account=account, files=files, bytes=bytes_)
+                     for (account, rse_id), (files, bytes_) in sums.items() if (account, rse_id) not in existing])
+    return len(delta_ids)
 
 
 @transactional_session
@@ -1231,6 +1231,21 @@ def delete_dids(
         if oracle_version < 12:
             must_delete_did_meta = False
     if must_delete_did_meta:
+        stmt = delete(
+            models.DidMetaTypedValue
+        ).where(
+            exists(
+                select(1)
+            ).where(
+                models.DidMetaTypedValue.scope == temp_table.scope,
+                models.DidMetaTypedValue.name == temp_table.name
+            )
+        ).execution_options(
+            synchronize_session=False
+        )
+        with METRICS.timer('delete_dids.did_meta_typed_values'):
+            session.execute(stmt)
+
         stmt = delete(
             models.DidMeta
         ).where(
@@ -2235,35 +2250,40 @@ def get_metadata(scope, name, plugin='DID_COLUMN', *, session: "Session"):
 
 
 @stream_session
-def list_parent_dids_bulk(dids, *, session: "Session"):
+def list_parent_dids_bulk(dids, *, temp_table=None, session: "Session"):
     """
     List parent datasets and containers of a did.
 
     :param dids:               A list of dids.
+    :param temp_table:         (optional) A scope/name temporary table to reuse. Its rows are replaced by the dids.
     :param session:            The database session in use.
     :returns:                  List of dids.
     :rtype:                    Generator.
     """
-    condition = []
-    for did in dids:
-        condition.append(and_(models.DataIdentifierAssociation.child_scope == did['scope'],
-                              models.DataIdentifierAssociation.child_name == did['name']))
+    unique_dids = {(did['scope'], did['name']) for did in dids}
+    if not unique_dids:
+        return
 
-    try:
-        for chunk in chunks(condition, 50):
-            stmt = select(
-                models.DataIdentifierAssociation.child_scope,
-                models.DataIdentifierAssociation.child_name,
-                models.DataIdentifierAssociation.scope,
-                models.DataIdentifierAssociation.name,
-                models.DataIdentifierAssociation.did_type
-            ).where(
-                or_(*chunk)
-            )
-            for did_chunk in session.execute(stmt).yield_per(5):
-                yield {'scope': did_chunk.scope, 'name': did_chunk.name, 'child_scope': did_chunk.child_scope, 'child_name': did_chunk.child_name, 'type': did_chunk.did_type}
-    except NoResultFound:
-        raise exception.DataIdentifierNotFound('No Data Identifiers found')
+    if temp_table is None:
+        temp_table = temp_table_mngr(session).create_scope_name_table()
+    else:
+        session.execute(delete(temp_table))
+    session.execute(insert(temp_table), [{'scope': scope, 'name': name} for scope, name in unique_dids])
+
+    stmt = select(
+        models.DataIdentifierAssociation.child_scope,
+        models.DataIdentifierAssociation.child_name,
+        models.DataIdentifierAssociation.scope,
+        models.DataIdentifierAssociation.name,
+        models.DataIdentifierAssociation.did_type
+    ).join_from(
+        temp_table,
+        models.DataIdentifierAssociation,
+        and_(models.DataIdentifierAssociation.child_scope == temp_table.scope,
+             models.DataIdentifierAssociation.child_name == temp_table.name)
+    )
+    for did_chunk in session.execute(stmt).yield_per(1000):
+        yield {'scope': did_chunk.scope, 'name': did_chunk.name, 'child_scope': did_chunk.child_scope, 'child_name': did_chunk.child_name, 'type': did_chunk.did_type}
 
 
 @stream_session
@@ -2275,63 +2295,50 @@ def get_metadata_bulk(dids, inherit=False, *, session: "Session"):
     :param session:            The database session in use.
     """
     if inherit:
-        parent_list = []
-        unique_dids = []
-        parents = [1, ]
+        dids = [(did['scope'], did['name']) for did in dids]
+
+        # Each did inherits from its first parent, up to 20 levels above it.
+        # A single temporary table is refilled for each level and for the metadata lookup.
+        temp_table = temp_table_mngr(session).create_scope_name_table()
+        parent_of = {}
+        level = set(dids)
+        visited = set(level)
         depth = 0
-        for did in dids:
-            unique_dids.append((did['scope'], did['name']))
-            parent_list.append([(did['scope'], did['name']), ])
-
-        while parents and depth < 20:
-            parents = []
-            for did in list_parent_dids_bulk(dids, session=session):
-                scope = did['scope']
-                name = did['name']
-                child_scope = did['child_scope']
-                child_name = did['child_name']
-                if (scope, name) not in unique_dids:
-                    unique_dids.append((scope, name))
-                if (scope, name) not in parents:
-                    parents.append((scope, name))
-                for entry in parent_list:
-                    if entry[-1] == (child_scope, child_name):
-                        entry.append((scope, name))
-            dids = [{'scope': did[0], 'name': did[1]} for did in parents]
+        while level and depth < 20:
+            for parent in list_parent_dids_bulk([{'scope': scope, 'name': name} for scope, name in level], temp_table=temp_table, session=session):
+                parent_of.setdefault((parent['child_scope'], parent['child_name']), (parent['scope'], parent['name']))
+            level = {parent_of[did] for did in level if did in parent_of}.difference(visited)
+            visited.update(level)
             depth += 1
-        unique_dids = [{'scope': did[0], 'name': did[1]} for did in unique_dids]
-        meta_dict = {}
-        for did in unique_dids:
-            try:
-                meta = get_metadata(did['scope'], did['name'], plugin='JSON', session=session)
-            except exception.DataIdentifierNotFound:
-                meta = {}
-            meta_dict[(did['scope'], did['name'])] = meta
-        for dids in parent_list:
-            result = {'scope': dids[0][0], 'name': dids[0][1]}
-            for did in dids:
-                for key in meta_dict[did]:
+
+        meta_dict = did_meta_plugins.get_metadata_bulk(visited, plugin='JSON', temp_table=temp_table, session=session)
+        for did in dids:
+            result = {'scope': did[0], 'name': did[1]}
+            ancestor, generation = did, 0
+            while ancestor is not None and generation <= depth:
+                for key, value in meta_dict.get(ancestor, {}).items():
                     if key not in result:
-                        result[key] = meta_dict[did][key]
+                        result[key] = value
+                ancestor, generation = parent_of.get(ancestor), generation + 1
             yield result
     else:
-        condition = []
-        for did in dids:
-            condition.append(and_(models.DataIdentifier.scope == did['scope'],
-                                  models.DataIdentifier.name == did['name']))
-        try:
-            for chunk in chunks(condition, 50):
-                stmt = select(
-                    models.DataIdentifier
-                ).with_hint(
-                    models.DataIdentifier, "INDEX(DIDS DIDS_PK)", 'oracle'
-                ).where(
-                    or_(*chunk)
-                )
-                for row in session.execute(stmt).scalars():
-                    yield row.to_dict()
-        except NoResultFound:
-            raise exception.DataIdentifierNotFound('No Data Identifiers found')
+        unique_dids = {(did['scope'], did['name']) for did in dids}
+        if not unique_dids:
+            return
+
+        temp_table = temp_table_mngr(session).create_scope_name_table()
+        session.execute(insert(temp_table), [{'scope': scope, 'name': name} for scope, name in unique_dids])
+
+        stmt = select(
+            models.DataIdentifier
+        ).join_from(
+            temp_table,
+            models.DataIdentifier,
+            and_(models.DataIdentifier.scope == temp_table.scope,
+                 models.DataIdentifier.name == temp_table.name)
+        )
+        for row in session.execute(stmt).scalars():
+            yield row.to_dict()
 
 
 @transactional_session
@@ -71,6 +71,64 @@ RESTRICTED_CHARACTERS = {
     '.': "Used as a delimiter for key and operator (<key>.<operator>) in filtering engine."
 }
 
+# Cache of the plugin managing each metadata key. The plugins are fixed for the lifetime of the process. As the keys
+# come from user-supplied filters, the cache is capped and the oldest keys are evicted first.
+#
+_KEY_TO_PLUGIN = {}
+_KEY_TO_PLUGIN_MAX_SIZE = 1000
+
+# Estimated fraction of DIDs matching a filter on one key, by operator. Used to order the plugins of a query.
+#
+SELECTIVITY_BY_OPERATOR = {
+    'name': 0.001,
+    'eq': 0.05,
+    'like': 0.2,
+    'range': 0.3,
+    'ne': 0.9,
+}
+
+
+def _get_managing_plugin(key, *, session: "Session"):
+    """
+    Returns the first metadata plugin managing a key, or None.
+
+    :param key: Metadata key, without operator suffix.
+    """
+    metadata_plugin = _KEY_TO_PLUGIN.get(key)
+    if metadata_plugin is None:
+        for candidate in METADATA_PLUGIN_MODULES:
+            if candidate.manages_key(key, session=session):
+                metadata_plugin = candidate
+                break
+        if metadata_plugin is not None:
+            if len(_KEY_TO_PLUGIN) >= _KEY_TO_PLUGIN_MAX_SIZE:
+                _KEY_TO_PLUGIN.pop(next(iter(_KEY_TO_PLUGIN)))
+            _KEY_TO_PLUGIN[key] = metadata_plugin
+    return metadata_plugin
+
+
+def estimate_selectivity(filters):
+    """
+    Estimates the fraction of DIDs matched by an AND group of filters.
+
+    :param filters: Dictionary of attributes by which the results should be filtered.
+    :returns: A number between 0 and 1, smaller for more selective filters.
+    """
+    selectivity = 1.0
+    for key, value in filters.items():
+        key_name, _, key_operator = key.partition('.')
+        if key_name == 'name' and not key_operator and isinstance(value, str) and '*' not in value:
+            selectivity *= SELECTIVITY_BY_OPERATOR['name']
+        elif key_operator == 'ne':
+            selectivity *= SELECTIVITY_BY_OPERATOR['ne']
+        elif key_operator or key_name in ('created_before', 'created_after'):
+            selectivity *= SELECTIVITY_BY_OPERATOR['range']
+        elif isinstance(value, str) and '*' in value:
+            selectivity *= SELECTIVITY_BY_OPERATOR['like']
+        else:
+            selectivity *= SELECTIVITY_BY_OPERATOR['eq']
+    return selectivity
+
 
 @read_session
 def get_metadata(scope, name, plugin="DID_COLUMN", *, session: "Session"):
@@ -99,6 +157,23 @@ def get_metadata(scope, name, plugin="DID_COLUMN", *, session: "Session"):
     raise NotImplementedError('Metadata plugin "%s" is not enabled on the server.' % plugin)
 
 
+@read_session
+def get_metadata_bulk(dids, plugin="DID_COLUMN", *, temp_table=None, session: "Session"):
+    """
+    Gets the metadata of several dids from a specified plugin.
+
+    :param dids: An iterable of (scope, name) tuples.
+    :param plugin: (optional) The metadata plugin to use.
+    :param temp_table: (optional) A scope/name temporary table which the plugin may reuse.
+    :returns: A dictionary {(scope, name): metadata}.
+    :raises: NotImplementedError
+    """
+    for metadata_plugin in METADATA_PLUGIN_MODULES:
+        if metadata_plugin.get_plugin_name().lower() == plugin.lower():
+            return metadata_plugin.get_metadata_bulk(dids, temp_table=temp_table, session=session)
+    raise NotImplementedError('Metadata plugin "%s" is not enabled on the server.' % plugin)
+
+
 @transactional_session
 def set_metadata(scope, name, key, value, recursive=False, *, session: "Session"):
     """
@@ -122,14 +197,10 @@ def set_metadata(scope, name, key, value, recursive=False, *, session: "Session"
 
     # Sequentially check if each metadata plugin manages this key. Note that the order of [METADATA_PLUGIN_MODULES]
     # means that the key is always checked for existence in the base list first.
-    metadata_was_set = False
-    for metadata_plugin in METADATA_PLUGIN_MODULES:
-        if metadata_plugin.manages_key(key, session=session):
-            metadata_plugin.set_metadata(scope, name, key, value, recursive, session=session)
-            metadata_was_set = True
-            break
-
-    if not metadata_was_set:
+    metadata_plugin = _get_managing_plugin(key, session=session)
+    if metadata_plugin is not None:
+        metadata_plugin.set_metadata(scope, name, key, value, recursive, session=session)
+    else:
         raise exception.InvalidMetadata('No plugin manages metadata key %s for DID %s:%s' % (key, scope, name))
 
 
@@ -163,13 +234,10 @@ def set_metadata_bulk(scope, name, meta, recursive=False, *, session: "Session")
                     char,
                     RESTRICTED_CHARACTERS[char]
                 ))
-        metadata_is_included = False
-        for metadata_plugin in METADATA_PLUGIN_MODULES:
-            if metadata_plugin.manages_key(key, session=session):
-                metadata_plugin_keys[metadata_plugin].append(key)
-                metadata_is_included = True
-                break
-        if not metadata_is_included:
+        metadata_plugin = _get_managing_plugin(key, session=session)
+        if metadata_plugin is not None:
+            metadata_plugin_keys[metadata_plugin].append(key)
+        else:
             unmanaged_keys.append(key)
     if unmanaged_keys:
         raise exception.InvalidMetadata('No plugin manages metadata keys %s on DID %s:%s' % (unmanaged_keys, scope, name))
@@ -201,7 +269,9 @@ def list_dids(scope=None, filters=None, did_type='collection', ignore_case=False
     """
     Search data identifiers.
 
-    All filter keys should belong to a single plugin. Queries across plugins are not currently supported.
+    Filter keys can belong to several plugins. If they all belong to the same plugin, the query is passed to it.
+    Otherwise, each AND group of filters is split into one sub-filter per plugin. The sub-filters are evaluated
+    from the most to the least selective one, and their results are intersected.
 
     :param scope: the scope name.
     :param filters: dictionary of attributes by which the results should be filtered.
@@ -220,31 +290,109 @@ def list_dids(scope=None, filters=None, did_type='collection', ignore_case=False
     if isinstance(filters, dict):
         filters = [filters]
 
+    plugins_by_or_group = []                        # plugins required by each or_group
     required_unique_plugins = set()                 # keep track of which plugins are required
     for or_group in filters:
+        or_group_plugins = set()
         for key in or_group.keys():
             if key == 'name':                       # [name] is always passed through, and needs to be in schema of all plugins
                 continue
             key_nooperator = key.split('.')[0]      # remove operator attribute from key if suffixed
 
-            # Iterate through the list of metadata plugins, checking which (if any) manages this particular key
-            # and appending the corresponding plugin to the set, required_unique_plugins.
-            is_this_key_managed = False
-            for metadata_plugin in METADATA_PLUGIN_MODULES:
-                if metadata_plugin.manages_key(key_nooperator, session=session):
-                    required_unique_plugins.add(metadata_plugin)
-                    is_this_key_managed = True
-                    break
-            if not is_this_key_managed:
+            metadata_plugin = _get_managing_plugin(key_nooperator, session=session)
+            if metadata_plugin is None:
                 raise exception.InvalidMetadata('There is no metadata plugin that manages the filter key(s) you requested.')
+            or_group_plugins.add(metadata_plugin)
+        plugins_by_or_group.append(or_group_plugins)
+        required_unique_plugins.update(or_group_plugins)
+
+    if len(required_unique_plugins) <= 1:
+        # if no metadata keys were specified, fall back to using the base plugin
+        selected_plugin_to_use = list(required_unique_plugins)[0] if required_unique_plugins else METADATA_PLUGIN_MODULES[0]
+        return selected_plugin_to_use.list_dids(scope=scope, filters=filters, did_type=did_type,
+                                                ignore_case=ignore_case, limit=limit,
+                                                offset=offset, long=long, recursive=recursive,
+                                                ignore_dids=ignore_dids, session=session)
+
+    if recursive:
+        raise exception.InvalidMetadata('Recursive searches are not supported with filter keys of several metadata plugins.')
+    return _list_dids_across_plugins(scope=scope, filters=filters, plugins_by_or_group=plugins_by_or_group, did_type=did_type,
+                                     ignore_case=ignore_case, limit=limit, offset=offset, long=long, ignore_dids=ignore_dids,
+                                     session=session)
+
+
+def _list_dids_across_plugins(scope, filters, plugins_by_or_group, did_type, ignore_case, limit, offset, long, ignore_dids, *, session: "Session"):
+    """
+    Search data identifiers with filters spanning several metadata plugins.
+
+    Each or_group is split into one sub-filter per plugin. All but the last sub-filter, ordered by estimated
+    selectivity, are evaluated into a set of candidate names; the results of the last one are streamed and
+    only the candidates are yielded. The results of the or_groups are concatenated without duplicates.
+    """
+    if not ignore_dids:
+        ignore_dids = set()
+
+    def _sub_query(metadata_plugin, sub_filter):
+        return metadata_plugin.list_dids(scope=scope, filters=[sub_filter], did_type=did_type, ignore_case=ignore_case,
+                                         long=long, recursive=False, session=session)
+
+    count = 0
+    for or_group, or_group_plugins in zip(filters, plugins_by_or_group):
+        if len(or_group_plugins) <= 1:
+            metadata_plugin = list(or_group_plugins)[0] if or_group_plugins else METADATA_PLUGIN_MODULES[0]
+            results = _sub_query(metadata_plugin, dict(or_group))
+        else:
+            sub_filters = {metadata_plugin: {} for metadata_plugin in or_group_plugins}
+            for key, value in or_group.items():
+                if key == 'name':
+                    for sub_filter in sub_filters.values():
+                        sub_filter[key] = value
+                else:
+                    sub_filters[_get_managing_plugin(key.split('.')[0], session=session)][key] = value
+            plan = sorted(sub_filters.items(), key=lambda item: estimate_selectivity(item[1]))
+            results = _intersect_sub_queries([_sub_query(metadata_plugin, sub_filter) for metadata_plugin, sub_filter in plan],
+                                             long=long)
+
+        for result in results:
+            did_full = '{}:{}'.format(result['scope'], result['name']) if long else '{}:{}'.format(scope, result)
+            if did_full in ignore_dids:                 # concatenating results of OR clauses may contain duplicate DIDs
+                continue
+            ignore_dids.add(did_full)
+            yield result
+            count += 1
+            if limit and count >= limit:
+                return
 
-    if not required_unique_plugins:               # if no metadata keys were specified, fall back to using the base plugin
-        required_unique_plugins = [METADATA_PLUGIN_MODULES[0]]
-    elif len(required_unique_plugins) > 1:        # check that only a single plugin is required for the query, otherwise not supported
-        raise exception.InvalidMetadata('Filter keys used do not all belong to the same metadata plugin.')
-    selected_plugin_to_use = list(required_unique_plugins)[0]
 
-    return selected_plugin_to_use.list_dids(scope=scope, filters=filters, did_type=did_type,
-                                            ignore_case=ignore_case, limit=limit,
-                                            offset=offset, long=long, recursive=recursive,
-                                            ignore_dids=ignore_dids, session=session)
+def _intersect_sub_queries(sub_queries, long):
+    """
+    Intersects the results of several sub-queries, given from the most to the least selective one.
+    The last sub-query is streamed. With long, the most detailed result of a DID is yielded.
+    """
+    def _name(result):
+        return result['name'] if long else result
+
+    candidates = None
+    for sub_query in sub_queries[:-1]:
+        matches = {}
+        for result in sub_query:
+            name = _name(result)
+            if candidates is None or name in candidates:
+                matches[name] = _most_detailed(candidates.get(name) if candidates else None, result)
+        candidates = matches
+        if not candidates:
+            return
+
+    for result in sub_queries[-1]:
+        name = _name(result)
+        if name in candidates:
+            yield _most_detailed(candidates[name], result) if long else result
+
+
+def _most_detailed(result, other):
+    """
+    Returns the result with the most known fields, e.g. the did_type is not known to the JSON plugin.
+    """
+    if not isinstance(result, dict) or not isinstance(other, dict):
+        return other if result is None else result
+    return result if sum(value is not None for value in result.values()) >= sum(value is not None for value in other.values()) else other
@@ -237,40 +237,55 @@ class DidColumnMeta(DidMetaPlugin):
 
         if limit:
             query = query.limit(limit)
-        if recursive:
-            from rucio.core.did import list_content
-
-            # Get attached DIDs and save in list because query has to be finished before starting a new one in the recursion
-            collections_content = []
-            for did in query.yield_per(100):
-                if (did.did_type == DIDType.CONTAINER or did.did_type == DIDType.DATASET):
-                    collections_content += [d for d in list_content(scope=did.scope, name=did.name)]
-
-            # Replace any name filtering with recursed DID names.
-            for did in collections_content:
-                for or_group in filters:
-                    or_group['name'] = did['name']
-                for result in self.list_dids(scope=did['scope'], filters=filters, recursive=True, did_type=did_type, limit=limit, offset=offset,
-                                             long=long, ignore_dids=ignore_dids, session=session):
-                    yield result
 
-        for did in query.yield_per(5):                  # don't unpack this as it makes it dependent on query return order!
+        def _result(did):
+            did_full = "{}:{}".format(did.scope, did.name)
+            if did_full in ignore_dids:             # concatenating results of OR clauses may contain duplicate DIDs if query result sets not mutually exclusive.
+                return None
+            ignore_dids.add(did_full)
             if long:
-                did_full = "{}:{}".format(did.scope, did.name)
-                if did_full not in ignore_dids:         # concatenating results of OR clauses may contain duplicate DIDs if query result sets not mutually exclusive.
-                    ignore_dids.add(did_full)
-                    yield {
-                        'scope': did.scope,
-                        'name': did.name,
-                        'did_type': str(did.did_type),
-                        'bytes': did.bytes,
-                        'length': did.length
-                    }
-            else:
-                did_full = "{}:{}".format(did.scope, did.name)
-                if did_full not in ignore_dids:         # concatenating results of OR clauses may contain duplicate DIDs if query result sets not mutually exclusive.
-                    ignore_dids.add(did_full)
-                    yield did.name
+                return {
+                    'scope': did.scope,
+                    'name': did.name,
+                    'did_type': str(did.did_type),
+                    'bytes': did.bytes,
+                    'length': did.length
+                }
+            return did.name
+
+        count = 0
+        collections = []
+        for did in query.yield_per(5):                  # don't unpack this as it makes it dependent on query return order!
+            if recursive and did.did_type in (DIDType.CONTAINER, DIDType.DATASET):
+                collections.append((did.scope, did.name))
+            result = _result(did)
+            if result is not None:
+                count += 1
+                yield result
+
+        if recursive and collections:
+            # The content is searched level by level, with the same filters minus the name, in any scope.
+            child_fe = FilterEngine([{key: value for key, value in or_group.items() if key != 'name'} for or_group in filters],
+                                    model_class=models.DataIdentifier)
+            child_query = child_fe.create_sqla_query(
+                additional_model_attributes=[
+                    models.DataIdentifier.scope,
+                    models.DataIdentifier.name,
+                    models.DataIdentifier.did_type,
+                    models.DataIdentifier.bytes,
+                    models.DataIdentifier.length
+                ], additional_filters=[
+                    (models.DataIdentifier.suppressed, operator.ne, true())
+                ],
+                session=session
+            )
+            for did in self._list_matching_descendants(child_query, models.DataIdentifier, collections, session=session):
+                if limit and count >= limit:
+                    break
+                result = _result(did)
+                if result is not None:
+                    count += 1
+                    yield result
 
     def delete_metadata(self, scope, name, key, *, session: "Optional[Session]" = None):
         """
@@ -16,7 +16,13 @@
 from abc import ABCMeta, abstractmethod
 from typing import TYPE_CHECKING
 
-from rucio.db.sqla.session import transactional_session
+from sqlalchemy import and_, delete, insert
+
+from rucio.common import exception
+from rucio.db.sqla import models
+from rucio.db.sqla.constants import DIDType
+from rucio.db.sqla.session import read_session, transactional_session
+from rucio.db.sqla.util import temp_table_mngr
 
 if TYPE_CHECKING:
     from typing import Optional
@@ -45,6 +51,24 @@ class DidMetaPlugin(object, metaclass=ABCMeta):
         """
         pass
 
+    @read_session
+    def get_metadata_bulk(self, dids, *, temp_table=None, session: "Optional[Session]" = None):
+        """
+        Get the metadata of several data identifiers.
+
+        :param dids: An iterable of (scope, name) tuples.
+        :param temp_table: (optional) A scope/name temporary table which may be reused. Its rows are replaced.
+        :param session: The database session in use.
+        :returns: A dictionary {(scope, name): metadata}, with empty metadata for unknown data identifiers.
+        """
+        result = {}
+        for scope, name in dids:
+            try:
+                result[(scope, name)] = self.get_metadata(scope, name, session=session)
+            except exception.DataIdentifierNotFound:
+                result[(scope, name)] = {}
+        return result
+
     @abstractmethod
     def set_metadata(self, scope, name, key, value, recursive=False, *, session: "Optional[Session]" = None):
         """
@@ -105,6 +129,48 @@ class DidMetaPlugin(object, metaclass=ABCMeta):
         """
         pass
 
+    @staticmethod
+    def _list_matching_descendants(child_query, model, collections, *, session: "Session"):
+        """
+        Expand the collection hierarchy breadth-first and yield the descendants matching a metadata filter.
+
+        The collections of each level are put into a single temporary table, refilled for each level, and the filter is evaluated once per level,
+        on the children of all collections of the level at the same time. Only matching collections are expanded further.
+
+        :param child_query: Query applying the metadata filter on the model, without restriction on the scope or name.
+        :param model: The model queried by child_query, with scope and name columns.
+        :param collections: The (scope, name) tuples of the matching collections to start from.
+        :param session: The database session in use.
+        :returns: The rows of child_query, with an additional child_type column, level by level.
+        """
+        visited = set(collections)
+        frontier = list(visited)
+        temp_table = temp_table_mngr(session).create_scope_name_table()
+        while frontier:
+            session.execute(delete(temp_table))
+            session.execute(insert(temp_table), [{'scope': scope, 'name': name} for scope, name in frontier])
+            level_query = child_query.add_columns(
+                models.DataIdentifierAssociation.child_type
+            ).join(
+                models.DataIdentifierAssociation,
+                and_(models.DataIdentifierAssociation.child_scope == model.scope,
+                     models.DataIdentifierAssociation.child_name == model.name)
+            ).join(
+                temp_table,
+                and_(temp_table.scope == models.DataIdentifierAssociation.scope,
+                     temp_table.name == models.DataIdentifierAssociation.name)
+            ).distinct()
+
+            frontier = []
+            for row in level_query.all():           # the level has to be complete before the next temporary table is filled
+                did = (row.scope, row.name)
+                if did in visited:                  # a DID attached to several collections is reached more than once
+                    continue
+                visited.add(did)
+                if row.child_type in (DIDType.CONTAINER, DIDType.DATASET):
+                    frontier.append(did)
+                yield row
+
     @abstractmethod
     def manages_key(self, key, *, session: "Optional[Session]" = None):
         """
@@ -14,9 +14,12 @@
 # limitations under the License.
 
 import ast
+import copy
 import fnmatch
 import operator
+import re
 from datetime import datetime, timedelta, date
+from functools import lru_cache
 from importlib import import_module
 from typing import TYPE_CHECKING
 
@@ -26,7 +29,8 @@ from sqlalchemy.sql.expression import text
 
 from rucio.common import exception
 from rucio.common.utils import parse_did_filter_from_string_fe
-from rucio.db.sqla.constants import DIDType
+from rucio.db.sqla import models
+from rucio.db.sqla.constants import DIDMetaValueType, DIDType
 from rucio.db.sqla.session import read_session
 
 if TYPE_CHECKING:
@@ -73,13 +77,132 @@ VALID_DATE_FORMATS = (
 )
 
 
+def typed_metadata_value(value_type, value):
+    """
+    Converts a metadata value to the column of the typed values table holding values of the declared type.
+
+    Booleans are stored as the numbers 0 and 1. Datetimes can be given as strings in one of the <VALID_DATE_FORMATS>.
+
+    :param value_type: The DIDMetaValueType declared for the key.
+    :param value: The value.
+    :returns: A tuple (column name, converted value).
+    :raises: ValueError if the value is not of the declared type.
+    """
+    if value_type == DIDMetaValueType.STRING:
+        if isinstance(value, str) and len(value) <= 255:
+            return 'value_string', value
+    elif value_type == DIDMetaValueType.NUMBER:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return 'value_number', float(value)
+    elif value_type == DIDMetaValueType.BOOLEAN:
+        if isinstance(value, bool):
+            return 'value_number', float(value)
+    elif value_type == DIDMetaValueType.DATETIME:
+        if isinstance(value, datetime):
+            return 'value_datetime', value
+        if isinstance(value, str):
+            for format in VALID_DATE_FORMATS:
+                try:
+                    return 'value_datetime', datetime.strptime(value, format)
+                except ValueError:
+                    continue
+    raise ValueError("'{}' is not a valid {} value.".format(value, value_type.name.lower()))
+
+
+# whitespace around operators and separators of filter strings, which the parser ignores.
+FILTER_STRING_WHITESPACE_REGEX = re.compile(r'\s*(<=|>=|==|!=|>|<|=|;|,)\s*')
+
+
+@lru_cache(maxsize=1024)
+def _parse_filter_string(filters):
+    """
+    Parses a normalised filter string. The result is cached and must not be modified.
+
+    :param filters: The filter string, without whitespace around operators and separators.
+    :returns: A tuple of or_group dictionaries.
+    """
+    parsed_filters, _ = parse_did_filter_from_string_fe(filters, omit_name=True)
+    return tuple(parsed_filters)
+
+
+@lru_cache(maxsize=4096)
+def _translate_filter_key(key, model_class, strict_coerce):
+    """
+    Translates a filter key to the key name, coerced to a <model_class> attribute if possible, and the pythonic operator.
+
+    Keys only depend on the structure of the filters and are cached, values are translated on each request.
+
+    :param key: The filter key with an optional operator suffix, e.g. "run_number.gte".
+    :param model_class: The SQL model class.
+    :param strict_coerce: Enforce that keywords must be coercable to a model attribute.
+    :returns: A tuple (key, operator).
+    :raises: DIDFilterSyntaxError, KeyNotFound
+    """
+    # Separate key for key name and possible operator.
+    key_tokenised = key.split('.')
+    if len(key_tokenised) == 1:       # no operator suffix found, assume eq
+        try:
+            key_no_suffix = ast.literal_eval(key)
+        except ValueError:
+            key_no_suffix = key
+        oper = ''
+    elif len(key_tokenised) == 2:     # operator suffix found
+        try:
+            key_no_suffix = ast.literal_eval(key_tokenised[0])
+        except ValueError:
+            key_no_suffix = key_tokenised[0]
+        oper = key_tokenised[1]
+    else:
+        raise exception.DIDFilterSyntaxError
+    key_no_suffix = FilterEngine._coerce_filter_word_to_model_attribute(key_no_suffix, model_class, strict=strict_coerce)
+    return key_no_suffix, OPERATORS_CONVERSION_LUT.get(oper)
+
+
+def _typecast_string(value):
+    """
+    Check if string can be typecasted to bool, datetime or float.
+
+    Containers evaluated from the string, e.g. lists, are copied so that callers never share a cached instance.
+
+    :param value: The value to be typecasted.
+    :returns: The typecasted value.
+    """
+    value = _cached_typecast_string(value)
+    if isinstance(value, (list, dict, set, tuple)):
+        value = copy.deepcopy(value)
+    return value
+
+
+@lru_cache(maxsize=4096)
+def _cached_typecast_string(value):
+    value = value.replace('true', 'True').replace('TRUE', 'True')
+    value = value.replace('false', 'False').replace('FALSE', 'False')
+    for format in VALID_DATE_FORMATS:       # try parsing multiple date formats.
+        try:
+            value = datetime.strptime(value, format)
+        except ValueError:
+            continue
+        else:
+            return value
+    try:
+        value = ast.literal_eval(value)     # will catch float, int and bool
+    except (ValueError, SyntaxError):
+        pass
+    return value
+
+
 class FilterEngine:
     """
     An engine to provide advanced filtering functionality to DID listing requests.
+
+    The parsing of filter strings and the translation of filter keys are cached, as the same filters are
+    requested again and again with different values. The values end up as bound parameters of the queries,
+    so that queries of the same filters share their compiled statement in the SQLAlchemy compiled cache.
     """
     def __init__(self, filters, model_class=None, strict_coerce=True):
         if isinstance(filters, str):
-            self._filters, _ = parse_did_filter_from_string_fe(filters, omit_name=True)
+            normalised_filters = FILTER_STRING_WHITESPACE_REGEX.sub(r'\1', filters.strip())
+            self._filters = [dict(or_group) for or_group in _parse_filter_string(normalised_filters)]
         elif isinstance(filters, dict):
             self._filters = [filters]
         elif isinstance(filters, list):
@@ -95,7 +218,8 @@ class FilterEngine:
     def filters(self):
         return self._filters
 
-    def _coerce_filter_word_to_model_attribute(self, word, model_class, strict=True):
+    @staticmethod
+    def _coerce_filter_word_to_model_attribute(word, model_class, strict=True):
         """
         Attempts to coerce a filter word to an attribute of a <model_class>.
 
@@ -145,13 +269,15 @@ class FilterEngine:
             or_group_test_duplicates = []
             for and_group in or_group:
                 key, oper, value = and_group
-                if key == 'did_type':   # (1)
+                # a key coerced to a model attribute is never equal to a name, and comparing it builds an SQL expression.
+                key_name = key if isinstance(key, str) else None
+                if key_name == 'did_type':   # (1)
                     if oper != operator.eq:
                         raise ValueError("Type operator must be equals.")
-                if key == 'name':       # (2)
+                if key_name == 'name':       # (2)
                     if oper not in (operator.eq, operator.ne):
                         raise ValueError("Name operator must be an equality operator.")
-                if key == 'length':     # (3)
+                if key_name == 'length':     # (3)
                     try:
                         int(value)
                     except ValueError:
@@ -162,7 +288,7 @@ class FilterEngine:
                         if oper not in [operator.eq, operator.ne]:
                             raise exception.DIDFilterSyntaxError("Wildcards can only be used with equality operators")
 
-                if key == 'created_at':     # (5)
+                if key_name == 'created_at':     # (5)
                     if not isinstance(value, datetime):
                         raise exception.DIDFilterSyntaxError("Couldn't parse date '{}'. Valid formats are: {}".format(value, VALID_DATE_FORMATS))
 
@@ -212,38 +338,23 @@ class FilterEngine:
 
         mandatory_model_attributes = set()
         filters_translated = []
+        # The string values before typecasting, by position in the translated filters, for keys which are declared as strings
+        self._string_values = {}
         for or_group in self._filters:
             and_group_parsed = []
             for key, value in or_group.items():
                 # KEY
-                # Separate key for key name and possible operator.
-                key_tokenised = key.split('.')
-                if len(key_tokenised) == 1:       # no operator suffix found, assume eq
-                    try:
-                        key_no_suffix = ast.literal_eval(key)
-                    except ValueError:
-                        key_no_suffix = key
-                    oper = ''
-                elif len(key_tokenised) == 2:     # operator suffix found
-                    try:
-                        key_no_suffix = ast.literal_eval(key_tokenised[0])
-                    except ValueError:
-                        key_no_suffix = key_tokenised[0]
-                    oper = key_tokenised[1]
-                else:
-                    raise exception.DIDFilterSyntaxError
-                key_no_suffix = self._coerce_filter_word_to_model_attribute(key_no_suffix, model_class, strict=strict_coerce)
+                key_no_suffix, oper = _translate_filter_key(key, model_class, strict_coerce)
                 if not isinstance(key_no_suffix, str):
                     mandatory_model_attributes.add(key_no_suffix)
 
                 # VALUE
                 # Typecasting is required when the entry point is the CLI as values will always be string.
                 if isinstance(value, str):
-                    value = self._try_typecast_string(value)
+                    self._string_values[(len(filters_translated), len(and_group_parsed))] = value
+                    value = _typecast_string(value)
 
-                # Convert string operator to pythonic operator.
-                and_group_parsed.append(
-                    (key_no_suffix, OPERATORS_CONVERSION_LUT.get(oper), value))
+                and_group_parsed.append((key_no_suffix, oper, value))
             filters_translated.append(and_group_parsed)
         self._filters = filters_translated
         return list(mandatory_model_attributes)
@@ -255,20 +366,7 @@ class FilterEngine:
         :param value: The value to be typecasted.
         :returns: The typecasted value.
         """
-        value = value.replace('true', 'True').replace('TRUE', 'True')
-        value = value.replace('false', 'False').replace('FALSE', 'False')
-        for format in VALID_DATE_FORMATS:       # try parsing multiple date formats.
-            try:
-                value = datetime.strptime(value, format)
-            except ValueError:
-                continue
-            else:
-                return value
-        try:
-            value = ast.literal_eval(value)     # will catch float, int and bool
-        except (ValueError, SyntaxError):
-            pass
-        return value
+        return _typecast_string(value)
 
     def create_mongo_query(self, additional_filters={}):
         """
@@ -399,7 +497,7 @@ class FilterEngine:
         return ' OR '.join(or_expressions)
 
     @read_session
-    def create_sqla_query(self, *, session: "Session", additional_model_attributes=[], additional_filters={}, json_column=None):
+    def create_sqla_query(self, *, session: "Session", additional_model_attributes=[], additional_filters={}, json_column=None, typed_keys=None):
         """
         Returns a database query that fully describes the filters.
 
@@ -410,9 +508,12 @@ class FilterEngine:
         :param additional_model_attributes: Additional model attributes to retrieve.
         :param additional_filters: Additional filters to be applied to all clauses.
         :param json_column: Column to be checked if filter key has not been coerced to a model attribute. Only valid if engine instantiated with strict_coerce=False.
+        :param typed_keys: Dictionary {key: DIDMetaValueType} of the keys of the json_column with a declared type. Filters on these keys are evaluated on the
+                           indexed typed values table instead of the json_column.
         :returns: A database query.
-        :raises: FilterEngineGenericError
+        :raises: FilterEngineGenericError, DIDFilterSyntaxError
         """
+        typed_keys = typed_keys or {}
         all_model_attributes = set(self.mandatory_model_attributes + additional_model_attributes)
 
         # Add additional filters, applied as AND clauses to each OR group.
@@ -421,9 +522,9 @@ class FilterEngine:
                 or_group.append(list(_filter))
 
         or_expressions = []
-        for or_group in self._filters:
+        for or_idx, or_group in enumerate(self._filters):
             and_expressions = []
-            for and_group in or_group:
+            for and_idx, and_group in enumerate(or_group):
                 key, oper, value = and_group
                 if isinstance(key, sqlalchemy.orm.attributes.InstrumentedAttribute):                # -> this key filters on a table column.
                     if isinstance(value, str) and any([char in value for char in ['*', '%']]):      # wildcards
@@ -438,6 +539,12 @@ class FilterEngine:
                         expression = oper(key, value)
                     if oper == operator.ne:                                                         # set .ne operator to include NULLs.
                         expression = or_(expression, key.is_(None))
+                elif json_column and key in typed_keys:                                             # -> this key filters on the typed values of a json column key
+                    if typed_keys[key] == DIDMetaValueType.STRING:                                  # string keys are searched with the value as given
+                        value = self._string_values.get((or_idx, and_idx), value)
+                    expression = self._create_typed_key_expression(key, oper, value, typed_keys[key], json_column)
+                    if expression is None:                                                          # match wildcard exactly == no filtering on key
+                        continue
                 elif json_column:                                                                   # -> this key filters on the content of a json column
                     if session.bind.dialect.name == 'oracle':
                         if isinstance(value, str) and any([char in value for char in ['*', '%']]):  # wildcards
@@ -490,6 +597,43 @@ class FilterEngine:
             or_expressions.append(and_(*and_expressions))
         return session.query(*all_model_attributes).filter(or_(*or_expressions))
 
+    @staticmethod
+    def _create_typed_key_expression(key, oper, value, value_type, json_column):
+        """
+        Returns an expression filtering on the typed values table for a key of a json column with a declared type.
+
+        :param key: The key.
+        :param oper: The operator.
+        :param value: The value.
+        :param value_type: The DIDMetaValueType declared for the key.
+        :param json_column: The json column, whose model is correlated with the typed values by scope and name.
+        :returns: The expression, or None if the filter does not restrict the results.
+        :raises: DIDFilterSyntaxError
+        """
+        if value_type == DIDMetaValueType.STRING and isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)                                                                      # numbers given for string keys are compared as strings
+        try:
+            column_name, value = typed_metadata_value(value_type, value)
+        except ValueError as error:
+            raise exception.DIDFilterSyntaxError("Filter on key '{}': {}".format(key, error))
+        column = getattr(models.DidMetaTypedValue, column_name)
+
+        if isinstance(value, str) and any([char in value for char in ['*', '%']]):                 # wildcards
+            if value in ('*', '%'):                                                                 # match wildcard exactly == no filtering on key
+                return None
+            if oper == operator.eq:
+                condition = column.like(value.replace('*', '%').replace('_', '\\_'), escape='\\')
+            else:
+                condition = column.notlike(value.replace('*', '%').replace('_', '\\_'), escape='\\')
+        else:
+            condition = oper(column, value)
+        return sqlalchemy.exists().where(
+            models.DidMetaTypedValue.scope == json_column.class_.scope,
+            models.DidMetaTypedValue.name == json_column.class_.name,
+            models.DidMetaTypedValue.key == key,
+            condition
+        )
+
     def evaluate(self):
         """
         Evaluates an expression and returns a boolean result.
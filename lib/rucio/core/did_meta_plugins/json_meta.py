@@ -17,16 +17,17 @@ import json as json_lib
 import operator
 from typing import TYPE_CHECKING, cast, Any
 
+from sqlalchemy import and_, delete, insert, or_, select
 from sqlalchemy.exc import DataError
 from sqlalchemy.orm.exc import NoResultFound
 
 from rucio.common import exception
 from rucio.core.did_meta_plugins.did_meta_plugin_interface import DidMetaPlugin
-from rucio.core.did_meta_plugins.filter_engine import FilterEngine
+from rucio.core.did_meta_plugins.filter_engine import FilterEngine, typed_metadata_value
 from rucio.db.sqla import models
-from rucio.db.sqla.constants import DIDType
+from rucio.db.sqla.constants import DIDMetaValueType
 from rucio.db.sqla.session import read_session, transactional_session, stream_session
-from rucio.db.sqla.util import json_implemented
+from rucio.db.sqla.util import json_implemented, temp_table_mngr
 
 if TYPE_CHECKING:
     from sqlalchemy.orm import Session
@@ -60,6 +61,45 @@ class JSONDidMeta(DidMetaPlugin):
         except NoResultFound:
             return {}
 
+    @read_session
+    def get_metadata_bulk(self, dids, *, temp_table=None, session: "Session"):
+        """
+        Get data identifier metadata (JSON) of several data identifiers in one query
+
+        :param dids: An iterable of (scope, name) tuples.
+        :param temp_table: (optional) A scope/name temporary table to reuse. Its rows are replaced by the dids.
+        :param session: The database session in use.
+        :returns: A dictionary {(scope, name): metadata}, with empty metadata for data identifiers without metadata.
+        """
+        if not json_implemented(session=session):
+            raise NotImplementedError
+
+        result = {(scope, name): {} for scope, name in dids}
+        if not result:
+            return result
+
+        if temp_table is None:
+            temp_table = temp_table_mngr(session).create_scope_name_table()
+        else:
+            session.execute(delete(temp_table))
+        session.execute(insert(temp_table), [{'scope': scope, 'name': name} for scope, name in result])
+
+        stmt = select(
+            models.DidMeta.scope,
+            models.DidMeta.name,
+            models.DidMeta.meta
+        ).join_from(
+            temp_table,
+            models.DidMeta,
+            and_(models.DidMeta.scope == temp_table.scope,
+                 models.DidMeta.name == temp_table.name)
+        )
+        decode = session.bind.dialect.name in ['oracle', 'sqlite']
+        for scope, name, meta in session.execute(stmt):
+            if meta is not None:
+                result[(scope, name)] = json_lib.loads(meta) if decode else meta
+        return result
+
     @transactional_session
     def set_metadata(self, scope, name, key, value, recursive=False, *, session: "Session"):
         self.set_metadata_bulk(scope=scope, name=name, metadata={key: value}, recursive=recursive, session=session)
@@ -72,6 +112,16 @@ class JSONDidMeta(DidMetaPlugin):
         if session.query(models.DataIdentifier).filter_by(scope=scope, name=name).one_or_none() is None:
             raise exception.DataIdentifierNotFound("Data identifier '%s:%s' not found" % (scope, name))
 
+        # Values of typed keys are checked before anything is written
+        typed_keys = list_typed_keys(session=session)
+        typed_values = {}
+        for key, value in metadata.items():
+            if key in typed_keys:
+                try:
+                    typed_values[key] = typed_metadata_value(typed_keys[key], value)
+                except ValueError as error:
+                    raise exception.InvalidValueForKey("Invalid value for the typed key '%s': %s" % (key, error))
+
         row_did_meta = session.query(models.DidMeta).filter_by(scope=scope, name=name).scalar()
         if row_did_meta is None:
             # Add metadata column to new table (if not already present)
@@ -100,6 +150,15 @@ class JSONDidMeta(DidMetaPlugin):
         row_did_meta.meta = existing_meta
         row_did_meta.save(session=session, flush=True)
 
+        if typed_values:
+            session.query(models.DidMetaTypedValue).filter(
+                models.DidMetaTypedValue.scope == scope,
+                models.DidMetaTypedValue.name == name,
+                models.DidMetaTypedValue.key.in_(list(typed_values))
+            ).delete(synchronize_session=False)
+            session.execute(insert(models.DidMetaTypedValue),
+                            [_typed_value_row(scope, name, key, column, value) for key, (column, value) in typed_values.items()])
+
     @transactional_session
     def delete_metadata(self, scope, name, key, *, session: "Session"):
         """
@@ -124,6 +183,7 @@ class JSONDidMeta(DidMetaPlugin):
                 raise exception.KeyNotFound(key)
 
             existing_meta.pop(key, None)
+            session.query(models.DidMetaTypedValue).filter_by(scope=scope, name=name, key=key).delete(synchronize_session=False)
 
             row.meta = None
             session.flush()
@@ -151,6 +211,8 @@ class JSONDidMeta(DidMetaPlugin):
 
         # instantiate fe and create sqla query, note that coercion to a model keyword
         # is not appropriate here as the filter words are stored in a single json column.
+        # filters on typed keys are evaluated on the typed values table.
+        typed_keys = list_typed_keys(session=session)
         fe = FilterEngine(filters, model_class=models.DidMeta, strict_coerce=False)
         query = fe.create_sqla_query(
             additional_model_attributes=[
@@ -160,46 +222,59 @@ class JSONDidMeta(DidMetaPlugin):
                 (models.DidMeta.scope, operator.eq, scope)
             ],
             json_column=models.DidMeta.meta,
+            typed_keys=typed_keys,
             session=session
         )
 
         if limit:
             query = query.limit(limit)
-        if recursive:
-            from rucio.core.did import list_content
-
-            # Get attached DIDs and save in list because query has to be finished before starting a new one in the recursion
-            collections_content = []
-            for did in query.yield_per(100):
-                if (did.did_type == DIDType.CONTAINER or did.did_type == DIDType.DATASET):
-                    collections_content += [d for d in list_content(scope=did.scope, name=did.name)]
-
-            # Replace any name filtering with recursed DID names.
-            for did in collections_content:
-                for or_group in filters:
-                    or_group['name'] = did['name']
-                for result in self.list_dids(scope=did['scope'], filters=filters, recursive=True, did_type=did_type, limit=limit, offset=offset,
-                                             long=long, ignore_dids=ignore_dids, session=session):
-                    yield result
+
+        def _result(did):
+            did_full = "{}:{}".format(did.scope, did.name)
+            if did_full in ignore_dids:                 # concatenating results of OR clauses may contain duplicate DIDs if query result sets not mutually exclusive.
+                return None
+            ignore_dids.add(did_full)
+            if long:
+                return {
+                    'scope': did.scope,
+                    'name': did.name,
+                    'did_type': None,                   # not available with JSON plugin
+                    'bytes': None,                      # not available with JSON plugin
+                    'length': None                      # not available with JSON plugin
+                }
+            return did.name
 
         try:
+            count = 0
+            collections = []
             for did in query.yield_per(5):                  # don't unpack this as it makes it dependent on query return order!
-                if long:
-                    did_full = "{}:{}".format(did.scope, did.name)
-                    if did_full not in ignore_dids:         # concatenating results of OR clauses may contain duplicate DIDs if query result sets not mutually exclusive.
-                        ignore_dids.add(did_full)
-                        yield {
-                            'scope': did.scope,
-                            'name': did.name,
-                            'did_type': None,               # not available with JSON plugin
-                            'bytes': None,                  # not available with JSON plugin
-                            'length': None                  # not available with JSON plugin
-                        }
-                else:
-                    did_full = "{}:{}".format(did.scope, did.name)
-                    if did_full not in ignore_dids:         # concatenating results of OR clauses may contain duplicate DIDs if query result sets not mutually exclusive.
-                        ignore_dids.add(did_full)
-                        yield did.name
+                if recursive:                               # the type is not known here, files simply have no content
+                    collections.append((did.scope, did.name))
+                result = _result(did)
+                if result is not None:
+                    count += 1
+                    yield result
+
+            if recursive and collections:
+                # The content is searched level by level, with the same filters minus the name, in any scope.
+                child_fe = FilterEngine([{key: value for key, value in or_group.items() if key != 'name'} for or_group in filters],
+                                        model_class=models.DidMeta, strict_coerce=False)
+                child_query = child_fe.create_sqla_query(
+                    additional_model_attributes=[
+                        models.DidMeta.scope,
+                        models.DidMeta.name
+                    ],
+                    json_column=models.DidMeta.meta,
+                    typed_keys=typed_keys,
+                    session=session
+                )
+                for did in self._list_matching_descendants(child_query, models.DidMeta, collections, session=session):
+                    if limit and count >= limit:
+                        break
+                    result = _result(did)
+                    if result is not None:
+                        count += 1
+                        yield result
         except DataError as e:
             raise exception.InvalidMetadata("Database query failed: {}. This can be raised when the datatype of a key is inconsistent between dids.".format(e))
 
@@ -213,3 +288,86 @@ class JSONDidMeta(DidMetaPlugin):
         :returns: The name of the plugin.
         """
         return self.plugin_name
+
+
+def _typed_value_row(scope, name, key, column, value):
+    row = {'scope': scope, 'name': name, 'key': key, 'value_string': None, 'value_number': None, 'value_datetime': None}
+    row[column] = value
+    return row
+
+
+@read_session
+def list_typed_keys(*, session: "Session"):
+    """
+    Lists the JSON metadata keys with a declared type.
+
+    :param session: The database session in use.
+    :returns: A dictionary {key: DIDMetaValueType}.
+    """
+    return {row.key: row.value_type for row in session.query(models.DidMetaTypedKey.key, models.DidMetaTypedKey.value_type)}
+
+
+@transactional_session
+def add_typed_key(key, value_type, *, session: "Session"):
+    """
+    Declares the type of the values of a JSON metadata key.
+
+    The values of a typed key are also stored, converted, in the typed values table, whose indexes are used by
+    searches filtering on the key. Values of another type are refused. The values already set are copied.
+
+    :param key: The key.
+    :param value_type: The DIDMetaValueType of the values, or its name.
+    :param session: The database session in use.
+    :raises: UnsupportedValueType, Duplicate, InvalidValueForKey
+    """
+    if isinstance(value_type, str):
+        try:
+            value_type = DIDMetaValueType(value_type.upper())
+        except ValueError:
+            raise exception.UnsupportedValueType("The type '%s' is not supported for typed keys! Supported types are %s" % (value_type, [t.value for t in DIDMetaValueType]))
+
+    if session.query(models.DidMetaTypedKey).filter_by(key=key).one_or_none() is not None:
+        raise exception.Duplicate("Typed key '%s' already exists!" % key)
+    models.DidMetaTypedKey(key=key, value_type=value_type).save(session=session)
+
+    if not json_implemented(session=session):
+        return
+
+    # The metadata is read and copied page by page, keeping the memory use bounded on large tables
+    last_did = None
+    while True:
+        query = session.query(models.DidMeta.scope, models.DidMeta.name, models.DidMeta.meta).order_by(models.DidMeta.scope, models.DidMeta.name)
+        if last_did is not None:
+            query = query.filter(or_(models.DidMeta.scope > last_did[0],
+                                     and_(models.DidMeta.scope == last_did[0], models.DidMeta.name > last_did[1])))
+        page = query.limit(1000).all()
+        if not page:
+            break
+        rows = []
+        for scope, name, meta in page:
+            if meta and session.bind.dialect.name in ['oracle', 'sqlite']:
+                meta = json_lib.loads(meta)
+            if not meta or key not in meta:
+                continue
+            try:
+                column, value = typed_metadata_value(value_type, meta[key])
+            except ValueError as error:
+                raise exception.InvalidValueForKey("Data identifier '%s:%s' has an invalid value for the typed key '%s': %s" % (scope, name, key, error))
+            rows.append(_typed_value_row(scope, name, key, column, value))
+        if rows:
+            session.execute(insert(models.DidMetaTypedValue), rows)
+        last_did = (page[-1].scope, page[-1].name)
+
+
+@transactional_session
+def del_typed_key(key, *, session: "Session"):
+    """
+    Removes the declared type of a JSON metadata key, together with its typed values. The JSON metadata is kept.
+
+    :param key: The key.
+    :param session: The database session in use.
+    :raises: KeyNotFound
+    """
+    session.query(models.DidMetaTypedValue).filter_by(key=key).delete(synchronize_session=False)
+    if not session.query(models.DidMetaTypedKey).filter_by(key=key).delete(synchronize_session=False):
+        raise exception.KeyNotFound("Typed key '%s' does not exist!" % key)
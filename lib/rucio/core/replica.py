@@ -2084,6 +2084,17 @@ def __cleanup_after_replica_deletion(scope_name_temp_table, scope_name_temp_tabl
             if oracle_version < 12:
                 must_delete_did_meta = False
         if must_delete_did_meta:
+            stmt = delete(
+                models.DidMetaTypedValue,
+            ).where(
+                exists(select(1)
+                       .where(and_(models.DidMetaTypedValue.scope == scope_name_temp_table.scope,
+                                   models.DidMetaTypedValue.name == scope_name_temp_table.name)))
+            ).execution_options(
+                synchronize_session=False
+            )
+            session.execute(stmt)
+
             stmt = delete(
                 models.DidMeta,
             ).where(
@@ -2428,6 +2439,73 @@ def touch_replica(replica, *, session: "Session"):
     return True
 
 
+@transactional_session
+def touch_replicas(replicas, *, session: "Session"):
+    """
+    Update the accessed_at timestamp of many file replicas and their dids at once.
+
+    Replicas are de-duplicated by (scope, name, rse_id), keeping the latest access time,
+    and applied with one UPDATE statement on the replicas and one on the dids through a
+    temporary table. Timestamps are only moved forward. Contrary to touch_replica, locked
+    rows are waited for.
+
+    :param replicas: list of dictionaries with scope, name, rse_id and optionally accessed_at.
+    :param session:  The database session in use.
+
+    :returns: the number of distinct replicas which were touched.
+    """
+    now = datetime.utcnow()
+    accesses = {}
+    for replica in replicas:
+        if replica.get('rse_id') is None:
+            continue
+        key = (replica['scope'], replica['name'], replica['rse_id'])
+        accessed_at = replica.get('accessed_at') or now
+        if key not in accesses or accesses[key] < accessed_at:
+            accesses[key] = accessed_at
+    if not accesses:
+        return 0
+
+    temp_table = temp_table_mngr(session).create_replica_access_table()
+    session.execute(insert(temp_table), [{'scope': scope, 'name': name, 'rse_id': rse_id, 'accessed_at': accessed_at}
+                                         for (scope, name, rse_id), accessed_at in accesses.items()])
+
+    replica_accessed_at = select(temp_table.accessed_at).\
+        where(and_(temp_table.scope == models.RSEFileAssociation.scope,
+                   temp_table.name == models.RSEFileAssociation.name,
+                   temp_table.rse_id == models.RSEFileAssociation.rse_id)).\
+        scalar_subquery()
+    stmt = update(models.RSEFileAssociation).\
+        where(exists(select(1).where(and_(temp_table.scope == models.RSEFileAssociation.scope,
+                                          temp_table.name == models.RSEFileAssociation.name,
+                                          temp_table.rse_id == models.RSEFileAssociation.rse_id,
+                                          or_(models.RSEFileAssociation.accessed_at == null(),
+                                              models.RSEFileAssociation.accessed_at < temp_table.accessed_at))))).\
+        execution_options(synchronize_session=False).\
+        values(accessed_at=replica_accessed_at,
+               tombstone=case((and_(models.RSEFileAssociation.tombstone != null(),
+                                    models.RSEFileAssociation.tombstone != OBSOLETE),
+                               replica_accessed_at),
+                              else_=models.RSEFileAssociation.tombstone))
+    session.execute(stmt)
+
+    did_accessed_at = select(func.max(temp_table.accessed_at)).\
+        where(and_(temp_table.scope == models.DataIdentifier.scope,
+                   temp_table.name == models.DataIdentifier.name)).\
+        scalar_subquery()
+    stmt = update(models.DataIdentifier).\
+        where(and_(models.DataIdentifier.did_type == DIDType.FILE,
+                   exists(select(1).where(and_(temp_table.scope == models.DataIdentifier.scope,
+                                               temp_table.name == models.DataIdentifier.name,
+                                               or_(models.DataIdentifier.accessed_at == null(),
+                                                   models.DataIdentifier.accessed_at < temp_table.accessed_at)))))).\
+        execution_options(synchronize_session=False).\
+        values(accessed_at=did_accessed_at)
+    session.execute(stmt)
+
+    return len(accesses)
+
+
 @transactional_session
 def update_replica_state(rse_id, scope, name, state, *, session: "Session"):
     """
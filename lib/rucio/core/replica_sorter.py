@@ -17,6 +17,8 @@ import random
 import shutil
 import socket
 import tarfile
+import threading
+import time
 from collections import OrderedDict
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -36,7 +38,8 @@ from rucio.common.exception import InvalidRSEExpression
 from rucio.core.rse_expression_parser import parse_expression
 
 if TYPE_CHECKING:
-    from typing import Optional
+    from collections.abc import Iterable
+    from typing import Any, Optional
 
 REGION = make_region_memcached(expiration_time=900, function_key_generator=utils.my_key_generator)
 
@@ -45,6 +48,46 @@ REGION = make_region_memcached(expiration_time=900, function_key_generator=utils
 GEOIP_DB_EDITION = 'GeoLite2-City'
 
 
+class _LRUCache:
+    """
+    Thread-safe, process-local LRU cache whose entries expire after a fixed time.
+    """
+
+    def __init__(self, maxsize: int, expiration_time: int):
+        self.maxsize = maxsize
+        self.expiration_time = expiration_time
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> "Any":
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return NO_VALUE
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return NO_VALUE
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: "Any") -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.expiration_time, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+# Client IP -> (latitude, longitude); metalink requests of one client resolve its location only once
+CLIENT_LOCATIONS = _LRUCache(maxsize=config_get_int('core', 'geoip_client_location_cache_size', raise_exception=False, default=10000),
+                             expiration_time=900)
+
+# (site, RSE) -> distance matrix of the custom distance table, reloaded when it expires
+_CUSTOM_DISTANCES = {'table': None, 'expires_at': 0.0}
+_CUSTOM_DISTANCES_LOCK = threading.Lock()
+
+
 def extract_file_from_tar_gz(archive_file_obj, file_name, destination):
     """
     Extract one file from the archive and put it at the destination
@@ -140,7 +183,12 @@ def __get_distance(se1, client_location, ignore_error):
                 lat2 = client_location['latitude']
                 long2 = client_location['longitude']
             else:
-                lat2, long2 = __get_lat_long(client_location['ip'], gi)
+                client_lat_long = CLIENT_LOCATIONS.get(client_location['ip'])
+                if client_lat_long is NO_VALUE:
+                    client_lat_long = __get_lat_long(client_location['ip'], gi)
+                    if client_lat_long[0] is not None:
+                        CLIENT_LOCATIONS.set(client_location['ip'], client_lat_long)
+                lat2, long2 = client_lat_long
 
             if lat1 and lat2:
                 long1, lat1, long2, lat2 = map(radians, [long1, lat1, long2, lat2])
@@ -158,11 +206,13 @@ def __get_distance(se1, client_location, ignore_error):
     return cache_val
 
 
-def __download_custom_distance_table() -> None:
+def __download_custom_distance_table() -> "dict[tuple[str, str], float]":
     """
     Downloads and parses the custom distance table specified by custom_distance_download_url
     in the config file. Each line of this CSV file should contain a site name, a RSE name,
     and a numerical distance value. Any additional fields are silently ignored.
+
+    :returns: the distances, indexed by (site, RSE).
     """
     db_path = Path('/tmp/rucio_custom_distance_table.csv')
     db_expire_delay = timedelta(days=config_get_int('core', 'custom_distance_expire_delay', raise_exception=False, default=30))
@@ -189,7 +239,8 @@ def __download_custom_distance_table() -> None:
                                                                                                 result.status_code,
                                                                                                 result.text))
 
-    # parse the local file and add its contents to REGION
+    # parse the local file into the (site, RSE) distance matrix
+    table = {}
     with open(db_path, mode='r') as f:
         lines = f.readlines()
         for line in lines:
@@ -205,8 +256,20 @@ def __download_custom_distance_table() -> None:
             distance = float(bits[2].strip())
             if distance < 0.0 or distance > 1.0:
                 raise Exception('Distances in custom distance table must be in range 0-1')
-            cache_key = f'replica_sorter:__get_distance_custom|site_distance|{rse}|{site}'
-            REGION.set(cache_key, distance)
+            table[(site, rse)] = distance
+    return table
+
+
+def __custom_distance_table() -> "dict[tuple[str, str], float]":
+    """
+    Return the custom distance table, loading it once per expiration period
+    instead of once per unknown (site, RSE) pair.
+    """
+    with _CUSTOM_DISTANCES_LOCK:
+        if _CUSTOM_DISTANCES['table'] is None or _CUSTOM_DISTANCES['expires_at'] < time.monotonic():
+            _CUSTOM_DISTANCES['table'] = __download_custom_distance_table()
+            _CUSTOM_DISTANCES['expires_at'] = time.monotonic() + 900
+        return _CUSTOM_DISTANCES['table']
 
 
 def __get_distance_custom(rse: Union[tuple, str], client_location: dict) -> float:
@@ -219,16 +282,8 @@ def __get_distance_custom(rse: Union[tuple, str], client_location: dict) -> floa
     # get RSE name out of tuple if necessary
     if isinstance(rse, tuple) and len(rse) == 4:
         rse = rse[2]
-    cache_key = f'replica_sorter:__get_distance_custom|site_distance|{rse}|{client_location["site"]}'
-    cache_val = REGION.get(cache_key)
-    if not isinstance(cache_val, float):
-        # download the table and add all its values to the cache
-        __download_custom_distance_table()
-        cache_val = REGION.get(cache_key)
-        if not isinstance(cache_val, float):
-            # assume maximum distance if not specified in table
-            cache_val = 1.0
-    return cache_val
+    # assume maximum distance if not specified in table
+    return __custom_distance_table().get((client_location['site'], rse), 1.0)
 
 
 def site_selector(replicas, site, vo):
@@ -252,7 +307,7 @@ def site_selector(replicas, site, vo):
     return result
 
 
-def sort_replicas(dictreplica: dict, client_location: dict, selection: "Optional[str]" = None) -> list:
+def sort_replicas(dictreplica: dict, client_location: dict, selection: "Optional[str]" = None, distances: "Optional[dict]" = None) -> list:
     """
     General sorting method for a dictionary of replicas. Returns the List of replicas.
 
@@ -260,6 +315,7 @@ def sort_replicas(dictreplica: dict, client_location: dict, selection: "Optional
     :param client_location: Location dictionary containing {'ip', 'fqdn', 'site', 'latitude', 'longitude'}
     :param selection: the selected sorting algorithm.
     :param default: the default sorting algorithm (random, if not defined).
+    :param distances: Optional dict, shared by calls for the same client, in which the distances to hosts and RSEs are memoized.
     :returns: the keys of dictreplica in a sorted list.
     """
     if len(dictreplica) == 0:
@@ -276,9 +332,9 @@ def sort_replicas(dictreplica: dict, client_location: dict, selection: "Optional
 
     # all sorts must be stable to preserve the priority (the Python standard sorting functions always are stable)
     if selection == 'geoip':
-        replicas = sort_geoip(dictreplica, client_location, ignore_error=True)
+        replicas = sort_geoip(dictreplica, client_location, ignore_error=True, distances=distances)
     elif selection == 'custom_table':
-        replicas = sort_custom(dictreplica, client_location)
+        replicas = sort_custom(dictreplica, client_location, distances=distances)
     elif selection == 'closeness':
         replicas = sort_closeness(dictreplica, client_location)
     elif selection == 'dynamic':
@@ -293,6 +349,20 @@ def sort_replicas(dictreplica: dict, client_location: dict, selection: "Optional
     return replicas
 
 
+def sort_replicas_bulk(dictreplicas: "Iterable[dict]", client_location: dict, selection: "Optional[str]" = None) -> "list[list]":
+    """
+    Sort the replicas of many files for the same client. The distance from the client to every
+    host or RSE is computed once and reused for all files.
+
+    :param dictreplicas: An iterable of dicts with replicas as keys (URIs), one per file.
+    :param client_location: Location dictionary containing {'ip', 'fqdn', 'site', 'latitude', 'longitude'}
+    :param selection: the selected sorting algorithm.
+    :returns: the sorted replicas of each file, in the order of dictreplicas.
+    """
+    distances = {}
+    return [sort_replicas(dictreplica, client_location, selection=selection, distances=distances) for dictreplica in dictreplicas]
+
+
 def sort_random(dictreplica: dict) -> list:
     """
     Return a list of replicas sorted randomly.
@@ -304,13 +374,16 @@ def sort_random(dictreplica: dict) -> list:
     return list_replicas
 
 
-def sort_geoip(dictreplica: dict, client_location: dict, ignore_error: bool = False) -> list:
+def sort_geoip(dictreplica: dict, client_location: dict, ignore_error: bool = False, distances: "Optional[dict]" = None) -> list:
     """
     Return a list of replicas sorted by geographical distance to the client IP.
     :param dictreplica: A dict with replicas as keys (URIs).
     :param client_location: Location dictionary containing {'ip', 'fqdn', 'site', 'latitude', 'longitude'}
     :param ignore_error: Ignore exception when the GeoLite DB cannot be retrieved
+    :param distances: Optional dict in which the distances to hosts are memoized.
     """
+    if distances is None:
+        distances = {}
 
     def distance(pfn):
         url = urlparse(pfn)
@@ -319,21 +392,32 @@ def sort_geoip(dictreplica: dict, client_location: dict, ignore_error: bool = Fa
             sub_url = urlparse(url.path.lstrip('/'))
             if sub_url.scheme and sub_url.hostname:
                 url = sub_url
-        return __get_distance(url.hostname, client_location, ignore_error)
+        key = ('geoip', url.hostname)
+        if key not in distances:
+            distances[key] = __get_distance(url.hostname, client_location, ignore_error)
+        return distances[key]
 
     return list(sorted(dictreplica, key=distance))
 
 
-def sort_custom(dictreplica: dict, client_location: dict) -> list:
+def sort_custom(dictreplica: dict, client_location: dict, distances: "Optional[dict]" = None) -> list:
     """
     Return a list of replicas sorted according to the custom distance table.
     :param dictreplica: A dict with replicas as keys (URIs).
     :param client_location: Location dictionary containing {'ip', 'fqdn', 'site', 'latitude', 'longitude'}
-    :param ignore_error: Ignore exception when the GeoLite DB cannot be retrieved
+    :param distances: Optional dict in which the distances to RSEs are memoized.
     """
+    if distances is None:
+        distances = {}
 
     def distance(pfn: str) -> float:
-        return __get_distance_custom(dictreplica[pfn], client_location)
+        rse = dictreplica[pfn]
+        if isinstance(rse, tuple) and len(rse) == 4:
+            rse = rse[2]
+        key = ('custom_table', rse)
+        if key not in distances:
+            distances[key] = __get_distance_custom(rse, client_location)
+        return distances[key]
 
     return list(sorted(dictreplica, key=distance))
 
@@ -22,9 +22,9 @@ from collections import namedtuple
 from collections.abc import Sequence
 from typing import TYPE_CHECKING, Any, Optional, Union
 
-from sqlalchemy import and_, or_, update, select, delete, exists, insert
+from sqlalchemy import and_, or_, update, select, delete, event, exists, insert, literal, DateTime
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import aliased
+from sqlalchemy.orm import Session, aliased
 from sqlalchemy.sql.expression import asc, true, false, null, func
 
 from rucio.common.config import config_get_bool
@@ -45,8 +45,6 @@ RequestAndState = namedtuple('RequestAndState', ['request_id', 'request_state'])
 if TYPE_CHECKING:
     from rucio.core.rse import RseCollection
 
-    from sqlalchemy.orm import Session
-
 """
 The core request.py is specifically for handling requests.
 Requests accessed by external_id (So called transfers), are covered in the core transfer.py
@@ -54,6 +52,11 @@ Requests accessed by external_id (So called transfers), are covered in the core
 
 METRICS = MetricManager(module=__name__)
 
+# session.info key of the {(account, dest_rse_id, source_rse_id, activity): [waiting, active]} deltas not yet written to request_counters
+PENDING_COUNTER_DELTAS_KEY = 'rucio.core.request.pending_counter_deltas'
+ACTIVE_REQUEST_STATES = (RequestState.QUEUED, RequestState.SUBMITTING, RequestState.SUBMITTED)
+COUNTED_REQUEST_TYPES = (RequestType.TRANSFER, RequestType.STAGEIN, RequestType.STAGEOUT)
+
 
 class RequestSource:
     def __init__(self, rse_data, ranking=None, distance=None, file_path=None, scheme=None, url=None):
@@ -174,36 +177,86 @@ def requeue_and_archive(request, source_ranking_update=True, retry_protocol_mism
     :param logger:                Optional decorated logger that can be passed from the calling daemons or servers.
     """
 
-    # Probably not needed anymore
-    request_id = request['request_id']
-    new_req = get_request(request_id, session=session)
-
-    if new_req:
-        new_req['sources'] = get_sources(request_id, session=session)
-        archive_request(request_id, session=session)
-
-        if should_retry_request(new_req, retry_protocol_mismatches):
-            new_req['request_id'] = generate_uuid()
-            new_req['previous_attempt_id'] = request_id
-            if new_req['retry_count'] is None:
-                new_req['retry_count'] = 1
-            elif new_req['state'] != RequestState.SUBMITTING:
-                new_req['retry_count'] += 1
-
-            if source_ranking_update and new_req['sources']:
-                for i in range(len(new_req['sources'])):
-                    if new_req['sources'][i]['is_using']:
-                        if new_req['sources'][i]['ranking'] is None:
-                            new_req['sources'][i]['ranking'] = -1
-                        else:
-                            new_req['sources'][i]['ranking'] -= 1
-                        new_req['sources'][i]['is_using'] = False
-            new_req.pop('state', None)
-            queue_requests([new_req], session=session, logger=logger)
-            return new_req
-    else:
+    new_reqs = requeue_and_archive_bulk([request],
+                                        source_ranking_update=source_ranking_update,
+                                        retry_protocol_mismatches=retry_protocol_mismatches,
+                                        session=session,
+                                        logger=logger)
+    if request['request_id'] not in new_reqs:
         raise RequestNotFound
-    return None
+    return new_reqs[request['request_id']]
+
+
+@METRICS.time_it
+@transactional_session
+def requeue_and_archive_bulk(requests, source_ranking_update=True, retry_protocol_mismatches=False, *, session: "Session", logger=logging.log):
+    """
+    Requeue and archive a batch of failed requests.
+
+    The requests and their sources are read and archived at once, and the requests which
+    must still be retried are queued again in one call.
+
+    :param requests:                   List of original requests.
+    :param source_ranking_update       Boolean. If True, the source ranking is decreased (making the sources less likely to be used)
+    :param retry_protocol_mismatches:  Boolean to retry the transfer in case of protocol mismatch.
+    :param session:                    Database session to use.
+    :param logger:                     Optional decorated logger that can be passed from the calling daemons or servers.
+    :returns:                          Dictionary {request_id: new request, or None if the request is not retried}.
+                                       Requests which do not exist anymore are not part of it.
+    """
+
+    old_reqs = {}
+    for chunk in chunks([request['request_id'] for request in requests], 1000):
+        stmt = select(
+            models.Request
+        ).where(
+            models.Request.id.in_(chunk)
+        )
+        for req in session.execute(stmt).scalars():
+            old_req = req.to_dict()
+            old_req['attributes'] = json.loads(str(old_req['attributes'] or '{}'))
+            old_req['sources'] = None
+            old_reqs[old_req['id']] = old_req
+
+        stmt = select(
+            models.Source
+        ).where(
+            models.Source.request_id.in_(chunk)
+        )
+        for source in session.execute(stmt).scalars():
+            old_req = old_reqs[source.request_id]
+            old_req['sources'] = (old_req['sources'] or []) + [source.to_dict()]
+
+    archive_requests(list(old_reqs), session=session)
+
+    new_reqs, to_queue = {}, []
+    for request_id, new_req in old_reqs.items():
+        if not should_retry_request(new_req, retry_protocol_mismatches):
+            new_reqs[request_id] = None
+            continue
+
+        new_req['request_id'] = generate_uuid()
+        new_req['previous_attempt_id'] = request_id
+        if new_req['retry_count'] is None:
+            new_req['retry_count'] = 1
+        elif new_req['state'] != RequestState.SUBMITTING:
+            new_req['retry_count'] += 1
+
+        if source_ranking_update and new_req['sources']:
+            for source in new_req['sources']:
+                if source['is_using']:
+                    if source['ranking'] is None:
+                        source['ranking'] = -1
+                    else:
+                        source['ranking'] -= 1
+                    source['is_using'] = False
+        new_req.pop('state', None)
+        new_reqs[request_id] = new_req
+        to_queue.append(new_req)
+
+    if to_queue:
+        queue_requests(to_queue, session=session, logger=logger)
+    return new_reqs
 
 
 @METRICS.count_it
@@ -222,6 +275,7 @@ def queue_requests(requests, *, session: "Session", logger=logging.log):
     request_clause = []
     rses = {}
     preparer_enabled = config_get_bool('conveyor', 'use_preparer', raise_exception=False, default=False)
+    counters_enabled = request_counters_enabled()
     for req in requests:
 
         if isinstance(req['attributes'], str):
@@ -295,6 +349,9 @@ def queue_requests(requests, *, session: "Session", logger=logging.log):
         else:
             new_request['id'] = generate_uuid()
         new_requests.append(new_request)
+        if counters_enabled and request['request_type'] in COUNTED_REQUEST_TYPES:
+            _add_request_counter_delta(new_request['account'], new_request['dest_rse_id'], new_request['source_rse_id'], new_request['activity'],
+                                       new_request['state'], 1, session=session)
 
         if 'sources' in request and request['sources']:
             for source in request['sources']:
@@ -820,6 +877,10 @@ def update_request(
         if transfertool is not None:
             update_items[models.Request.transfertool] = transfertool
 
+        counted_request = None
+        if (state is not None or source_rse_id is not None) and request_counters_enabled():
+            counted_request = get_counted_request(request_id, session=session)
+
         stmt = update(
             models.Request
         ).where(
@@ -831,6 +892,9 @@ def update_request(
         )
         rowcount = session.execute(stmt).rowcount
 
+        if rowcount:
+            count_request_state_change(counted_request, state, source_rse_id, session=session)
+
     except IntegrityError as error:
         raise RucioException(error.args)
 
@@ -1086,11 +1150,16 @@ def handle_failed_intermediate_hop(request, *, session: "Session"):
         dependent_requests.extend(path[idx + 1:])
 
     if dependent_requests:
+        criteria = (
+            models.Request.id.in_(dependent_requests),
+            models.Request.state.in_([RequestState.QUEUED, RequestState.SUBMITTED]),
+        )
+        if request_counters_enabled():
+            count_requests_state_change(*criteria, new_state=new_state, session=session)
         stmt = update(
             models.Request
         ).where(
-            models.Request.id.in_(dependent_requests),
-            models.Request.state.in_([RequestState.QUEUED, RequestState.SUBMITTED]),
+            *criteria
         ).execution_options(
             synchronize_session=False
         ).values(
@@ -1110,66 +1179,97 @@ def archive_request(request_id, *, session: "Session"):
     :param session:     Database session to use.
     """
 
-    req = get_request(request_id=request_id, session=session)
-
-    if req:
-        hist_request = models.RequestHistory(id=req['id'],
-                                             created_at=req['created_at'],
-                                             request_type=req['request_type'],
-                                             scope=req['scope'],
-                                             name=req['name'],
-                                             dest_rse_id=req['dest_rse_id'],
-                                             source_rse_id=req['source_rse_id'],
-                                             attributes=json.dumps(req['attributes']) if isinstance(req['attributes'], dict) else req['attributes'],
-                                             state=req['state'],
-                                             account=req['account'],
-                                             external_id=req['external_id'],
-                                             retry_count=req['retry_count'],
-                                             err_msg=req['err_msg'],
-                                             previous_attempt_id=req['previous_attempt_id'],
-                                             external_host=req['external_host'],
-                                             rule_id=req['rule_id'],
-                                             activity=req['activity'],
-                                             bytes=req['bytes'],
-                                             md5=req['md5'],
-                                             adler32=req['adler32'],
-                                             dest_url=req['dest_url'],
-                                             requested_at=req['requested_at'],
-                                             submitted_at=req['submitted_at'],
-                                             staging_started_at=req['staging_started_at'],
-                                             staging_finished_at=req['staging_finished_at'],
-                                             started_at=req['started_at'],
-                                             estimated_started_at=req['estimated_started_at'],
-                                             estimated_at=req['estimated_at'],
-                                             transferred_at=req['transferred_at'],
-                                             estimated_transferred_at=req['estimated_transferred_at'],
-                                             transfertool=req['transfertool'])
-        hist_request.save(session=session)
+    archive_requests([request_id], session=session)
+
+
+ARCHIVED_REQUEST_COLUMNS = ('id', 'created_at', 'request_type', 'scope', 'name', 'did_type', 'dest_rse_id', 'source_rse_id', 'attributes',
+                            'state', 'account', 'external_id', 'retry_count', 'err_msg', 'previous_attempt_id', 'external_host', 'rule_id',
+                            'activity', 'bytes', 'md5', 'adler32', 'dest_url', 'requested_at', 'submitted_at', 'staging_started_at',
+                            'staging_finished_at', 'started_at', 'estimated_started_at', 'estimated_at', 'transferred_at',
+                            'estimated_transferred_at', 'transfertool')
+
+
+@METRICS.count_it
+@transactional_session
+def archive_requests(request_ids, *, session: "Session"):
+    """
+    Move requests to the history table.
+
+    The requests are copied with one INSERT ... SELECT per chunk, then deleted together
+    with their sources and transfer hops.
+
+    :param request_ids:  List of Request-IDs as 32 character hex strings.
+    :param session:      Database session to use.
+    """
+
+    counters_enabled = request_counters_enabled()
+    for chunk in chunks(request_ids, 1000):
+        stmt = select(
+            models.Request.id,
+            models.Request.request_type,
+            models.Request.account,
+            models.Request.dest_rse_id,
+            models.Request.source_rse_id,
+            models.Request.activity,
+            models.Request.state,
+            models.Request.created_at,
+            models.Request.updated_at
+        ).where(
+            models.Request.id.in_(chunk)
+        )
+        reqs = session.execute(stmt).all()
+        if not reqs:
+            continue
+        archived_ids = [req.id for req in reqs]
+
         try:
-            time_diff = req['updated_at'] - req['created_at']
-            time_diff_s = time_diff.seconds + time_diff.days * 24 * 3600
-            METRICS.timer('archive_request_per_activity.{activity}').labels(activity=req['activity'].replace(' ', '_')).observe(time_diff_s)
+            stmt = insert(
+                models.RequestHistory
+            ).from_select(
+                list(ARCHIVED_REQUEST_COLUMNS) + ['updated_at'],
+                select(
+                    *[getattr(models.Request, column) for column in ARCHIVED_REQUEST_COLUMNS],
+                    literal(datetime.datetime.utcnow(), DateTime)
+                ).where(
+                    models.Request.id.in_(archived_ids)
+                )
+            )
+            session.execute(stmt)
+
+            for req in reqs:
+                if req.request_type in COUNTED_REQUEST_TYPES and counters_enabled:
+                    _add_request_counter_delta(req.account, req.dest_rse_id, req.source_rse_id, req.activity, req.state, -1, session=session)
+                time_diff = req.updated_at - req.created_at
+                time_diff_s = time_diff.seconds + time_diff.days * 24 * 3600
+                METRICS.timer('archive_request_per_activity.{activity}').labels(activity=req.activity.replace(' ', '_')).observe(time_diff_s)
+
             session.execute(
                 delete(
                     models.Source
                 ).where(
-                    models.Source.request_id == request_id
+                    models.Source.request_id.in_(archived_ids)
+                ).execution_options(
+                    synchronize_session=False
                 )
             )
             session.execute(
                 delete(
                     models.TransferHop
                 ).where(
-                    or_(models.TransferHop.request_id == request_id,
-                        models.TransferHop.next_hop_request_id == request_id,
-                        models.TransferHop.initial_request_id == request_id)
+                    or_(models.TransferHop.request_id.in_(archived_ids),
+                        models.TransferHop.next_hop_request_id.in_(archived_ids),
+                        models.TransferHop.initial_request_id.in_(archived_ids))
+                ).execution_options(
+                    synchronize_session=False
                 )
             )
             session.execute(
                 delete(
                     models.Request
                 ).where(
-                    models.Request.id == request_id
+                    models.Request.id.in_(archived_ids)
+                ).execution_options(
+                    synchronize_session=False
                 )
             )
         except IntegrityError as error:
@@ -1327,6 +1427,222 @@ def get_request_stats(state, *, session: "Session"):
         raise RucioException(error.args)
 
 
+def request_counters_enabled() -> bool:
+    """
+    Check if the number of waiting and active requests is maintained incrementally in the request_counters table.
+    """
+    return config_get_bool('throttler', 'incremental_stats', raise_exception=False, default=False)
+
+
+def _add_request_counter_delta(account, dest_rse_id, source_rse_id, activity, state, count, *, session: "Session"):
+    """
+    Add a number of requests in the given state to the request counters of the current transaction.
+    States other than waiting and active states are not counted.
+    """
+    if state == RequestState.WAITING:
+        index = 0
+    elif state in ACTIVE_REQUEST_STATES:
+        index = 1
+    else:
+        return
+    delta = session.info.setdefault(PENDING_COUNTER_DELTAS_KEY, {}).setdefault((account, dest_rse_id, source_rse_id, activity), [0, 0])
+    delta[index] += count
+
+
+def get_counted_request(request_id, *, session: "Session"):
+    """
+    Read the attributes of a request which determine its request counter, before it is updated.
+
+    :param request_id:  The request id.
+    :param session:     The database session in use.
+    :returns:           The request attributes, or None if the request does not exist or is not counted.
+    """
+    stmt = select(
+        models.Request.state,
+        models.Request.request_type,
+        models.Request.account,
+        models.Request.dest_rse_id,
+        models.Request.source_rse_id,
+        models.Request.activity,
+    ).where(
+        models.Request.id == request_id
+    )
+    request = session.execute(stmt).one_or_none()
+    if request is None or request.request_type not in COUNTED_REQUEST_TYPES:
+        return None
+    return request
+
+
+def count_request_state_change(request, state=None, source_rse_id=None, *, session: "Session"):
+    """
+    Record the change of state or source of an existing request in the request counters.
+    Must only be called once the request was effectively updated.
+
+    :param request:        The request attributes before the update, as returned by get_counted_request.
+    :param state:          The new state of the request, if it changes.
+    :param source_rse_id:  The new source RSE of the request, if it changes.
+    :param session:        The database session in use.
+    """
+    if request is None:
+        return
+    _add_request_counter_delta(request.account, request.dest_rse_id, request.source_rse_id, request.activity, request.state, -1, session=session)
+    _add_request_counter_delta(request.account, request.dest_rse_id, source_rse_id or request.source_rse_id, request.activity, state or request.state, 1, session=session)
+
+
+def count_requests_state_change(*criteria, new_state=None, session: "Session"):
+    """
+    Record the change of state, or the removal, of the existing requests matching the criteria in the request counters.
+    Must be called before the requests are updated or deleted.
+
+    :param criteria:   Criteria on models.Request selecting the changed requests.
+    :param new_state:  The new state of the requests, None if they are deleted.
+    :param session:    The database session in use.
+    """
+    stmt = select(
+        models.Request.account,
+        models.Request.dest_rse_id,
+        models.Request.source_rse_id,
+        models.Request.activity,
+        models.Request.state,
+        func.count(1),
+    ).where(
+        models.Request.request_type.in_(COUNTED_REQUEST_TYPES),
+        *criteria
+    ).group_by(
+        models.Request.account,
+        models.Request.dest_rse_id,
+        models.Request.source_rse_id,
+        models.Request.activity,
+        models.Request.state,
+    )
+    for account, dest_rse_id, source_rse_id, activity, state, count in session.execute(stmt):
+        _add_request_counter_delta(account, dest_rse_id, source_rse_id, activity, state, -count, session=session)
+        if new_state is not None:
+            _add_request_counter_delta(account, dest_rse_id, source_rse_id, activity, new_state, count, session=session)
+
+
+def _count_released_requests(*criteria, session: "Session"):
+    """
+    Record the release of the waiting requests matching the criteria in the request counters.
+    """
+    count_requests_state_change(models.Request.state == RequestState.WAITING, *criteria, new_state=RequestState.QUEUED, session=session)
+
+
+@event.listens_for(Session, 'before_commit')
+def _write_pending_counter_deltas(session):
+    """
+    Write the coalesced request counter deltas of the committing transaction.
+    """
+    deltas = session.info.pop(PENDING_COUNTER_DELTAS_KEY, None)
+    if deltas:
+        session.add_all([models.RequestCounter(account=account, dest_rse_id=dest_rse_id, source_rse_id=source_rse_id, activity=activity,
+                                               waiting=waiting, active=active)
+                         for (account, dest_rse_id, source_rse_id, activity), (waiting, active) in deltas.items() if waiting or active])
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending_counter_deltas(session):
+    session.info.pop(PENDING_COUNTER_DELTAS_KEY, None)
+
+
+@read_session
+def get_request_counters(*, session: "Session"):
+    """
+    Retrieve the number of waiting and active requests by account, destination, source and activity
+    from the request counters, without scanning the requests table.
+
+    :param session: Database session to use.
+    :returns:       List of (account, dest_rse_id, source_rse_id, activity, waiting, active).
+    """
+    stmt = select(
+        models.RequestCounter.account,
+        models.RequestCounter.dest_rse_id,
+        models.RequestCounter.source_rse_id,
+        models.RequestCounter.activity,
+        func.sum(models.RequestCounter.waiting).label('waiting'),
+        func.sum(models.RequestCounter.active).label('active'),
+    ).group_by(
+        models.RequestCounter.account,
+        models.RequestCounter.dest_rse_id,
+        models.RequestCounter.source_rse_id,
+        models.RequestCounter.activity,
+    )
+    return session.execute(stmt).all()
+
+
+@transactional_session
+def compact_request_counters(*, session: "Session"):
+    """
+    Replace the rows of the request counters by one row per account, destination, source and activity.
+    Rows written concurrently are left untouched.
+
+    :param session: Database session to use.
+    :returns:       The number of removed rows.
+    """
+    stmt = select(
+        models.RequestCounter.id,
+        models.RequestCounter.account,
+        models.RequestCounter.dest_rse_id,
+        models.RequestCounter.source_rse_id,
+        models.RequestCounter.activity,
+        models.RequestCounter.waiting,
+        models.RequestCounter.active,
+    )
+    ids, totals = [], {}
+    for id_, account, dest_rse_id, source_rse_id, activity, waiting, active in session.execute(stmt):
+        ids.append(id_)
+        total = totals.setdefault((account, dest_rse_id, source_rse_id, activity), [0, 0])
+        total[0] += waiting
+        total[1] += active
+
+    new_rows = [{'account': account, 'dest_rse_id': dest_rse_id, 'source_rse_id': source_rse_id, 'activity': activity,
+                 'waiting': waiting, 'active': active}
+                for (account, dest_rse_id, source_rse_id, activity), (waiting, active) in totals.items() if waiting or active]
+    if len(new_rows) == len(ids):
+        return 0
+
+    for ids_chunk in chunks(ids, 1000):
+        stmt = delete(
+            models.RequestCounter
+        ).where(
+            models.RequestCounter.id.in_(ids_chunk)
+        ).execution_options(
+            synchronize_session=False
+        )
+        session.execute(stmt)
+    for rows_chunk in chunks(new_rows, 1000):
+        session.execute(insert(models.RequestCounter), rows_chunk)
+    return len(ids) - len(new_rows)
+
+
+@transactional_session
+def reconcile_request_counters(*, session: "Session"):
+    """
+    Rebuild the request counters from the requests table.
+
+    State changes committed while the requests table is aggregated can be
+    counted twice or not at all; the next reconciliation corrects them.
+
+    :param session: Database session to use.
+    """
+    totals = {}
+    for db_stat in get_request_stats(state=[RequestState.WAITING, *ACTIVE_REQUEST_STATES], session=session):
+        total = totals.setdefault((db_stat.account, db_stat.dest_rse_id, db_stat.source_rse_id, db_stat.activity), [0, 0])
+        total[0 if db_stat.state == RequestState.WAITING else 1] += db_stat.counter
+
+    stmt = delete(
+        models.RequestCounter
+    ).execution_options(
+        synchronize_session=False
+    )
+    session.execute(stmt)
+    new_rows = [{'account': account, 'dest_rse_id': dest_rse_id, 'source_rse_id': source_rse_id, 'activity': activity,
+                 'waiting': waiting, 'active': active}
+                for (account, dest_rse_id, source_rse_id, activity), (waiting, active) in totals.items()]
+    for rows_chunk in chunks(new_rows, 1000):
+        session.execute(insert(models.RequestCounter), rows_chunk)
+
+
 @transactional_session
 def release_waiting_requests_per_deadline(
         dest_rse_id: Optional[str] = None,
@@ -1362,6 +1678,9 @@ def release_waiting_requests_per_deadline(
                  filtered_requests_subquery.c.dataset_scope == old_requests_subquery.c.scope)
         ).subquery()
 
+        if request_counters_enabled():
+            _count_released_requests(models.Request.id.in_(old_requests_subquery), session=session)
+
         amount_released_requests = update(
             models.Request
         ).where(
@@ -1434,6 +1753,9 @@ def release_waiting_requests_per_free_volume(
         cumulated_volume_subquery.c.cum_volume <= volume - sum_volume_active_subquery.c.sum_bytes
     ).subquery()
 
+    if request_counters_enabled():
+        _count_released_requests(models.Request.id.in_(cumulated_volume_subquery), session=session)
+
     amount_released_requests = update(
         models.Request
     ).where(
@@ -1587,6 +1909,9 @@ def release_waiting_requests_fifo(
         # wrap select to update and select from the same table
         subquery = select(subquery.c.id).subquery()
 
+    if request_counters_enabled():
+        _count_released_requests(models.Request.id.in_(subquery), session=session)
+
     stmt = update(
         models.Request
     ).where(
@@ -1652,6 +1977,9 @@ def release_waiting_requests_grouped_fifo(
     # needed for mysql to update and select from the same table
     cumulated_children_subquery = select(cumulated_children_subquery.c.id).subquery()
 
+    if request_counters_enabled():
+        _count_released_requests(models.Request.id.in_(cumulated_children_subquery), session=session)
+
     stmt = update(
         models.Request
     ).where(
@@ -1689,31 +2017,29 @@ def release_all_waiting_requests(
     :param session: The database session.
     """
     try:
+        criteria = []
+        if source_rse_id is not None:
+            criteria.append(models.Request.source_rse_id == source_rse_id)
+        if dest_rse_id is not None:
+            criteria.append(models.Request.dest_rse_id == dest_rse_id)
+        if activity is not None:
+            criteria.append(models.Request.activity == activity)
+        if account is not None:
+            criteria.append(models.Request.account == account)
+
+        if request_counters_enabled():
+            _count_released_requests(*criteria, session=session)
+
         query = update(
             models.Request
         ).where(
             models.Request.state == RequestState.WAITING,
+            *criteria
         ).execution_options(
             synchronize_session=False
         ).values(
             {'state': RequestState.QUEUED}
         )
-        if source_rse_id is not None:
-            query = query.where(
-                models.Request.source_rse_id == source_rse_id
-            )
-        if dest_rse_id is not None:
-            query = query.where(
-                models.Request.dest_rse_id == dest_rse_id
-            )
-        if activity is not None:
-            query = query.where(
-                models.Request.activity == activity
-            )
-        if account is not None:
-            query = query.where(
-                models.Request.account == account
-            )
         rowcount = session.execute(query).rowcount
         return rowcount
     except IntegrityError as error:
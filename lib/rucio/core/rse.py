@@ -14,16 +14,19 @@
 # limitations under the License.
 
 import json
-from collections.abc import Iterator, Iterable
+import threading
+from collections.abc import Iterator, Iterable, Mapping
 from datetime import datetime
 from io import StringIO
+from types import MappingProxyType
 from re import match
-from typing import Any, Generic, Optional, TypeVar, Union, TYPE_CHECKING
+from typing import Any, Generic, Optional, TypeVar, Union
 
 import sqlalchemy
 from dogpile.cache.api import NO_VALUE
 from sqlalchemy.exc import DatabaseError, IntegrityError, OperationalError
-from sqlalchemy.orm import aliased
+from sqlalchemy import event
+from sqlalchemy.orm import Session, aliased
 from sqlalchemy.orm.exc import FlushError
 from sqlalchemy.sql.expression import or_, and_, desc, true, false, func, select, delete
 
@@ -38,14 +41,14 @@ from rucio.db.sqla.constants import RSEType, ReplicaState
 from rucio.db.sqla.session import read_session, transactional_session, stream_session
 from rucio.db.sqla.util import temp_table_mngr
 
-if TYPE_CHECKING:
-    from sqlalchemy.orm import Session
-
 T = TypeVar('T', bound="RseData")
 
 RSE_SETTINGS = ["continent", "city", "region_code", "country_name", "time_zone", "ISP", "ASN"]
 REGION = make_region_memcached(expiration_time=900)
 
+# session.info key of the ids of the RSEs whose cached settings must be invalidated once the transaction is committed
+PENDING_RSE_INVALIDATIONS_KEY = 'rucio.core.rse.pending_invalidations'
+
 
 class RseData:
     """
@@ -346,6 +349,151 @@ class RseCollection(Generic[T]):
         )
 
 
+class FrozenRseData(RseData):
+    """
+    Read-only RseData of a RseRegistry snapshot, which can be shared between threads.
+    The loaded dictionaries must not be modified. ensure_loaded only accepts fields
+    which are already loaded; use RseRegistry.rse_data to get a loadable copy.
+    """
+    _frozen = False
+
+    def __init__(self, rse_data: RseData):
+        super().__init__(rse_data.id, name=rse_data._name, columns=rse_data._columns, attributes=rse_data._attributes,
+                         info=rse_data._info, usage=rse_data._usage, limits=rse_data._limits,
+                         transfer_limits=rse_data._transfer_limits)
+        self._frozen = True
+
+    def __setattr__(self, key, value):
+        if self._frozen:
+            raise AttributeError(f'rse {self} is read-only')
+        super().__setattr__(key, value)
+
+    def ensure_loaded(self, load_name=False, load_columns=False, load_attributes=False,
+                      load_info=False, load_usage=False, load_limits=False, load_transfer_limits=False, *, session: "Optional[Session]" = None):
+        for load, field in ((load_name, '_name'), (load_columns, '_columns'), (load_attributes, '_attributes'), (load_info, '_info'),
+                            (load_usage, '_usage'), (load_limits, '_limits'), (load_transfer_limits, '_transfer_limits')):
+            if load and getattr(self, field) is None:
+                raise ValueError(f'{field[1:]} not loaded for read-only rse {self}')
+        return self
+
+    @staticmethod
+    def bulk_load(*args, **kwargs):
+        raise TypeError('FrozenRseData cannot be loaded')
+
+
+class RseRegistry:
+    """
+    Snapshot of the columns, attributes, protocols and limits of all the RSEs of a VO.
+
+    The snapshot is loaded in bulk. A refresh compares the updated_at of the RSE rows and the
+    number and latest updated_at of their attributes, protocols and limits with the snapshot,
+    and only reloads the RSEs which changed. Each refresh publishes a new snapshot, so threads
+    can keep using the previous one while it is built.
+    """
+
+    def __init__(self, vo: "Optional[str]" = None):
+        """
+        :param vo: The VO of the RSEs. All VOs if None.
+        """
+        self.vo = vo
+        self._lock = threading.Lock()
+        self._snapshot: "Mapping[str, FrozenRseData]" = MappingProxyType({})
+        self._signatures: dict[str, tuple] = {}
+
+    @property
+    def snapshot(self) -> "Mapping[str, FrozenRseData]":
+        """
+        The latest snapshot, a read-only mapping {rse_id: FrozenRseData}.
+        """
+        return self._snapshot
+
+    def get(self, rse_id: str) -> "Optional[FrozenRseData]":
+        return self._snapshot.get(rse_id)
+
+    def rse_data(self, rse_id: str, rse_data_cls: type[T] = RseData) -> "T":
+        """
+        Return a new RseData initialised with the fields of the snapshot, which can be loaded further.
+
+        :param rse_id:       The RSE id.
+        :param rse_data_cls: The RseData class to instantiate.
+        """
+        frozen = self._snapshot.get(rse_id)
+        if frozen is None:
+            return rse_data_cls(rse_id)
+        return rse_data_cls(frozen.id, name=frozen._name, columns=frozen._columns, attributes=frozen._attributes,
+                            info=frozen._info, limits=frozen._limits)
+
+    def collection(self, rse_ids: "Optional[Iterable[str]]" = None, rse_data_cls: type[T] = RseData) -> "RseCollection[T]":
+        """
+        Return a RseCollection initialised with the fields of the snapshot.
+
+        :param rse_ids:      The RSE ids to add to the collection. All RSEs of the snapshot if None.
+        :param rse_data_cls: The RseData class of the collection.
+        """
+        collection = RseCollection(rse_data_cls=rse_data_cls)
+        for rse_id in (self._snapshot if rse_ids is None else rse_ids):
+            collection[rse_id] = self.rse_data(rse_id, rse_data_cls=rse_data_cls)
+        return collection
+
+    def _fetch_signatures(self, *, session: "Session") -> dict[str, tuple]:
+        """
+        Fetch the signature of each RSE: the updated_at of the RSE and the number and
+        latest updated_at of its attributes, protocols and limits.
+        """
+        rse_filter = [models.RSE.deleted == false()]
+        if self.vo is not None:
+            rse_filter.append(models.RSE.vo == self.vo)
+
+        stmt = select(
+            models.RSE.id,
+            models.RSE.updated_at
+        ).where(
+            *rse_filter
+        )
+        signatures = {str(rse_id): [updated_at] for rse_id, updated_at in session.execute(stmt)}
+
+        for model in (models.RSEAttrAssociation, models.RSEProtocols, models.RSELimit):
+            stmt = select(
+                model.rse_id,
+                func.count(),
+                func.max(model.updated_at)
+            ).join(
+                models.RSE,
+                models.RSE.id == model.rse_id
+            ).where(
+                *rse_filter
+            ).group_by(
+                model.rse_id
+            )
+            by_rse_id = {str(rse_id): (count, updated_at) for rse_id, count, updated_at in session.execute(stmt)}
+            for rse_id, signature in signatures.items():
+                signature.append(by_rse_id.get(rse_id))
+        return {rse_id: tuple(signature) for rse_id, signature in signatures.items()}
+
+    @transactional_session
+    def refresh(self, *, session: "Session") -> "Mapping[str, FrozenRseData]":
+        """
+        Reload the RSEs which changed since the last refresh and publish a new snapshot.
+
+        :param session: The database session in use.
+        :returns:       The new snapshot.
+        """
+        with self._lock:
+            signatures = self._fetch_signatures(session=session)
+            changed = {rse_id: RseData(rse_id) for rse_id, signature in signatures.items() if self._signatures.get(rse_id) != signature}
+            if not changed and len(signatures) == len(self._signatures):
+                return self._snapshot
+
+            if changed:
+                RseData.bulk_load(changed, load_name=True, load_columns=True, load_attributes=True,
+                                  load_info=True, load_limits=True, session=session)
+            snapshot = {rse_id: rse_data for rse_id, rse_data in self._snapshot.items() if rse_id in signatures}
+            snapshot.update((rse_id, FrozenRseData(rse_data)) for rse_id, rse_data in changed.items())
+            self._signatures = signatures
+            self._snapshot = MappingProxyType(snapshot)
+            return self._snapshot
+
+
 @stream_session
 def _group_query_result_by_rse_id(stmt, *, session: "Session") -> Iterator[tuple[str, list[Any]]]:
     """
@@ -763,6 +911,7 @@ def add_rse_attribute(rse_id, key, value, *, session: "Session"):
     except IntegrityError:
         rse = get_rse_name(rse_id=rse_id, session=session)
         raise exception.Duplicate(f"RSE attribute '{key}-{value}' for RSE '{rse}' already exists!")
+    _invalidate_rse_cache(rse_id, session=session)
     return True
 
 
@@ -788,6 +937,7 @@ def del_rse_attribute(rse_id, key, *, session: "Session"):
     except sqlalchemy.orm.exc.NoResultFound:
         raise exception.RSEAttributeNotFound('RSE attribute \'%s\' cannot be found' % key)
     rse_attr.delete(session=session)
+    _invalidate_rse_cache(rse_id, session=session)
     return True
 
 
@@ -1331,6 +1481,7 @@ def add_protocol(
             raise exception.InvalidObject('Missing values!')
 
         raise exception.RucioException(error.args)
+    _invalidate_rse_cache(rse_id, session=session)
     return new_protocol
 
 
@@ -1537,6 +1688,7 @@ def update_protocols(
             msg = 'RSE \'%s\' does not support protocol \'%s\' for hostname \'%s\' on port \'%s\'' % (rse, scheme, hostname, port)
             raise exception.RSEProtocolNotSupported(msg)
         up.update(data, flush=True, session=session)
+        _invalidate_rse_cache(rse_id, session=session)
     except (IntegrityError, OperationalError) as error:
         if 'UNIQUE'.lower() in error.args[0].lower() or 'Duplicate' in error.args[0]:  # Covers SQLite, Oracle and MySQL error
             raise exception.Duplicate('Protocol \'%s\' on port %s already registered for  \'%s\' with hostname \'%s\'.' % (scheme, port, rse, hostname))
@@ -1596,6 +1748,33 @@ def del_protocols(
 
     for row in p:
         row.delete(session=session)
+    _invalidate_rse_cache(rse_id, session=session)
+
+
+def _invalidate_rse_cache(rse_id: str, *, session: "Session") -> None:
+    """
+    Invalidate the cached settings and protocols of an RSE used by rsemanager, once the
+    current transaction is committed. Invalidating earlier would let other processes
+    cache the settings of the RSE again before the change is visible to them.
+
+    :param rse_id:  The id of the RSE.
+    :param session: The database session in use.
+    """
+    session.info.setdefault(PENDING_RSE_INVALIDATIONS_KEY, set()).add(rse_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_pending_rse_caches(session):
+    """
+    Invalidate the cached settings of the RSEs changed by the committed transaction.
+    Pending invalidations are kept across rollbacks, as an extra invalidation is harmless.
+    """
+    rse_ids = session.info.pop(PENDING_RSE_INVALIDATIONS_KEY, None)
+    if rse_ids:
+        # rucio.rse imports this module in server mode
+        from rucio.rse import rsemanager
+        for rse_id in rse_ids:
+            rsemanager.invalidate_rse_cache(rse_id)
 
 
 MUTABLE_RSE_PROPERTIES = {
@@ -1676,6 +1855,7 @@ def update_rse(rse_id: str, parameters: dict[str, Any], *, session: "Session"):
     if 'rse' in param:
         add_rse_attribute(rse_id=rse_id, key=parameters['name'], value=True, session=session)
         del_rse_attribute(rse_id=rse_id, key=old_rse_name, session=session)
+    _invalidate_rse_cache(rse_id, session=session)
 
 
 @read_session
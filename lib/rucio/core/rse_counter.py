@@ -12,16 +12,18 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from typing import TYPE_CHECKING
 
+from sqlalchemy import and_, bindparam, delete, event, func, select
+from sqlalchemy.orm import Session
 from sqlalchemy.orm.exc import NoResultFound
 
 from rucio.common.exception import CounterNotFound
+from rucio.common.utils import chunks
 from rucio.db.sqla import models, filter_thread_work
 from rucio.db.sqla.session import read_session, transactional_session
 
-if TYPE_CHECKING:
-    from sqlalchemy.orm import Session
+# session.info key of the {rse_id: [files, bytes]} deltas not yet written to updated_rse_counters
+PENDING_DELTAS_KEY = 'rucio.core.rse_counter.pending_deltas'
 
 
 @transactional_session
@@ -41,13 +43,33 @@ def increase(rse_id, files, bytes_, *, session: "Session"):
     """
     Increments the specified counter by the specified amount.
 
+    The deltas of one transaction are summed up per RSE and written as
+    a single updated_rse_counters row when the transaction is committed.
+
     :param rse_id:  The id of the RSE.
     :param files:   The number of added files.
     :param bytes_:   The number of added bytes.
     :param session: The database session in use.
     """
-    models.UpdatedRSECounter(rse_id=rse_id, files=files, bytes=bytes_).\
-        save(session=session)
+    delta = session.info.setdefault(PENDING_DELTAS_KEY, {}).setdefault(rse_id, [0, 0])
+    delta[0] += files
+    delta[1] += bytes_
+
+
+@event.listens_for(Session, 'before_commit')
+def _write_pending_deltas(session):
+    """
+    Write the coalesced counter deltas of the committing transaction.
+    """
+    deltas = session.info.pop(PENDING_DELTAS_KEY, None)
+    if deltas:
+        session.add_all([models.UpdatedRSECounter(rse_id=rse_id, files=files, bytes=bytes_)
+                         for rse_id, (files, bytes_) in deltas.items() if files or bytes_])
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending_deltas(session):
+    session.info.pop(PENDING_DELTAS_KEY, None)
 
 
 @transactional_session
@@ -124,23 +146,65 @@ def update_rse_counter(rse_id, *, session: "Session"):
     :param rse_id:   The rse_id to update.
     :param session:  Database session in use.
     """
+    update_rse_counters(rse_ids=[rse_id], session=session)
 
-    updated_rse_counters = session.query(models.UpdatedRSECounter).filter_by(rse_id=rse_id).all()
-    sum_bytes = sum([updated_rse_counter.bytes for updated_rse_counter in updated_rse_counters])
-    sum_files = sum([updated_rse_counter.files for updated_rse_counter in updated_rse_counters])
 
-    try:
-        rse_counter = session.query(models.RSEUsage).filter_by(rse_id=rse_id, source='rucio').one()
-        rse_counter.used = (rse_counter.used or 0) + sum_bytes
-        rse_counter.files = (rse_counter.files or 0) + sum_files
-    except NoResultFound:
-        models.RSEUsage(rse_id=rse_id,
-                        used=sum_bytes,
-                        files=sum_files,
-                        source='rucio').save(session=session)
+@transactional_session
+def update_rse_counters(rse_ids, limit=None, *, session: "Session"):
+    """
+    Apply the updated_rse_counters of several RSEs to their rse_counters.
+
+    The deltas are summed up per RSE in the database and applied with one UPDATE
+    statement. Consumed deltas are deleted by id, so deltas committed concurrently
+    are kept for the next call.
 
-    for update in updated_rse_counters:
-        update.delete(flush=False, session=session)
+    :param rse_ids:  The rse_ids to update, at most 1000.
+    :param limit:    Maximum number of deltas to consume; the others are left for the next call.
+    :param session:  Database session in use.
+    :returns:        The number of consumed deltas.
+    """
+    stmt = select(models.UpdatedRSECounter.id).where(models.UpdatedRSECounter.rse_id.in_(rse_ids))
+    if limit:
+        stmt = stmt.limit(limit)
+    delta_ids = session.execute(stmt).scalars().all()
+
+    sums = {}
+    for chunk in chunks(delta_ids, 1000):
+        stmt = select(models.UpdatedRSECounter.rse_id,
+                      func.sum(models.UpdatedRSECounter.files),
+                      func.sum(models.UpdatedRSECounter.bytes)).\
+            where(models.UpdatedRSECounter.id.in_(chunk)).\
+            group_by(models.UpdatedRSECounter.rse_id)
+        for rse_id, sum_files, sum_bytes in session.execute(stmt):
+            files, bytes_ = sums.get(rse_id, (0, 0))
+            sums[rse_id] = (files + sum_files, bytes_ + sum_bytes)
+        stmt = delete(models.UpdatedRSECounter).\
+            where(models.UpdatedRSECounter.id.in_(chunk)).\
+            execution_options(synchronize_session=False)
+        session.execute(stmt)
+
+    if not sums:
+        return len(delta_ids)
+
+    stmt = select(models.RSEUsage.rse_id).\
+        where(and_(models.RSEUsage.rse_id.in_(list(sums)),
+                   models.RSEUsage.source == 'rucio'))
+    existing = set(session.execute(stmt).scalars())
+
+    updates = [{'b_rse_id': rse_id, 'b_files': files, 'b_bytes': bytes_}
+               for rse_id, (files, bytes_) in sums.items() if rse_id in existing]
+    if updates:
+        table = models.RSEUsage.__table__
+        stmt = table.update().\
+            where(and_(table.c.rse_id == bindparam('b_rse_id'),
+                       table.c.source == 'rucio')).\
+            values(used=func.coalesce(table.c.used, 0) + bindparam('b_bytes'),
+                   files=func.coalesce(table.c.files, 0) + bindparam('b_files'))
+        session.execute(stmt, updates)
+
+    session.add_all([models.RSEUsage(rse_id=rse_id, used=bytes_, files=files, source='rucio')
+                     for rse_id, (files, bytes_) in sums.items() if rse_id not in existing])
+    return len(delta_ids)
 
 
 @transactional_session
@@ -1922,6 +1922,8 @@ def update_rules_for_lost_replica(scope, name, rse_id, nowait=False, *, session:
         if {'name': parent['name'], 'scope': parent['scope']} not in datasets:
             datasets.append({'name': parent['name'], 'scope': parent['scope']})
 
+    if requests and request_core.request_counters_enabled():
+        request_core.count_requests_state_change(models.Request.id.in_([request.id for request in requests]), session=session)
     for request in requests:
         session.delete(request)
 
@@ -87,6 +87,7 @@ class TransferDestination:
 class ProtocolFactory:
     """
     Creates and caches protocol objects. Allowing to reuse them.
+    Protocols are taken from the process-wide cache of rsemanager, so they outlive the factory.
     """
     def __init__(self):
         self.protocols = {}
@@ -95,7 +96,7 @@ class ProtocolFactory:
         protocol_key = '%s_%s_%s' % (operation, rse_data.id, scheme)
         protocol = self.protocols.get(protocol_key)
         if not protocol:
-            protocol = rsemgr.create_protocol(rse_data.info, operation, scheme)
+            protocol = rsemgr.get_cached_protocol(rse_data.id, operation, scheme)
             self.protocols[protocol_key] = protocol
         return protocol
 
@@ -422,10 +423,12 @@ def set_transfers_state(
 
     logger(logging.INFO, 'Setting state(%s), transfertool(%s), external_host(%s) and eid(%s) for transfers: %s',
            state.name, transfertool, external_host, external_id, ', '.join(t.rws.request_id for t in transfers))
+    counters_enabled = request_core.request_counters_enabled()
     try:
         for transfer in transfers:
             rws = transfer.rws
             logger(logging.DEBUG, 'COPYING REQUEST %s DID %s:%s USING %s with state(%s) with eid(%s)' % (rws.request_id, rws.scope, rws.name, external_host, state, external_id))
+            counted_request = request_core.get_counted_request(rws.request_id, session=session) if counters_enabled else None
             stmt = update(
                 models.Request
             ).where(
@@ -447,6 +450,7 @@ def set_transfers_state(
 
             if rowcount == 0:
                 raise RucioException("%s: failed to set transfer state: request doesn't exist or is not in SUBMITTING state" % rws)
+            request_core.count_request_state_change(counted_request, state, transfer.src.rse.id, session=session)
 
             stmt = select(
                 models.DataIdentifier.datatype
@@ -24,9 +24,10 @@ from typing import TYPE_CHECKING
 
 import rucio.db.sqla.util
 from rucio.common import exception
+from rucio.common.config import config_get_int
 from rucio.common.logging import setup_logging
-from rucio.common.utils import get_thread_with_periodic_running_function
-from rucio.core.account_counter import get_updated_account_counters, update_account_counter, fill_account_counter_history_table
+from rucio.common.utils import chunks, get_thread_with_periodic_running_function
+from rucio.core.account_counter import get_updated_account_counters, update_account_counters, fill_account_counter_history_table
 from rucio.daemons.common import run_daemon
 
 if TYPE_CHECKING:
@@ -64,13 +65,22 @@ def run_once(heartbeat_handler, **_kwargs):
         logger(logging.INFO, 'did not get any work')
         return
 
-    for account_rse_id in account_rse_ids:
-        worker_number, total_workers, logger = heartbeat_handler.live()
+    # Apply the deltas of many account-rse counters per transaction, in transactions of bounded size
+    # both sizes are at least 1, otherwise no delta could ever be applied
+    counters_per_transaction = max(1, config_get_int('abacus', 'counters_per_transaction', raise_exception=False, default=100))
+    deltas_per_transaction = max(1, config_get_int('abacus', 'deltas_per_transaction', raise_exception=False, default=10000))
+    for chunk in chunks([tuple(account_rse_id) for account_rse_id in account_rse_ids], min(counters_per_transaction, 1000)):
+        start_time = time.time()
+        nb_deltas = 0
+        while not graceful_stop.is_set():
+            worker_number, total_workers, logger = heartbeat_handler.live()
+            applied = update_account_counters(account_rse_ids=chunk, limit=deltas_per_transaction)
+            nb_deltas += applied
+            if applied < deltas_per_transaction:
+                break
+        logger(logging.DEBUG, 'update of %d account-rse counters with %d deltas took %f' % (len(chunk), nb_deltas, time.time() - start_time))
         if graceful_stop.is_set():
             break
-        start_time = time.time()
-        update_account_counter(account=account_rse_id[0], rse_id=account_rse_id[1])
-        logger(logging.DEBUG, 'update of account-rse counter "%s-%s" took %f' % (account_rse_id[0], account_rse_id[1], time.time() - start_time))
 
 
 def stop(signum: "Optional[int]" = None, frame: "Optional[FrameType]" = None) -> None:
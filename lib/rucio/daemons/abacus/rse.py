@@ -24,9 +24,10 @@ from typing import TYPE_CHECKING
 
 import rucio.db.sqla.util
 from rucio.common import exception
+from rucio.common.config import config_get_int
 from rucio.common.logging import setup_logging
-from rucio.common.utils import get_thread_with_periodic_running_function
-from rucio.core.rse_counter import get_updated_rse_counters, update_rse_counter, fill_rse_counter_history_table
+from rucio.common.utils import chunks, get_thread_with_periodic_running_function
+from rucio.core.rse_counter import get_updated_rse_counters, update_rse_counters, fill_rse_counter_history_table
 from rucio.daemons.common import run_daemon
 
 if TYPE_CHECKING:
@@ -65,13 +66,22 @@ def run_once(heartbeat_handler, **_kwargs):
         logger(logging.INFO, 'did not get any work')
         return
 
-    for rse_id in rse_ids:
-        worker_number, total_workers, logger = heartbeat_handler.live()
+    # Apply the deltas of many RSEs per transaction, in transactions of bounded size
+    # both sizes are at least 1, otherwise no delta could ever be applied
+    rses_per_transaction = max(1, config_get_int('abacus', 'counters_per_transaction', raise_exception=False, default=100))
+    deltas_per_transaction = max(1, config_get_int('abacus', 'deltas_per_transaction', raise_exception=False, default=10000))
+    for chunk in chunks(rse_ids, min(rses_per_transaction, 1000)):
+        start_time = time.time()
+        nb_deltas = 0
+        while not graceful_stop.is_set():
+            worker_number, total_workers, logger = heartbeat_handler.live()
+            applied = update_rse_counters(rse_ids=chunk, limit=deltas_per_transaction)
+            nb_deltas += applied
+            if applied < deltas_per_transaction:
+                break
+        logger(logging.DEBUG, 'update of %d rses with %d deltas took %f' % (len(chunk), nb_deltas, time.time() - start_time))
         if graceful_stop.is_set():
             break
-        start_time = time.time()
-        update_rse_counter(rse_id=rse_id)
-        logger(logging.DEBUG, 'update of rse "%s" took %f' % (rse_id, time.time() - start_time))
 
 
 def stop(signum: "Optional[int]" = None, frame: "Optional[FrameType]" = None) -> None:
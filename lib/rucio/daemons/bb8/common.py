@@ -14,6 +14,8 @@
 # limitations under the License.
 
 import logging
+import time
+from array import array
 from datetime import datetime, date, timedelta
 from string import Template
 
@@ -28,13 +30,16 @@ from rucio.common.exception import (
     RuleNotFound,
     DuplicateRule,
     InsufficientAccountLimit,
+    InvalidRuleWeight,
 )
 from rucio.common.types import InternalAccount, InternalScope
+from rucio.common.utils import chunks
 from rucio.core.lock import get_dataset_locks
-from rucio.core.rse import list_rse_attributes, get_rse_name, get_rse_vo
+from rucio.core.rse import get_rse_name, get_rse_vo
 from rucio.core.rse_expression_parser import parse_expression
 from lib.rucio.core.rse_selector import RSESelector
 from rucio.core.rule import get_rule, add_rule, update_rule
+from rucio.core.weighted_rse_selector import WeightedSelector
 from rucio.db.sqla import models
 from rucio.db.sqla.constants import DIDType, RuleState, RuleGrouping, LockState
 from rucio.db.sqla.session import transactional_session, read_session
@@ -478,30 +483,25 @@ def list_rebalance_rule_candidates(rse_id, mode=None, *, session=None):
 
 
 @read_session
-def select_target_rse(
+def _resolve_target_rses(
     parent_rule,
     current_rse_id,
     rse_expression,
-    subscription_id,
-    rse_attributes,
-    other_rses=[],
     exclude_expression=None,
     force_expression=None,
     *,
     session=None,
 ):
     """
-    Select a new target RSE for a rebalanced rule.
+    Resolve the candidate target RSEs for a rebalanced rule.
     :param parent_rule           rule that is rebalanced.
     :param current_rse_id:       RSE of the source.
     :param rse_expression:       RSE Expression of the source rule.
-    :param subscription_id:      Subscription ID of the source rule.
-    :param rse_attributes:       The attributes of the source rse.
-    :param other_rses:           Other RSEs with existing dataset replicas.
     :param exclude_expression:   Exclude this rse_expression from being target_rses.
     :param force_expression:     Force a specific rse_expression as target.
     :param session:              The DB Session.
-    :returns:                    New RSE expression.
+    :returns:                    List of RSE dictionaries {'rse_id':, 'weight':, ...} of the RSE selector.
+    :raises:                     InsufficientTargetRSEs, InsufficientAccountLimit, InvalidRuleWeight
     """
 
     current_rse = get_rse_name(rse_id=current_rse_id)
@@ -564,17 +564,385 @@ def select_target_rse(
         ignore_account_limit=True,
         session=session,
     )
+    return rseselector.rses
+
+
+@read_session
+def select_target_rse(
+    parent_rule,
+    current_rse_id,
+    rse_expression,
+    subscription_id,
+    rse_attributes,
+    other_rses=[],
+    exclude_expression=None,
+    force_expression=None,
+    *,
+    session=None,
+):
+    """
+    Select a new target RSE for a rebalanced rule.
+    :param parent_rule           rule that is rebalanced.
+    :param current_rse_id:       RSE of the source.
+    :param rse_expression:       RSE Expression of the source rule.
+    :param subscription_id:      Subscription ID of the source rule.
+    :param rse_attributes:       The attributes of the source rse.
+    :param other_rses:           Other RSEs with existing dataset replicas.
+    :param exclude_expression:   Exclude this rse_expression from being target_rses.
+    :param force_expression:     Force a specific rse_expression as target.
+    :param session:              The DB Session.
+    :returns:                    New RSE expression.
+    """
+
+    rses = _resolve_target_rses(
+        parent_rule=parent_rule,
+        current_rse_id=current_rse_id,
+        rse_expression=rse_expression,
+        exclude_expression=exclude_expression,
+        force_expression=force_expression,
+        session=session,
+    )
+    selector = WeightedSelector()
     return get_rse_name(
         [
             rse_id
-            for rse_id, _, _ in rseselector.select_rse(
-                size=0, preferred_rse_ids=[], blocklist=other_rses
+            for rse_id, _, _ in selector.select_rse(
+                rses, 1, size=0, preferred_rse_ids=[], blocklist=other_rses
             )
         ][0],
         session=session,
     )
 
 
+@read_session
+def _get_rules_bulk(rule_ids, *, session=None):
+    """
+    Get the replication rules of a list of rule ids.
+    :param rule_ids:   List of rule ids.
+    :param session:    The DB Session.
+    :returns:          Dictionary {rule_id: rule dictionary}.
+    """
+    rules = {}
+    for chunk in chunks(list(set(rule_ids)), 100):
+        query = session.query(models.ReplicationRule).filter(
+            models.ReplicationRule.id.in_(chunk)
+        )
+        for rule in query:
+            rules[rule.id] = rule.to_dict()
+    return rules
+
+
+@read_session
+def _get_dataset_lock_rses_bulk(dids, *, session=None):
+    """
+    Get the RSEs holding a dataset lock for a list of DIDs.
+    :param dids:       List of (scope, name) tuples.
+    :param session:    The DB Session.
+    :returns:          Dictionary {(scope, name): [rse_id, ...]}.
+    """
+    lock_rses = {did: [] for did in dids}
+    for chunk in chunks(list(lock_rses), 100):
+        query = session.query(
+            models.DatasetLock.scope,
+            models.DatasetLock.name,
+            models.DatasetLock.rse_id,
+        ).filter(
+            or_(
+                *[
+                    and_(
+                        models.DatasetLock.scope == scope,
+                        models.DatasetLock.name == name,
+                    )
+                    for scope, name in chunk
+                ]
+            )
+        )
+        for scope, name, rse_id in query:
+            lock_rses[(scope, name)].append(rse_id)
+    return lock_rses
+
+
+@read_session
+def _get_rse_capacities(rse_ids, *, session=None):
+    """
+    Get the space that can still be filled on a list of RSEs, i.e. the free space
+    reported by the storage minus the space to keep free.
+    :param rse_ids:    List of RSE ids.
+    :param session:    The DB Session.
+    :returns:          Dictionary {rse_id: bytes}. RSEs without storage usage are unlimited.
+    """
+    capacities = {rse_id: float("inf") for rse_id in rse_ids}
+    min_free_space = {}
+    for chunk in chunks(list(capacities), 100):
+        query = session.query(
+            models.RSEUsage.rse_id,
+            models.RSEUsage.source,
+            models.RSEUsage.used,
+            models.RSEUsage.free,
+        ).filter(
+            models.RSEUsage.rse_id.in_(chunk),
+            models.RSEUsage.source.in_(["storage", "min_free_space"]),
+        )
+        for rse_id, source, used, free in query:
+            if source == "storage" and free is not None:
+                capacities[rse_id] = free
+            elif source == "min_free_space" and used is not None:
+                min_free_space[rse_id] = used
+    for rse_id, used in min_free_space.items():
+        if capacities[rse_id] != float("inf"):
+            capacities[rse_id] = max(capacities[rse_id] - used, 0)
+    return capacities
+
+
+@read_session
+def plan_rebalance(
+    rse_id,
+    max_bytes=1e9,
+    max_files=None,
+    exclude_expression=None,
+    force_expression=None,
+    mode=None,
+    *,
+    session=None,
+    logger=logging.log,
+):
+    """
+    Plan the rebalancing of data from an RSE.
+
+    The candidate rules, their dataset locks and the space left on the target RSEs are
+    loaded once. The target RSEs of the distinct rule expressions are resolved once, and
+    the candidates are then assigned in order to the target with the highest weight, scaled
+    by the fraction of its capacity not yet filled by the plan.
+    :param rse_id:                     RSE to rebalance data from.
+    :param max_bytes:                  Maximum amount of bytes to rebalance.
+    :param max_files:                  Maximum amount of files to rebalance.
+    :param exclude_expression:         Exclude this rse_expression from being target_rses.
+    :param force_expression:           Force a specific rse_expression as target.
+    :param mode:                       BB8 mode to execute (None=normal, 'decomission'=Decomission mode)
+    :param session:                    The database session.
+    :param logger:                     Logger.
+    :returns:                          List of planned moves {'rule':, 'scope':, 'name':, 'bytes':, 'length':, 'target_rse':}.
+    """
+    candidates = [
+        candidate
+        for candidate in list_rebalance_rule_candidates(
+            rse_id=rse_id, mode=mode, session=session
+        )
+        if force_expression is None or candidate[4] is None
+    ]
+    if not candidates:
+        return []
+
+    rules = _get_rules_bulk([candidate[2] for candidate in candidates], session=session)
+    lock_rses = _get_dataset_lock_rses_bulk(
+        [(candidate[0], candidate[1]) for candidate in candidates], session=session
+    )
+
+    # Resolve the target RSEs once per distinct expression
+    targets = {}
+    rse_index = {}
+    weights = array("d")
+    for _, _, rule_id, rse_expression, _, _, _, _ in candidates:
+        rule = rules.get(rule_id)
+        if rule is None:
+            continue
+        key = (rule["scope"].vo, rse_expression, rule["grouping"] == RuleGrouping.NONE)
+        if key in targets:
+            continue
+        try:
+            rses = _resolve_target_rses(
+                parent_rule=rule,
+                current_rse_id=rse_id,
+                rse_expression=rse_expression,
+                exclude_expression=exclude_expression,
+                force_expression=force_expression,
+                session=session,
+            )
+        except (
+            InsufficientTargetRSEs,
+            InsufficientAccountLimit,
+            InvalidRuleWeight,
+        ) as err:
+            targets[key] = err
+            continue
+        indices = []
+        for rse in rses:
+            if rse["rse_id"] not in rse_index:
+                rse_index[rse["rse_id"]] = len(weights)
+                weights.append(rse["weight"])
+            indices.append(rse_index[rse["rse_id"]])
+        targets[key] = indices
+
+    rse_ids = list(rse_index)
+    capacities = _get_rse_capacities(rse_ids, session=session)
+    capacity = array("d", [capacities[target_rse_id] for target_rse_id in rse_ids])
+    remaining = array("d", capacity)
+
+    planned_bytes = 0
+    planned_files = 0
+    plan = []
+    for scope, name, rule_id, rse_expression, _, bytes_, length, _ in candidates:
+        if planned_bytes + bytes_ > max_bytes:
+            continue
+        if max_files:
+            if planned_files + length > max_files:
+                continue
+
+        rule = rules.get(rule_id)
+        if rule is None:
+            logger(logging.ERROR, "No rule with the id %s found" % rule_id)
+            continue
+        indices = targets[(rule["scope"].vo, rse_expression, rule["grouping"] == RuleGrouping.NONE)]
+        if isinstance(indices, Exception):
+            logger(logging.ERROR, str(indices))
+            continue
+
+        blocklist = lock_rses[(scope, name)]
+        best_idx, best_score = None, None
+        for idx in indices:
+            if remaining[idx] < bytes_ or rse_ids[idx] in blocklist:
+                continue
+            score = weights[idx]
+            if 0 < capacity[idx] < float("inf"):
+                score *= remaining[idx] / capacity[idx]
+            if best_score is None or score > best_score:
+                best_idx, best_score = idx, score
+        if best_idx is None:
+            logger(
+                logging.ERROR,
+                "There are not enough target RSEs with enough space to rebalance rule %s",
+                str(rule_id),
+            )
+            continue
+
+        remaining[best_idx] -= bytes_
+        planned_bytes += bytes_
+        planned_files += length
+        plan.append(
+            {
+                "rule": rule,
+                "scope": scope,
+                "name": name,
+                "bytes": bytes_,
+                "length": length,
+                "target_rse": get_rse_name(rse_id=rse_ids[best_idx], session=session),
+            }
+        )
+    return plan
+
+
+@transactional_session
+def _apply_rebalance_batch(
+    moves,
+    priority,
+    source_replica_expression,
+    comment,
+    *,
+    session=None,
+):
+    """
+    Rebalance the rules of a batch of planned moves in one transaction.
+    :returns:    List of the new child rule ids.
+    """
+    return [
+        rebalance_rule(
+            parent_rule=move["rule"],
+            activity="Data Rebalancing",
+            rse_expression=move["target_rse"],
+            priority=priority,
+            source_replica_expression=source_replica_expression,
+            comment=comment,
+            session=session,
+        )
+        for move in moves
+    ]
+
+
+def apply_rebalance_plan(
+    plan,
+    priority=3,
+    source_replica_expression="*\\bb8-enabled=false",
+    comment=None,
+    batch_size=None,
+    logger=logging.log,
+):
+    """
+    Create the rules of a rebalancing plan.
+
+    The moves are applied in batches, each in its own transaction. If a batch fails, its
+    moves are applied one by one, so that a failing rule does not block the others.
+    :param plan:                       List of planned moves, as returned by plan_rebalance.
+    :param priority:                   Priority of the new created rules.
+    :param source_replica_expression:  Source replica expression of the new created rules.
+    :param comment:                    Comment to set on the new rules.
+    :param batch_size:                 Number of moves per transaction.
+    :param logger:                     Logger.
+    :returns:                          List of (move, child_rule_id) tuples of the applied moves.
+    """
+    if batch_size is None:
+        batch_size = config_get_int(
+            "bb8", "apply_batch_size", raise_exception=False, default=20
+        )
+
+    applied = []
+    for batch in chunks(plan, batch_size):
+        try:
+            child_rule_ids = _apply_rebalance_batch(
+                batch, priority, source_replica_expression, comment
+            )
+            results = list(zip(batch, child_rule_ids))
+        except Exception as error:
+            logger(
+                logging.DEBUG,
+                "Failed to apply %d moves at once, applying them one by one: %s",
+                len(batch),
+                str(error),
+            )
+            results = []
+            for move in batch:
+                try:
+                    child_rule_id = rebalance_rule(
+                        parent_rule=move["rule"],
+                        activity="Data Rebalancing",
+                        rse_expression=move["target_rse"],
+                        priority=priority,
+                        source_replica_expression=source_replica_expression,
+                        comment=comment,
+                    )
+                except (
+                    DuplicateRule,
+                    RuleNotFound,
+                    InsufficientAccountLimit,
+                    InsufficientTargetRSEs,
+                ) as err:
+                    logger(logging.ERROR, str(err))
+                    continue
+                except Exception as err:
+                    logger(
+                        logging.ERROR,
+                        "Exception %s occured while rebalancing %s:%s, rule_id: %s!",
+                        str(err),
+                        move["scope"],
+                        move["name"],
+                        str(move["rule"]["id"]),
+                    )
+                    continue
+                results.append((move, child_rule_id))
+
+        for move, child_rule_id in results:
+            if child_rule_id is None:
+                logger(
+                    logging.WARNING,
+                    "A rule for %s:%s already exists on %s. It cannot be rebalanced",
+                    move["scope"],
+                    move["name"],
+                    move["target_rse"],
+                )
+                continue
+            applied.append((move, child_rule_id))
+    return applied
+
+
 @transactional_session
 def rebalance_rse(
     rse_id,
@@ -607,11 +975,6 @@ def rebalance_rse(
     :param logger:                     Logger.
     :returns:                          List of rebalanced datasets.
     """
-    rebalanced_bytes = 0
-    rebalanced_files = 0
-    rebalanced_datasets = []
-
-    rse_attributes = list_rse_attributes(rse_id=rse_id, session=session)
     src_rse = get_rse_name(rse_id=rse_id)
 
     logger(logging.INFO, "***************************")
@@ -620,97 +983,65 @@ def rebalance_rse(
     logger(logging.INFO, "Dry Run: %s" % (dry_run))
     logger(logging.INFO, "***************************")
 
-    for (
-        scope,
-        name,
-        rule_id,
-        rse_expression,
-        subscription_id,
-        bytes_,
-        length,
-        fsize,
-    ) in list_rebalance_rule_candidates(rse_id=rse_id, mode=mode):
-        if force_expression is not None and subscription_id is not None:
-            continue
+    start_time = time.time()
+    plan = plan_rebalance(
+        rse_id=rse_id,
+        max_bytes=max_bytes,
+        max_files=max_files,
+        exclude_expression=exclude_expression,
+        force_expression=force_expression,
+        mode=mode,
+        session=session,
+        logger=logger,
+    )
+    duration = time.time() - start_time
+    logger(
+        logging.INFO,
+        "Planned %d rules (%f GB) from %s in %.3f seconds (%.1f rules/s)",
+        len(plan),
+        sum(move["bytes"] for move in plan) / 1e9,
+        src_rse,
+        duration,
+        len(plan) / duration if duration > 0 else 0,
+    )
 
-        if rebalanced_bytes + bytes_ > max_bytes:
-            continue
-        if max_files:
-            if rebalanced_files + length > max_files:
-                continue
+    if dry_run:
+        applied = [(move, "") for move in plan]
+    else:
+        applied = apply_rebalance_plan(
+            plan,
+            priority=priority,
+            source_replica_expression=source_replica_expression,
+            comment=comment,
+            logger=logger,
+        )
 
-        try:
-            rule = get_rule(rule_id=rule_id)
-            other_rses = [
-                r["rse_id"] for r in get_dataset_locks(scope, name, session=session)
-            ]
-            # Select the target RSE for this rule
-            try:
-                target_rse_exp = select_target_rse(
-                    parent_rule=rule,
-                    current_rse_id=rse_id,
-                    rse_expression=rse_expression,
-                    subscription_id=subscription_id,
-                    rse_attributes=rse_attributes,
-                    other_rses=other_rses,
-                    exclude_expression=exclude_expression,
-                    force_expression=force_expression,
-                    session=session,
-                )
-                # Rebalance this rule
-                if not dry_run:
-                    child_rule_id = rebalance_rule(
-                        parent_rule=rule,
-                        activity="Data Rebalancing",
-                        rse_expression=target_rse_exp,
-                        priority=priority,
-                        source_replica_expression=source_replica_expression,
-                        comment=comment,
-                    )
-                else:
-                    child_rule_id = ""
-            except (
-                InsufficientTargetRSEs,
-                DuplicateRule,
-                RuleNotFound,
-                InsufficientAccountLimit,
-            ) as err:
-                logger(logging.ERROR, str(err))
-                continue
-            if child_rule_id is None:
-                logger(
-                    logging.WARNING,
-                    "A rule for %s:%s already exists on %s. It cannot be rebalanced",
-                    scope,
-                    name,
-                    target_rse_exp,
-                )
-                continue
-            logger(
-                logging.INFO,
-                "Rebalancing %s:%s rule %s (%f GB) from %s to %s. New rule %s",
-                scope,
-                name,
-                str(rule_id),
-                bytes_ / 1e9,
-                rule["rse_expression"],
-                target_rse_exp,
+    rebalanced_bytes = 0
+    rebalanced_datasets = []
+    for move, child_rule_id in applied:
+        logger(
+            logging.INFO,
+            "Rebalancing %s:%s rule %s (%f GB) from %s to %s. New rule %s",
+            move["scope"],
+            move["name"],
+            str(move["rule"]["id"]),
+            move["bytes"] / 1e9,
+            move["rule"]["rse_expression"],
+            move["target_rse"],
+            child_rule_id,
+        )
+        rebalanced_bytes += move["bytes"]
+        rebalanced_datasets.append(
+            (
+                move["scope"],
+                move["name"],
+                move["bytes"],
+                move["length"],
+                move["target_rse"],
+                move["rule"]["id"],
                 child_rule_id,
             )
-            rebalanced_bytes += bytes_
-            rebalanced_files += length
-            rebalanced_datasets.append(
-                (scope, name, bytes_, length, target_rse_exp, rule_id, child_rule_id)
-            )
-        except Exception as error:
-            logger(
-                logging.ERROR,
-                "Exception %s occured while rebalancing %s:%s, rule_id: %s!",
-                str(error),
-                scope,
-                name,
-                str(rule_id),
-            )
+        )
 
     logger(
         logging.INFO,
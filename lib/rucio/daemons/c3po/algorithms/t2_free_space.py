@@ -16,14 +16,11 @@
 import logging
 from operator import itemgetter
 
-from rucio.common.config import config_get, config_get_int
-from rucio.common.exception import DataIdentifierNotFound
-from rucio.core.did import get_did
-from rucio.core.replica import list_dataset_replicas
 from rucio.core.rse import list_rse_attributes, get_rse_name
 from rucio.core.rse_expression_parser import parse_expression
 from rucio.daemons.c3po.collectors.free_space import FreeSpaceCollector
 from rucio.daemons.c3po.utils.dataset_cache import DatasetCache
+from rucio.daemons.c3po.utils.placement import BatchCache, FreeSpaceSnapshot, get_dataset_replicas, get_dids_metadata
 from rucio.daemons.c3po.utils.popularity import get_popularity
 from rucio.db.sqla.constants import ReplicaState
 
@@ -34,7 +31,7 @@ class PlacementAlgorithm:
     """
     def __init__(self):
         self._fsc = FreeSpaceCollector()
-        self._dc = DatasetCache(config_get('c3po', 'redis_host'), config_get_int('c3po', 'redis_port'), timeout=86400)
+        self._dc = DatasetCache(timeout=86400)
 
         rse_expr = "tier=2&type=DATADISK"
         rse_attrs = parse_expression(rse_expr)
@@ -56,25 +53,40 @@ class PlacementAlgorithm:
                 self._penalties[rse_id] = penalty - 1
 
     def place(self, did):
+        return self.place_batch([did])[0]
+
+    def place_batch(self, dids):
+        """
+        Decide the placement of a window of DIDs against one snapshot of the free space of the RSEs.
+        The bytes of every placed DID are deducted from the free space of its destination
+        before the next DID is evaluated.
+
+        :param dids: List of (scope, name) DIDs.
+        :returns:    The list of decisions, in the order of the DIDs.
+        """
+        snapshot = FreeSpaceSnapshot(self._rses, self._fsc.get_rse_space())
+        candidates = [did for did in dids if did[0].external.startswith('data') or did[0].external.startswith('mc')]
+        metadata = get_dids_metadata(candidates)
+        replicas = get_dataset_replicas(candidates)
+        cache = BatchCache()
+        return [self.__place(did, metadata.get((did[0], did[1])), replicas.get((did[0], did[1]), []), snapshot, cache) for did in dids]
+
+    def __place(self, did, meta, reps, snapshot, cache):
         self.__update_penalties()
         decision = {'did': '{}:{}'.format(did[0].internal, did[1])}
         if (not did[0].external.startswith('data')) and (not did[0].external.startswith('mc')):
             decision['error_reason'] = 'not a data or mc dataset'
             return decision
 
-        try:
-            meta = get_did(did[0], did[1])
-        except DataIdentifierNotFound:
+        if meta is None:
             decision['error_reason'] = 'did does not exist'
             return decision
-        if meta['length'] is None:
-            meta['length'] = 0
-        if meta['bytes'] is None:
-            meta['bytes'] = 0
-        logging.debug('got %s:%s, num_files: %d, bytes: %d' % (did[0], did[1], meta['length'], meta['bytes']))
+        length = meta['length'] or 0
+        nbytes = meta['bytes'] or 0
+        logging.debug('got %s:%s, num_files: %d, bytes: %d' % (did[0], did[1], length, nbytes))
 
-        decision['length'] = meta['length']
-        decision['bytes'] = meta['bytes']
+        decision['length'] = length
+        decision['bytes'] = nbytes
 
         last_accesses = self._dc.get_did(did)
         self._dc.add_did(did)
@@ -88,19 +100,15 @@ class PlacementAlgorithm:
             decision['error_reason'] = 'did not popular enough'
             return decision
 
-        free_rses = self._rses
         available_reps = []
-        reps = list_dataset_replicas(did[0], did[1])
         num_reps = 0
         for rep in reps:
-            rse_attr = list_rse_attributes(rep['rse_id'])
+            rse_attr = cache.get(list_rse_attributes, rep['rse_id'])
             if 'type' not in rse_attr:
                 continue
             if rse_attr['type'] != 'DATADISK':
                 continue
             if rep['state'] == ReplicaState.AVAILABLE:
-                if rep['rse_id'] in free_rses:
-                    free_rses.remove(rep['rse_id'])
                 available_reps.append(rep['rse_id'])
                 num_reps += 1
 
@@ -110,16 +118,18 @@ class PlacementAlgorithm:
             decision['error_reason'] = 'more than 4 replicas already exist'
             return decision
 
-        rse_ratios = {}
-        space_info = self._fsc.get_rse_space()
-        for rse_id in free_rses:
-            rse_space = space_info[rse_id]
-            penalty = self._penalties[rse_id]
-            rse_ratios[rse_id] = float(rse_space['free']) / float(rse_space['total']) * 100.0 / penalty
+        # Score all the RSEs without a replica at once
+        ratios = [ratio / self._penalties[rse_id] for rse_id, ratio in zip(snapshot.rse_ids, snapshot.free_ratios())]
+        rse_ratios = [(rse_id, ratio) for rse_id, ratio in zip(snapshot.rse_ids, ratios) if rse_id not in available_reps]
+        if not rse_ratios:
+            decision['error_reason'] = 'found no suitable rse for replication'
+            return decision
 
-        sorted_rses = sorted(rse_ratios.items(), key=itemgetter(1), reverse=True)
-        decision['destination_rse'] = get_rse_name(rse_id=sorted_rses[0][0])
+        sorted_rses = sorted(rse_ratios, key=itemgetter(1), reverse=True)
+        destination_rse = sorted_rses[0][0]
+        decision['destination_rse'] = cache.get(get_rse_name, destination_rse)
         decision['rse_ratios'] = sorted_rses
-        self._penalties[sorted_rses[0][0]] = 10.0
+        self._penalties[destination_rse] = 10.0
+        snapshot.plan(destination_rse, nbytes)
 
         return decision
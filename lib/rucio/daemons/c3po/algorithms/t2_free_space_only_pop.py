@@ -16,14 +16,13 @@
 import logging
 from operator import itemgetter
 
-from rucio.common.config import config_get, config_get_int
 from rucio.common.exception import DataIdentifierNotFound
 from rucio.core.did import get_did
 from rucio.core.replica import list_dataset_replicas
 from rucio.core.rse import list_rse_attributes, get_rse_name
 from rucio.core.rse_expression_parser import parse_expression
 from rucio.daemons.c3po.collectors.free_space import FreeSpaceCollector
-from rucio.daemons.c3po.utils.expiring_dataset_cache import ExpiringDatasetCache
+from rucio.daemons.c3po.utils.expiring_dataset_cache import get_expiring_dataset_cache
 from rucio.daemons.c3po.utils.popularity import get_popularity
 from rucio.db.sqla.constants import ReplicaState
 
@@ -34,7 +33,7 @@ class PlacementAlgorithm:
     """
     def __init__(self):
         self._fsc = FreeSpaceCollector()
-        self._added_cache = ExpiringDatasetCache(config_get('c3po', 'redis_host'), config_get_int('c3po', 'redis_port'), timeout=86400)
+        self._added_cache = get_expiring_dataset_cache(timeout=86400)
 
         rse_expr = "tier=2&type=DATADISK"
         rse_attrs = parse_expression(rse_expr)
@@ -16,18 +16,17 @@
 import logging
 from operator import itemgetter
 
-from rucio.common.config import config_get, config_get_int
 from rucio.common.exception import DataIdentifierNotFound
 from rucio.core.did import get_did
-from rucio.core.replica import list_dataset_replicas
 from rucio.core.rse import list_rse_attributes, get_rse, get_rse_name
 from rucio.core.rse_expression_parser import parse_expression
 from rucio.daemons.c3po.collectors.free_space import FreeSpaceCollector
 from rucio.daemons.c3po.collectors.network_metrics import NetworkMetricsCollector
 from rucio.daemons.c3po.utils.dataset_cache import DatasetCache
-from rucio.daemons.c3po.utils.expiring_dataset_cache import ExpiringDatasetCache
+from rucio.daemons.c3po.utils.expiring_dataset_cache import get_expiring_dataset_cache
+from rucio.daemons.c3po.utils.placement import BatchCache, FreeSpaceSnapshot, argmax, get_dataset_replicas, get_dids_metadata
 from rucio.daemons.c3po.utils.popularity import get_popularity
-from rucio.daemons.c3po.utils.timeseries import RedisTimeSeries
+from rucio.daemons.c3po.utils.timeseries import get_time_series
 from rucio.db.sqla.constants import ReplicaState
 
 
@@ -38,10 +37,10 @@ class PlacementAlgorithm:
     def __init__(self, datatypes, dest_rse_expr, max_bytes_hour, max_files_hour, max_bytes_hour_rse, max_files_hour_rse, min_popularity, min_recent_requests, max_replicas):
         self._fsc = FreeSpaceCollector()
         self._nmc = NetworkMetricsCollector()
-        self._added_cache = ExpiringDatasetCache(config_get('c3po', 'redis_host'), config_get_int('c3po', 'redis_port'), timeout=86400)
-        self._dc = DatasetCache(config_get('c3po', 'redis_host'), config_get_int('c3po', 'redis_port'), timeout=86400)
-        self._added_bytes = RedisTimeSeries(config_get('c3po', 'redis_host'), config_get_int('c3po', 'redis_port'), window=3600, prefix="added_bytes_")
-        self._added_files = RedisTimeSeries(config_get('c3po', 'redis_host'), config_get_int('c3po', 'redis_port'), window=3600, prefix="added_files_")
+        self._added_cache = get_expiring_dataset_cache(timeout=86400)
+        self._dc = DatasetCache(timeout=86400)
+        self._added_bytes = get_time_series(window=3600, prefix="added_bytes_")
+        self._added_files = get_time_series(window=3600, prefix="added_files_")
 
         self._datatypes = datatypes.split(',')
         self._dest_rse_expr = dest_rse_expr
@@ -86,7 +85,13 @@ class PlacementAlgorithm:
             if penalty < 100.0:
                 self._src_penalties[rse_id] += 10.0
 
-    def check_did(self, did):
+    def check_did(self, did, meta=None):
+        """
+        Check if a DID is a candidate for a new replica.
+
+        :param did:  The (scope, name) DID.
+        :param meta: The metadata of the DID if already known, fetched otherwise.
+        """
         decision = {'did': '{}:{}'.format(did[0].internal, did[1])}
         if (self._added_cache.check_dataset(decision['did'])):
             decision['error_reason'] = 'already added replica for this did in the last 24h'
@@ -102,11 +107,12 @@ class PlacementAlgorithm:
             decision['error_reason'] = 'wrong datatype'
             return decision
 
-        try:
-            meta = get_did(did[0], did[1])
-        except DataIdentifierNotFound:
-            decision['error_reason'] = 'did does not exist'
-            return decision
+        if meta is None:
+            try:
+                meta = get_did(did[0], did[1])
+            except DataIdentifierNotFound:
+                decision['error_reason'] = 'did does not exist'
+                return decision
         if meta['length'] is None:
             meta['length'] = 0
         if meta['bytes'] is None:
@@ -148,29 +154,51 @@ class PlacementAlgorithm:
         return decision
 
     def place(self, did):
+        return self.place_batch([did])[0]
+
+    def place_batch(self, dids):
+        """
+        Decide the placement of a window of DIDs against one snapshot of the free space of the RSEs
+        and of the network metrics. The bytes of every placed DID are deducted from the free space
+        of its destination before the next DID is evaluated.
+
+        :param dids: List of (scope, name) DIDs.
+        :returns:    The list of decisions, in the order of the DIDs.
+        """
+        snapshot = FreeSpaceSnapshot(self._rses, self._fsc.get_rse_space())
+        metadata = get_dids_metadata(dids)
+        replicas = get_dataset_replicas(dids)
+        cache = BatchCache()
+        decisions = []
+        for did in dids:
+            meta = metadata.get((did[0], did[1]))
+            if meta is None:
+                decisions.append({'did': '{}:{}'.format(did[0].internal, did[1]), 'error_reason': 'did does not exist'})
+                continue
+            decisions.append(self.__place(did, meta, replicas.get((did[0], did[1]), []), snapshot, cache))
+        return decisions
+
+    def __place(self, did, meta, reps, snapshot, cache):
         self.__update_penalties()
         self._added_bytes.trim()
         self._added_files.trim()
 
-        decision = self.check_did(did)
+        decision = self.check_did(did, meta=meta)
 
         if 'error_reason' in decision:
             return decision
 
-        meta = get_did(did[0], did[1])
         available_reps = {}
-        reps = list_dataset_replicas(did[0], did[1])
         num_reps = 0
-        space_info = self._fsc.get_rse_space()
         max_mbps = 0.0
         for rep in reps:
-            rse_attr = list_rse_attributes(rep['rse_id'])
+            rse_attr = cache.get(list_rse_attributes, rep['rse_id'])
             src_rse_id = rep['rse_id']
             if 'site' not in rse_attr:
                 continue
 
             src_site = rse_attr['site']
-            src_rse_info = get_rse(rse_id=src_rse_id)
+            src_rse_info = cache.get(get_rse, src_rse_id)
 
             if 'type' not in rse_attr:
                 continue
@@ -186,10 +214,10 @@ class PlacementAlgorithm:
                 net_metrics_type = None
                 for metric_type in ('fts', 'fax', 'perfsonar', 'dashb'):
                     net_metrics_type = metric_type
-                    net_metrics = self._nmc.getMbps(src_site, metric_type)
+                    net_metrics = cache.get(self._nmc.getMbps, src_site, metric_type)
                     if net_metrics:
                         break
-                if len(net_metrics) == 0:
+                if not net_metrics:
                     continue
                 available_reps[src_rse_id] = {}
                 for dst_site, mbps in net_metrics.items():
@@ -199,7 +227,7 @@ class PlacementAlgorithm:
                         if mbps > max_mbps:
                             max_mbps = mbps
                         dst_rse_id = self._sites[dst_site]['rse_id']
-                        dst_rse_info = get_rse(rse_id=dst_rse_id)
+                        dst_rse_info = cache.get(get_rse, dst_rse_id)
 
                         if not dst_rse_info['availability_write']:
                             continue
@@ -212,21 +240,17 @@ class PlacementAlgorithm:
                         if ((site_added_files + meta['length']) > self._max_files_hour_rse):
                             continue
 
-                        queued = self._nmc.getQueuedFiles(src_site, dst_site)
+                        queued = cache.get(self._nmc.getQueuedFiles, src_site, dst_site)
 
                         # logging.debug('queued %s -> %s: %d' % (src_site, dst_site, queued))
                         if queued > 0:
                             continue
-                        rse_space = space_info.get(dst_rse_id, {'free': 0, 'total': 1})
                         if src_rse_id not in self._src_penalties:
                             self._src_penalties[src_rse_id] = 100.0
-                        src_penalty = self._src_penalties[src_rse_id]
                         if dst_rse_id not in self._dst_penalties:
                             self._dst_penalties[dst_rse_id] = 100.0
-                        dst_penalty = self._dst_penalties[dst_rse_id]
 
-                        free_space = float(rse_space['free']) / float(rse_space['total']) * 100.0
-                        available_reps[src_rse_id][dst_rse_id] = {'free_space': free_space, 'src_penalty': src_penalty, 'dst_penalty': dst_penalty, 'mbps': float(mbps), 'metrics_type': net_metrics_type}
+                        available_reps[src_rse_id][dst_rse_id] = {'mbps': float(mbps), 'metrics_type': net_metrics_type}
 
                 num_reps += 1
 
@@ -237,36 +261,29 @@ class PlacementAlgorithm:
             decision['error_reason'] = 'more than 4 replicas already exist'
             return decision
 
-        src_dst_ratios = []
-
         if max_mbps == 0.0:
             decision['error_reason'] = 'could not find enough network metrics'
             return decision
 
-        for src_id, dst_ids in available_reps.items():
-            for dst_id, metrics in dst_ids.items():
-                if dst_id in available_reps:
-                    continue
-                bdw = (metrics['mbps'] / max_mbps) * 100.0
-                src_penalty = self._src_penalties[src_id]
-                dst_penalty = self._dst_penalties[dst_id]
-
-                ratio = ((metrics['free_space'] / 4.0) + bdw) * src_penalty * dst_penalty
-                src_dst_ratios.append((src_id, dst_id, ratio))
+        # Score all the source/destination pairs at once, with the free space left after the previous decisions
+        pairs = [(src_id, dst_id, metrics['mbps']) for src_id, dst_ids in available_reps.items()
+                 for dst_id, metrics in dst_ids.items() if dst_id not in available_reps]
+        ratios = [((snapshot.free_ratio(dst_id) / 4.0) + (mbps / max_mbps) * 100.0) * self._src_penalties[src_id] * self._dst_penalties[dst_id]
+                  for src_id, dst_id, mbps in pairs]
 
-        if len(src_dst_ratios) == 0:
+        best = argmax(ratios)
+        if best is None:
             decision['error_reason'] = 'found no suitable src/dst for replication'
             return decision
 
-        sorted_ratios = sorted(src_dst_ratios, key=itemgetter(2), reverse=True)
-        logging.debug(sorted_ratios)
-        destination_rse = sorted_ratios[0][1]
-        source_rse = sorted_ratios[0][0]
-        decision['destination_rse'] = get_rse_name(rse_id=destination_rse)
-        decision['source_rse'] = get_rse_name(rse_id=source_rse)
+        logging.debug(sorted(((src_id, dst_id, ratio) for (src_id, dst_id, _), ratio in zip(pairs, ratios)), key=itemgetter(2), reverse=True))
+        source_rse, destination_rse, _ = pairs[best]
+        decision['destination_rse'] = cache.get(get_rse_name, destination_rse)
+        decision['source_rse'] = cache.get(get_rse_name, source_rse)
         # decision['rse_ratios'] = src_dst_ratios
         self._dst_penalties[destination_rse] = 10.0
         self._src_penalties[source_rse] = 10.0
+        snapshot.plan(destination_rse, meta['bytes'])
 
         self._added_cache.add_dataset(decision['did'])
 
@@ -204,13 +204,21 @@ def place_replica(once=False,
             else:
                 logging.debug('(%s) no dids in queue' % (instance_id))
 
+            dids = []
             for _ in range(0, len_dids):
                 did = did_queue.get()
                 if isinstance(did[0], str):
                     did[0] = InternalScope(did[0], vo=vo)
-                for algorithm, instance in instances.items():
-                    logging.info('(%s:%s) Retrieved %s:%s from queue. Run placement algorithm' % (algorithm, instance_id, did[0], did[1]))
-                    decision = instance.place(did)
+                dids.append(did)
+
+            for algorithm, instance in instances.items():
+                logging.info('(%s:%s) Retrieved %d did(s) from queue. Run placement algorithm' % (algorithm, instance_id, len(dids)))
+                # Algorithms supporting it evaluate the whole window together
+                if hasattr(instance, 'place_batch'):
+                    decisions = instance.place_batch(dids)
+                else:
+                    decisions = [instance.place(did) for did in dids]
+                for did, decision in zip(dids, decisions):
                     decision['@timestamp'] = datetime.utcnow().isoformat()
                     decision['algorithm'] = algorithm
                     decision['instance_id'] = instance_id
@@ -24,7 +24,7 @@ from time import time
 from requests import get
 
 from rucio.common.config import config_get, config_get_int
-from rucio.daemons.c3po.utils.timeseries import RedisTimeSeries
+from rucio.daemons.c3po.utils.timeseries import get_time_series
 
 
 class WorkloadCollector(object):
@@ -41,7 +41,7 @@ class WorkloadCollector(object):
             self._avg_jobs = {}
             self._cur_jobs = {}
             self._max_jobs = {}
-            self._tms = RedisTimeSeries(config_get('c3po', 'redis_host'), config_get_int('c3po', 'redis_port'), config_get_int('c3po-workload', 'window'), 'jobs_')
+            self._tms = get_time_series(config_get_int('c3po-workload', 'window'), 'jobs_')
 
             self._request_headers = {"Accept": "application/json", "Content-Type": "application/json"}
             self._request_url = config_get('c3po-workload', 'panda_url')
@@ -15,16 +15,16 @@
 
 from uuid import uuid4
 
-from rucio.daemons.c3po.utils.timeseries import RedisTimeSeries
+from rucio.daemons.c3po.utils.timeseries import get_time_series
 
 
 class DatasetCache(object):
     """
     Utility to count the accesses of the datasets during the last day.
     """
-    def __init__(self, redis_host, redis_port, timeout=1, prefix='did_cache', delete_keys=False):
+    def __init__(self, redis_host=None, redis_port=None, timeout=1, prefix='did_cache', delete_keys=False, backend=None):
         self._prefix = prefix + '_' + str(uuid4()).split('-')[0]
-        self._tms = RedisTimeSeries(redis_host, redis_port, timeout, self._prefix)
+        self._tms = get_time_series(timeout, self._prefix, redis_host=redis_host, redis_port=redis_port, backend=backend)
 
         if delete_keys:
             self._tms.delete_keys()
@@ -33,8 +33,9 @@ class DatasetCache(object):
         self._tms.add_point('{}_{}'.format(did[0].internal, did[1]), 1)
 
     def get_did(self, did):
-        self._tms.trim()
+        key = '{}_{}'.format(did[0].internal, did[1])
+        self._tms.trim(key)
 
-        series = self._tms.get_series('{}_{}'.format(did[0].internal, did[1]))
+        series = self._tms.get_series(key)
 
         return len(series)
@@ -16,10 +16,34 @@
 """
 Expiring Dataset Cache
 """
+from heapq import heappop, heappush
+from threading import Lock
+from time import monotonic
 from uuid import uuid4
 
 from redis import StrictRedis
 
+from rucio.common.config import config_get, config_get_int
+from rucio.daemons.c3po.utils.timeseries import BACKEND_MEMORY, get_backend
+
+
+def get_expiring_dataset_cache(timeout=1, prefix='expiring_did_cache', redis_host=None, redis_port=None, backend=None):
+    """
+    Create an expiring dataset cache with the given backend.
+
+    :param timeout:    The lifetime of the datasets in the cache in seconds.
+    :param prefix:     The prefix of the Redis keys.
+    :param redis_host: The Redis host, by default [c3po] redis_host.
+    :param redis_port: The Redis port, by default [c3po] redis_port.
+    :param backend:    'redis' or 'memory', by default [c3po] cache_backend.
+    """
+    if get_backend(backend) == BACKEND_MEMORY:
+        return InMemoryExpiringDatasetCache(timeout=timeout)
+    return ExpiringDatasetCache(redis_host or config_get('c3po', 'redis_host'),
+                                redis_port or config_get_int('c3po', 'redis_port'),
+                                timeout=timeout,
+                                prefix=prefix)
+
 
 class ExpiringDatasetCache(object):
     """
@@ -43,3 +67,42 @@ class ExpiringDatasetCache(object):
             return False
 
         return True
+
+
+class InMemoryExpiringDatasetCache(object):
+    """
+    Cache with expiring values kept in the memory of the process. The expiration
+    times are kept in a heap, so only the expired datasets are visited.
+    """
+    def __init__(self, timeout=1):
+        self._lock = Lock()
+        self._timeout = timeout
+        self._expires_at = {}
+        self._heap = []
+
+    def _expire(self, now):
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, dataset = heappop(self._heap)
+            # The dataset may have been added again since, with a later expiration
+            if self._expires_at.get(dataset) == expires_at:
+                del self._expires_at[dataset]
+
+    def add_dataset(self, dataset):
+        """ Adds a datasets to cache with lifetime """
+        now = monotonic()
+        with self._lock:
+            self._expire(now)
+            expires_at = now + self._timeout
+            self._expires_at[dataset] = expires_at
+            heappush(self._heap, (expires_at, dataset))
+
+    def check_dataset(self, dataset):
+        """ Checks if dataset is still in cache """
+        with self._lock:
+            self._expire(monotonic())
+            return dataset in self._expires_at
+
+    def __len__(self):
+        with self._lock:
+            self._expire(monotonic())
+            return len(self._expires_at)
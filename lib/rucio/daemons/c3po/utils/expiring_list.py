@@ -18,7 +18,8 @@ Utility classes for C3PO
 """
 
 from collections import deque
-from threading import Lock, Timer
+from threading import Lock
+from time import monotonic
 
 
 class ExpiringList(object):
@@ -29,35 +30,41 @@ class ExpiringList(object):
     def __init__(self, timeout=1):
         self._lock = Lock()
         self._timeout = timeout
+        # (expiration time, item), ordered by expiration time since the timeout is the same for all items
         self._items = deque()
 
     def add(self, item):
         """Add event time
         """
         with self._lock:
-            self._items.append(item)
-            Timer(self._timeout, self._expire).start()
+            now = monotonic()
+            self._expire(now)
+            self._items.append((now + self._timeout, item))
 
     def __len__(self):
         """
         Return number of active events
         """
         with self._lock:
+            self._expire(monotonic())
             return len(self._items)
 
-    def _expire(self):
+    def _expire(self, now):
         """
         Remove any expired events
         """
-        with self._lock:
+        while self._items and self._items[0][0] <= now:
             self._items.popleft()
 
     def to_set(self):
         """
         Return items as a set
         """
-        return set(self._items)
+        with self._lock:
+            self._expire(monotonic())
+            return set(item for _, item in self._items)
 
     def __str__(self):
         with self._lock:
-            return str(self._items)
+            self._expire(monotonic())
+            return str(deque(item for _, item in self._items))
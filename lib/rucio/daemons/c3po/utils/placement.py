@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+# Copyright European Organization for Nuclear Research (CERN) since 2012
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Helpers to evaluate the placement of a window of DIDs together
+"""
+
+from array import array
+from collections import defaultdict
+
+from rucio.core.did import get_metadata_bulk
+from rucio.core.replica import list_dataset_replicas_bulk
+
+
+class FreeSpaceSnapshot(object):
+    """
+    Free and total space of a fixed list of RSEs, held in arrays. The bytes planned
+    to be placed on an RSE are deducted from its free space, so that the following
+    decisions of the same window see the space which is actually left.
+    """
+
+    def __init__(self, rse_ids, space_info):
+        """
+        :param rse_ids:    The RSE ids of the candidate destinations.
+        :param space_info: Dictionary rse_id -> {'free': ..., 'total': ...}, as returned by FreeSpaceCollector.get_rse_space.
+        """
+        self.rse_ids = list(rse_ids)
+        self._index = {rse_id: index for index, rse_id in enumerate(self.rse_ids)}
+        spaces = [space_info.get(rse_id, {'free': 0, 'total': 1}) for rse_id in self.rse_ids]
+        self._free = array('d', (float(space['free']) for space in spaces))
+        self._total = array('d', (float(space['total']) or 1.0 for space in spaces))
+
+    def __contains__(self, rse_id):
+        return rse_id in self._index
+
+    def free_ratios(self):
+        """
+        Return the percentage of free space of every RSE, in the order of rse_ids.
+        """
+        return [free / total * 100.0 for free, total in zip(self._free, self._total)]
+
+    def free_ratio(self, rse_id):
+        """
+        Return the percentage of free space of one RSE, 0 for unknown RSEs.
+        """
+        index = self._index.get(rse_id)
+        if index is None:
+            return 0.0
+        return self._free[index] / self._total[index] * 100.0
+
+    def plan(self, rse_id, nbytes):
+        """
+        Deduct the bytes of a planned replica from the free space of an RSE.
+        """
+        index = self._index.get(rse_id)
+        if index is not None:
+            self._free[index] = max(0.0, self._free[index] - nbytes)
+
+
+class BatchCache(object):
+    """
+    Memoizes the lookups done while evaluating a window of DIDs, e.g. the attributes
+    of an RSE or the network metrics of a site, so every lookup is done once per window.
+    """
+
+    def __init__(self):
+        self._values = {}
+
+    def get(self, function, *args):
+        """
+        Return function(*args), calling it only the first time.
+        """
+        key = (function, args)
+        if key not in self._values:
+            self._values[key] = function(*args)
+        return self._values[key]
+
+
+def argmax(values):
+    """
+    Return the index of the first maximal value, or None for an empty sequence.
+    """
+    if not values:
+        return None
+    return max(range(len(values)), key=values.__getitem__)
+
+
+def get_dids_metadata(dids):
+    """
+    Return the metadata of the DIDs by (scope, name). DIDs which do not exist are left out.
+
+    :param dids: List of (scope, name) DIDs.
+    """
+    metadata = {}
+    for meta in get_metadata_bulk([{'scope': did[0], 'name': did[1]} for did in dids]):
+        metadata[(meta['scope'], meta['name'])] = meta
+    return metadata
+
+
+def get_dataset_replicas(dids):
+    """
+    Return the dataset replicas of the DIDs by (scope, name).
+
+    :param dids: List of (scope, name) DIDs.
+    """
+    names_by_scope = defaultdict(list)
+    for did in dids:
+        names_by_scope[did[0]].append(did[1])
+    replicas = defaultdict(list)
+    for replica in list_dataset_replicas_bulk(names_by_scope):
+        replicas[(replica['scope'], replica['name'])].append(replica)
+    return replicas
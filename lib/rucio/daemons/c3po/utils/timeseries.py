@@ -14,13 +14,48 @@
 # limitations under the License.
 
 """
-Redis time series abstraction
+Time series abstraction, stored in Redis or in the memory of the process
 """
 
+from array import array
+from threading import Lock
 from time import time
 
 from redis import StrictRedis
 
+from rucio.common.config import config_get, config_get_int
+
+BACKEND_REDIS = 'redis'
+BACKEND_MEMORY = 'memory'
+
+
+def get_backend(backend=None):
+    """
+    Return the cache backend to use, by default the one configured in [c3po] cache_backend.
+    """
+    backend = backend or config_get('c3po', 'cache_backend', raise_exception=False, default=BACKEND_REDIS)
+    if backend not in (BACKEND_REDIS, BACKEND_MEMORY):
+        raise ValueError('Unknown c3po cache backend %s' % backend)
+    return backend
+
+
+def get_time_series(window, prefix, redis_host=None, redis_port=None, backend=None):
+    """
+    Create a time series with the given backend.
+
+    :param window:     The length of the sliding window in seconds.
+    :param prefix:     The prefix of the keys of the series.
+    :param redis_host: The Redis host, by default [c3po] redis_host.
+    :param redis_port: The Redis port, by default [c3po] redis_port.
+    :param backend:    'redis' or 'memory', by default [c3po] cache_backend.
+    """
+    if get_backend(backend) == BACKEND_MEMORY:
+        return InMemoryTimeSeries(window, prefix)
+    return RedisTimeSeries(redis_host or config_get('c3po', 'redis_host'),
+                           redis_port or config_get_int('c3po', 'redis_port'),
+                           window,
+                           prefix)
+
 
 class RedisTimeSeries(object):
     """
@@ -28,7 +63,7 @@ class RedisTimeSeries(object):
     """
 
     def __init__(self, redis_host, redis_port, window, prefix):
-        self._redis = StrictRedis(host=redis_host, port=redis_port)
+        self._redis = StrictRedis(host=redis_host, port=redis_port, decode_responses=True)
         self._prefix = prefix
         self._window = window * 1000000
 
@@ -38,7 +73,7 @@ class RedisTimeSeries(object):
         """
         r_key = self._prefix + key
         score = int(time() * 1000000)
-        self._redis.zadd(r_key, score, "%d:%d" % (value, score))
+        self._redis.zadd(r_key, {"%d:%d" % (value, score): score})
 
     def get_series(self, key):
         """
@@ -53,14 +88,15 @@ class RedisTimeSeries(object):
 
         return tuple(series)
 
-    def trim(self):
+    def trim(self, key=None):
         """
-        Trim the time series
+        Trim the time series, or only the series of the given key
         """
         now = time()
         max_score = int(now * 1000000 - self._window)
-        for key in self.get_keys():
-            self._redis.zremrangebyscore(key, 0, max_score)
+        keys = [self._prefix + key] if key is not None else self.get_keys()
+        for r_key in keys:
+            self._redis.zremrangebyscore(r_key, 0, max_score)
 
     def get_keys(self):
         """
@@ -74,3 +110,105 @@ class RedisTimeSeries(object):
         """
         for key in self.get_keys():
             self._redis.zremrangebyrank(key, 0, -1)
+
+
+class _RingBuffer(object):
+    """
+    Timestamps and values of one series, oldest first, in a pair of circular arrays.
+    The capacity doubles when the buffer is full.
+    """
+    __slots__ = ('times', 'values', 'start', 'size')
+
+    def __init__(self, capacity=16):
+        self.times = array('q', bytes(8 * capacity))
+        self.values = array('q', bytes(8 * capacity))
+        self.start = 0
+        self.size = 0
+
+    def _ordered(self, buffer):
+        end = self.start + self.size
+        if end <= len(buffer):
+            return buffer[self.start:end]
+        return buffer[self.start:] + buffer[:end - len(buffer)]
+
+    def append(self, timestamp, value):
+        capacity = len(self.times)
+        if self.size == capacity:
+            padding = array('q', bytes(8 * capacity))
+            self.times = self._ordered(self.times) + padding
+            self.values = self._ordered(self.values) + padding
+            self.start = 0
+            capacity *= 2
+        index = (self.start + self.size) % capacity
+        self.times[index] = timestamp
+        self.values[index] = value
+        self.size += 1
+
+    def trim(self, max_time):
+        capacity = len(self.times)
+        while self.size and self.times[self.start] <= max_time:
+            self.start = (self.start + 1) % capacity
+            self.size -= 1
+
+    def series(self):
+        return tuple(self._ordered(self.values))
+
+
+class InMemoryTimeSeries(object):
+    """
+    Time series kept in the memory of the process, with the interface of RedisTimeSeries.
+    Points are only visible to the instance which added them.
+    """
+
+    def __init__(self, window, prefix):
+        self._lock = Lock()
+        self._series = {}
+        self._prefix = prefix
+        self._window = window * 1000000
+
+    def add_point(self, key, value):
+        """
+        Add a point
+        """
+        with self._lock:
+            if key not in self._series:
+                self._series[key] = _RingBuffer()
+            self._series[key].append(int(time() * 1000000), value)
+
+    def get_series(self, key):
+        """
+        Return a time series tuple
+        """
+        with self._lock:
+            if key not in self._series:
+                return ()
+            return self._series[key].series()
+
+    def trim(self, key=None):
+        """
+        Trim the time series, or only the series of the given key
+        """
+        max_time = int(time() * 1000000 - self._window)
+        with self._lock:
+            keys = [key] if key is not None else list(self._series)
+            for series_key in keys:
+                series = self._series.get(series_key)
+                if series is None:
+                    continue
+                series.trim(max_time)
+                if not series.size:
+                    del self._series[series_key]
+
+    def get_keys(self):
+        """
+        Return matching keys
+        """
+        with self._lock:
+            return [self._prefix + key for key in self._series]
+
+    def delete_keys(self):
+        """
+        Delete keys
+        """
+        with self._lock:
+            self._series.clear()
@@ -55,6 +55,58 @@ REGION = make_region_memcached(expiration_time=900)
 METRICS = MetricManager(module=__name__)
 DAEMON_NAME = 'conveyor-finisher'
 FAILED_DURING_SUBMISSION_DELAY = datetime.timedelta(minutes=120)
+# Numbered backreferences and conditional groups, whose group numbers change once patterns are combined
+GROUP_NUMBER_REFERENCE_REGEX = re.compile(r'\\[1-9]|\(\?\(\d')
+
+
+class SuspiciousPatternMatcher:
+    """
+    Matches transfer errors against the suspicious patterns.
+
+    The patterns are combined into a single regular expression when possible, and the
+    result is cached per distinct error message, as failure bursts repeat the same errors.
+    """
+
+    def __init__(self, patterns, cache_size=10000):
+        """
+        :param patterns:    List of regular expressions, matched at the beginning of the error message.
+        :param cache_size:  Maximum number of error messages to keep the result of.
+        """
+        self.patterns = [re.compile(pattern) if isinstance(pattern, str) else pattern for pattern in patterns]
+        self.cache_size = cache_size
+        self._cache = {}
+        self._combined = None
+        # Patterns with their own flags, e.g. global inline flags, or referring to groups by number cannot be combined
+        if self.patterns and all(pattern.flags == re.UNICODE and not GROUP_NUMBER_REFERENCE_REGEX.search(pattern.pattern)
+                                 for pattern in self.patterns):
+            try:
+                self._combined = re.compile('|'.join('(?:%s)' % pattern.pattern for pattern in self.patterns))
+            except re.error:
+                self._combined = None
+
+    def __bool__(self):
+        return bool(self.patterns)
+
+    def __str__(self):
+        return str([pattern.pattern for pattern in self.patterns])
+
+    def match(self, err_msg):
+        """
+        :param err_msg:  The transfer error message.
+        :returns:        True if the error message matches one of the patterns.
+        """
+        if not self.patterns or not err_msg:
+            return False
+        result = self._cache.get(err_msg)
+        if result is None:
+            if self._combined is not None:
+                result = self._combined.match(err_msg) is not None
+            else:
+                result = any(pattern.match(err_msg) for pattern in self.patterns)
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            self._cache[err_msg] = result
+        return result
 
 
 def _fetch_requests(
@@ -151,8 +203,8 @@ def finisher(
     """
     # Get suspicious patterns
     suspicious_patterns = config_get_list('conveyor', 'suspicious_pattern', default=[])
-    suspicious_patterns = [re.compile(pat.strip()) for pat in suspicious_patterns]
-    logging.log(logging.DEBUG, "Suspicious patterns: %s" % [pat.pattern for pat in suspicious_patterns])
+    suspicious_patterns = SuspiciousPatternMatcher([pat.strip() for pat in suspicious_patterns])
+    logging.log(logging.DEBUG, "Suspicious patterns: %s" % suspicious_patterns)
 
     retry_protocol_mismatches = config_get_bool('conveyor', 'retry_protocol_mismatches', default=False)
 
@@ -224,15 +276,20 @@ def _finish_requests(reqs, suspicious_patterns, retry_protocol_mismatches, logge
     Used by finisher to handle terminated requests,
 
     :param reqs:                         List of requests.
-    :param suspicious_patterns:          List of suspicious patterns.
+    :param suspicious_patterns:          SuspiciousPatternMatcher of the suspicious patterns.
     :param retry_protocol_mismatches:    Boolean to retry the transfer in case of protocol mismatch.
     """
 
+    if not isinstance(suspicious_patterns, SuspiciousPatternMatcher):
+        suspicious_patterns = SuspiciousPatternMatcher(suspicious_patterns)
     failed_during_submission = [RequestState.SUBMITTING, RequestState.SUBMISSION_FAILED, RequestState.LOST]
     failed_no_submission_attempts = [RequestState.NO_SOURCES, RequestState.ONLY_TAPE_SOURCES, RequestState.MISMATCH_SCHEME]
     undeterministic_rses = __get_undeterministic_rses(logger=logger)
-    rses_info, protocols = {}, {}
     replicas = {}
+    # Failed requests to retry, by whether the ranking of their sources must be decreased
+    to_requeue = {True: [], False: []}
+    # PFNs of suspicious replicas, by reason and VO
+    suspicious_replicas = {}
     for req in reqs:
         try:
             replica = {'scope': req['scope'], 'name': req['name'], 'rse_id': req['dest_rse_id'], 'bytes': req['bytes'], 'adler32': req['adler32'], 'request_id': req['request_id']}
@@ -252,14 +309,10 @@ def _finish_requests(reqs, suspicious_patterns, retry_protocol_mismatches, logge
 
                 # for TAPE, replica path is needed
                 if req['request_type'] in (RequestType.TRANSFER, RequestType.STAGEIN) and req['dest_rse_id'] in undeterministic_rses:
-                    if req['dest_rse_id'] not in rses_info:
-                        rses_info[req['dest_rse_id']] = rsemanager.get_rse_info(rse_id=req['dest_rse_id'])
                     pfn = req['dest_url']
                     scheme = urlparse(pfn).scheme
-                    dest_rse_id_scheme = '%s_%s' % (req['dest_rse_id'], scheme)
-                    if dest_rse_id_scheme not in protocols:
-                        protocols[dest_rse_id_scheme] = rsemanager.create_protocol(rses_info[req['dest_rse_id']], 'write', scheme)
-                    path = protocols[dest_rse_id_scheme].parse_pfns([pfn])[pfn]['path']
+                    protocol = rsemanager.get_cached_protocol(req['dest_rse_id'], 'write', scheme)
+                    path = protocol.parse_pfns([pfn])[pfn]['path']
                     replica['path'] = os.path.join(path, os.path.basename(pfn))
 
                 # replica should not be added to replicas until all info are filled
@@ -267,46 +320,26 @@ def _finish_requests(reqs, suspicious_patterns, retry_protocol_mismatches, logge
 
             # Standard failure from the transfer tool
             elif req['state'] == RequestState.FAILED:
-                __check_suspicious_files(req, suspicious_patterns, logger=logger)
-                try:
-                    if request_core.should_retry_request(req, retry_protocol_mismatches):
-                        new_req = request_core.requeue_and_archive(req, source_ranking_update=True, retry_protocol_mismatches=retry_protocol_mismatches, logger=logger)
-                        # should_retry_request and requeue_and_archive are not in one session,
-                        # another process can requeue_and_archive and this one will return None.
-                        logger(logging.WARNING, 'REQUEUED DID %s:%s REQUEST %s AS %s TRY %s' % (req['scope'],
-                                                                                                req['name'],
-                                                                                                req['request_id'],
-                                                                                                new_req['request_id'],
-                                                                                                new_req['retry_count']))
-                    else:
-                        # No new_req is return if should_retry_request returns False
-                        logger(logging.WARNING, 'EXCEEDED SUBMITTING DID %s:%s REQUEST %s in state %s', req['scope'], req['name'], req['request_id'], req['state'])
-                        replica['state'] = ReplicaState.UNAVAILABLE
-                        replica['archived'] = False
-                        replica['error_message'] = req['err_msg'] if req['err_msg'] else request_core.get_transfer_error(req['state'])
-                        replicas[req['request_type']][req['rule_id']].append(replica)
-                except RequestNotFound:
-                    logger(logging.WARNING, 'Cannot find request %s anymore', req['request_id'])
+                __check_suspicious_files(req, suspicious_patterns, suspicious_replicas, logger=logger)
+                if request_core.should_retry_request(req, retry_protocol_mismatches):
+                    to_requeue[True].append(req)
+                else:
+                    logger(logging.WARNING, 'EXCEEDED SUBMITTING DID %s:%s REQUEST %s in state %s', req['scope'], req['name'], req['request_id'], req['state'])
+                    replica['state'] = ReplicaState.UNAVAILABLE
+                    replica['archived'] = False
+                    replica['error_message'] = req['err_msg'] if req['err_msg'] else request_core.get_transfer_error(req['state'])
+                    replicas[req['request_type']][req['rule_id']].append(replica)
 
             # All other failures
             elif req['state'] in failed_during_submission or req['state'] in failed_no_submission_attempts:
-                try:
-                    if request_core.should_retry_request(req, retry_protocol_mismatches):
-                        new_req = request_core.requeue_and_archive(req, source_ranking_update=False, retry_protocol_mismatches=retry_protocol_mismatches, logger=logger)
-                        logger(logging.WARNING, 'REQUEUED SUBMITTING DID %s:%s REQUEST %s AS %s TRY %s' % (req['scope'],
-                                                                                                           req['name'],
-                                                                                                           req['request_id'],
-                                                                                                           new_req['request_id'],
-                                                                                                           new_req['retry_count']))
-                    else:
-                        # No new_req is return if should_retry_request returns False
-                        logger(logging.WARNING, 'EXCEEDED SUBMITTING DID %s:%s REQUEST %s in state %s', req['scope'], req['name'], req['request_id'], req['state'])
-                        replica['state'] = ReplicaState.UNAVAILABLE
-                        replica['archived'] = False
-                        replica['error_message'] = req['err_msg'] if req['err_msg'] else request_core.get_transfer_error(req['state'])
-                        replicas[req['request_type']][req['rule_id']].append(replica)
-                except RequestNotFound:
-                    logger(logging.WARNING, 'Cannot find request %s anymore', req['request_id'])
+                if request_core.should_retry_request(req, retry_protocol_mismatches):
+                    to_requeue[False].append(req)
+                else:
+                    logger(logging.WARNING, 'EXCEEDED SUBMITTING DID %s:%s REQUEST %s in state %s', req['scope'], req['name'], req['request_id'], req['state'])
+                    replica['state'] = ReplicaState.UNAVAILABLE
+                    replica['archived'] = False
+                    replica['error_message'] = req['err_msg'] if req['err_msg'] else request_core.get_transfer_error(req['state'])
+                    replicas[req['request_type']][req['rule_id']].append(replica)
 
         except Exception as error:
             logger(logging.ERROR, "Something unexpected happened when handling request %s(%s:%s) at %s: %s" % (req['request_id'],
@@ -315,9 +348,55 @@ def _finish_requests(reqs, suspicious_patterns, retry_protocol_mismatches, logge
                                                                                                                req['dest_rse_id'],
                                                                                                                str(error)))
 
+    __declare_suspicious_replicas(suspicious_replicas, logger=logger)
+    __requeue_and_archive(to_requeue[True], source_ranking_update=True, retry_protocol_mismatches=retry_protocol_mismatches, logger=logger)
+    __requeue_and_archive(to_requeue[False], source_ranking_update=False, retry_protocol_mismatches=retry_protocol_mismatches, logger=logger)
     __handle_terminated_replicas(replicas, logger=logger)
 
 
+def __requeue_and_archive(reqs, source_ranking_update, retry_protocol_mismatches, logger=logging.log):
+    """
+    Requeue and archive failed requests in bulk. If the bulk operation fails, the requests are
+    requeued one by one.
+
+    :param reqs:                         List of requests.
+    :param source_ranking_update:        Boolean. If True, the source ranking is decreased.
+    :param retry_protocol_mismatches:    Boolean to retry the transfer in case of protocol mismatch.
+    """
+    if not reqs:
+        return
+
+    try:
+        new_reqs = request_core.requeue_and_archive_bulk(reqs, source_ranking_update=source_ranking_update, retry_protocol_mismatches=retry_protocol_mismatches, logger=logger)
+    except Exception as error:
+        logger(logging.WARNING, 'Failed to requeue %d requests in bulk, will do it one by one: %s', len(reqs), str(error))
+        new_reqs = {}
+        for req in reqs:
+            try:
+                new_reqs[req['request_id']] = request_core.requeue_and_archive(req, source_ranking_update=source_ranking_update, retry_protocol_mismatches=retry_protocol_mismatches, logger=logger)
+            except RequestNotFound:
+                pass
+            except Exception as error:
+                logger(logging.ERROR, "Something unexpected happened when handling request %s(%s:%s) at %s: %s" % (req['request_id'],
+                                                                                                                   req['scope'],
+                                                                                                                   req['name'],
+                                                                                                                   req['dest_rse_id'],
+                                                                                                                   str(error)))
+                new_reqs[req['request_id']] = False
+
+    for req in reqs:
+        if req['request_id'] not in new_reqs:
+            logger(logging.WARNING, 'Cannot find request %s anymore', req['request_id'])
+            continue
+        new_req = new_reqs[req['request_id']]
+        if new_req is None:
+            # The request was changed by another process since it was fetched and must not be retried anymore
+            logger(logging.WARNING, 'ARCHIVED DID %s:%s REQUEST %s WITHOUT RETRY', req['scope'], req['name'], req['request_id'])
+        elif new_req:
+            logger(logging.WARNING, 'REQUEUED %sDID %s:%s REQUEST %s AS %s TRY %s', '' if source_ranking_update else 'SUBMITTING ',
+                   req['scope'], req['name'], req['request_id'], new_req['request_id'], new_req['retry_count'])
+
+
 def __get_undeterministic_rses(logger=logging.log):
     """
     Get the undeterministic rses from the database
@@ -336,12 +415,13 @@ def __get_undeterministic_rses(logger=logging.log):
     return result
 
 
-def __check_suspicious_files(req, suspicious_patterns, logger=logging.log):
+def __check_suspicious_files(req, suspicious_patterns, suspicious_replicas, logger=logging.log):
     """
     Check suspicious files when a transfer failed.
 
     :param req:                  Request object.
-    :param suspicious_patterns:  A list of regexp pattern object.
+    :param suspicious_patterns:  SuspiciousPatternMatcher of the suspicious patterns.
+    :param suspicious_replicas:  Dictionary {(reason, vo): [pfn, ...]} the suspicious replicas are added to.
     """
     is_suspicious = False
     if not suspicious_patterns:
@@ -349,26 +429,34 @@ def __check_suspicious_files(req, suspicious_patterns, logger=logging.log):
 
     try:
         logger(logging.DEBUG, "Checking suspicious file for request: %s, transfer error: %s", req['request_id'], req['err_msg'])
-        for pattern in suspicious_patterns:
-            if pattern.match(req['err_msg']):
-                is_suspicious = True
-                break
+        is_suspicious = suspicious_patterns.match(req['err_msg'])
 
         if is_suspicious:
             reason = req['err_msg'][:255]
             urls = request_core.get_sources(req['request_id'], rse_id=req['source_rse_id'])
             if urls:
-                pfns = []
-                for url in urls:
-                    pfns.append(url['url'])
+                pfns = [url['url'] for url in urls]
                 if pfns:
                     logger(logging.DEBUG, "Found suspicious urls: %s", str(pfns))
-                    replica_core.declare_bad_file_replicas(pfns, reason=reason, issuer=InternalAccount('root', vo=req['scope'].vo), status=BadFilesStatus.SUSPICIOUS)
+                    suspicious_replicas.setdefault((reason, req['scope'].vo), []).extend(pfns)
     except Exception as error:
         logger(logging.WARNING, "Failed to check suspicious file with request: %s - %s", req['request_id'], str(error))
     return is_suspicious
 
 
+def __declare_suspicious_replicas(suspicious_replicas, logger=logging.log):
+    """
+    Declare the suspicious replicas found in a batch of requests, with one declaration per reason and VO.
+
+    :param suspicious_replicas:  Dictionary {(reason, vo): [pfn, ...]}.
+    """
+    for (reason, vo), pfns in suspicious_replicas.items():
+        try:
+            replica_core.declare_bad_file_replicas(pfns, reason=reason, issuer=InternalAccount('root', vo=vo), status=BadFilesStatus.SUSPICIOUS)
+        except Exception as error:
+            logger(logging.WARNING, "Failed to declare %d suspicious replicas - %s", len(pfns), str(error))
+
+
 def __handle_terminated_replicas(replicas, logger=logging.log):
     """
     Used by finisher to handle available and unavailable replicas.
@@ -421,9 +509,8 @@ def __update_bulk_replicas(replicas, *, session, logger=logging.log):
         logger(logging.WARNING, 'Failed to bulk update replicas, will do it one by one: %s', str(error))
         raise ReplicaNotFound(error)
 
+    request_core.archive_requests([replica['request_id'] for replica in replicas if not replica['archived']], session=session)
     for replica in replicas:
-        if not replica['archived']:
-            request_core.archive_request(replica['request_id'], session=session)
         logger(logging.INFO, "HANDLED REQUEST %s DID %s:%s AT RSE %s STATE %s", replica['request_id'], replica['scope'], replica['name'], replica['rse_id'], str(replica['state']))
     return True
 
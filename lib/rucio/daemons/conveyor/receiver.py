@@ -19,6 +19,7 @@ Conveyor is a daemon to manage file transfers.
 
 import json
 import logging
+import queue
 import socket
 import threading
 import time
@@ -30,7 +31,7 @@ import stomp
 
 import rucio.db.sqla.util
 from rucio.common import exception
-from rucio.common.config import config_get, config_get_bool, config_get_int
+from rucio.common.config import config_get, config_get_bool, config_get_float, config_get_int
 from rucio.common.logging import setup_logging
 from rucio.common.policy import get_policy
 from rucio.core import request as request_core
@@ -48,11 +49,21 @@ DAEMON_NAME = 'conveyor-receiver'
 
 class Receiver(object):
 
-    def __init__(self, broker, id_, total_threads, all_vos=False):
+    def __init__(self, broker, id_, total_threads, all_vos=False, conn=None, buffer=None):
+        """
+        :param broker:         The broker the messages are received from.
+        :param id_:            The receiver thread number.
+        :param total_threads:  The total number of receiver threads.
+        :param all_vos:        Handle the messages of all VOs.
+        :param conn:           The connection to acknowledge the messages on.
+        :param buffer:         Bounded queue of messages waiting to be applied. If not set, messages are applied immediately.
+        """
         self.__all_vos = all_vos
         self.__broker = broker
         self.__id = id_
         self.__total_threads = total_threads
+        self.__conn = conn
+        self.__buffer = buffer
 
     @METRICS.count_it
     def on_error(self, frame):
@@ -60,10 +71,18 @@ class Receiver(object):
 
     @METRICS.count_it
     def on_message(self, frame):
-        msg = json.loads(frame.body)
+        ack_id = frame.headers.get('ack', frame.headers.get('message-id'))
+        try:
+            msg = json.loads(frame.body)
+        except ValueError:
+            METRICS.counter('json_error').inc()
+            logging.error('[%s] Corrupt message: %s' % (self.__broker, frame.body))
+            _ack(self.__conn, ack_id)
+            return
 
         if not self.__all_vos:
             if 'vo' not in msg or msg['vo'] != get_policy():
+                _ack(self.__conn, ack_id)
                 return
 
         if 'job_metadata' in msg.keys() \
@@ -74,10 +93,28 @@ class Receiver(object):
             if 'job_state' in msg.keys() and (str(msg['job_state']) != str('ACTIVE') or msg.get('job_multihop', False) is True):
                 METRICS.counter('message_rucio').inc()
 
+                if self.__buffer is not None:
+                    # The message is acknowledged by the updater, once its update is committed
+                    while not GRACEFUL_STOP.is_set():
+                        try:
+                            self.__buffer.put((msg, self.__conn, ack_id), timeout=1)
+                            break
+                        except queue.Full:
+                            METRICS.counter('buffer_full').inc()
+                    METRICS.gauge('buffered_messages').set(self.__buffer.qsize())
+                    return
+
                 self._perform_request_update(msg)
 
+        _ack(self.__conn, ack_id)
+
     @transactional_session
     def _perform_request_update(self, msg, *, session=None, logger=logging.log):
+        """
+        Update the request of a message.
+
+        :returns: True if the request was updated, False if there was nothing to update, None on error.
+        """
         external_host = msg.get('endpnt', None)
         request_id = msg['file_metadata'].get('request_id', None)
         try:
@@ -87,8 +124,124 @@ class Receiver(object):
 
                 ret = request_core.update_request_state(tt_status_report, session=session, logger=logger)
                 METRICS.counter('update_request_state.{updated}').labels(updated=ret).inc()
+                return ret
+            return False
+        except Exception:
+            logging.critical(traceback.format_exc())
+
+    @transactional_session
+    def _perform_request_updates(self, msgs, *, session=None, logger=logging.log):
+        """
+        Update the requests of a batch of messages in one transaction.
+
+        :raises RucioException: if one of the updates failed. The whole batch is rolled back.
+        """
+        for msg in msgs:
+            if self._perform_request_update(msg, session=session, logger=logger) is None:
+                raise exception.RucioException('Failed to update the request of message %s' % msg['file_metadata'].get('request_id', None))
+
+
+def _ack(conn, ack_id):
+    """
+    Acknowledge a message. Failures are only logged: unacknowledged messages are redelivered by the broker.
+    """
+    if conn is None or ack_id is None:
+        return
+    try:
+        conn.ack(ack_id)
+    except Exception as error:
+        logging.warning('Failed to acknowledge message %s: %s' % (ack_id, str(error)))
+
+
+def _next_batch(buffer, batch_size, batch_timeout):
+    """
+    Wait for the next batch of buffered messages, which is complete once it holds
+    batch_size messages or batch_timeout seconds after its first message.
+    """
+    try:
+        batch = [buffer.get(timeout=batch_timeout)]
+    except queue.Empty:
+        return []
+    deadline = time.time() + batch_timeout
+    while len(batch) < batch_size:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(buffer.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
+
+
+def _apply_batch(updater, batch):
+    """
+    Apply a batch of buffered messages in one transaction, or message by message if the batch fails,
+    and acknowledge the applied messages.
+
+    A message whose own update raises, e.g. because its transaction could not be committed, is
+    deliberately left unacknowledged, so that the broker delivers it again.
+    """
+    start_time = time.time()
+    msgs = [msg for msg, _, _ in batch]
+    try:
+        updater._perform_request_updates(msgs)
+        applied = batch
+    except Exception as error:
+        logging.warning('Failed to apply %d messages at once, applying them one by one: %s' % (len(msgs), str(error)))
+        METRICS.counter('batch_failure').inc()
+        applied = []
+        for msg, conn, ack_id in batch:
+            try:
+                updater._perform_request_update(msg)
+            except Exception:
+                logging.error('Failed to apply message %s, leaving it unacknowledged: %s' % (ack_id, traceback.format_exc()))
+                METRICS.counter('message_failure').inc()
+                continue
+            applied.append((msg, conn, ack_id))
+    duration = time.time() - start_time
+    METRICS.timer('batch_update').observe(duration)
+    METRICS.counter('batch_messages').inc(len(msgs))
+    logging.debug('Applied %d messages in %.3f seconds' % (len(applied), duration))
+
+    for _, conn, ack_id in applied:
+        _ack(conn, ack_id)
+
+
+def request_updater(updater, buffer, batch_size=100, batch_timeout=0.5):
+    """
+    Apply the buffered messages in micro-batches and acknowledge them once committed.
+    Failures are logged and never stop the updater, as the receivers would otherwise block on the full buffer.
+
+    :param updater:        The Receiver applying the updates.
+    :param buffer:         Bounded queue of (message, connection, ack id) tuples.
+    :param batch_size:     Maximum number of messages per transaction.
+    :param batch_timeout:  Maximum number of seconds a message waits for its batch to be complete.
+    """
+    while not (GRACEFUL_STOP.is_set() and buffer.empty()):
+        try:
+            batch = _next_batch(buffer, batch_size, batch_timeout)
+            METRICS.gauge('buffered_messages').set(buffer.qsize())
+            if batch:
+                _apply_batch(updater, batch)
         except Exception:
+            # The messages of the batch are not acknowledged, the broker delivers them again
             logging.critical(traceback.format_exc())
+            METRICS.counter('updater_failure').inc()
+
+
+def _start_request_updater(updater, buffer, batch_size, batch_timeout):
+    """
+    Start the thread applying the buffered messages.
+    """
+    updater_thread = threading.Thread(target=request_updater,
+                                      kwargs={'updater': updater,
+                                              'buffer': buffer,
+                                              'batch_size': batch_size,
+                                              'batch_timeout': batch_timeout},
+                                      daemon=True)
+    updater_thread.start()
+    return updater_thread
 
 
 def receiver(id_, total_threads=1, all_vos=False):
@@ -144,6 +297,12 @@ def receiver(id_, total_threads=1, all_vos=False):
             )
         conns.append(con)
 
+    batch_size = config_get_int('conveyor', 'receiver_batch_size', False, 100)
+    batch_timeout = config_get_float('conveyor', 'receiver_batch_timeout', False, 0.5)
+    buffer = queue.Queue(maxsize=config_get_int('conveyor', 'receiver_buffer_size', False, 1000))
+    updater = Receiver(broker=None, id_=id_, total_threads=total_threads, all_vos=all_vos)
+    updater_thread = _start_request_updater(updater, buffer, batch_size, batch_timeout)
+
     logging.info('receiver started')
 
     with HeartbeatHandler(executable=DAEMON_NAME, renewal_interval=30) as heartbeat_handler:
@@ -152,6 +311,12 @@ def receiver(id_, total_threads=1, all_vos=False):
 
             _, _, logger = heartbeat_handler.live()
 
+            # Without updater, the receivers would block on the full buffer while the heartbeat reports the daemon alive
+            if not updater_thread.is_alive():
+                logger(logging.CRITICAL, 'The request updater thread stopped, restarting it')
+                METRICS.counter('updater_restart').inc()
+                updater_thread = _start_request_updater(updater, buffer, batch_size, batch_timeout)
+
             for conn in conns:
 
                 if not conn.is_connected():
@@ -159,16 +324,20 @@ def receiver(id_, total_threads=1, all_vos=False):
                     METRICS.counter('reconnect.{host}').labels(host=conn.transport._Transport__host_and_ports[0][0].split('.')[0]).inc()
 
                     conn.set_listener('rucio-messaging-fts3', Receiver(broker=conn.transport._Transport__host_and_ports[0],
-                                                                       id_=id_, total_threads=total_threads, all_vos=all_vos))
+                                                                       id_=id_, total_threads=total_threads, all_vos=all_vos,
+                                                                       conn=conn, buffer=buffer))
                     if not use_ssl:
                         conn.connect(username, password, wait=True)
                     else:
                         conn.connect(wait=True)
                     conn.subscribe(destination=config_get('messaging-fts3', 'destination'),
                                    id='rucio-messaging-fts3',
-                                   ack='auto')
+                                   ack='client-individual')
             time.sleep(1)
 
+        # Apply and acknowledge the buffered messages before disconnecting
+        updater_thread.join()
+
         for conn in conns:
             try:
                 conn.disconnect()
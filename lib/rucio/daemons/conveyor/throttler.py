@@ -18,6 +18,7 @@ Conveyor throttler is a daemon to manage rucio internal queue.
 """
 import logging
 import threading
+import time
 import traceback
 from collections import defaultdict
 from types import FrameType
@@ -28,11 +29,13 @@ from sqlalchemy import null
 
 import rucio.db.sqla.util
 from rucio.common import exception
+from rucio.common.config import config_get_int
 from rucio.common.logging import setup_logging
 from rucio.core.monitor import MetricManager
-from rucio.core.request import (get_request_stats, release_all_waiting_requests, release_waiting_requests_fifo,
-                                release_waiting_requests_grouped_fifo, set_transfer_limit_stats, re_sync_all_transfer_limits)
-from rucio.core.rse import RseCollection
+from rucio.core.request import (compact_request_counters, get_request_counters, get_request_stats, reconcile_request_counters,
+                                release_all_waiting_requests, release_waiting_requests_fifo, release_waiting_requests_grouped_fifo,
+                                request_counters_enabled, set_transfer_limit_stats, re_sync_all_transfer_limits)
+from rucio.core.rse import RseCollection, RseRegistry
 from rucio.core.transfer import applicable_rse_transfer_limits
 from rucio.daemons.common import db_workqueue, ProducerConsumerDaemon
 from rucio.db.sqla.constants import RequestState, TransferLimitDirection
@@ -42,6 +45,7 @@ if TYPE_CHECKING:
 
 GRACEFUL_STOP = threading.Event()
 METRICS = MetricManager(module=__name__)
+RSE_REGISTRY = RseRegistry()
 DAEMON_NAME = 'conveyor-throttler'
 
 
@@ -56,6 +60,9 @@ def throttler(
 
     logging.info('Throttler starting')
 
+    reconcile_interval = config_get_int('throttler', 'reconcile_interval', raise_exception=False, default=3600)
+    last_reconcile = 0.0
+
     @db_workqueue(
         once=once,
         graceful_stop=GRACEFUL_STOP,
@@ -63,14 +70,24 @@ def throttler(
         partition_wait_time=partition_wait_time,
         sleep_time=sleep_time)
     def _db_producer(*, activity: str, heartbeat_handler: "HeartbeatHandler"):
+        nonlocal last_reconcile
         worker_number, total_workers, logger = heartbeat_handler.live()
         if worker_number != 0:
             logger(logging.INFO, 'Throttler thread id is not 0, will sleep. Only thread 0 will work')
             return True, None
 
         re_sync_all_transfer_limits()
-        rse_collection = RseCollection()
-        release_groups = _get_request_stats(rse_collection, logger=logger)
+        incremental = request_counters_enabled()
+        if incremental:
+            if time.time() - last_reconcile >= reconcile_interval:
+                logger(logging.INFO, 'Reconciling the request counters with the requests table')
+                reconcile_request_counters()
+                last_reconcile = time.time()
+            else:
+                compact_request_counters()
+        RSE_REGISTRY.refresh()
+        rse_collection = RSE_REGISTRY.collection()
+        release_groups = _get_request_stats(rse_collection, incremental=incremental, logger=logger)
         return True, release_groups
 
     def _consumer(release_groups):
@@ -192,7 +209,136 @@ class RequestGrouper:
         return merged_groups
 
 
-def _get_request_stats(rse_collection: RseCollection, *, logger=logging.log):
+def _add_group_counters(counters, source_rse_id, dest_rse_id, activity, account, waiting, active):
+    if account is None:
+        # account == None results in SQL queries which doesn't filter on account at all.
+        # While account == null() explicitly filters on "account is NULL" in the database.
+        # Here we want the second case.
+        account = null()
+    group_counters = counters.setdefault((source_rse_id, dest_rse_id, activity), {})
+    account_counters = group_counters.setdefault(account, [0, 0])
+    account_counters[0] += waiting
+    account_counters[1] += active
+
+
+def _group_request_stats(db_stats):
+    """
+    Sum the rows returned by get_request_stats per (source rse, destination rse, activity, account)
+    for waiting and active requests separately, which collapses the different active states into one entry.
+
+    :param db_stats: Rows with account, state, dest_rse_id, source_rse_id, activity and counter.
+    :returns:        Dictionary {(source_rse_id, dest_rse_id, activity): {account: [waiting, active]}}.
+    """
+    counters = {}
+    for db_stat in db_stats:
+        if not db_stat.counter:
+            continue
+        if db_stat.state == RequestState.WAITING:
+            waiting, active = db_stat.counter, 0
+        else:
+            waiting, active = 0, db_stat.counter
+        _add_group_counters(counters, db_stat.source_rse_id, db_stat.dest_rse_id, db_stat.activity, db_stat.account, waiting, active)
+    return counters
+
+
+def _group_request_counters(db_counters):
+    """
+    Same as _group_request_stats, for the rows returned by get_request_counters.
+    """
+    counters = {}
+    for db_counter in db_counters:
+        waiting, active = max(db_counter.waiting or 0, 0), max(db_counter.active or 0, 0)
+        if not waiting and not active:
+            continue
+        _add_group_counters(counters, db_counter.source_rse_id, db_counter.dest_rse_id, db_counter.activity, db_counter.account, waiting, active)
+    return counters
+
+
+def _aggregate_request_stats(counters, rse_collection: RseCollection, *, logger=logging.log):
+    """
+    Compute per-limit statistics and groups of waiting requests from the request counters.
+
+    Each distinct RSE is resolved once and the applicable limits are looked up
+    once per (rse, activity), instead of once per group.
+
+    :param counters:       Dictionary {(source_rse_id, dest_rse_id, activity): {account: [waiting, active]}}.
+    :param rse_collection: The RseCollection used to resolve the RSEs.
+    :param logger:         Optional decorated logger that can be passed from the calling daemons or servers.
+    :returns:              A tuple (limit_stats, grouper).
+    """
+    rses = {}
+    for source_rse_id, dest_rse_id, _ in counters:
+        for rse_id in (source_rse_id, dest_rse_id):
+            if rse_id and rse_id not in rses:
+                try:
+                    rses[rse_id] = rse_collection[rse_id].ensure_loaded(load_transfer_limits=True, load_name=True, load_columns=True)
+                except exception.RSENotFound:
+                    logger(logging.INFO, "RSE %s not found. Probably deleted.", rse_id)
+                    rses[rse_id] = None
+
+    source_limits_cache = {}
+    dest_limits_cache = {}
+
+    def _limits(cache, rse, activity, **kwargs):
+        key = (rse.id if rse else None, activity)
+        limits = cache.get(key)
+        if limits is None:
+            limits = cache[key] = list(applicable_rse_transfer_limits(activity=activity, **kwargs))
+        return limits
+
+    # for each active limit, compute how many waiting and active transfers are currently in the database
+    limit_stats = {}
+    # for each group of (source_rse, destination_rse, activity) of waiting requests, find the limits which must be enforced
+    grouper = RequestGrouper()
+    for (source_rse_id, dest_rse_id, activity), group_counters in counters.items():
+        dest_rse = rses.get(dest_rse_id)
+        if dest_rse is None:
+            continue
+        source_rse = None
+        if source_rse_id:
+            source_rse = rses[source_rse_id]
+            if source_rse is None:
+                continue
+
+        limits = (_limits(source_limits_cache, source_rse, activity, source_rse=source_rse)
+                  + _limits(dest_limits_cache, dest_rse, activity, dest_rse=dest_rse))
+        has_waiting = any(waiting for waiting, _ in group_counters.values())
+        if not limits and not has_waiting:
+            continue
+
+        applicable_limits = []
+        for limit in limits:
+            limit_stat = limit_stats.get(limit['id'])
+            if limit_stat is None:
+                limit_stat = limit_stats[limit['id']] = {
+                    'limit': limit,
+                    'stat': {
+                        'waiting': 0,
+                        'active': 0,
+                        'accounts': {},
+                    }
+                }
+            applicable_limits.append(limit_stat)
+
+            stat = limit_stat['stat']
+            for account, (waiting, active) in group_counters.items():
+                account_stat = stat['accounts'].setdefault(account, {'waiting': 0, 'active': 0})
+                account_stat['waiting'] += waiting
+                account_stat['active'] += active
+                stat['waiting'] += waiting
+                stat['active'] += active
+
+        if has_waiting:
+            grouper.record_waiting_request_group(
+                source_rse=source_rse,
+                dest_rse=dest_rse,
+                activity=activity,
+                applicable_limits=applicable_limits,
+            )
+    return limit_stats, grouper
+
+
+def _get_request_stats(rse_collection: RseCollection, *, incremental=False, logger=logging.log):
     """
     Group waiting requests into arbitrary groups for bulk handling.
     The current grouping (source rse + dest rse + activity) was dictated
@@ -205,84 +351,22 @@ def _get_request_stats(rse_collection: RseCollection, *, logger=logging.log):
     limit can be shared by multiple groups.
 
     For each limit, compute the total number of active and waiting transfers
-    subject to that limit.
+    subject to that limit. If incremental is set, the number of transfers is
+    read from the request counters instead of the requests table.
     """
     logging.info("Throttler retrieve requests statistics")
 
-    db_stats = get_request_stats(
-        state=[RequestState.QUEUED,
-               RequestState.SUBMITTING,
-               RequestState.SUBMITTED,
-               RequestState.WAITING],
-    )
-
-    # for each active limit, compute how many waiting and active transfers are currently in the database
-    limit_stats = {}
-    # for each group of (source_rse, destination_rse, activity) of waiting requests, find the limits which must be enforced
-    grouper = RequestGrouper()
-    for db_stat in db_stats:
-        account = db_stat.account
-        state = db_stat.state
-        counter = db_stat.counter
-        activity = db_stat.activity
-
-        try:
-            dest_rse = rse_collection[db_stat.dest_rse_id].ensure_loaded(load_transfer_limits=True, load_name=True, load_columns=True)
-        except exception.RSENotFound:
-            logger(logging.INFO, "Destination RSE {} not found. Probably deleted.", db_stat.dest_rse_id)
-            continue
-        source_rse = None
-        if db_stat.source_rse_id:
-            try:
-                source_rse = rse_collection[db_stat.source_rse_id].ensure_loaded(load_transfer_limits=True, load_name=True, load_columns=True)
-            except exception.RSENotFound:
-                logger(logging.INFO, "Source RSE {} not found. Probably deleted.", db_stat.source_rse_id)
-                continue
-
-        source_limits = list(applicable_rse_transfer_limits(activity=activity, source_rse=source_rse))
-        dest_limits = list(applicable_rse_transfer_limits(activity=activity, dest_rse=dest_rse))
-        limits = source_limits + dest_limits
-
-        if counter and (limits or state == RequestState.WAITING):
-            applicable_limits = []
-            for limit in limits:
-                limit_stat = limit_stats.setdefault(limit['id'], {})
-                applicable_limits.append(limit_stat)
-
-                if not limit_stat:
-                    limit_stat.update({
-                        'limit': limit,
-                        'stat': {
-                            'waiting': 0,
-                            'active': 0,
-                            'accounts': {},
-                        }
-                    })
-
-                if account is None:
-                    # account == None results in SQL queries which doesn't filter on account at all.
-                    # While account == null() explicitly filters on "account is NULL" in the database.
-                    # Here we want the second case.
-                    account = null()
-
-                stat = limit_stat['stat']
-                if account not in stat['accounts']:
-                    stat['accounts'][account] = {'waiting': 0, 'active': 0}
-
-                if state == RequestState.WAITING:
-                    stat['waiting'] += counter
-                    stat['accounts'][account]['waiting'] += counter
-                else:
-                    stat['active'] += counter
-                    stat['accounts'][account]['active'] += counter
-
-            if state == RequestState.WAITING:
-                grouper.record_waiting_request_group(
-                    source_rse=source_rse,
-                    dest_rse=dest_rse,
-                    activity=activity,
-                    applicable_limits=applicable_limits,
-                )
+    if incremental:
+        counters = _group_request_counters(get_request_counters())
+    else:
+        db_stats = get_request_stats(
+            state=[RequestState.QUEUED,
+                   RequestState.SUBMITTING,
+                   RequestState.SUBMITTED,
+                   RequestState.WAITING],
+        )
+        counters = _group_request_stats(db_stats)
+    limit_stats, grouper = _aggregate_request_stats(counters, rse_collection, logger=logger)
 
     # Find the residual capacity in each of the limits
     for limit_stat in limit_stats.values():
@@ -48,7 +48,7 @@ from rucio.core.message import add_message
 from rucio.core.monitor import MetricManager
 from rucio.core.oidc import get_token_for_account_operation
 from rucio.core.replica import list_and_mark_unlocked_replicas, delete_replicas
-from rucio.core.rse import list_rses, RseData
+from rucio.core.rse import list_rses, RseData, RseRegistry
 from rucio.core.rse_expression_parser import parse_expression
 from rucio.core.rule import get_evaluation_backlog
 from rucio.core.vo import list_vos
@@ -65,6 +65,7 @@ if TYPE_CHECKING:
 GRACEFUL_STOP = threading.Event()
 METRICS = MetricManager(module=__name__)
 REGION = make_region_memcached(expiration_time=600)
+RSE_REGISTRY = RseRegistry()
 DAEMON_NAME = 'reaper'
 
 EXCLUDED_RSE_GAUGE = METRICS.gauge('excluded_rses.{rse}', documentation='Temporarly excluded RSEs')
@@ -455,7 +456,10 @@ def run_once(rses, include_rses, exclude_rses, vos, chunk_size, greedy, scheme,
             return must_sleep
 
     rses_to_process = get_rses_to_process(rses, include_rses, exclude_rses, vos)
-    rses_to_process = [RseData(id_=rse['id'], name=rse['rse'], columns=rse) for rse in rses_to_process]
+    # The attributes, protocols and limits of the RSEs are taken from a snapshot refreshed in bulk
+    RSE_REGISTRY.refresh()
+    rses_to_process = [RSE_REGISTRY.rse_data(rse['id']) if rse['id'] in RSE_REGISTRY.snapshot else RseData(id_=rse['id'], name=rse['rse'], columns=rse)
+                       for rse in rses_to_process]
     if not rses_to_process:
         logger(logging.ERROR, 'Reaper: No RSEs found. Will sleep for 30 seconds')
         return must_sleep
@@ -597,16 +601,19 @@ def _run_once(rses_to_process, chunk_size, greedy, scheme,
                 if token_dict is not None and 'token' in token_dict:
                     auth_token = token_dict['token']
                     logger(logging.DEBUG, 'OIDC authentication used for deletion.')
-            prot = rsemgr.create_protocol(rse.info, 'delete', scheme=scheme, auth_token=auth_token, logger=logger)
+            if auth_token:
+                prot = rsemgr.create_protocol(rse.info, 'delete', scheme=scheme, auth_token=auth_token, logger=logger)
+            else:
+                prot = rsemgr.get_cached_protocol(rse.id, 'delete', scheme=scheme, logger=logger)
+            # The PFNs are built without authentication token, the same protocol serves every replica
+            pfn_prot = rsemgr.get_cached_protocol(rse.id, 'delete', scheme=scheme, logger=logger)
             for file_replicas in chunks(replicas, chunk_size):
                 # Refresh heartbeat
                 _, total_workers, logger = heartbeat_handler.live(payload=hb_payload)
                 del_start_time = time.time()
                 for replica in file_replicas:
                     try:
-                        replica['pfn'] = str(list(rsemgr.lfns2pfns(rse_settings=rse.info,
-                                                                   lfns=[{'scope': replica['scope'].external, 'name': replica['name'], 'path': replica['path']}],
-                                                                   operation='delete', scheme=scheme).values())[0])
+                        replica['pfn'] = str(list(pfn_prot.lfns2pfns(lfns=[{'scope': replica['scope'].external, 'name': replica['name'], 'path': replica['path']}]).values())[0])
                     except (ReplicaUnAvailable, ReplicaNotFound) as error:
                         logger(logging.WARNING, 'Failed get pfn UNAVAILABLE replica %s:%s on %s with error %s', replica['scope'], replica['name'], rse.name, str(error))
                         replica['pfn'] = None
@@ -38,7 +38,7 @@ from rucio.common.types import InternalAccount, InternalScope
 from rucio.core.did import touch_dids, list_parent_dids
 from rucio.core.lock import touch_dataset_locks
 from rucio.core.monitor import MetricManager
-from rucio.core.replica import touch_replica, touch_collection_replicas, declare_bad_file_replicas
+from rucio.core.replica import touch_replica, touch_replicas, touch_collection_replicas, declare_bad_file_replicas
 from rucio.core.rse import get_rse_id
 from rucio.daemons.common import HeartbeatHandler, run_daemon
 from rucio.db.sqla.constants import DIDType, BadFilesStatus
@@ -273,6 +273,27 @@ class AMQConsumer:
         self.__logger(logging.DEBUG, "trying to update replicas: %s", replicas)
 
         stopwatch = Stopwatch()
+        try:
+            # touch all replicas of the chunk at once and fall back to one by one on lock contention
+            nb_touched = touch_replicas(replicas)
+            METRICS.counter('bulk_touched_replicas').inc(nb_touched)
+        except DatabaseException:
+            self.__logger(logging.WARNING, "Bulk update of replicas failed, updating them one by one.", exc_info=True)
+            METRICS.counter('bulk_touch_error').inc()
+            self.__touch_replicas_one_by_one(replicas)
+        except Exception:
+            self.__logger(logging.ERROR, "Cannot update replicas.", exc_info=True)
+            METRICS.counter('update_error').inc()
+        METRICS.timer('update_atime').observe(stopwatch.elapsed)
+        if stopwatch.elapsed > 0:
+            METRICS.gauge('touched_replicas_per_second').set(len(replicas) / stopwatch.elapsed)
+
+        METRICS.counter('updated_replicas').inc()
+
+    def __touch_replicas_one_by_one(self, replicas):
+        """
+        Update atime replica by replica, and put traces of locked replicas back into the queue.
+        """
         try:
             for replica in replicas:
                 # if touch replica hits a locked row put the trace back into queue for later retry
@@ -289,13 +310,10 @@ class AMQConsumer:
                         resubmit['vo'] = replica['scope'].vo
                     self.__conn.send(body=jdumps(resubmit), destination=self.__queue, headers={'appversion': 'rucio', 'resubmitted': '1'})
                     METRICS.counter('sent_resubmitted').inc()
-            METRICS.timer('update_atime').observe(stopwatch.elapsed)
         except Exception:
             self.__logger(logging.ERROR, "Cannot update replicas.", exc_info=True)
             METRICS.counter('update_error').inc()
 
-        METRICS.counter('updated_replicas').inc()
-
 
 def kronos_file(once: bool = False, dataset_queue: Queue = None, sleep_time: int = 60):
     """
@@ -15,16 +15,18 @@
 
 import functools
 import logging
+import queue
 import re
 import threading
 import time
-from collections.abc import Callable
+from collections import defaultdict
+from collections.abc import Callable, Iterable
 from datetime import datetime
 from json import loads, dumps
 from typing import TYPE_CHECKING
 
 import rucio.db.sqla.util
-from rucio.common.config import config_get
+from rucio.common.config import config_get, config_get_int
 from rucio.common.exception import (
     DatabaseException,
     InvalidReplicationRule,
@@ -42,12 +44,12 @@ from rucio.common.logging import setup_logging
 from rucio.common.stopwatch import Stopwatch
 from rucio.common.types import InternalAccount
 from rucio.common.utils import chunks
-from rucio.core.did import list_new_dids, set_new_dids, get_metadata
+from rucio.core.did import list_new_dids, set_new_dids, get_metadata_bulk
 from rucio.core.monitor import MetricManager
 from rucio.core.rse import list_rses, rse_exists, get_rse_id, list_rse_attributes
 from rucio.core.rse_expression_parser import parse_expression
 from lib.rucio.core.rse_selector import resolve_rse_expression
-from rucio.core.rule import add_rule, list_rules, get_rule
+from rucio.core.rule import add_rule, add_rules, list_rules, get_rule
 from rucio.core.subscription import list_subscriptions, update_subscription
 from rucio.daemons.common import run_daemon
 from rucio.db.sqla.constants import DIDType, SubscriptionState
@@ -292,93 +294,152 @@ def get_subscriptions(logger: Callable = logging.log) -> list[dict]:
     return subscriptions
 
 
-def __is_matching_subscription(subscription, did, metadata):
+class SubscriptionMatcher:
     """
-    Internal method to identify if a DID matches a subscription.
+    Match DIDs against a list of subscriptions.
 
-    :param subscription: The subscription dictionary.
-    :param did: The DID dictionary
-    :param metadata: The metadata dictionnary for the DID
-    :return: True/False
+    The filters of the subscriptions are parsed and their regular expressions
+    compiled once. The subscriptions are indexed by the DID types and accounts
+    they accept, and the result of the scope filters is cached per scope, so
+    that only the remaining candidates are evaluated for each DID.
     """
-    if metadata["hidden"]:
-        return False
-    try:
-        filter_string = loads(subscription["filter"])
-    except ValueError as error:
-        logging.error("%s : Subscription will be skipped" % error)
-        return False
-    # Loop over the keys of filter_string for subscription
-    for key in filter_string:
-        values = filter_string[key]
-        if key == "pattern":
-            if not re.match(values, did["name"]):
-                return False
-        elif key == "excluded_pattern":
-            if re.match(values, did["name"]):
-                return False
-        elif key == "split_rule":
-            pass
-        elif key == "scope":
-            match_scope = False
-            for scope in values:
-                if re.match(scope, did["scope"].internal):
-                    match_scope = True
-                    break
-            if not match_scope:
-                return False
-        elif key == "account":
-            match_account = False
-            if not isinstance(values, list):
-                values = [values]
-            for account in values:
-                if account == metadata["account"].internal:
-                    match_account = True
-                    break
-            if not match_account:
-                return False
-        elif key == "did_type":
-            match_did_type = False
-            if not isinstance(values, list):
-                values = [values]
-            for did_type in values:
-                if did_type == metadata["did_type"].name:
-                    match_did_type = True
-                    break
-            if not match_did_type:
-                return False
-        elif key in ["min_avg_file_size", "max_avg_file_size"]:
-            length = metadata["length"]
-            size = metadata["bytes"]
-            if length and size:
-                avg_file_size = size / length
-                if key == "min_avg_file_size" and avg_file_size < values:
-                    return False
-                if key == "max_avg_file_size" and avg_file_size > values:
-                    return False
-            else:
-                # If the DID is evaluated at the creation, length and bytes are not set yet
-                # In that case, just ignore min_avg_file_size and max_avg_file_size filter
+
+    def __init__(self, subscriptions: list[dict], logger: "Callable" = logging.log):
+        """
+        :param subscriptions: The subscriptions, in order of priority.
+        :param logger: The logger.
+        """
+        self.subscriptions = []
+        self._checks = []
+        self._scope_patterns = {}
+        self._scope_candidates = {}
+        self._did_type_index = defaultdict(set)
+        self._any_did_type = set()
+        self._account_index = defaultdict(set)
+        self._any_account = set()
+
+        for subscription in subscriptions:
+            try:
+                filter_string = loads(subscription["filter"])
+                checks, scope_patterns, did_types, accounts = self.__compile_filter(filter_string)
+            except (ValueError, TypeError, re.error) as error:
+                logger(logging.ERROR, "%s : Subscription %s will be skipped" % (error, subscription["name"]))
                 continue
-        else:
-            if not isinstance(values, list):
-                values = [
-                    values,
-                ]
-            has_metadata = False
-            for meta in metadata:
-                if str(meta) == str(key):
-                    has_metadata = True
-                    match_meta = False
-                    for value in values:
-                        if re.match(str(value), str(metadata[meta])):
-                            match_meta = True
-                            break
-                    if not match_meta:
-                        return False
-            if not has_metadata:
-                return False
-    return True
+            idx = len(self.subscriptions)
+            self.subscriptions.append(subscription)
+            self._checks.append(checks)
+            if scope_patterns is not None:
+                self._scope_patterns[idx] = scope_patterns
+            if did_types is None:
+                self._any_did_type.add(idx)
+            for did_type in did_types or ():
+                self._did_type_index[did_type].add(idx)
+            if accounts is None:
+                self._any_account.add(idx)
+            for account in accounts or ():
+                self._account_index[account].add(idx)
+
+    @staticmethod
+    def __compile_filter(filter_string: dict) -> tuple:
+        """
+        Compile a subscription filter.
+
+        :return: A tuple with the list of checks evaluated for each DID, the compiled scope
+                 patterns, and the accepted DID types and accounts. The last three are None
+                 if the filter doesn't restrict them.
+        """
+        checks = []
+        scope_patterns, did_types, accounts = None, None, None
+        for key, values in filter_string.items():
+            if key == "pattern":
+                checks.append(functools.partial(_check_pattern, re.compile(values)))
+            elif key == "excluded_pattern":
+                checks.append(functools.partial(_check_excluded_pattern, re.compile(values)))
+            elif key == "split_rule":
+                pass
+            elif key == "scope":
+                scope_patterns = [re.compile(scope) for scope in values]
+            elif key == "account":
+                accounts = set(values if isinstance(values, list) else [values])
+            elif key == "did_type":
+                did_types = set(values if isinstance(values, list) else [values])
+            elif key in ["min_avg_file_size", "max_avg_file_size"]:
+                checks.append(functools.partial(_check_avg_file_size, key, values))
+            else:
+                if not isinstance(values, list):
+                    values = [values]
+                checks.append(functools.partial(_check_metadata, str(key), [re.compile(str(value)) for value in values]))
+        return checks, scope_patterns, did_types, accounts
+
+    def __matching_scope(self, scope: str) -> set:
+        """
+        Return the subscriptions whose scope filter accepts the scope.
+        """
+        candidates = self._scope_candidates.get(scope)
+        if candidates is None:
+            candidates = set(range(len(self.subscriptions)))
+            for idx, patterns in self._scope_patterns.items():
+                if not any(pattern.match(scope) for pattern in patterns):
+                    candidates.discard(idx)
+            self._scope_candidates[scope] = candidates
+        return candidates
+
+    def matching_subscriptions(self, did: dict, metadata: dict) -> list[dict]:
+        """
+        Return the subscriptions matched by a DID, in order of priority.
+
+        :param did: The DID dictionary.
+        :param metadata: The metadata dictionary of the DID.
+        :return: The list of matching subscriptions.
+        """
+        if metadata["hidden"]:
+            return []
+        candidates = self._did_type_index.get(metadata["did_type"].name, set()) | self._any_did_type
+        account = metadata["account"].internal if metadata["account"] else None
+        candidates &= self._account_index.get(account, set()) | self._any_account
+        candidates &= self.__matching_scope(did["scope"].internal)
+        if not candidates:
+            return []
+        metadata_by_key = {str(key): value for key, value in metadata.items()}
+        return [self.subscriptions[idx] for idx in sorted(candidates)
+                if all(check(did, metadata, metadata_by_key) for check in self._checks[idx])]
+
+    def match(self, dids_and_metadata: "Iterable[tuple[dict, dict]]") -> list[list[dict]]:
+        """
+        Match a batch of DIDs against all subscriptions.
+
+        :param dids_and_metadata: The (DID dictionary, metadata dictionary) pairs.
+        :return: The list of matching subscriptions of each DID.
+        """
+        return [self.matching_subscriptions(did, metadata) for did, metadata in dids_and_metadata]
+
+
+def _check_pattern(regex, did, metadata, metadata_by_key):
+    return regex.match(did["name"]) is not None
+
+
+def _check_excluded_pattern(regex, did, metadata, metadata_by_key):
+    return regex.match(did["name"]) is None
+
+
+def _check_avg_file_size(key, values, did, metadata, metadata_by_key):
+    length = metadata["length"]
+    size = metadata["bytes"]
+    if not (length and size):
+        # If the DID is evaluated at the creation, length and bytes are not set yet
+        # In that case, just ignore min_avg_file_size and max_avg_file_size filter
+        return True
+    avg_file_size = size / length
+    if key == "min_avg_file_size":
+        return avg_file_size >= values
+    return avg_file_size <= values
+
+
+def _check_metadata(key, regexes, did, metadata, metadata_by_key):
+    if key not in metadata_by_key:
+        return False
+    value = str(metadata_by_key[key])
+    return any(regex.match(value) for regex in regexes)
 
 
 def select_algorithm(algorithm: str, rule_ids: list, params: dict, logger: "Callable") -> dict:
@@ -477,215 +538,393 @@ def transmogrifier(bulk: int = 5, once: bool = False, sleep_time: int = 60) -> N
     )
 
 
+def __create_rules_for_did(did: dict, subscription: dict, blocklisted_rse_id: list, logger: "Callable") -> bool:
+    """
+    Create the rules of a subscription for one DID, one rule at a time.
+
+    :param did: The DID matching the subscription.
+    :param subscription: The subscription.
+    :param blocklisted_rse_id: The list of blocklisted_rse_id.
+    :param logger: The logger.
+    :return: False if the DID must be reevaluated at the next cycle, True otherwise.
+    """
+    did_success = True
+    filter_string = loads(subscription["filter"])
+    split_rule = filter_string.get("split_rule", False)
+    stime = time.time()
+    rules = loads(subscription["replication_rules"])
+    created_rules = {}
+    for cnt, rule_dict in enumerate(rules):
+        created_rules[cnt + 1] = []
+        #  Get all the rule and subscription parameters
+        rule_dict = __get_rule_dict(rule_dict, subscription)
+        weight = rule_dict.get("weight", None)
+        source_replica_expression = rule_dict.get(
+            "source_replica_expression", None
+        )
+        copies = rule_dict["copies"]
+        success = False
+
+        chained_idx = rule_dict.get("chained_idx", None)
+        #  By default selected_rses contains only the rse_expression
+        #  It is overwritten in 2 cases : Chained subscription and split_rule
+        selected_rses = [rule_dict.get("rse_expression")]
+        if chained_idx:
+            #  In the case of chained subscription, don't use rseselector but use the rses returned by the algorithm
+            params = {}
+            params['rse_expression'] = rule_dict.get("rse_expression")
+            params['subscription_id'] = subscription["id"]
+            params['subscription_name'] = subscription["name"]
+            params['blocklisted_rse_id'] = blocklisted_rse_id
+            if rule_dict.get("associated_site_idx", None):
+                params["associated_site_idx"] = rule_dict.get(
+                    "associated_site_idx", None
+                )
+            logger(
+                logging.DEBUG,
+                "Chained subscription identified. Will use %s",
+                str(created_rules[chained_idx]),
+            )
+            algorithm = rule_dict.get("algorithm", None)
+            selected_rses = select_algorithm(
+                algorithm,
+                created_rules[chained_idx],
+                params,
+                logger
+            )
+            copies = 1
+        elif split_rule:
+            (
+                selected_rses,
+                create_rule,
+                wont_reevaluate,
+            ) = __split_rule_select_rses(
+                subscription_id=subscription["id"],
+                subscription_name=subscription["name"],
+                scope=did["scope"],
+                name=did["name"],
+                account=rule_dict.get("account"),
+                weight=weight,
+                rse_expression=rule_dict.get("rse_expression"),
+                copies=copies,
+                blocklisted_rse_id=blocklisted_rse_id,
+                logger=logger,
+            )
+            copies = 1
+            if not create_rule:
+                continue
+            # The DID won't be reevaluated at the next cycle
+            did_success = did_success and wont_reevaluate
+
+        nb_rule = 0
+        #  Try to create the rule
+        logger(logging.DEBUG, 'selected_rses : %s' % selected_rses)
+        try:
+            for rse in selected_rses:
+                if isinstance(selected_rses, dict):
+                    #  selected_rses is a dictionary only when split_rule is True or for chained subscriptions
+                    source_replica_expression = selected_rses[rse].get(
+                        "source_replica_expression",
+                        None,
+                    )
+                    weight = selected_rses[rse].get("weight", None)
+                logger(
+                    logging.INFO,
+                    "Will insert one rule for %s:%s on %s"
+                    % (did["scope"], did["name"], rse),
+                )
+                rule_ids = add_rule(
+                    dids=[
+                        {
+                            "scope": did["scope"],
+                            "name": did["name"],
+                        }
+                    ],
+                    account=rule_dict.get("account"),
+                    copies=copies,
+                    rse_expression=rse,
+                    grouping=rule_dict.get("grouping", "DATASET"),
+                    weight=weight,
+                    lifetime=rule_dict.get("lifetime", None),
+                    locked=rule_dict.get("locked", None),
+                    subscription_id=subscription["id"],
+                    source_replica_expression=source_replica_expression,
+                    activity=rule_dict.get("activity"),
+                    purge_replicas=rule_dict.get("purge_replicas", False),
+                    ignore_availability=rule_dict.get(
+                        "ignore_availability", None
+                    ),
+                    comment=rule_dict.get("comment"),
+                    delay_injection=rule_dict.get("delay_injection"),
+                )
+                created_rules[cnt + 1].append(rule_ids[0])
+                nb_rule += 1
+                if nb_rule == copies:
+                    success = True
+                if split_rule:
+                    success = True
+
+            METRICS.counter("addnewrule.done").inc(nb_rule)
+            METRICS.counter("addnewrule.activity.{activity}").labels(activity="".join(rule_dict.get("activity").split())).inc(nb_rule)
+            success = True
+        except (
+            InvalidReplicationRule,
+            InvalidRuleWeight,
+            InvalidRSEExpression,
+            StagingAreaRuleRequiresLifetime,
+            DuplicateRule,
+        ) as error:
+            # Errors that won't be retried
+            success = True
+            logger(logging.ERROR, str(error))
+            METRICS.counter("addnewrule.errortype.{exception}").labels(exception=str(error.__class__.__name__)).inc()
+        except Exception:
+            # Errors that will be retried
+            METRICS.counter("addnewrule.errortype.{exception}").labels(exception="unknown").inc()
+            logger(logging.ERROR, "Unexpected error", exc_info=True)
+
+        did_success = did_success and success
+        if not success:
+            logger(
+                logging.ERROR,
+                "Rule for %s:%s on %s cannot be inserted"
+                % (
+                    did["scope"],
+                    did["name"],
+                    rule_dict.get("rse_expression"),
+                ),
+            )
+        else:
+            logger(
+                logging.INFO,
+                "%s rule(s) inserted in %f seconds"
+                % (str(nb_rule), time.time() - stime),
+            )
+    return did_success
+
+
+def __get_bulk_rules(subscription: dict) -> "Optional[list[dict]]":
+    """
+    Internal method to build the rules of a subscription in the format of add_rules.
+
+    :param subscription: The subscription.
+    :return: The list of rules, or None if the rules of the subscription depend on the DID
+             (split_rule or chained subscriptions) and must be created one DID at a time.
+    """
+    if loads(subscription["filter"]).get("split_rule", False):
+        return None
+    rules = []
+    for rule_dict in loads(subscription["replication_rules"]):
+        rule_dict = __get_rule_dict(rule_dict, subscription)
+        if rule_dict["chained_idx"]:
+            return None
+        rules.append({
+            "account": rule_dict["account"],
+            "copies": rule_dict["copies"],
+            "rse_expression": rule_dict["rse_expression"],
+            "grouping": rule_dict.get("grouping", "DATASET"),
+            "weight": rule_dict.get("weight", None),
+            "lifetime": rule_dict.get("lifetime", None),
+            "locked": rule_dict["locked"],
+            "subscription_id": subscription["id"],
+            "source_replica_expression": rule_dict["source_replica_expression"],
+            "activity": rule_dict["activity"],
+            "purge_replicas": rule_dict["purge_replicas"],
+            "ignore_availability": rule_dict.get("ignore_availability", None),
+            "comment": rule_dict["comment"],
+            "delay_injection": rule_dict["delay_injection"],
+        })
+    return rules
+
+
+def __create_rules_bulk(dids: list[dict], subscription: dict, rules: list[dict], logger: "Callable") -> bool:
+    """
+    Create the rules of a subscription for several DIDs in a single transaction.
+
+    :param dids: The DIDs matching the subscription.
+    :param subscription: The subscription.
+    :param rules: The rules of the subscription, as returned by __get_bulk_rules.
+    :param logger: The logger.
+    :return: True if all the rules were created, False if the transaction was rolled back.
+    """
+    stime = time.time()
+    try:
+        # add_rules modifies the rules, each transaction gets its own copy
+        add_rules(
+            dids=[{"scope": did["scope"], "name": did["name"]} for did in dids],
+            rules=[dict(rule) for rule in rules],
+        )
+    except Exception as error:
+        logger(
+            logging.DEBUG,
+            "Cannot insert the rules of subscription %s for %i DIDs in one transaction, falling back to one DID at a time : %s"
+            % (subscription["name"], len(dids), str(error)),
+        )
+        return False
+    nb_rule = len(dids) * len(rules)
+    METRICS.counter("addnewrule.done").inc(nb_rule)
+    for rule in rules:
+        METRICS.counter("addnewrule.activity.{activity}").labels(activity="".join(rule["activity"].split())).inc(len(dids))
+    logger(
+        logging.INFO,
+        "%i rule(s) of subscription %s inserted for %i DIDs in %f seconds"
+        % (nb_rule, subscription["name"], len(dids), time.time() - stime),
+    )
+    return True
+
+
+def _produce_did_batches(
+    worker_number: int,
+    total_workers: int,
+    bulk: int,
+    batch_size: int,
+    batches: "queue.Queue",
+    stop_event: threading.Event,
+    logger: "Callable",
+) -> None:
+    """
+    List the new DIDs and fetch the metadata of the datasets and containers in batches.
+    The batches are put in the queue, followed by None once all the DIDs are listed.
+
+    :param worker_number: The number of the worker.
+    :param total_workers: The total number of workers.
+    :param bulk: The maximal number of DIDs to list.
+    :param batch_size: The number of DIDs per batch.
+    :param batches: The queue receiving tuples (dids, metadata by (scope, name)).
+    :param stop_event: Event set when the consumer does not want more batches.
+    :param logger: The logger.
+    """
+    def _put(item):
+        while not stop_event.is_set():
+            try:
+                batches.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        logger(logging.DEBUG, "Listing new dids")
+        for dids in chunks(list_new_dids(
+            thread=worker_number,
+            total_threads=total_workers,
+            chunk_size=bulk,
+            did_type=None,
+        ), batch_size):
+            collections = [did for did in dids if did["did_type"] in (DIDType.DATASET, DIDType.CONTAINER)]
+            metadata = {}
+            if collections:
+                for meta in get_metadata_bulk(collections):
+                    metadata[(meta["scope"], meta["name"])] = meta
+            if not _put((dids, metadata)) or graceful_stop.is_set():
+                break
+    except Exception:
+        logger(logging.ERROR, "Failed to list the new DIDs", exc_info=True)
+    finally:
+        _put(None)
+
+
 def run_once(heartbeat_handler: "HeartbeatHandler", bulk: int, **_kwargs) -> bool:
 
     worker_number, total_workers, logger = heartbeat_handler.live()
     stopwatch = Stopwatch()
     blocklisted_rse_id = [rse["id"] for rse in list_rses({"availability_write": False})]
     identifiers = []
+    nb_dids = 0
     #  List all the active subscriptions
     subscriptions = get_subscriptions(logger=logger)
-
-    #  Loop over all the new dids
-    #  Get the new DIDs based on the is_new flag
-    logger(logging.DEBUG, "Listing new dids")
-    for did in list_new_dids(
-        thread=worker_number,
-        total_threads=total_workers,
-        chunk_size=bulk,
-        did_type=None,
-    ):
-        _, _, logger = heartbeat_handler.live()
-        did_success = True
-        if not (
-            did["did_type"] == DIDType.DATASET or did["did_type"] == DIDType.CONTAINER
-        ):
-            identifiers.append(
-                {
-                    "scope": did["scope"],
-                    "name": did["name"],
-                    "did_type": did["did_type"],
-                }
-            )
-            continue
-        metadata = get_metadata(did["scope"], did["name"])
-
-        #  Loop over all the subscriptions
-        for subscription in subscriptions:
-            #  Check if the DID match the subscription
-            if __is_matching_subscription(subscription, did, metadata) is True:
-                filter_string = loads(subscription["filter"])
-                split_rule = filter_string.get("split_rule", False)
-                stime = time.time()
-                logger(
-                    logging.INFO,
-                    "%s:%s matches subscription %s"
-                    % (did["scope"], did["name"], subscription["name"]),
-                )
-                rules = loads(subscription["replication_rules"])
-                created_rules = {}
-                for cnt, rule_dict in enumerate(rules):
-                    created_rules[cnt + 1] = []
-                    #  Get all the rule and subscription parameters
-                    rule_dict = __get_rule_dict(rule_dict, subscription)
-                    weight = rule_dict.get("weight", None)
-                    source_replica_expression = rule_dict.get(
-                        "source_replica_expression", None
+    matcher = SubscriptionMatcher(subscriptions, logger=logger)
+    bulk_rules = {}
+
+    #  The new DIDs and their metadata are read by a producer thread while the rules of the previous batch are created
+    batch_size = max(1, config_get_int("transmogrifier", "batch_size", raise_exception=False, default=100))
+    batches = queue.Queue(maxsize=2)
+    stop_event = threading.Event()
+    producer = threading.Thread(
+        target=_produce_did_batches,
+        kwargs={
+            "worker_number": worker_number,
+            "total_workers": total_workers,
+            "bulk": bulk,
+            "batch_size": batch_size,
+            "batches": batches,
+            "stop_event": stop_event,
+            "logger": logger,
+        },
+        daemon=True,
+    )
+    producer.start()
+    try:
+        for dids, metadata in iter(batches.get, None):
+            _, _, logger = heartbeat_handler.live()
+            nb_dids += len(dids)
+            did_success = {}
+            dids_by_subscription = defaultdict(list)
+            for did in dids:
+                did_key = (did["scope"], did["name"])
+                if not (
+                    did["did_type"] == DIDType.DATASET or did["did_type"] == DIDType.CONTAINER
+                ):
+                    identifiers.append(
+                        {
+                            "scope": did["scope"],
+                            "name": did["name"],
+                            "did_type": did["did_type"],
+                        }
                     )
-                    copies = rule_dict["copies"]
-                    success = False
-
-                    chained_idx = rule_dict.get("chained_idx", None)
-                    #  By default selected_rses contains only the rse_expression
-                    #  It is overwritten in 2 cases : Chained subscription and split_rule
-                    selected_rses = [rule_dict.get("rse_expression")]
-                    if chained_idx:
-                        #  In the case of chained subscription, don't use rseselector but use the rses returned by the algorithm
-                        params = {}
-                        params['rse_expression'] = rule_dict.get("rse_expression")
-                        params['subscription_id'] = subscription["id"]
-                        params['subscription_name'] = subscription["name"]
-                        params['blocklisted_rse_id'] = blocklisted_rse_id
-                        if rule_dict.get("associated_site_idx", None):
-                            params["associated_site_idx"] = rule_dict.get(
-                                "associated_site_idx", None
-                            )
-                        logger(
-                            logging.DEBUG,
-                            "Chained subscription identified. Will use %s",
-                            str(created_rules[chained_idx]),
-                        )
-                        algorithm = rule_dict.get("algorithm", None)
-                        selected_rses = select_algorithm(
-                            algorithm,
-                            created_rules[chained_idx],
-                            params,
-                            logger
-                        )
-                        copies = 1
-                    elif split_rule:
-                        (
-                            selected_rses,
-                            create_rule,
-                            wont_reevaluate,
-                        ) = __split_rule_select_rses(
-                            subscription_id=subscription["id"],
-                            subscription_name=subscription["name"],
-                            scope=did["scope"],
-                            name=did["name"],
-                            account=rule_dict.get("account"),
-                            weight=weight,
-                            rse_expression=rule_dict.get("rse_expression"),
-                            copies=copies,
-                            blocklisted_rse_id=blocklisted_rse_id,
-                            logger=logger,
-                        )
-                        copies = 1
-                        if not create_rule:
-                            continue
-                        # The DID won't be reevaluated at the next cycle
-                        did_success = did_success and wont_reevaluate
-
-                    nb_rule = 0
-                    #  Try to create the rule
-                    logger(logging.DEBUG, 'selected_rses : %s' % selected_rses)
-                    try:
-                        for rse in selected_rses:
-                            if isinstance(selected_rses, dict):
-                                #  selected_rses is a dictionary only when split_rule is True or for chained subscriptions
-                                source_replica_expression = selected_rses[rse].get(
-                                    "source_replica_expression",
-                                    None,
-                                )
-                                weight = selected_rses[rse].get("weight", None)
-                            logger(
-                                logging.INFO,
-                                "Will insert one rule for %s:%s on %s"
-                                % (did["scope"], did["name"], rse),
-                            )
-                            rule_ids = add_rule(
-                                dids=[
-                                    {
-                                        "scope": did["scope"],
-                                        "name": did["name"],
-                                    }
-                                ],
-                                account=rule_dict.get("account"),
-                                copies=copies,
-                                rse_expression=rse,
-                                grouping=rule_dict.get("grouping", "DATASET"),
-                                weight=weight,
-                                lifetime=rule_dict.get("lifetime", None),
-                                locked=rule_dict.get("locked", None),
-                                subscription_id=subscription["id"],
-                                source_replica_expression=source_replica_expression,
-                                activity=rule_dict.get("activity"),
-                                purge_replicas=rule_dict.get("purge_replicas", False),
-                                ignore_availability=rule_dict.get(
-                                    "ignore_availability", None
-                                ),
-                                comment=rule_dict.get("comment"),
-                                delay_injection=rule_dict.get("delay_injection"),
-                            )
-                            created_rules[cnt + 1].append(rule_ids[0])
-                            nb_rule += 1
-                            if nb_rule == copies:
-                                success = True
-                            if split_rule:
-                                success = True
-
-                        METRICS.counter("addnewrule.done").inc(nb_rule)
-                        METRICS.counter("addnewrule.activity.{activity}").labels(activity="".join(rule_dict.get("activity").split())).inc(nb_rule)
-                        success = True
-                    except (
-                        InvalidReplicationRule,
-                        InvalidRuleWeight,
-                        InvalidRSEExpression,
-                        StagingAreaRuleRequiresLifetime,
-                        DuplicateRule,
-                    ) as error:
-                        # Errors that won't be retried
-                        success = True
-                        logger(logging.ERROR, str(error))
-                        METRICS.counter("addnewrule.errortype.{exception}").labels(exception=str(error.__class__.__name__)).inc()
-                    except Exception:
-                        # Errors that will be retried
-                        METRICS.counter("addnewrule.errortype.{exception}").labels(exception="unknown").inc()
-                        logger(logging.ERROR, "Unexpected error", exc_info=True)
-
-                    did_success = did_success and success
-                    if not success:
-                        logger(
-                            logging.ERROR,
-                            "Rule for %s:%s on %s cannot be inserted"
-                            % (
-                                did["scope"],
-                                did["name"],
-                                rule_dict.get("rse_expression"),
-                            ),
-                        )
-                    else:
-                        logger(
-                            logging.INFO,
-                            "%s rule(s) inserted in %f seconds"
-                            % (str(nb_rule), time.time() - stime),
-                        )
-
-        if did_success:
-            if did["did_type"] == str(DIDType.FILE):
-                METRICS.counter(name="files_processed").inc()
-            elif did["did_type"] == str(DIDType.DATASET):
-                METRICS.counter(name="datasets_processed").inc()
-            elif did["did_type"] == str(DIDType.CONTAINER):
-                METRICS.counter(name="containers_processed").inc()
-            METRICS.counter(name="dids_processed").inc()
-            identifiers.append(
-                {
-                    "scope": did["scope"],
-                    "name": did["name"],
-                    "did_type": did["did_type"],
-                }
-            )
+                    continue
+                if did_key not in metadata:
+                    logger(logging.WARNING, "%s:%s does not exist anymore" % did_key)
+                    continue
+                did_success[did_key] = True
+                #  Group the DIDs by matched subscription
+                for subscription in matcher.matching_subscriptions(did, metadata[did_key]):
+                    logger(
+                        logging.INFO,
+                        "%s:%s matches subscription %s"
+                        % (did["scope"], did["name"], subscription["name"]),
+                    )
+                    dids_by_subscription[subscription["id"]].append(did)
+
+            for subscription in subscriptions:
+                matching_dids = dids_by_subscription.get(subscription["id"])
+                if not matching_dids:
+                    continue
+                if subscription["id"] not in bulk_rules:
+                    bulk_rules[subscription["id"]] = __get_bulk_rules(subscription)
+                rules = bulk_rules[subscription["id"]]
+                if rules:
+                    #  add_rule creates the rule asynchronously for large DIDs, keep that behaviour by creating these rules one by one
+                    max_copies = max(rule["copies"] for rule in rules)
+                    small_dids = [did for did in matching_dids
+                                  if (metadata[(did["scope"], did["name"])].get("length") or 0) * max_copies < 10000]
+                    if small_dids and __create_rules_bulk(small_dids, subscription, rules, logger):
+                        matching_dids = [did for did in matching_dids
+                                         if (metadata[(did["scope"], did["name"])].get("length") or 0) * max_copies >= 10000]
+                for did in matching_dids:
+                    did_key = (did["scope"], did["name"])
+                    did_success[did_key] = __create_rules_for_did(did, subscription, blocklisted_rse_id, logger) and did_success[did_key]
+
+            for did in dids:
+                if not did_success.get((did["scope"], did["name"])):
+                    continue
+                if did["did_type"] == str(DIDType.FILE):
+                    METRICS.counter(name="files_processed").inc()
+                elif did["did_type"] == str(DIDType.DATASET):
+                    METRICS.counter(name="datasets_processed").inc()
+                elif did["did_type"] == str(DIDType.CONTAINER):
+                    METRICS.counter(name="containers_processed").inc()
+                METRICS.counter(name="dids_processed").inc()
+                identifiers.append(
+                    {
+                        "scope": did["scope"],
+                        "name": did["name"],
+                        "did_type": did["did_type"],
+                    }
+                )
+    finally:
+        stop_event.set()
+        producer.join()
 
     #  Mark the DIDs as processed
     flag_stopwatch = Stopwatch()
@@ -701,13 +940,15 @@ def run_once(heartbeat_handler: "HeartbeatHandler", bulk: int, **_kwargs) -> boo
             account=sub["account"],
             metadata={"last_processed": datetime.utcnow()},
         )
+    dids_per_second = nb_dids / stopwatch.elapsed if stopwatch.elapsed else 0
     logger(
         logging.INFO,
-        "It took %f seconds to process %i DIDs" % (stopwatch.elapsed, len(identifiers)),
+        "It took %f seconds to process %i DIDs (%.1f DIDs/s)" % (stopwatch.elapsed, len(identifiers), dids_per_second),
     )
     logger(logging.DEBUG, "DIDs processed : %s" % (str(identifiers)))
     METRICS.counter(name="transmogrifier.job.done").inc(1)
     METRICS.timer("job.duration").observe(stopwatch.elapsed)
+    METRICS.gauge("dids_per_second").set(dids_per_second)
     must_sleep = True
     return must_sleep
 
@@ -59,6 +59,13 @@ class DIDAvailability(Enum):
     AVAILABLE = 'A'
 
 
+class DIDMetaValueType(Enum):
+    STRING = 'STRING'
+    NUMBER = 'NUMBER'
+    BOOLEAN = 'BOOLEAN'
+    DATETIME = 'DATETIME'
+
+
 class DIDReEvaluation(Enum):
     ATTACH = 'A'
     DETACH = 'D'
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# Copyright European Organization for Nuclear Research (CERN) since 2012
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+''' add did_meta typed keys and values tables '''
+
+import datetime
+
+import sqlalchemy as sa
+from alembic import context
+from alembic.op import (create_table, create_primary_key, create_foreign_key,
+                        create_check_constraint, create_index, drop_table)
+
+from rucio.common.schema import get_schema_value
+from rucio.db.sqla.constants import DIDMetaValueType
+from rucio.db.sqla.types import InternalScopeString
+
+# Alembic revision identifiers
+revision = '63b0f00a91b4'
+down_revision = 'fd4e6d12795f'
+
+
+def upgrade():
+    '''
+    Upgrade the database to this revision
+    '''
+
+    if context.get_context().dialect.name in ['oracle', 'mysql', 'postgresql']:
+        create_table('did_meta_typed_keys',
+                     sa.Column('key', sa.String(255)),
+                     sa.Column('value_type', sa.Enum(DIDMetaValueType,
+                                                     name='DID_META_TYPED_KEYS_TYPE_CHK',
+                                                     create_constraint=True,
+                                                     values_callable=lambda obj: [e.value for e in obj])),
+                     sa.Column('created_at', sa.DateTime, default=datetime.datetime.utcnow),
+                     sa.Column('updated_at', sa.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow))
+        create_primary_key('DID_META_TYPED_KEYS_PK', 'did_meta_typed_keys', ['key'])
+        create_check_constraint('DID_META_TYPED_KEYS_TYPE_NN', 'did_meta_typed_keys', 'value_type is not null')
+        create_check_constraint('DID_META_TYPED_KEYS_CREATED_NN', 'did_meta_typed_keys', 'created_at is not null')
+        create_check_constraint('DID_META_TYPED_KEYS_UPDATED_NN', 'did_meta_typed_keys', 'updated_at is not null')
+
+        create_table('did_meta_typed_values',
+                     sa.Column('scope', InternalScopeString(get_schema_value('SCOPE_LENGTH'))),
+                     sa.Column('name', sa.String(get_schema_value('NAME_LENGTH'))),
+                     sa.Column('key', sa.String(255)),
+                     sa.Column('value_string', sa.String(255)),
+                     sa.Column('value_number', sa.Float),
+                     sa.Column('value_datetime', sa.DateTime),
+                     sa.Column('created_at', sa.DateTime, default=datetime.datetime.utcnow),
+                     sa.Column('updated_at', sa.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow))
+        create_primary_key('DID_META_TYPED_VALUES_PK', 'did_meta_typed_values', ['scope', 'name', 'key'])
+        create_foreign_key('DID_META_TYPED_VALUES_FK', 'did_meta_typed_values', 'did_meta', ['scope', 'name'], ['scope', 'name'])
+        create_foreign_key('DID_META_TYPED_VALUES_KEY_FK', 'did_meta_typed_values', 'did_meta_typed_keys', ['key'], ['key'])
+        create_check_constraint('DID_META_TYPED_VALUES_CREATED_NN', 'did_meta_typed_values', 'created_at is not null')
+        create_check_constraint('DID_META_TYPED_VALUES_UPDATED_NN', 'did_meta_typed_values', 'updated_at is not null')
+        create_index('DID_META_TYPED_VALUES_STR_IDX', 'did_meta_typed_values', ['key', 'value_string'])
+        create_index('DID_META_TYPED_VALUES_NUM_IDX', 'did_meta_typed_values', ['key', 'value_number'])
+        create_index('DID_META_TYPED_VALUES_DATE_IDX', 'did_meta_typed_values', ['key', 'value_datetime'])
+
+
+def downgrade():
+    '''
+    Downgrade the database to the previous revision
+    '''
+
+    if context.get_context().dialect.name in ['oracle', 'mysql', 'postgresql']:
+        drop_table('did_meta_typed_values')
+        drop_table('did_meta_typed_keys')
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+# Copyright European Organization for Nuclear Research (CERN) since 2012
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+''' add request counters table '''
+
+import datetime
+
+import sqlalchemy as sa
+from alembic import context
+from alembic.op import create_check_constraint, create_primary_key, create_table, drop_table
+
+from rucio.common.schema import get_schema_value
+from rucio.db.sqla.types import GUID, InternalAccountString
+
+# Alembic revision identifiers
+revision = 'fd4e6d12795f'
+down_revision = '4df2c5ddabc0'
+
+
+def upgrade():
+    '''Upgrade the database to this revision'''
+    if context.get_context().dialect.name in ['oracle', 'mysql', 'postgresql']:
+        create_table('request_counters',
+                     sa.Column('id', GUID()),
+                     sa.Column('account', InternalAccountString(get_schema_value('ACCOUNT_LENGTH'))),
+                     sa.Column('dest_rse_id', GUID()),
+                     sa.Column('source_rse_id', GUID()),
+                     sa.Column('activity', sa.String(50)),
+                     sa.Column('waiting', sa.BigInteger),
+                     sa.Column('active', sa.BigInteger),
+                     sa.Column('created_at', sa.DateTime, default=datetime.datetime.utcnow),
+                     sa.Column('updated_at', sa.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow))
+        create_primary_key('REQUEST_COUNTERS_PK', 'request_counters', ['id'])
+        create_check_constraint('REQUEST_COUNTERS_DEST_RSE_ID_NN', 'request_counters', 'dest_rse_id is not null')
+        create_check_constraint('REQUEST_COUNTERS_CREATED_NN', 'request_counters', 'created_at is not null')
+        create_check_constraint('REQUEST_COUNTERS_UPDATED_NN', 'request_counters', 'updated_at is not null')
+
+
+def downgrade():
+    '''Downgrade the database to the previous revision'''
+    if context.get_context().dialect.name in ['oracle', 'mysql', 'postgresql']:
+        drop_table('request_counters')
@@ -29,7 +29,7 @@ from sqlalchemy.types import LargeBinary
 from rucio.common import utils
 from rucio.common.schema import get_schema_value
 from rucio.common.types import InternalAccount, InternalScope
-from rucio.db.sqla.constants import (AccountStatus, AccountType, DIDAvailability, DIDType, DIDReEvaluation,
+from rucio.db.sqla.constants import (AccountStatus, AccountType, DIDAvailability, DIDMetaValueType, DIDType, DIDReEvaluation,
                                      KeyType, IdentityType, LockState, RuleGrouping, BadFilesStatus,
                                      RuleState, ReplicaState, RequestState, RequestType, RSEType,
                                      ScopeStatus, SubscriptionState, RuleNotification, LifetimeExceptionsState,
@@ -462,6 +462,34 @@ class DidMeta(BASE, ModelBase):
                    Index('DID_META_DID_TYPE_IDX', 'did_type'))
 
 
+class DidMetaTypedKey(BASE, ModelBase):
+    """Represents a JSON metadata key with a declared value type, searched through the typed values table"""
+    __tablename__ = 'did_meta_typed_keys'
+    key: Mapped[str] = mapped_column(String(255))
+    value_type: Mapped[DIDMetaValueType] = mapped_column(Enum(DIDMetaValueType, name='DID_META_TYPED_KEYS_TYPE_CHK',
+                                                              create_constraint=True,
+                                                              values_callable=lambda obj: [e.value for e in obj]))
+    _table_args = (PrimaryKeyConstraint('key', name='DID_META_TYPED_KEYS_PK'),
+                   CheckConstraint('VALUE_TYPE IS NOT NULL', name='DID_META_TYPED_KEYS_TYPE_NN'))
+
+
+class DidMetaTypedValue(BASE, ModelBase):
+    """Represents the value of a typed JSON metadata key of a data identifier, in the column of its type"""
+    __tablename__ = 'did_meta_typed_values'
+    scope: Mapped[InternalScope] = mapped_column(InternalScopeString(get_schema_value('SCOPE_LENGTH')))
+    name: Mapped[str] = mapped_column(String(get_schema_value('NAME_LENGTH')))
+    key: Mapped[str] = mapped_column(String(255))
+    value_string: Mapped[Optional[str]] = mapped_column(String(255))
+    value_number: Mapped[Optional[float]] = mapped_column(Float)
+    value_datetime: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    _table_args = (PrimaryKeyConstraint('scope', 'name', 'key', name='DID_META_TYPED_VALUES_PK'),
+                   ForeignKeyConstraint(['scope', 'name'], ['did_meta.scope', 'did_meta.name'], name='DID_META_TYPED_VALUES_FK'),
+                   ForeignKeyConstraint(['key'], ['did_meta_typed_keys.key'], name='DID_META_TYPED_VALUES_KEY_FK'),
+                   Index('DID_META_TYPED_VALUES_STR_IDX', 'key', 'value_string'),
+                   Index('DID_META_TYPED_VALUES_NUM_IDX', 'key', 'value_number'),
+                   Index('DID_META_TYPED_VALUES_DATE_IDX', 'key', 'value_datetime'))
+
+
 class DeletedDataIdentifier(BASE, ModelBase):
     """Represents a dataset"""
     __tablename__ = 'deleted_dids'
@@ -808,6 +836,20 @@ class RSETransferLimit(BASE, ModelBase):
                    ForeignKeyConstraint(['limit_id'], ['transfer_limits.id'], name='RSE_TRANSFER_LIMITS_LIMIT_ID_FK'), )
 
 
+class RequestCounter(BASE, ModelBase):
+    """Represents a contribution to the number of waiting and active requests per account, source, destination and activity"""
+    __tablename__ = 'request_counters'
+    id: Mapped[uuid.UUID] = mapped_column(GUID(), default=utils.generate_uuid)
+    account: Mapped[Optional[InternalAccount]] = mapped_column(InternalAccountString(get_schema_value('ACCOUNT_LENGTH')))
+    dest_rse_id: Mapped[uuid.UUID] = mapped_column(GUID())
+    source_rse_id: Mapped[Optional[uuid.UUID]] = mapped_column(GUID())
+    activity: Mapped[Optional[str]] = mapped_column(String(50))
+    waiting: Mapped[int] = mapped_column(BigInteger)
+    active: Mapped[int] = mapped_column(BigInteger)
+    _table_args = (PrimaryKeyConstraint('id', name='REQUEST_COUNTERS_PK'),
+                   CheckConstraint('DEST_RSE_ID IS NOT NULL', name='REQUEST_COUNTERS_DEST_RSE_ID_NN'), )
+
+
 class RSEUsage(BASE, ModelBase):
     """Represents location usage"""
     __tablename__ = 'rse_usage'
@@ -1694,6 +1736,8 @@ def register_models(engine):
               DIDKeyValueAssociation,
               DataIdentifier,
               DidMeta,
+              DidMetaTypedKey,
+              DidMetaTypedValue,
               VirtualPlacements,
               DeletedDataIdentifier,
               DidsFollowed,
@@ -1724,6 +1768,7 @@ def register_models(engine):
               ReplicationRuleHistoryRecent,
               Request,
               RequestHistory,
+              RequestCounter,
               TransferHop,
               Scope,
               Source,
@@ -1763,6 +1808,8 @@ def unregister_models(engine):
               DIDKey,
               DIDKeyValueAssociation,
               DidMeta,
+              DidMetaTypedKey,
+              DidMetaTypedValue,
               DataIdentifier,
               DeletedDataIdentifier,
               DidsFollowed,
@@ -1793,6 +1840,7 @@ def unregister_models(engine):
               ReplicationRuleHistoryRecent,
               Request,
               RequestHistory,
+              RequestCounter,
               TransferHop,
               Scope,
               Source,
@@ -202,7 +202,7 @@ def get_engine():
         config_params = [('pool_size', int), ('max_overflow', int), ('pool_timeout', int),
                          ('pool_recycle', int), ('echo', int), ('echo_pool', str),
                          ('pool_reset_on_return', str), ('use_threadlocal', int),
-                         ('poolclass', _get_engine_poolclass)]
+                         ('poolclass', _get_engine_poolclass), ('query_cache_size', int)]
         params = {}
         if 'mysql' in sql_connection:
             conv = mysql_convert_decimal_to_float(pymysql=sql_connection.startswith('mysql+pymysql'))
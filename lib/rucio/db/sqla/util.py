@@ -23,7 +23,7 @@ import sqlalchemy
 from alembic import command, op
 from alembic.config import Config
 from dogpile.cache.api import NoValue
-from sqlalchemy import func, inspect, Column, PrimaryKeyConstraint
+from sqlalchemy import func, inspect, Column, DateTime, PrimaryKeyConstraint
 from sqlalchemy.dialects.postgresql.base import PGInspector
 from sqlalchemy.exc import IntegrityError, DatabaseError
 from sqlalchemy.orm import declarative_base
@@ -497,6 +497,24 @@ class TempTableManager:
             logger=logger,
         )
 
+    def create_replica_access_table(self, logger=logging.log):
+        """
+        Create a temporary table with columns 'scope', 'name', 'rse_id' and 'accessed_at'
+        """
+
+        columns = [
+            Column("scope", InternalScopeString(get_schema_value('SCOPE_LENGTH'))),
+            Column("name", String(get_schema_value('NAME_LENGTH'))),
+            Column("rse_id", models.GUID()),
+            Column("accessed_at", DateTime),
+        ]
+        return self.create_temp_table(
+            'TEMPORARY_REPLICA_ACCESS',
+            *columns,
+            primary_key=columns[:3],
+            logger=logger,
+        )
+
     def create_id_table(self, logger=logging.log):
         """
         Create a temp table with a single id column of uuid type
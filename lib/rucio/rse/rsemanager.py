@@ -16,6 +16,8 @@
 import copy
 import logging
 import random
+import threading
+import time
 from time import sleep
 from urllib.parse import urlparse
 
@@ -24,7 +26,7 @@ from rucio.common import types
 from rucio.common.config import config_get_int
 from rucio.common.constraints import STRING_TYPES
 from rucio.common.logging import formatted_logger
-from rucio.common.utils import make_valid_did, GLOBALLY_SUPPORTED_CHECKSUMS
+from rucio.common.utils import make_valid_did, generate_uuid, GLOBALLY_SUPPORTED_CHECKSUMS
 
 
 def get_rse_info(rse=None, vo='def', rse_id=None, session=None) -> types.RSESettingsDict:
@@ -67,6 +69,118 @@ def get_rse_info(rse=None, vo='def', rse_id=None, session=None) -> types.RSESett
     return rse_info
 
 
+class _CachedRSE:
+    """
+    Process-wide cache entry of an RSE: its settings.
+    """
+    __slots__ = ('version', 'checked_at', 'info')
+
+    def __init__(self, version, info):
+        self.version = version
+        self.checked_at = time.monotonic()
+        self.info = info
+
+
+_RSE_CACHE = {}
+_RSE_CACHE_LOCK = threading.Lock()
+# Protocol instances are not thread-safe: each thread keeps its own, released with the thread
+_PROTOCOL_CACHE = threading.local()
+
+
+def _get_rse_version(rse_id):
+    """
+    Returns the version of the RSE settings, shared by all processes using the same RSE_REGION.
+    A new version is created if there is none yet, e.g. after the cache entry expired.
+
+    :param rse_id: The id of the rse.
+    """
+    key = 'rse_version_%s' % rse_id
+    version = RSE_REGION.get(key)  # NOQA pylint: disable=undefined-variable
+    if not version:
+        version = generate_uuid()
+        RSE_REGION.set(key, version)  # NOQA pylint: disable=undefined-variable
+    return version
+
+
+def invalidate_rse_cache(rse_id):
+    """
+    Invalidates the cached settings and protocols of an RSE, in this process and, through
+    a new version of the RSE, in all other processes sharing the same RSE_REGION.
+
+    :param rse_id: The id of the rse.
+    """
+    with _RSE_CACHE_LOCK:
+        _RSE_CACHE.pop(str(rse_id), None)
+    RSE_REGION.delete('rse_info_%s' % rse_id)  # NOQA pylint: disable=undefined-variable
+    RSE_REGION.set('rse_version_%s' % rse_id, generate_uuid())  # NOQA pylint: disable=undefined-variable
+
+
+def _get_cached_rse(rse_id, session=None):
+    """
+    Returns the cache entry of an RSE. The version of the RSE is checked at most
+    every ``[rse] cache_check_interval`` seconds, the settings are only fetched again
+    if the version changed.
+
+    :param rse_id: The id of the rse.
+    :param session: The eventual database session.
+    """
+    rse_id = str(rse_id)
+    with _RSE_CACHE_LOCK:
+        entry = _RSE_CACHE.get(rse_id)
+    check_interval = config_get_int('rse', 'cache_check_interval', raise_exception=False, default=60)
+    if entry is not None and time.monotonic() - entry.checked_at < check_interval:
+        return entry
+
+    version = _get_rse_version(rse_id)
+    if entry is not None and entry.version == version:
+        entry.checked_at = time.monotonic()
+        return entry
+
+    entry = _CachedRSE(version, get_rse_info(rse_id=rse_id, session=session))
+    with _RSE_CACHE_LOCK:
+        _RSE_CACHE[rse_id] = entry
+    return entry
+
+
+def get_cached_rse_info(rse_id, session=None) -> types.RSESettingsDict:
+    """
+    Returns the RSE settings like get_rse_info, from a process-wide cache which is
+    invalidated when the RSE or its protocols are updated.
+
+    :param rse_id: The id of the rse.
+    :param session: The eventual database session.
+    """
+    return _get_cached_rse(rse_id, session=session).info
+
+
+def get_cached_protocol(rse_id, operation, scheme=None, domain='wan', logger=logging.log, impl=None, session=None):
+    """
+    Returns an instance of the protocol defined for the given operation, like create_protocol,
+    from a process-wide cache which is invalidated when the RSE or its protocols are updated.
+    Protocol instances are not shared between threads, and are created without authentication token.
+
+    :param rse_id:    The id of the rse.
+    :param operation: Intended operation for this protocol
+    :param scheme:    Optional filter if no specific protocol is defined in rse_setting for the provided operation
+    :param domain:    Optional specification of the domain
+    :param logger:    Optional decorated logger, used if the protocol is instantiated.
+    :param impl:      Optional protocol implementation.
+    :param session:   The eventual database session.
+    :returns:         An instance of the requested protocol
+    """
+    entry = _get_cached_rse(rse_id, session=session)
+    protocols = getattr(_PROTOCOL_CACHE, 'protocols', None)
+    if protocols is None:
+        protocols = _PROTOCOL_CACHE.protocols = {}
+    # A single instance is kept per key: instances of previous versions of the RSE are replaced
+    key = (str(rse_id), operation, scheme, domain, impl)
+    version, protocol = protocols.get(key, (None, None))
+    if protocol is None or version != entry.version:
+        protocol = create_protocol(entry.info, operation, scheme, domain, logger=logger, impl=impl)
+        protocols[key] = (entry.version, protocol)
+    return protocol
+
+
 def _get_possible_protocols(rse_settings: types.RSESettingsDict, operation, scheme=None, domain=None, impl=None):
     """
     Filter the list of available protocols or provided by the supported ones.
@@ -222,6 +222,7 @@ class Replicas(ErrorHandlingMethodView):
             def _list_and_sort_replicas(vo):
                 # we need to call list_replicas before starting to reply
                 # otherwise the exceptions won't be propagated correctly
+                distances = {}
                 for rfile in list_replicas(dids=dids, schemes=schemes, vo=vo):
                     replicas = []
                     dictreplica = {}
@@ -230,7 +231,7 @@ class Replicas(ErrorHandlingMethodView):
                             replicas.append(replica)
                             dictreplica[replica] = rse
 
-                    replicas = sort_replicas(dictreplica, client_location, selection=select)
+                    replicas = sort_replicas(dictreplica, client_location, selection=select, distances=distances)
                     rfile['pfns'] = dict(_sorted_with_priorities(rfile['pfns'], replicas, limit=limit))
                     yield rfile
 
@@ -682,6 +683,8 @@ class ListReplicas(ErrorHandlingMethodView):
             def _list_and_sort_replicas(request_id, issuer, vo):
                 # we need to call list_replicas before starting to reply
                 # otherwise the exceptions won't be propagated correctly
+                # the distances from the client are computed once and shared by all files
+                distances = {}
                 for rfile in list_replicas(dids=dids, schemes=schemes,
                                            unavailable=unavailable,
                                            request_id=request_id,
@@ -711,7 +714,7 @@ class ListReplicas(ErrorHandlingMethodView):
                     rfile['pfns'] = dict(_sorted_with_priorities(replicas=rfile['pfns'],
                                                                  # Lan replicas sorted by priority; followed by wan replicas sorted by selection criteria
                                                                  sorted_pfns=chain(sorted(lanreplicas.keys(), key=lambda pfn: lanreplicas[pfn][1]),
-                                                                                   sort_replicas(wanreplicas, client_location, selection=select)),
+                                                                                   sort_replicas(wanreplicas, client_location, selection=select, distances=distances)),
                                                                  limit=limit))
                     yield rfile
 
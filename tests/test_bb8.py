@@ -26,7 +26,7 @@ from rucio.core.rse import add_rse_attribute, fill_rse_expired, get_rse_usage, s
 from rucio.core.rule import add_rule, get_rule, delete_rule, update_rule
 from rucio.core.rse_expression_parser import REGION
 from rucio.daemons.abacus.rse import run as run_abacus
-from rucio.daemons.bb8.common import rebalance_rule
+from rucio.daemons.bb8.common import apply_rebalance_plan, plan_rebalance, rebalance_rse, rebalance_rule
 from rucio.daemons.bb8.bb8 import run as bb8_run
 from rucio.daemons.judge.cleaner import rule_cleaner
 from rucio.daemons.judge.evaluator import re_evaluator
@@ -268,3 +268,55 @@ def test_bb8_full_workflow(vo, root_account, jdoe_account, rse_factory, mock_sco
     for dataset in dsn:
         set_metadata(mock_scope, dataset, 'lifetime', -86400)
     undertaker.run(once=True)
+
+
+@pytest.mark.noparallel(reason='uses daemons')
+@pytest.mark.parametrize("file_config_mock", [{"overrides": [
+    ('bb8', 'allowed_accounts', 'jdoe'),
+]}], indirect=True)
+def test_bb8_plan_rebalance(vo, root_account, jdoe_account, rse_factory, mock_scope, did_factory, file_config_mock):
+    """BB8: Test the planning and the application of a rebalancing with capacity tracking"""
+    rses = [rse_factory.make_posix_rse() for _ in range(3)]
+    rse1, rse1_id = rses[0]
+    rse2, rse2_id = rses[1]
+    rse3, rse3_id = rses[2]
+    tag = tag_generator()
+    for _, rse_id in rses:
+        add_rse_attribute(rse_id, tag, True)
+        add_rse_attribute(rse_id, "freespace", 1)
+        set_local_account_limit(jdoe_account, rse_id, -1)
+        set_rse_usage(rse_id=rse_id, source='min_free_space', used=0, free=0, session=None)
+    base_unit = 100000000000
+    set_rse_usage(rse_id=rse2_id, source='storage', used=0, free=10 * base_unit, session=None)
+    set_rse_usage(rse_id=rse3_id, source='storage', used=0, free=5 * base_unit, session=None)
+    REGION.invalidate()
+
+    # Four datasets of 400 GB on RSE 1. Only three of them fit on RSE 2 and RSE 3
+    rules = []
+    for _ in range(4):
+        dataset = did_factory.make_dataset()
+        files = create_files(2, mock_scope, rse1_id, bytes_=2 * base_unit)
+        attach_dids(mock_scope, dataset['name'], files, jdoe_account)
+        rules.append(add_rule(dids=[{'scope': mock_scope, 'name': dataset['name']}], account=jdoe_account, copies=1, rse_expression=rse1,
+                              grouping='DATASET', weight=None, lifetime=None, locked=False, subscription_id=None)[0])
+        set_status(mock_scope, dataset['name'], open=False)
+
+    plan = plan_rebalance(rse_id=rse1_id, max_bytes=1e13, force_expression='%s=true' % tag)
+    assert len(plan) == 3
+    targets = [move['target_rse'] for move in plan]
+    assert targets.count(rse2) == 2
+    assert targets.count(rse3) == 1
+
+    # A dry run does not create any rule
+    rebalanced = rebalance_rse(rse_id=rse1_id, max_bytes=1e13, dry_run=True, force_expression='%s=true' % tag)
+    assert [rebalanced_rule[6] for rebalanced_rule in rebalanced] == ['', '', '']
+    assert all(get_rule(rule_id)['child_rule_id'] is None for rule_id in rules)
+
+    applied = apply_rebalance_plan(plan, comment='Background rebalancing', batch_size=2)
+    assert len(applied) == 3
+    for move, child_rule_id in applied:
+        assert get_rule(move['rule']['id'])['child_rule_id'] == child_rule_id
+        assert get_rule(child_rule_id)['rse_expression'] == move['target_rse']
+        # For teardown, delete child rule
+        update_rule(child_rule_id, {'lifetime': -86400})
+    rule_cleaner(once=True)
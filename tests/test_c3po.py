@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+# Copyright European Organization for Nuclear Research (CERN) since 2012
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from rucio.common.types import InternalScope
+from rucio.daemons.c3po.utils import expiring_dataset_cache, expiring_list, timeseries
+from rucio.daemons.c3po.utils.dataset_cache import DatasetCache
+from rucio.daemons.c3po.utils.expiring_dataset_cache import InMemoryExpiringDatasetCache, get_expiring_dataset_cache
+from rucio.daemons.c3po.utils.expiring_list import ExpiringList
+from rucio.daemons.c3po.utils.placement import BatchCache, FreeSpaceSnapshot, argmax, get_dataset_replicas, get_dids_metadata
+from rucio.daemons.c3po.utils.timeseries import InMemoryTimeSeries, get_time_series
+from rucio.db.sqla import models
+from rucio.db.sqla.constants import DIDType, ReplicaState
+
+
+class _Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_in_memory_time_series(monkeypatch):
+    """ C3PO: In-memory time series with a sliding window """
+    clock = _Clock()
+    monkeypatch.setattr(timeseries, 'time', clock)
+    tms = get_time_series(window=10, prefix='jobs_', backend='memory')
+    assert isinstance(tms, InMemoryTimeSeries)
+
+    # More points than the initial capacity of the ring buffer, spread over 20 seconds
+    for value in range(40):
+        tms.add_point('site', value)
+        clock.now += 0.5
+    tms.add_point('other', 7)
+    assert tms.get_series('site') == tuple(range(40))
+    assert sorted(tms.get_keys()) == ['jobs_other', 'jobs_site']
+
+    tms.trim('site')
+    assert tms.get_series('site') == tuple(range(21, 40))
+    assert tms.get_series('other') == (7, )
+
+    # The buffer wraps around after the trim
+    for value in range(40, 50):
+        tms.add_point('site', value)
+    assert tms.get_series('site') == tuple(range(21, 50))
+
+    clock.now += 100
+    tms.trim()
+    assert tms.get_keys() == []
+    assert tms.get_series('site') == ()
+
+
+def test_in_memory_dataset_caches(monkeypatch):
+    """ C3PO: In-memory dataset caches expire their entries """
+    clock = _Clock()
+    monkeypatch.setattr(timeseries, 'time', clock)
+    monkeypatch.setattr(expiring_dataset_cache, 'monotonic', clock)
+    monkeypatch.setattr(expiring_list, 'monotonic', clock)
+
+    did = (InternalScope('mock'), 'dataset')
+    dc = DatasetCache(timeout=10, backend='memory')
+    for _ in range(3):
+        dc.add_did(did)
+        clock.now += 4
+    assert dc.get_did(did) == 2
+
+    cache = get_expiring_dataset_cache(timeout=10, backend='memory')
+    assert isinstance(cache, InMemoryExpiringDatasetCache)
+    cache.add_dataset('mock:a')
+    clock.now += 6
+    cache.add_dataset('mock:b')
+    cache.add_dataset('mock:a')
+    clock.now += 6
+    assert cache.check_dataset('mock:a')
+    assert cache.check_dataset('mock:b')
+    clock.now += 6
+    assert not cache.check_dataset('mock:a')
+    assert len(cache) == 0
+
+    items = ExpiringList(timeout=10)
+    items.add('a')
+    clock.now += 6
+    items.add('b')
+    assert items.to_set() == {'a', 'b'}
+    clock.now += 6
+    assert len(items) == 1
+    assert items.to_set() == {'b'}
+
+
+def test_free_space_snapshot():
+    """ C3PO: Planned bytes are deducted from the free space snapshot """
+    snapshot = FreeSpaceSnapshot(['rse1', 'rse2', 'rse3'], {'rse1': {'free': 50, 'total': 100}, 'rse2': {'free': 80, 'total': 100}})
+    assert snapshot.free_ratios() == [50.0, 80.0, 0.0]
+    assert argmax(snapshot.free_ratios()) == 1
+
+    snapshot.plan('rse2', 40)
+    snapshot.plan('unknown', 40)
+    assert snapshot.free_ratios() == [50.0, 40.0, 0.0]
+    assert argmax(snapshot.free_ratios()) == 0
+    snapshot.plan('rse1', 1000)
+    assert snapshot.free_ratio('rse1') == 0.0
+    assert argmax([]) is None
+
+    calls = []
+
+    def _double(value):
+        calls.append(value)
+        return value * 2
+
+    cache = BatchCache()
+    assert [cache.get(_double, value) for value in (1, 2, 1, 2)] == [2, 4, 2, 4]
+    assert calls == [1, 2]
+
+
+def test_placement_bulk_lookups(rse_factory, did_factory, db_session):
+    """ C3PO: Metadata and dataset replicas of a window of DIDs are fetched in bulk """
+    _, rse_id = rse_factory.make_mock_rse()
+    datasets = [did_factory.make_dataset() for _ in range(2)]
+    models.CollectionReplica(rse_id=rse_id, scope=datasets[0]['scope'], name=datasets[0]['name'], bytes=10, length=1, available_replicas_cnt=1,
+                             state=ReplicaState.AVAILABLE, did_type=DIDType.DATASET).save(session=db_session)
+    db_session.commit()
+    dids = [(did['scope'], did['name']) for did in datasets] + [(datasets[0]['scope'], 'missing')]
+
+    metadata = get_dids_metadata(dids)
+    assert set(metadata) == set(dids[:2])
+    assert metadata[dids[0]]['did_type'] == DIDType.DATASET
+
+    replicas = get_dataset_replicas(dids)
+    assert list(replicas) == [dids[0]]
+    assert [replica['rse_id'] for replica in replicas[dids[0]]] == [rse_id]
@@ -22,7 +22,7 @@ import pytest
 from rucio.client.baseclient import BaseClient
 from rucio.client.client import Client
 from rucio.common.config import config_get, config_set, Config
-from rucio.common.exception import CannotAuthenticate, ClientProtocolNotSupported, RucioException
+from rucio.common.exception import CannotAuthenticate, ClientProtocolNotSupported, DataIdentifierNotFound, RucioException
 from rucio.common.utils import execute
 from tests.mocks.mock_http_server import MockServer
 
@@ -117,6 +117,33 @@ class TestBaseClient:
         # The client did back-off multiple times before succeeding: 2 * 0.25s (authentication) + 2 * 0.25s (request) = 1s
         assert datetime.utcnow() - start_time > timedelta(seconds=0.9)
 
+    def testMapConcurrently(self, vo):
+        """ CLIENTS (BASECLIENT): Ensure concurrent requests keep their order and raise the mapped exceptions"""
+
+        class EchoPath(MockServer.Handler):
+            def do_GET(self):
+                if self.path.startswith('/missing'):
+                    self.send_code_and_message(404, {'ExceptionClass': 'DataIdentifierNotFound', 'ExceptionMessage': 'not found'}, '')
+                else:
+                    self.send_code_and_message(200, {'x-rucio-auth-token': 'sometoken'}, self.path)
+
+        with MockServer(EchoPath) as server:
+            creds = {'username': 'ddmlab', 'password': 'secret'}
+            client = BaseClient(rucio_host=server.base_url, auth_host=server.base_url, account='root', auth_type='userpass', creds=creds, vo=vo)
+
+            def _get(path):
+                result = client._send_request(server.base_url + path)  # noqa
+                if result.status_code != 200:
+                    exc_cls, exc_msg = client._get_exception(headers=result.headers, status_code=result.status_code, data=result.content)  # noqa
+                    raise exc_cls(exc_msg)
+                return result.text
+
+            paths = ['/path%d' % i for i in range(20)]
+            assert client.map_concurrently(_get, paths, max_workers=4) == paths
+            assert client.map_concurrently(_get, []) == []
+            with pytest.raises(DataIdentifierNotFound):
+                client.map_concurrently(_get, ['/path', '/missing', '/path'], max_workers=2)
+
 
 class TestRucioClients:
     """ To test Clients"""
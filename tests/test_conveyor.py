@@ -12,7 +12,10 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import json
 import logging
+import queue
+import re
 import threading
 import time
 from datetime import datetime, timedelta
@@ -24,7 +27,7 @@ import pytest
 import rucio.daemons.reaper.reaper
 from rucio.common.types import InternalAccount
 from rucio.common.utils import generate_uuid
-from rucio.common.exception import ReplicaNotFound, RequestNotFound
+from rucio.common.exception import DatabaseException, ReplicaNotFound, RequestNotFound
 from rucio.core import config as core_config
 from rucio.core import did as did_core
 from rucio.core import distance as distance_core
@@ -35,13 +38,13 @@ from rucio.core import request as request_core
 from rucio.core import rse as rse_core
 from rucio.core import rule as rule_core
 from rucio.core.account_limit import set_local_account_limit
-from rucio.daemons.conveyor.finisher import finisher
+from rucio.daemons.conveyor.finisher import finisher, SuspiciousPatternMatcher
 from rucio.daemons.conveyor.poller import poller
 from rucio.daemons.conveyor.preparer import preparer
 from rucio.daemons.conveyor.submitter import submitter
 from rucio.daemons.conveyor.stager import stager
 from rucio.daemons.conveyor.throttler import throttler
-from rucio.daemons.conveyor.receiver import receiver, GRACEFUL_STOP as receiver_graceful_stop, Receiver
+from rucio.daemons.conveyor.receiver import receiver, request_updater, GRACEFUL_STOP as receiver_graceful_stop, Receiver
 from rucio.daemons.reaper.reaper import reaper
 from rucio.db.sqla import models
 from rucio.db.sqla.constants import LockState, RequestState, RequestType, ReplicaState, RSEType, RuleState
@@ -1553,3 +1556,119 @@ def test_preparer_ignore_availability(rse_factory, did_factory, root_account, fi
     preparer(once=True, sleep_time=1, bulk=100, partition_wait_time=0, ignore_availability=True)
     request = request_core.get_request_by_did(rse_id=dst_rse_id, **did)
     assert request['state'] == RequestState.QUEUED
+
+
+@pytest.mark.noparallel(reason='uses the receiver graceful stop event')
+def test_receiver_micro_batches():
+    """
+    Ensure that the receiver applies the buffered messages in batches and acknowledges them once applied
+    """
+
+    applied = []
+    acked = []
+
+    class FakeConnection:
+        def ack(self, id_):
+            acked.append((id_, list(applied)))
+
+    class FakeFrame:
+        def __init__(self, ack_id, body):
+            self.headers = {'ack': ack_id}
+            self.body = json.dumps(body)
+
+    class ReceiverWrapper(Receiver):
+        def _perform_request_update(self, msg, *, session=None, logger=logging.log):
+            applied.append(msg['file_metadata']['request_id'])
+            # Message 3 fails within a batch, but succeeds on its own
+            if msg['file_metadata']['request_id'] == 3 and session is not None and applied.count(3) == 1:
+                return None
+            return True
+
+    buffer = queue.Queue(maxsize=10)
+    conn = FakeConnection()
+    listener = ReceiverWrapper(broker=None, id_=0, total_threads=1, all_vos=True, conn=conn, buffer=buffer)
+    for i in range(5):
+        listener.on_message(FakeFrame(i, {'job_metadata': {'issuer': 'rucio'}, 'job_state': 'FINISHED', 'file_metadata': {'request_id': i}}))
+    # Messages not issued by rucio are acknowledged immediately
+    listener.on_message(FakeFrame(5, {'job_metadata': {'issuer': 'other'}, 'job_state': 'FINISHED', 'file_metadata': {}}))
+    assert acked == [(5, [])]
+    assert buffer.qsize() == 5
+
+    updater = ReceiverWrapper(broker=None, id_=0, total_threads=1, all_vos=True)
+    receiver_graceful_stop.set()
+    try:
+        request_updater(updater=updater, buffer=buffer, batch_size=2, batch_timeout=0.1)
+    finally:
+        receiver_graceful_stop.clear()
+
+    assert buffer.empty()
+    # The batch of messages 2 and 3 was rolled back and re-applied message by message
+    assert applied == [0, 1, 2, 3, 2, 3, 4]
+    assert [ack_id for ack_id, _ in acked] == [5, 0, 1, 2, 3, 4]
+    # Messages are only acknowledged once their batch is applied
+    for ack_id, applied_before_ack in acked[1:]:
+        assert ack_id in applied_before_ack
+
+
+@pytest.mark.noparallel(reason='uses the receiver graceful stop event')
+def test_receiver_failing_message():
+    """
+    Ensure that a message failing on its own, e.g. at commit, is left unacknowledged without stopping the updater
+    """
+
+    acked = []
+
+    class FakeConnection:
+        def ack(self, id_):
+            acked.append(id_)
+
+    class ReceiverWrapper(Receiver):
+        def _perform_request_updates(self, msgs, *, session=None, logger=logging.log):
+            raise DatabaseException('Commit failed')
+
+        def _perform_request_update(self, msg, *, session=None, logger=logging.log):
+            if msg['file_metadata']['request_id'] == 1:
+                raise DatabaseException('Commit failed')
+            return True
+
+    conn = FakeConnection()
+    buffer = queue.Queue(maxsize=10)
+    for i in range(4):
+        buffer.put(({'file_metadata': {'request_id': i}}, conn, i))
+
+    updater = ReceiverWrapper(broker=None, id_=0, total_threads=1, all_vos=True)
+    receiver_graceful_stop.set()
+    try:
+        request_updater(updater=updater, buffer=buffer, batch_size=2, batch_timeout=0.1)
+    finally:
+        receiver_graceful_stop.clear()
+
+    assert buffer.empty()
+    assert acked == [0, 2, 3]
+
+
+def test_suspicious_pattern_matcher():
+    """
+    Ensure that the combined suspicious patterns match like the individual patterns and that results are cached
+    """
+    patterns = ['.*CHECKSUM MISMATCH.*', '.*SOURCE.*No such file.*', r'^\s*TRANSFER.*timeout']
+    matcher = SuspiciousPatternMatcher(patterns)
+    messages = ['SOURCE [2] No such file or directory', 'DESTINATION CHECKSUM MISMATCH', 'TRANSFER globus timeout',
+                'DESTINATION OVERWRITE file exists', '', None]
+    for message in messages:
+        expected = bool(message) and any(re.match(pattern, message) for pattern in patterns)
+        assert matcher.match(message) == expected
+    assert len(matcher._cache) == 4
+
+    # Patterns with global inline flags cannot be combined and are matched one by one
+    matcher = SuspiciousPatternMatcher(['(?i).*checksum mismatch.*', '.*No such file.*'])
+    assert matcher.match('DESTINATION CHECKSUM MISMATCH')
+    assert not matcher.match('DESTINATION OVERWRITE file exists')
+    assert not SuspiciousPatternMatcher([])
+
+    # Group numbers change once patterns are combined: patterns with numbered backreferences are matched one by one
+    patterns = [r'(SOURCE|DESTINATION) error', r'.*(\w+) file \1 .*', r'(\d+)?(?(1)x|y)z']
+    matcher = SuspiciousPatternMatcher(patterns)
+    assert matcher._combined is None
+    for message in ['DESTINATION error', 'the file file exists', 'the file other exists', '5xz', 'yz', 'xz']:
+        assert matcher.match(message) == any(re.match(pattern, message) for pattern in patterns)
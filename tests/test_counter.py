@@ -74,6 +74,42 @@ class TestCoreRSECounter:
             del cnt['updated_at']
             assert cnt == {'files': count, 'bytes': sum_}
 
+    def test_coalesce_deltas(self, rse_factory, db_session):
+        """ RSE COUNTER (CORE): The deltas of one transaction are written as one row """
+        _, rse_id = rse_factory.make_mock_rse(session=db_session)
+        db_session.commit()
+        for _ in range(10):
+            rse_counter.increase(rse_id=rse_id, files=2, bytes_=10, session=db_session)
+        rse_counter.decrease(rse_id=rse_id, files=1, bytes_=5, session=db_session)
+        assert db_session.query(models.UpdatedRSECounter).filter_by(rse_id=rse_id).count() == 0
+        db_session.commit()
+        deltas = [(row.files, row.bytes) for row in db_session.query(models.UpdatedRSECounter).filter_by(rse_id=rse_id)]
+        assert deltas == [(19, 95)]
+
+        # deltas of a rolled back transaction are discarded
+        rse_counter.increase(rse_id=rse_id, files=1, bytes_=1, session=db_session)
+        db_session.rollback()
+        db_session.commit()
+        assert db_session.query(models.UpdatedRSECounter).filter_by(rse_id=rse_id).count() == 1
+
+    def test_update_counters_in_batches(self, rse_factory, db_session):
+        """ RSE COUNTER (CORE): Deltas of several RSEs are applied in bounded batches """
+        rse_ids = [rse_factory.make_mock_rse(session=db_session)[1] for _ in range(2)]
+        db_session.add_all([models.UpdatedRSECounter(rse_id=rse_id, files=1, bytes=10) for rse_id in rse_ids for _ in range(25)])
+        db_session.commit()
+
+        consumed = []
+        while True:
+            consumed.append(rse_counter.update_rse_counters(rse_ids=rse_ids, limit=20))
+            if consumed[-1] < 20:
+                break
+        assert consumed == [20, 20, 10]
+        assert db_session.query(models.UpdatedRSECounter).filter(models.UpdatedRSECounter.rse_id.in_(rse_ids)).count() == 0
+        for rse_id in rse_ids:
+            cnt = rse_counter.get_counter(rse_id=rse_id)
+            del cnt['updated_at']
+            assert cnt == {'files': 25, 'bytes': 250}
+
     def test_fill_counter_history(self, db_session):
         """RSE COUNTER (CORE): Fill the usage history with the current value."""
         db_session.query(models.RSEUsageHistory).delete()
@@ -88,6 +124,39 @@ class TestCoreRSECounter:
 @pytest.mark.noparallel(reason='runs abacus daemons; deletes all account_usage_history rows')
 class TestCoreAccountCounter:
 
+    def test_coalesce_deltas(self, jdoe_account, rse_factory, db_session):
+        """ACCOUNT COUNTER (CORE): The deltas of one transaction are written as one row per RSE and account """
+        _, rse_id = rse_factory.make_mock_rse(session=db_session)
+        db_session.commit()
+        for _ in range(10):
+            account_counter.increase(rse_id=rse_id, account=jdoe_account, files=1, bytes_=10, session=db_session)
+        account_counter.decrease(rse_id=rse_id, account=jdoe_account, files=10, bytes_=100, session=db_session)
+        db_session.commit()
+        # deltas that cancel out are not written at all
+        assert db_session.query(models.UpdatedAccountCounter).filter_by(rse_id=rse_id, account=jdoe_account).count() == 0
+
+        account_counter.increase(rse_id=rse_id, account=jdoe_account, files=1, bytes_=10, session=db_session)
+        account_counter.increase(rse_id=rse_id, account=jdoe_account, files=1, bytes_=10, session=db_session)
+        db_session.commit()
+        deltas = [(row.files, row.bytes) for row in db_session.query(models.UpdatedAccountCounter).filter_by(rse_id=rse_id, account=jdoe_account)]
+        assert deltas == [(2, 20)]
+
+    def test_update_counters_in_batches(self, jdoe_account, root_account, rse_factory, db_session):
+        """ACCOUNT COUNTER (CORE): Deltas of several accounts and RSEs are applied in bounded batches """
+        _, rse_id = rse_factory.make_mock_rse(session=db_session)
+        account_counter.add_counter(rse_id=rse_id, account=root_account, session=db_session)
+        keys = [(jdoe_account, rse_id), (root_account, rse_id)]
+        db_session.add_all([models.UpdatedAccountCounter(account=account, rse_id=rse_id, files=1, bytes=10) for account, rse_id in keys for _ in range(15)])
+        db_session.commit()
+
+        assert account_counter.update_account_counters(account_rse_ids=keys, limit=20) == 20
+        assert account_counter.update_account_counters(account_rse_ids=keys, limit=20) == 10
+        assert account_counter.update_account_counters(account_rse_ids=keys, limit=20) == 0
+        for account, _ in keys:
+            cnt = get_usage(rse_id=rse_id, account=account)
+            del cnt['updated_at']
+            assert cnt == {'files': 15, 'bytes': 150}
+
     def test_inc_dec_get_counter(self, jdoe_account, rse_factory, db_session):
         """ACCOUNT COUNTER (CORE): Increase, decrease and get counter """
         db_session.commit()
@@ -27,7 +27,7 @@ from rucio.common.exception import (DataIdentifierNotFound, DataIdentifierAlread
 from rucio.common.types import InternalAccount, InternalScope
 from rucio.common.utils import generate_uuid
 from rucio.core.did import (list_dids, add_did, delete_dids, get_did_atime, touch_dids, attach_dids, detach_dids,
-                            get_metadata, set_metadata, get_did, get_did_access_cnt, add_did_to_followed,
+                            get_metadata, get_metadata_bulk, set_metadata, get_did, get_did_access_cnt, add_did_to_followed,
                             get_users_following_did, remove_did_from_followed, set_status, list_new_dids,
                             set_new_dids)
 from rucio.core.replica import add_replica, get_replica
@@ -1147,6 +1147,42 @@ def test_bulk_get_meta_inheritance(vo, rse_factory, mock_scope, did_factory, ruc
             assert met[key] == meta[key]
 
 
+def test_get_metadata_bulk_core(rse_factory, mock_scope, did_factory, root_account):
+    """ DATA IDENTIFIERS (CORE): Get the metadata of several DIDs, inherited from their ancestors """
+    skip_without_json()
+    _, rse_id = rse_factory.make_posix_rse()
+    files = [did_factory.random_file_did() for _ in range(3)]
+    for file_ in files:
+        add_replica(rse_id=rse_id, bytes_=1, account=root_account, **file_)
+    dataset = did_factory.make_dataset()
+    container = did_factory.make_container()
+    attach_dids(account=root_account, dids=files[:2], **dataset)
+    attach_dids(account=root_account, dids=[dataset], **container)
+
+    set_metadata(mock_scope, files[0]['name'], 'level', 'file')
+    set_metadata(mock_scope, dataset['name'], 'level', 'dataset')
+    set_metadata(mock_scope, dataset['name'], 'dataset_key', 'dataset')
+    set_metadata(mock_scope, container['name'], 'level', 'container')
+    set_metadata(mock_scope, container['name'], 'container_key', 'container')
+
+    dids = [{'scope': mock_scope, 'name': file_['name']} for file_ in files] + [{'scope': mock_scope, 'name': dataset['name']}]
+    metas = list(get_metadata_bulk(dids, inherit=True))
+    assert [(meta['scope'], meta['name']) for meta in metas] == [(did['scope'], did['name']) for did in dids]
+    assert metas[0]['level'] == 'file'
+    assert metas[1]['level'] == 'dataset'
+    for meta in metas[:2]:
+        assert meta['dataset_key'] == 'dataset'
+        assert meta['container_key'] == 'container'
+    assert set(metas[2]) == {'scope', 'name'}
+    assert metas[3]['level'] == 'dataset'
+    assert metas[3]['container_key'] == 'container'
+    assert 'dataset_key' in metas[3]
+
+    metas = list(get_metadata_bulk(dids + [{'scope': mock_scope, 'name': did_name_generator('file')}]))
+    assert sorted(meta['name'] for meta in metas) == sorted(did['name'] for did in dids)
+    assert all(meta['scope'] == mock_scope for meta in metas)
+
+
 @pytest.mark.dirty
 @pytest.mark.noparallel(reason='uses pre-defined scope')
 def test_list_by_length(vo, root_account, rse_factory, mock_scope, did_factory, did_client):
@@ -18,12 +18,16 @@ from copy import deepcopy
 import pytest
 
 from rucio.client.didclient import DIDClient
-from rucio.common.exception import KeyNotFound
+from rucio.common.exception import Duplicate, InvalidMetadata, InvalidValueForKey, KeyNotFound
 from rucio.common.utils import generate_uuid
-from rucio.core.did import add_did, delete_dids, set_metadata_bulk, set_dids_metadata_bulk
-from rucio.core.did_meta_plugins import list_dids, get_metadata, set_metadata
+from rucio.core.did import add_did, attach_dids, delete_dids, set_metadata_bulk, set_dids_metadata_bulk
+from rucio.core import did_meta_plugins
+from rucio.core.did_meta_plugins import estimate_selectivity, list_dids, get_metadata, set_metadata
+from rucio.core.did_meta_plugins.did_meta_plugin_interface import DidMetaPlugin
+from rucio.core.did_meta_plugins.json_meta import add_typed_key, del_typed_key, list_typed_keys
 from rucio.core.did_meta_plugins.mongo_meta import MongoDidMeta
 from rucio.core.did_meta_plugins.postgres_meta import ExternalPostgresJSONDidMeta
+from rucio.db.sqla.constants import DIDMetaValueType, DIDType
 from rucio.db.sqla.util import json_implemented
 from rucio.tests.common import skip_rse_tests_with_accounts, did_name_generator
 
@@ -106,6 +110,32 @@ class TestDidMetaDidColumn:
         # with pytest.raises(KeyNotFound):
         #     list_dids(tmp_scope, {'NotReallyAKey': 'NotReallyAValue'})
 
+    @pytest.mark.dirty
+    def test_list_dids_recursive(self, mock_scope, root_account, db_session):
+        """ DID Meta (Hardcoded): List did meta recursively, level by level """
+        project = 'project_%s' % generate_uuid()[:8]
+        top, sub, other = [did_name_generator('container') for _ in range(3)]
+        datasets = [did_name_generator('dataset') for _ in range(4)]
+        for name in (top, sub, other):
+            add_did(scope=mock_scope, name=name, did_type='CONTAINER', account=root_account, meta={'project': project if name != other else 'other'})
+        for idx, name in enumerate(datasets):
+            add_did(scope=mock_scope, name=name, did_type='DATASET', account=root_account, meta={'project': project if idx != 1 else 'other'})
+        attach_dids(scope=mock_scope, name=top, dids=[{'scope': mock_scope, 'name': sub}, {'scope': mock_scope, 'name': other}], account=root_account)
+        attach_dids(scope=mock_scope, name=sub, dids=[{'scope': mock_scope, 'name': name} for name in datasets[:3]], account=root_account)
+        attach_dids(scope=mock_scope, name=other, dids=[{'scope': mock_scope, 'name': datasets[3]}], account=root_account)
+
+        # Only the content of matching collections is searched
+        results = list(list_dids(mock_scope, {'name': top, 'project': project}, did_type='all', recursive=True, session=db_session))
+        assert sorted(results) == sorted([top, sub, datasets[0], datasets[2]])
+        assert results[0] == top
+
+        results = list(list_dids(mock_scope, {'name': top, 'project': project}, did_type='container', recursive=True, session=db_session))
+        assert sorted(results) == sorted([top, sub])
+
+        results = list(list_dids(mock_scope, {'name': top, 'project': project}, did_type='all', recursive=True, limit=3, long=True, session=db_session))
+        assert len(results) == 3
+        assert results[0]['name'] == top
+
 
 class TestDidMetaJSON:
 
@@ -192,6 +222,65 @@ class TestDidMetaJSON:
         # assert [{'scope': (tmp_scope), 'name': tmp_dsn4}] == results
         assert [tmp_dsn4] == results
 
+    @pytest.mark.dirty
+    def test_list_dids_recursive(self, mock_scope, root_account, db_session):
+        """ DID Meta (JSON): List did meta recursively, level by level """
+        skip_without_json()
+
+        meta_key = 'my_key_%s' % generate_uuid()
+        top, sub, other = [did_name_generator('container') for _ in range(3)]
+        datasets = [did_name_generator('dataset') for _ in range(3)]
+        for name in (top, sub, other):
+            add_did(scope=mock_scope, name=name, did_type='CONTAINER', account=root_account)
+        for name in datasets:
+            add_did(scope=mock_scope, name=name, did_type='DATASET', account=root_account)
+        for name in (top, sub, datasets[0], datasets[2]):
+            set_metadata(scope=mock_scope, name=name, key=meta_key, value='match')
+        attach_dids(scope=mock_scope, name=top, dids=[{'scope': mock_scope, 'name': sub}, {'scope': mock_scope, 'name': other}], account=root_account)
+        attach_dids(scope=mock_scope, name=sub, dids=[{'scope': mock_scope, 'name': name} for name in datasets[:2]], account=root_account)
+        attach_dids(scope=mock_scope, name=other, dids=[{'scope': mock_scope, 'name': datasets[2]}], account=root_account)
+
+        results = list(list_dids(mock_scope, {'name': top, meta_key: 'match'}, recursive=True, session=db_session))
+        assert sorted(results) == sorted([top, sub, datasets[0]])
+
+    @pytest.mark.dirty
+    def test_typed_keys(self, mock_scope, root_account):
+        """ DID Meta (JSON): Search typed keys through the typed values table """
+        skip_without_json()
+
+        number_key = 'my_key_%s' % generate_uuid()
+        string_key = 'my_key_%s' % generate_uuid()
+        names = [did_name_generator('dataset') for _ in range(3)]
+        for idx, name in enumerate(names):
+            add_did(scope=mock_scope, name=name, did_type='DATASET', account=root_account)
+            set_metadata(scope=mock_scope, name=name, key=number_key, value=idx)
+
+        # Values already set are copied when the key is declared
+        add_typed_key(number_key, 'number')
+        add_typed_key(string_key, DIDMetaValueType.STRING)
+        assert list_typed_keys()[number_key] == DIDMetaValueType.NUMBER
+        with pytest.raises(Duplicate):
+            add_typed_key(number_key, DIDMetaValueType.NUMBER)
+
+        set_metadata(scope=mock_scope, name=names[0], key=string_key, value='abc_1')
+        set_metadata(scope=mock_scope, name=names[1], key=string_key, value='abd_2')
+        with pytest.raises(InvalidValueForKey):
+            set_metadata(scope=mock_scope, name=names[2], key=string_key, value=3)
+
+        assert sorted(list_dids(mock_scope, {'%s.gt' % number_key: 0}, did_type='all')) == sorted(names[1:])
+        assert list(list_dids(mock_scope, {number_key: 2}, did_type='all')) == [names[2]]
+        assert list(list_dids(mock_scope, {string_key: 'abc*'}, did_type='all')) == [names[0]]
+        assert list(list_dids(mock_scope, {string_key: 'abd_2', number_key: 1}, did_type='all')) == [names[1]]
+
+        set_metadata(scope=mock_scope, name=names[2], key=number_key, value=-1)
+        assert list(list_dids(mock_scope, {'%s.lt' % number_key: 0}, did_type='all')) == [names[2]]
+
+        del_typed_key(number_key)
+        del_typed_key(string_key)
+        with pytest.raises(KeyNotFound):
+            del_typed_key(string_key)
+        assert list(list_dids(mock_scope, {number_key: 1}, did_type='all')) == [names[1]]
+
 
 @pytest.fixture
 def mongo_meta():
@@ -276,6 +365,88 @@ class TestDidMetaMongo:
         assert [tmp_dsn4] == results
 
 
+class DictDidMeta(DidMetaPlugin):
+    """ In-memory metadata plugin managing the keys starting with 'dict_' """
+
+    def __init__(self):
+        super().__init__()
+        self.meta = {}
+        self.queries = 0
+
+    def get_metadata(self, scope, name, *, session=None):
+        return self.meta.get((scope, name), {})
+
+    def set_metadata(self, scope, name, key, value, recursive=False, *, session=None):
+        self.meta.setdefault((scope, name), {})[key] = value
+
+    def delete_metadata(self, scope, name, key, *, session=None):
+        self.meta.get((scope, name), {}).pop(key, None)
+
+    def list_dids(self, scope, filters, did_type='collection', ignore_case=False, limit=None,
+                  offset=None, long=False, recursive=False, ignore_dids=None, *, session=None):
+        self.queries += 1
+        for (did_scope, name), meta in self.meta.items():
+            if did_scope == scope and any(all(meta.get(key) == value for key, value in or_group.items() if key != 'name') for or_group in filters):
+                yield {'scope': did_scope, 'name': name, 'did_type': None, 'bytes': None, 'length': None} if long else name
+
+    def manages_key(self, key, *, session=None):
+        return key.startswith('dict_')
+
+    def get_plugin_name(self):
+        return 'DICT'
+
+
+def test_managing_plugin_cache_is_bounded(monkeypatch):
+    """ DID Meta (PLANNER): The cache of the plugin managing each key evicts the oldest keys when full """
+    dict_meta = DictDidMeta()
+    monkeypatch.setattr(did_meta_plugins, 'METADATA_PLUGIN_MODULES', [dict_meta])
+    monkeypatch.setattr(did_meta_plugins, '_KEY_TO_PLUGIN', {})
+    monkeypatch.setattr(did_meta_plugins, '_KEY_TO_PLUGIN_MAX_SIZE', 3)
+
+    for idx in range(5):
+        assert did_meta_plugins._get_managing_plugin('dict_%s' % idx, session=None) is dict_meta
+    assert list(did_meta_plugins._KEY_TO_PLUGIN) == ['dict_2', 'dict_3', 'dict_4']
+
+    # Keys managed by no plugin are not cached
+    assert did_meta_plugins._get_managing_plugin('unknown', session=None) is None
+    assert 'unknown' not in did_meta_plugins._KEY_TO_PLUGIN
+
+
+def test_list_dids_across_plugins(mock_scope, root_account, monkeypatch):
+    """ DID Meta (PLANNER): Filters spanning several plugins are split and their results intersected """
+    dict_meta = DictDidMeta()
+    monkeypatch.setattr(did_meta_plugins, 'METADATA_PLUGIN_MODULES', did_meta_plugins.METADATA_PLUGIN_MODULES[:1] + [dict_meta])
+    monkeypatch.setattr(did_meta_plugins, '_KEY_TO_PLUGIN', {})
+
+    project = 'project_%s' % generate_uuid()
+    names = [did_name_generator('dataset') for _ in range(4)]
+    for idx, name in enumerate(names):
+        add_did(scope=mock_scope, name=name, did_type='DATASET', account=root_account, meta={'project': project if idx < 3 else 'other'})
+        set_metadata(scope=mock_scope, name=name, key='dict_run', value=idx % 2)
+
+    results = sorted(list_dids(scope=mock_scope, filters={'project': project, 'dict_run': 0}))
+    assert results == sorted([names[0], names[2]])
+    assert did_meta_plugins._KEY_TO_PLUGIN['dict_run'] is dict_meta
+
+    # The results of both or_groups are concatenated without duplicates, with the details of the base plugin
+    results = list(list_dids(scope=mock_scope, filters=[{'project': project, 'dict_run': 1}, {'dict_run': 1}], long=True))
+    assert sorted(result['name'] for result in results) == sorted([names[1], names[3]])
+    assert all(result['did_type'] == str(DIDType.DATASET) for result in results if result['name'] == names[1])
+
+    assert len(list(list_dids(scope=mock_scope, filters=[{'project': project, 'dict_run': 1}, {'dict_run': 1}], limit=1))) == 1
+    assert list(list_dids(scope=mock_scope, filters={'project': 'unknown_%s' % generate_uuid(), 'dict_run': 1})) == []
+
+    with pytest.raises(InvalidMetadata):
+        list(list_dids(scope=mock_scope, filters={'project': project, 'dict_run': 1}, recursive=True))
+
+
+def test_estimate_selectivity():
+    """ DID Meta (PLANNER): Exact names are more selective than equalities, which are more selective than ranges """
+    assert estimate_selectivity({'name': 'abc'}) < estimate_selectivity({'run': 1}) < estimate_selectivity({'name': 'abc*'}) \
+        < estimate_selectivity({'length.gt': 1}) < estimate_selectivity({'run.ne': 1}) < estimate_selectivity({})
+    assert estimate_selectivity({'run': 1, 'project': 'p'}) < estimate_selectivity({'run': 1})
+
+
 @pytest.fixture
 def postgres_json_meta():
     return ExternalPostgresJSONDidMeta(
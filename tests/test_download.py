@@ -26,8 +26,10 @@ import pytest
 from rucio.client.downloadclient import DownloadClient
 from rucio.common.config import config_add_section, config_set
 from rucio.common.exception import InputValidationError, NoFilesDownloaded, RucioException
+from rucio.common.filecache import FileCache
+from rucio.common.replicacache import ReplicaCache
 from rucio.common.types import InternalScope
-from rucio.common.utils import generate_uuid
+from rucio.common.utils import adler32, generate_uuid
 from rucio.core import did as did_core
 from rucio.core import scope as scope_core
 from rucio.core.rse import add_protocol
@@ -742,6 +744,138 @@ def test_download_exclude_tape(rse_factory, did_factory, download_client):
         download_client.download_dids([{'did': did_str, 'base_dir': tmp_dir}])
 
 
+def test_download_with_replica_cache(rse_factory, did_factory, download_client):
+    """Client: Resolve the replicas of a repeated download from the local replica cache."""
+    rse, _ = rse_factory.make_posix_rse()
+    items = did_factory.upload_test_dataset(rse)
+    dataset_str = '%s:%s' % (items[0]['dataset_scope'], items[0]['dataset_name'])
+    expected_result = [{'did': '%s:%s' % (item['did_scope'], item['did_name']), 'clientState': 'DONE'} for item in items]
+
+    with TemporaryDirectory() as tmp_dir:
+        download_client.replica_cache = ReplicaCache(path=os.path.join(tmp_dir, 'replicas.db'))
+        result = download_client.download_dids([{'did': dataset_str, 'base_dir': os.path.join(tmp_dir, 'first')}])
+        _check_download_result(actual_result=result, expected_result=expected_result)
+
+        with patch('rucio.client.replicaclient.ReplicaClient.list_replicas', side_effect=Exception()) as mock_list_replicas:
+            result = download_client.download_dids([{'did': dataset_str, 'base_dir': os.path.join(tmp_dir, 'second')}])
+            mock_list_replicas.assert_not_called()
+        _check_download_result(actual_result=result, expected_result=expected_result)
+
+
+def test_replica_cache_expiration_and_eviction():
+    """Client: Entries of the replica cache expire and the least recently used ones are evicted."""
+    with TemporaryDirectory() as tmp_dir:
+        cache = ReplicaCache(path=os.path.join(tmp_dir, 'replicas.db'), ttl=3600, max_bytes=100)
+        cache.set('files', 'first', ['a' * 30])
+        cache.set('files', 'second', ['b' * 30])
+        assert cache.get('files', 'first') == ['a' * 30]
+        assert cache.get('files', 'unknown') is None
+
+        # 'second' is the least recently used entry and gets evicted
+        cache.set('files', 'third', ['c' * 30])
+        assert cache.get('files', 'second') is None
+        assert cache.get('files', 'first') == ['a' * 30]
+        assert cache.get('files', 'third') == ['c' * 30]
+
+        # values bigger than the cache are never stored
+        cache.set('files', 'huge', ['d' * 200])
+        assert cache.get('files', 'huge') is None
+
+        cache.ttl = -1
+        cache.set('dids', 'expired', [{'scope': 'mock', 'name': 'expired'}])
+        assert cache.get('dids', 'expired') is None
+
+        cache.clear()
+        assert cache.get('files', 'first') is None
+        cache.close()
+
+
+def test_file_cache_accounting_and_eviction():
+    """Client: The local file cache hands out files by key, accounts its usage incrementally and evicts least recently used files."""
+    with TemporaryDirectory() as tmp_dir:
+        cache_dir = os.path.join(tmp_dir, 'cache')
+        cache = FileCache(cache_dir=cache_dir, max_bytes=100, hysteresis=0.5)
+        sources = {}
+        for name in ('first', 'second', 'third'):
+            sources[name] = os.path.join(tmp_dir, name)
+            with open(sources[name], 'w') as f:
+                f.write(name[0] * 40)
+
+        dst = os.path.join(tmp_dir, 'dst')
+        assert not cache.get('first', dst)
+        assert cache.add('first', sources['first'])
+        assert cache.add('second', sources['second'])
+        assert cache.usage() == {'files': 2, 'bytes': 80}
+        assert cache.get('first', dst)
+        with open(dst) as f:
+            assert f.read() == 'f' * 40
+
+        # provided files are copies: modifying them leaves the cache entry untouched
+        with open(dst, 'w') as f:
+            f.write('modified')
+        with open(sources['first'], 'w') as f:
+            f.write('modified')
+        assert cache.get('first', dst)
+        with open(dst) as f:
+            assert f.read() == 'f' * 40
+
+        # exceeding max_bytes evicts the least recently used files down to 50 bytes
+        assert cache.add('third', sources['third'])
+        assert cache.usage() == {'files': 1, 'bytes': 40}
+        assert not cache.get('first', dst)
+        assert cache.get('third', dst)
+
+        # a second instance, e.g. in another process, shares the index
+        other = FileCache(cache_dir=cache_dir, max_bytes=100)
+        assert other.get('third', os.path.join(tmp_dir, 'other'))
+
+        # entries whose file vanished are dropped
+        shutil.rmtree(os.path.join(cache_dir, 'data'))
+        assert not other.get('third', dst)
+        assert cache.usage() == {'files': 0, 'bytes': 0}
+        cache.close()
+        other.close()
+
+
+def test_download_item_with_file_cache():
+    """Client: Only verified downloads enter the local file cache, which is used even without replicas."""
+    with TemporaryDirectory() as tmp_dir:
+        content = 'content'
+        path = os.path.join(tmp_dir, 'content')
+        with open(path, 'w') as f:
+            f.write(content)
+        checksum = adler32(path)
+
+        cache = FileCache(cache_dir=os.path.join(tmp_dir, 'cache'))
+        client = MagicMock(auth_token='token', account='root', vo='def')
+        download_client = DownloadClient(client=client, logger=logging.getLogger('dlul_client'), file_cache=cache)
+        download_client.tracing = False
+        protocol = MagicMock()
+
+        def _download(written_content, dest_name, **item_options):
+            protocol.get.side_effect = lambda pfn, dest, **kwargs: open(dest, 'w').write(written_content)
+            dest = os.path.join(tmp_dir, dest_name)
+            item = {'scope': 'mock', 'name': 'file', 'adler32': checksum, 'bytes': len(content), 'dest_file_paths': [dest],
+                    'temp_file_path': dest + '.part', 'sources': [{'pfn': 'mock://file', 'rse': 'MOCK'}], 'merged_options': {}}
+            item.update(item_options)
+            with patch('rucio.client.downloadclient.rsemgr.get_rse_info', return_value={}), \
+                 patch('rucio.client.downloadclient.rsemgr.create_protocol', return_value=protocol):
+                return download_client._download_item(item, trace={}, traces_copy_out=None)['clientState']
+
+        # a download whose checksum was not verified is not cached
+        assert _download('corrupt', 'unverified', merged_options={'ignore_checksum': True}) == FileDownloadState.DONE
+        assert cache.usage()['files'] == 0
+
+        assert _download(content, 'verified') == FileDownloadState.DONE
+        assert cache.usage()['files'] == 1
+
+        # a cached file is a hit even if no replica was found
+        assert _download(content, 'cached', sources=[]) == FileDownloadState.FOUND_IN_FILE_CACHE
+        with open(os.path.join(tmp_dir, 'cached')) as f:
+            assert f.read() == content
+        cache.close()
+
+
 def test_download_states():
     """ Tests the available download states. """
     FileDownloadState.PROCESSING
@@ -749,8 +883,9 @@ def test_download_states():
     FileDownloadState.DONE
     FileDownloadState.ALREADY_DONE
     FileDownloadState.FOUND_IN_PCACHE
+    FileDownloadState.FOUND_IN_FILE_CACHE
     FileDownloadState.FILE_NOT_FOUND
     FileDownloadState.FAIL_VALIDATE
     FileDownloadState.FAILED
 
-    assert len(FileDownloadState) == 8
+    assert len(FileDownloadState) == 9
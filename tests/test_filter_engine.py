@@ -19,13 +19,14 @@ import unittest
 
 import pytest
 
-from rucio.common.exception import DuplicateCriteriaInDIDFilter
+from rucio.common.exception import DuplicateCriteriaInDIDFilter, DIDFilterSyntaxError
 from rucio.common.utils import generate_uuid
 from rucio.core.did import add_did
 from rucio.core.did_meta_plugins import set_metadata
 from rucio.db.sqla import models
+from rucio.db.sqla.constants import DIDMetaValueType
 from rucio.db.sqla.util import json_implemented
-from rucio.core.did_meta_plugins.filter_engine import FilterEngine
+from rucio.core.did_meta_plugins.filter_engine import FilterEngine, typed_metadata_value
 
 
 class TestFilterEngineDummy:
@@ -142,6 +143,66 @@ class TestFilterEngineDummy:
             filters = FilterEngine(input_length_expression, strict_coerce=False).filters
             assert isinstance(filters[0][0][2], type_expected)
 
+    def test_cachedTranslation(self, db_session):
+        filters = FilterEngine(' run_number >= 1 ,project=test; created_after = 1900-01-01 00:00:00', model_class=models.DataIdentifier).filters
+        assert filters == FilterEngine('run_number>=1, project = test;created_after=1900-01-01 00:00:00', model_class=models.DataIdentifier).filters
+        assert filters[1] == [(models.DataIdentifier.created_at, operator.ge, datetime(1900, 1, 1))]
+
+        # Filters of the same structure only differ by the parameters of their statement
+        statements = []
+        for run_number, project in ((1, 'test'), (2, 'other')):
+            q = FilterEngine('run_number >= {}, project = {}'.format(run_number, project), model_class=models.DataIdentifier).create_sqla_query(
+                additional_model_attributes=[models.DataIdentifier.name],
+                session=db_session)
+            statements.append(q.statement.compile(dialect=db_session.bind.dialect))
+        assert str(statements[0]) == str(statements[1])
+        assert statements[0].params != statements[1].params
+
+        # Typecast values are cached, but containers are never shared between callers
+        engine = FilterEngine('name = test', model_class=models.DataIdentifier)
+        value = engine._try_typecast_string('[1, 2]')
+        value.append(3)
+        assert engine._try_typecast_string('[1, 2]') == [1, 2]
+
+    def test_typedMetadataValue(self):
+        assert typed_metadata_value(DIDMetaValueType.STRING, 'test') == ('value_string', 'test')
+        assert typed_metadata_value(DIDMetaValueType.NUMBER, 1) == ('value_number', 1.0)
+        assert typed_metadata_value(DIDMetaValueType.BOOLEAN, True) == ('value_number', 1.0)
+        assert typed_metadata_value(DIDMetaValueType.DATETIME, '1900-01-01T00:00:00') == ('value_datetime', datetime(1900, 1, 1))
+        for value_type, value in ((DIDMetaValueType.STRING, 1), (DIDMetaValueType.STRING, 'x' * 256), (DIDMetaValueType.NUMBER, '1'),
+                                  (DIDMetaValueType.NUMBER, True), (DIDMetaValueType.BOOLEAN, 1), (DIDMetaValueType.DATETIME, 'yesterday')):
+            with pytest.raises(ValueError):
+                typed_metadata_value(value_type, value)
+
+    def test_typedKeys(self, db_session):
+        typed_keys = {'testkeyint1': DIDMetaValueType.NUMBER, 'testkeystr1': DIDMetaValueType.STRING}
+        q = FilterEngine('testkeyint1 > 0, testkeystr1 = 1, testkeyuntyped = 1', model_class=models.DidMeta, strict_coerce=False).create_sqla_query(
+            additional_model_attributes=[models.DidMeta.name],
+            json_column=models.DidMeta.meta,
+            typed_keys=typed_keys,
+            session=db_session)
+        statement = str(q.statement.compile(compile_kwargs={'literal_binds': True}))
+        assert statement.count('did_meta_typed_values.value_number > 0') == 1
+        assert statement.count("did_meta_typed_values.value_string = '1'") == 1
+
+        # String keys are searched with the value as given, even if it could be typecast
+        for value in ('1.50', '1e3', 'true', '2020-01-01'):
+            q = FilterEngine('testkeystr1 = {}; testkeystr1 = x'.format(value), model_class=models.DidMeta, strict_coerce=False).create_sqla_query(
+                additional_model_attributes=[models.DidMeta.name],
+                json_column=models.DidMeta.meta,
+                typed_keys=typed_keys,
+                session=db_session)
+            statement = str(q.statement.compile(compile_kwargs={'literal_binds': True}))
+            assert statement.count("did_meta_typed_values.value_string = '{}'".format(value)) == 1
+            assert statement.count("did_meta_typed_values.value_string = 'x'") == 1
+
+        with pytest.raises(DIDFilterSyntaxError):
+            FilterEngine('testkeyint1 = test', model_class=models.DidMeta, strict_coerce=False).create_sqla_query(
+                additional_model_attributes=[models.DidMeta.name],
+                json_column=models.DidMeta.meta,
+                typed_keys=typed_keys,
+                session=db_session)
+
 
 class TestFilterEngineReal:
 
@@ -13,8 +13,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import sys
+
 from rucio.common.utils import execute
 
+# Upper bound, in milliseconds, for the cumulative import time of the complete client.
+# This is far above the expected value and only meant to catch severe regressions.
+CLIENT_IMPORT_TIME_BUDGET_MS = 1500
+
 
 class TestModuleImport():
     def test_import(self):
@@ -25,3 +31,27 @@ class TestModuleImport():
         assert 'ImportError' not in out
         assert 'Exception' not in err
         assert 'Exception' not in out
+
+    def test_lazy_client_import(self):
+        """ MODULE IMPORT: Importing the client package loads neither the sub-clients nor the heavy optional dependencies """
+        code = ('import sys; import rucio.client; '
+                'assert "rucio.client.didclient" not in sys.modules; '
+                'from rucio.client import DIDClient; '
+                'assert "rucio.client.replicaclient" not in sys.modules; '
+                'from rucio.client import Client; '
+                'assert "paramiko" not in sys.modules; '
+                'assert "requests_kerberos" not in sys.modules')
+        exitcode, out, err = execute('%s -c \'%s\'' % (sys.executable, code))
+        assert exitcode == 0, err
+
+    def test_client_import_time(self):
+        """ MODULE IMPORT: The import time of the client does not regress """
+        code = ('import time; start = time.perf_counter(); '
+                'from rucio.client import Client; '
+                'print((time.perf_counter() - start) * 1000)')
+        timings = []
+        for _ in range(3):
+            exitcode, out, err = execute('%s -c \'%s\'' % (sys.executable, code))
+            assert exitcode == 0, err
+            timings.append(float(out))
+        assert min(timings) < CLIENT_IMPORT_TIME_BUDGET_MS
@@ -37,7 +37,7 @@ from rucio.core.did import add_did, attach_dids, get_did, set_status, list_files
 from rucio.core.replica import (add_replica, add_replicas, delete_replicas, get_replicas_state,
                                 get_replica, list_replicas, update_replica_state,
                                 get_RSEcoverage_of_dataset, get_replica_atime,
-                                touch_replica, get_bad_pfns, set_tombstone, add_bad_dids)
+                                touch_replica, touch_replicas, get_bad_pfns, set_tombstone, add_bad_dids)
 from rucio.core.rse import add_protocol, add_rse_attribute, del_rse_attribute
 from rucio.daemons.badreplicas.minos import minos
 from rucio.daemons.badreplicas.minos_temporary_expiration import minos_tu_expiration
@@ -326,6 +326,36 @@ class TestReplicaCore:
         for i in range(0, nbfiles - 1):
             assert get_replica_atime({'scope': files2[i]['scope'], 'name': files2[i]['name'], 'rse_id': rse_id}) is None
 
+    def test_touch_replicas_bulk(self, rse_factory, mock_scope, root_account):
+        """ REPLICA (CORE): Touch many replicas at once, keeping the latest access time"""
+        _, rse1_id = rse_factory.make_mock_rse()
+        _, rse2_id = rse_factory.make_mock_rse()
+        files = [{'scope': mock_scope, 'name': did_name_generator('file'), 'bytes': 1, 'adler32': '0cc737eb'} for _ in range(3)]
+        add_replicas(rse_id=rse1_id, files=files, account=root_account, ignore_availability=True)
+        add_replicas(rse_id=rse2_id, files=files[:1], account=root_account, ignore_availability=True)
+
+        now = datetime.utcnow()
+        now -= timedelta(microseconds=now.microsecond)
+        earlier = now - timedelta(hours=1)
+        accesses = [{'scope': mock_scope, 'name': files[0]['name'], 'rse_id': rse1_id, 'accessed_at': earlier},
+                    {'scope': mock_scope, 'name': files[0]['name'], 'rse_id': rse1_id, 'accessed_at': now},
+                    {'scope': mock_scope, 'name': files[0]['name'], 'rse_id': rse2_id, 'accessed_at': earlier},
+                    {'scope': mock_scope, 'name': files[1]['name'], 'rse_id': rse1_id, 'accessed_at': earlier},
+                    {'scope': mock_scope, 'name': files[1]['name'], 'rse_id': None, 'accessed_at': now}]
+        assert touch_replicas(accesses) == 3
+
+        assert get_replica_atime({'scope': mock_scope, 'name': files[0]['name'], 'rse_id': rse1_id}) == now
+        assert get_replica_atime({'scope': mock_scope, 'name': files[0]['name'], 'rse_id': rse2_id}) == earlier
+        assert get_did_atime(scope=mock_scope, name=files[0]['name']) == now
+        assert get_replica_atime({'scope': mock_scope, 'name': files[1]['name'], 'rse_id': rse1_id}) == earlier
+        assert get_did_atime(scope=mock_scope, name=files[1]['name']) == earlier
+        assert get_replica_atime({'scope': mock_scope, 'name': files[2]['name'], 'rse_id': rse1_id}) is None
+
+        # access times only move forward
+        touch_replicas([{'scope': mock_scope, 'name': files[0]['name'], 'rse_id': rse1_id, 'accessed_at': earlier}])
+        assert get_replica_atime({'scope': mock_scope, 'name': files[0]['name'], 'rse_id': rse1_id}) == now
+        assert get_did_atime(scope=mock_scope, name=files[0]['name']) == now
+
     def test_list_replicas_all_states(self, rse_factory, mock_scope, root_account):
         """ REPLICA (CORE): list file replicas with all_states"""
         _, rse1_id = rse_factory.make_mock_rse()
@@ -803,6 +833,24 @@ def test_client_add_list_replicas(rse_factory, replica_client, mock_scope):
         assert rse2 in replicas[i]['rses']
 
 
+def test_client_list_replicas_concurrently(rse_factory, replica_client, did_client, mock_scope):
+    """ REPLICA (CLIENT): List the replicas of many files with concurrent chunked requests """
+    rse, _ = rse_factory.make_posix_rse()
+    nbfiles = 7
+
+    files = [{'scope': mock_scope.external, 'name': did_name_generator('file'), 'bytes': 1, 'adler32': '0cc737eb'} for _ in range(nbfiles)]
+    replica_client.add_replicas(rse=rse, files=files)
+    dids = [{'scope': f['scope'], 'name': f['name']} for f in files]
+
+    replicas = list(replica_client.list_replicas_concurrently(dids=dids, chunk_size=2, max_workers=3))
+    assert sorted(r['name'] for r in replicas) == sorted(f['name'] for f in files)
+    for replica in replicas:
+        assert rse in replica['rses']
+
+    fetched_dids = did_client.get_dids(dids, max_workers=3)
+    assert [did['name'] for did in fetched_dids] == [f['name'] for f in files]
+
+
 def test_client_add_replica_scope_not_found(rse_factory, replica_client):
     """ REPLICA (CLIENT): Add replica with missing scope """
     rse, _ = rse_factory.make_mock_rse()
@@ -488,7 +488,7 @@ def test_get_sorted_list_replicas_no_metalink(vo, rest_client, auth_token, proto
     global replica_singleton
     replica_singleton = None
 
-    def _reverse_geoip(dictreplica, client_location, ignore_error=False):
+    def _reverse_geoip(dictreplica, client_location, ignore_error=False, distances=None):
         global replica_singleton
         if replica_singleton is None:
             replica_singleton = list(dictreplica.keys())
@@ -509,3 +509,34 @@ def test_get_sorted_list_replicas_no_metalink(vo, rest_client, auth_token, proto
         initial_priorities = _extract_priorities(get_replicas())
         updated_priorities = _extract_priorities(get_replicas())
         assert initial_priorities != updated_priorities, "The replica list is not sorted according to the priorities."
+
+
+def test_sort_replicas_bulk():
+    """Replicas: the distance to each host or RSE is computed once when sorting the replicas of many files."""
+    host_distances = {'near.example.com': 1, 'middle.example.com': 2, 'far.example.com': 3}
+    calls = []
+
+    def fake_get_distance(se1, client_location, ignore_error):
+        calls.append(se1)
+        return host_distances[se1]
+
+    files = [
+        {'root://far.example.com:1094//file%d' % i: 'FAR', 'davs://near.example.com:443/file%d' % i: 'NEAR', 'gsiftp://middle.example.com/file%d' % i: 'MIDDLE'}
+        for i in range(10)
+    ]
+    client_location = {'ip': '127.0.0.1', 'fqdn': None, 'site': 'CLIENTSITE'}
+
+    with mock.patch('rucio.core.replica_sorter.__get_distance', side_effect=fake_get_distance):
+        sorted_files = replica_sorter.sort_replicas_bulk(files, client_location, selection='geoip')
+    assert sorted(calls) == sorted(host_distances)
+    for i, replicas in enumerate(sorted_files):
+        assert replicas == ['davs://near.example.com:443/file%d' % i, 'gsiftp://middle.example.com/file%d' % i, 'root://far.example.com:1094//file%d' % i]
+
+    table = {('CLIENTSITE', 'FAR'): 0.9, ('CLIENTSITE', 'NEAR'): 0.1}
+    with mock.patch('rucio.core.replica_sorter.__download_custom_distance_table', return_value=table) as download_mock, \
+            mock.patch.dict(replica_sorter._CUSTOM_DISTANCES, {'table': None, 'expires_at': 0.0}):
+        sorted_files = replica_sorter.sort_replicas_bulk(files, client_location, selection='custom_table')
+        download_mock.assert_called_once()
+    for i, replicas in enumerate(sorted_files):
+        # RSEs missing from the table are at the maximum distance
+        assert replicas == ['davs://near.example.com:443/file%d' % i, 'root://far.example.com:1094//file%d' % i, 'gsiftp://middle.example.com/file%d' % i]
@@ -21,7 +21,8 @@ import pytest
 from rucio.common.config import config_get_bool
 from rucio.common.utils import generate_uuid, parse_response
 from rucio.core.replica import add_replica
-from rucio.core.request import queue_requests, get_request_by_did, list_requests, list_requests_history, set_transfer_limit
+from rucio.core.request import queue_requests, get_request, get_request_by_did, get_sources, list_requests, list_requests_history, set_transfer_limit, \
+    set_request_state, requeue_and_archive_bulk
 from rucio.core.rse import add_rse_attribute
 from rucio.db.sqla import models, constants
 from rucio.db.sqla.constants import RequestType, RequestState
@@ -123,6 +124,62 @@ def test_queue_requests_state(vo, file_config_mock, rse_factory, mock_scope, roo
     assert request['state'] == target_state
 
 
+def test_requeue_and_archive_bulk(rse_factory, mock_scope, root_account, db_session):
+    """ REQUEST (CORE): Requeue and archive failed requests in bulk """
+    source_rse, source_rse_id = rse_factory.make_mock_rse(session=db_session)
+    _, dest_rse_id = rse_factory.make_mock_rse(session=db_session)
+
+    requests = []
+    for retry_count in (0, 1, 3):
+        name = generate_uuid()
+        add_replica(source_rse_id, mock_scope, name, 1, root_account, session=db_session)
+        requests.append({
+            'dest_rse_id': dest_rse_id,
+            'request_type': RequestType.TRANSFER,
+            'request_id': generate_uuid(),
+            'name': name,
+            'scope': mock_scope,
+            'rule_id': generate_uuid(),
+            'retry_count': retry_count,
+            'attributes': {
+                'activity': 'User Subscription',
+                'bytes': 1,
+                'md5': '',
+                'adler32': ''
+            },
+            'sources': [{
+                'rse_id': source_rse_id,
+                'ranking': 0,
+                'bytes': 1,
+                'url': 'mock://%s/%s' % (source_rse, name),
+                'is_using': True
+            }]
+        })
+    queue_requests(requests, session=db_session)
+    request_ids = [get_request_by_did(mock_scope, request['name'], dest_rse_id, session=db_session)['id'] for request in requests]
+    for request_id in request_ids:
+        set_request_state(request_id, RequestState.FAILED, session=db_session)
+
+    missing_id = generate_uuid()
+    new_reqs = requeue_and_archive_bulk([{'request_id': request_id} for request_id in request_ids + [missing_id]], session=db_session)
+
+    assert missing_id not in new_reqs
+    # The request which exceeded its retries is archived, but not requeued
+    assert new_reqs[request_ids[2]] is None
+    for request_id in request_ids:
+        assert get_request(request_id, session=db_session) is None
+    history = db_session.query(models.RequestHistory).filter(models.RequestHistory.id.in_(request_ids)).all()
+    assert sorted(request.id for request in history) == sorted(request_ids)
+    assert all(request.state == RequestState.FAILED for request in history)
+
+    for request_id, retry_count in zip(request_ids[:2], (1, 2)):
+        new_req = get_request(new_reqs[request_id]['request_id'], session=db_session)
+        assert new_req['previous_attempt_id'] == request_id
+        assert new_req['retry_count'] == retry_count
+        sources = get_sources(new_req['id'], session=db_session)
+        assert [(source['ranking'], source['is_using']) for source in sources] == [(-1, False)]
+
+
 @pytest.mark.parametrize(
     "model,list_fnc", [
         (models.Request, list_requests),
@@ -13,6 +13,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import threading
+
 import pytest
 
 from rucio.client.replicaclient import ReplicaClient
@@ -35,7 +37,7 @@ from rucio.core.rse import (add_rse, get_rse_id, del_rse, restore_rse, list_rses
                             del_rse_attribute, get_rse_attribute, get_rse, rse_is_empty,
                             parse_checksum_support_attribute,
                             get_rse_supported_checksums_from_attributes,
-                            update_rse)
+                            update_protocols, update_rse, RseRegistry)
 from rucio.daemons.abacus.account import account_update
 from rucio.db.sqla import session, models
 from rucio.db.sqla.constants import RSEType, DIDType
@@ -1558,3 +1560,89 @@ def test_get_rse_attribute(use_cache, rse_factory):
 
     del_rse_attribute(rse_id, "test")
     assert get_rse_attribute(rse_id, "test", use_cache=use_cache) is None
+
+
+def test_rsemgr_cached_protocol(rse_factory):
+    """ RSE (CORE): Cached RSE settings and protocols are invalidated when the protocols change """
+    _, rse_id = rse_factory.make_posix_rse()
+
+    protocol = mgr.get_cached_protocol(rse_id, 'write', scheme='file')
+    assert mgr.get_cached_protocol(rse_id, 'write', scheme='file') is protocol
+    assert mgr.get_cached_rse_info(rse_id) is mgr.get_cached_rse_info(rse_id)
+
+    # Protocol instances are not shared between threads
+    other_thread_protocols = []
+    thread = threading.Thread(target=lambda: other_thread_protocols.append(mgr.get_cached_protocol(rse_id, 'write', scheme='file')))
+    thread.start()
+    thread.join()
+    assert other_thread_protocols[0] is not protocol
+
+    prefix = protocol.attributes['prefix']
+    assert prefix != '/new/prefix/'
+
+    update_protocols(rse_id, 'file', {'prefix': '/new/prefix/'}, hostname=protocol.attributes['hostname'], port=protocol.attributes['port'])
+    new_protocol = mgr.get_cached_protocol(rse_id, 'write', scheme='file')
+    assert new_protocol is not protocol
+    assert new_protocol.attributes['prefix'] == '/new/prefix/'
+    assert mgr.get_cached_rse_info(rse_id)['protocols'][0]['prefix'] == '/new/prefix/'
+
+    update_rse(rse_id, {'deterministic': False})
+    assert mgr.get_cached_rse_info(rse_id)['deterministic'] is False
+
+
+def test_rsemgr_cache_invalidated_on_commit(rse_factory):
+    """ RSE (CORE): Cached RSE settings are only invalidated once the change is committed """
+    _, rse_id = rse_factory.make_posix_rse()
+    info = mgr.get_cached_rse_info(rse_id)
+
+    db_session = session.get_session()
+    update_rse(rse_id, {'deterministic': False}, session=db_session)
+    assert mgr.get_cached_rse_info(rse_id) is info
+    db_session.rollback()
+    assert mgr.get_cached_rse_info(rse_id) is info
+
+    update_rse(rse_id, {'deterministic': False}, session=db_session)
+    db_session.commit()
+    assert mgr.get_cached_rse_info(rse_id)['deterministic'] is False
+
+
+def test_rse_registry(vo, rse_factory):
+    """ RSE (CORE): The RSE registry loads RSEs in bulk and only reloads the RSEs which changed """
+    rse1, rse1_id = rse_factory.make_posix_rse()
+    rse2, rse2_id = rse_factory.make_posix_rse()
+    rse3, rse3_id = rse_factory.make_mock_rse()
+    add_rse_attribute(rse1_id, 'registry_test', 'value')
+
+    registry = RseRegistry(vo=vo)
+    snapshot = registry.refresh()
+    for rse, rse_id in ((rse1, rse1_id), (rse2, rse2_id), (rse3, rse3_id)):
+        assert snapshot[rse_id].name == rse
+        assert snapshot[rse_id].columns['rse'] == rse
+        assert snapshot[rse_id].info['rse'] == rse
+        assert snapshot[rse_id].limits == {}
+    assert snapshot[rse1_id].attributes['registry_test'] == 'value'
+    assert registry.refresh() is snapshot
+
+    # Views are read-only
+    with pytest.raises(AttributeError):
+        snapshot[rse1_id].name = 'other'
+    with pytest.raises(ValueError):
+        snapshot[rse1_id].ensure_loaded(load_usage=True)
+
+    # Only the updated RSEs are reloaded
+    del_rse_attribute(rse1_id, 'registry_test')
+    update_rse(rse2_id, {'availability_write': False})
+    del_rse(rse3_id)
+    new_snapshot = registry.refresh()
+    assert 'registry_test' not in new_snapshot[rse1_id].attributes
+    assert new_snapshot[rse2_id].columns['availability_write'] is False
+    assert rse3_id not in new_snapshot
+    assert snapshot[rse1_id].attributes['registry_test'] == 'value'
+    for rse_id in registry.snapshot:
+        if rse_id not in (rse1_id, rse2_id):
+            assert new_snapshot[rse_id] is snapshot[rse_id]
+
+    # Copies can be loaded further
+    rse_data = registry.rse_data(rse1_id).ensure_loaded(load_usage=True)
+    assert rse_data.usage is not None
+    assert registry.collection([rse1_id])[rse1_id].info is new_snapshot[rse1_id].info
@@ -14,7 +14,7 @@
 # limitations under the License.
 
 from datetime import datetime
-from json import loads
+from json import dumps, loads
 from json.decoder import JSONDecodeError
 
 import pytest
@@ -28,15 +28,58 @@ from rucio.common.types import InternalAccount, InternalScope
 from rucio.common.utils import generate_uuid as uuid
 from rucio.core.account import add_account
 from rucio.core.did import add_did, set_new_dids, list_new_dids, attach_dids, set_status
-from rucio.core.rule import add_rule
+from rucio.core.rule import add_rule, list_rules
 from rucio.core.rse import add_rse_attribute
 from rucio.core.scope import add_scope
 from rucio.core import subscription as subscription_core
-from rucio.daemons.transmogrifier.transmogrifier import run, get_subscriptions
+from rucio.daemons.transmogrifier.transmogrifier import run, get_subscriptions, SubscriptionMatcher
 from rucio.db.sqla.constants import AccountType, DIDType
 from rucio.tests.common import headers, auth, did_name_generator, rse_name_generator
 
 
+def test_subscription_matcher():
+    """ SUBSCRIPTION (DAEMON): Match DIDs against compiled subscription filters """
+    def _sub(name, **filter_):
+        return {'name': name, 'filter': dumps(filter_)}
+
+    subscriptions = [
+        _sub('by_pattern', pattern=r'data\d+\..*', excluded_pattern=r'.*\.log$', scope=['mc.*', 'data.*']),
+        _sub('by_type', did_type=['DATASET'], account='tier0'),
+        _sub('by_meta', datatype=['AOD', 'ESD'], project='data12.*', min_avg_file_size=10),
+        {'name': 'broken', 'filter': '{not json'},
+        _sub('bad_regex', pattern='('),
+        _sub('any'),
+    ]
+    matcher = SubscriptionMatcher(subscriptions)
+    assert [sub['name'] for sub in matcher.subscriptions] == ['by_pattern', 'by_type', 'by_meta', 'any']
+
+    def _did(scope, name, account='root', did_type=DIDType.DATASET, hidden=False, **meta):
+        metadata = {'hidden': hidden, 'did_type': did_type, 'account': InternalAccount(account), 'length': None, 'bytes': None}
+        metadata.update(meta)
+        return {'scope': InternalScope(scope), 'name': name}, metadata
+
+    batch = [
+        _did('data12', 'data12.1'),
+        _did('data12', 'data12.1.log'),
+        _did('user.jdoe', 'data12.1', account='tier0'),
+        _did('user.jdoe', 'file', account='tier0', did_type=DIDType.CONTAINER),
+        _did('data12', 'x', datatype='AOD', project='data12_8TeV', length=2, bytes=100),
+        _did('data12', 'x', datatype='AOD', project='data12_8TeV', length=20, bytes=100),
+        _did('data12', 'x', datatype='RAW', project='data12_8TeV'),
+        _did('data12', 'data12.1', hidden=True),
+    ]
+    assert [[sub['name'] for sub in subs] for subs in matcher.match(batch)] == [
+        ['by_pattern', 'any'],
+        ['any'],
+        ['by_type', 'any'],
+        ['any'],
+        ['by_meta', 'any'],
+        ['any'],
+        ['any'],
+        [],
+    ]
+
+
 class TestSubscriptionCoreApi:
     projects = ['data12_900GeV', 'data12_8TeV', 'data13_900GeV', 'data13_8TeV']
     pattern1 = r'(_tid|physics_(Muons|JetTauEtmiss|Egamma)\..*\.ESD|express_express(?!.*NTUP|.*\.ESD|.*RAW)|(physics|express)(?!.*NTUP).* \
@@ -178,6 +221,48 @@ class TestSubscriptionCoreApi:
         for rule in list_subscription_rule_states(account='root', name=subscription_name, vo=vo):
             assert rule[3] == 2
 
+    @pytest.mark.noparallel(reason='runs transmogrifier. Cannot be run at the same time with other tests running it')
+    def test_run_transmogrifier_bulk_rules(self, vo, rse_factory):
+        """ SUBSCRIPTION (DAEMON): Test the creation of the rules of a batch of DIDs in one transaction """
+        new_dids = [did for did in list_new_dids(did_type=None, thread=None, total_threads=None, chunk_size=100000, session=None)]
+        set_new_dids(new_dids, None)
+
+        rse1, _ = rse_factory.make_mock_rse()
+        rse2, _ = rse_factory.make_mock_rse()
+        tmp_scope = InternalScope('mock_' + uuid()[:8], vo=vo)
+        root = InternalAccount('root', vo=vo)
+        add_scope(tmp_scope, root)
+        dsn_prefix = did_name_generator('dataset')
+        dsns = ['%sdataset-%s' % (dsn_prefix, uuid()) for _ in range(3)]
+        subid = add_subscription(name=uuid(),
+                                 account='root',
+                                 filter_={'scope': [tmp_scope.external, ], 'pattern': '%s.*' % dsn_prefix},
+                                 replication_rules=[{'rse_expression': rse1, 'copies': 1, 'activity': self.activity},
+                                                    {'rse_expression': rse2, 'copies': 1, 'activity': self.activity}],
+                                 lifetime=None,
+                                 retroactive=False,
+                                 dry_run=False,
+                                 comments='Ni ! Ni!',
+                                 issuer='root',
+                                 vo=vo)
+
+        def _subscription_rses(dsn):
+            return sorted(rule['rse_expression'] for rule in list_rules(filters={'scope': tmp_scope, 'name': dsn}) if str(rule['subscription_id']) == str(subid))
+
+        for dsn in dsns[:2]:
+            add_did(scope=tmp_scope, name=dsn, did_type=DIDType.DATASET, account=root)
+        run(threads=1, bulk=1000000, once=True)
+        assert _subscription_rses(dsns[0]) == sorted([rse1, rse2])
+        assert _subscription_rses(dsns[1]) == sorted([rse1, rse2])
+
+        # One of the rules already exists, the rules are created one DID at a time
+        add_did(scope=tmp_scope, name=dsns[2], did_type=DIDType.DATASET, account=root)
+        add_rule(dids=[{'scope': tmp_scope, 'name': dsns[2]}], account=root, copies=1, rse_expression=rse1, grouping='DATASET', weight=None, lifetime=None, locked=False, subscription_id=None)
+        run(threads=1, bulk=1000000, once=True)
+        assert _subscription_rses(dsns[2]) == [rse2]
+        new_dids = [did['name'] for did in list_new_dids(did_type=None, thread=None, total_threads=None, chunk_size=100000, session=None)]
+        assert not set(dsns) & set(new_dids)
+
 
 def test_create_and_update_and_list_subscription(rse_factory, rest_client, auth_token):
     """ SUBSCRIPTION (REST): Test the creation of a new subscription, update it, list it """
@@ -13,10 +13,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from collections import namedtuple
 from datetime import datetime, timedelta
 
 import pytest
-from sqlalchemy import delete
+from sqlalchemy import delete, func, null, select
 
 from rucio.common.utils import generate_uuid
 from rucio.core.did import attach_dids, add_did
@@ -24,11 +25,15 @@ from rucio.core.distance import add_distance
 from rucio.core.replica import add_replica
 from rucio.core.request import (queue_requests, get_request_by_did, release_waiting_requests_per_deadline,
                                 release_all_waiting_requests, release_waiting_requests_fifo, release_waiting_requests_grouped_fifo,
-                                release_waiting_requests_per_free_volume, delete_transfer_limit)
-from rucio.daemons.conveyor.throttler import throttler
+                                release_waiting_requests_per_free_volume, delete_transfer_limit, archive_request, compact_request_counters,
+                                get_request_counters, get_request_stats, reconcile_request_counters, set_request_state, update_request,
+                                handle_failed_intermediate_hop)
+from rucio.core.rse import RseCollection
+from rucio.core.rule import update_rules_for_lost_replica
+from rucio.daemons.conveyor.throttler import throttler, _aggregate_request_stats, _group_request_stats, _group_request_counters
 from rucio.daemons.conveyor.preparer import preparer
 from rucio.db.sqla import models
-from rucio.db.sqla.session import transactional_session, get_session
+from rucio.db.sqla.session import read_session, transactional_session, get_session
 from rucio.db.sqla.constants import DIDType, RequestType, RequestState, TransferLimitDirection
 from rucio.tests.common import skiplimitedsql
 
@@ -70,6 +75,45 @@ def _create_request(dest_rse_id, _bytes, activity, state, account, *, session):
     return request.to_dict()
 
 
+@read_session
+def _count_request_counter_rows(dest_rse_id, *, session):
+    stmt = select(
+        func.count(1)
+    ).where(
+        models.RequestCounter.dest_rse_id == dest_rse_id
+    )
+    return session.execute(stmt).scalar_one()
+
+
+@transactional_session
+def _create_counted_requests(request_configs, transfer_hops=(), *, session):
+    """
+    Create requests and their transfer hops without recording them in the request counters.
+    transfer_hops are tuples of indexes in request_configs: (request, next hop request, initial request).
+    """
+    requests = [models.Request(**config) for config in request_configs]
+    for request in requests:
+        request.save(session=session, flush=False)
+    session.flush()
+    for request_idx, next_hop_idx, initial_idx in transfer_hops:
+        models.TransferHop(request_id=requests[request_idx].id, next_hop_request_id=requests[next_hop_idx].id,
+                           initial_request_id=requests[initial_idx].id).save(session=session, flush=False)
+    return [request.id for request in requests]
+
+
+def _check_request_counters(dest_rse_id):
+    """
+    Check that the request counters of the destination match a fresh count of the requests table.
+    """
+    def _counters(group_fnc, rows):
+        return {key: value for key, value in group_fnc(rows).items() if key[1] == dest_rse_id}
+
+    expected = _counters(_group_request_stats, get_request_stats(state=[RequestState.QUEUED, RequestState.SUBMITTING,
+                                                                        RequestState.SUBMITTED, RequestState.WAITING]))
+    assert _counters(_group_request_counters, get_request_counters()) == expected
+    return expected
+
+
 @transactional_session
 def _delete_requests(scope, names, ids=None, *, session):
     session.execute(
@@ -1009,3 +1053,146 @@ class TestRequestCoreRelease:
         assert request['state'] == RequestState.QUEUED
         request = get_request_by_did(mock_scope, name3, dest_rse_id)
         assert request['state'] == RequestState.WAITING
+
+
+def test_aggregate_request_stats(rse_factory, root_account, jdoe_account, transfer_limit_factory):
+    """ THROTTLER (CORE): aggregate synthetic request statistics into limits and groups """
+    source_rse, source_rse_id = rse_factory.make_mock_rse()
+    dest_rse, dest_rse_id = rse_factory.make_mock_rse()
+    _, other_dest_rse_id = rse_factory.make_mock_rse()
+    activity, other_activity = 'User Subscription', 'Express'
+    source_limit_id = transfer_limit_factory(source_rse, activity='all_activities', max_transfers=100, direction=TransferLimitDirection.SOURCE)
+    dest_limit_id = transfer_limit_factory(dest_rse, activity=activity, max_transfers=10, direction=TransferLimitDirection.DESTINATION)
+
+    Row = namedtuple('Row', ['account', 'state', 'dest_rse_id', 'source_rse_id', 'activity', 'counter', 'bytes'])
+    db_stats = [
+        Row(root_account, RequestState.WAITING, dest_rse_id, source_rse_id, activity, 3, 0),
+        Row(root_account, RequestState.SUBMITTED, dest_rse_id, source_rse_id, activity, 2, 0),
+        Row(root_account, RequestState.QUEUED, dest_rse_id, source_rse_id, activity, 1, 0),
+        Row(jdoe_account, RequestState.WAITING, dest_rse_id, source_rse_id, activity, 5, 0),
+        Row(None, RequestState.WAITING, other_dest_rse_id, source_rse_id, other_activity, 7, 0),
+        # Requests towards an RSE without limits and which are not waiting are irrelevant
+        Row(root_account, RequestState.SUBMITTED, other_dest_rse_id, None, other_activity, 11, 0),
+        # Unknown RSEs are ignored
+        Row(root_account, RequestState.WAITING, generate_uuid(), source_rse_id, activity, 13, 0),
+    ]
+    limit_stats, grouper = _aggregate_request_stats(_group_request_stats(db_stats), RseCollection())
+
+    assert set(limit_stats) == {source_limit_id, dest_limit_id}
+    dest_stat = limit_stats[dest_limit_id]['stat']
+    assert (dest_stat['waiting'], dest_stat['active']) == (8, 3)
+    assert dest_stat['accounts'] == {root_account: {'waiting': 3, 'active': 3}, jdoe_account: {'waiting': 5, 'active': 0}}
+    source_stat = limit_stats[source_limit_id]['stat']
+    assert (source_stat['waiting'], source_stat['active']) == (15, 3)
+    assert source_stat['accounts'][null()] == {'waiting': 7, 'active': 0}
+
+    groups = {(src.id if src else None, dst.id if dst else None, act): [limit_stat['limit']['id'] for limit_stat in limits]
+              for (src, dst, act), limits in grouper.waiting_transfer_groups.items()}
+    assert groups == {
+        (source_rse_id, dest_rse_id, activity): [source_limit_id, dest_limit_id],
+        (source_rse_id, other_dest_rse_id, other_activity): [source_limit_id],
+    }
+
+
+@pytest.mark.noparallel(reason='uses preparer and throttler')
+@pytest.mark.usefixtures("core_config_mock", "file_config_mock")
+@pytest.mark.parametrize("file_config_mock", [{"overrides": [
+    ('conveyor', 'use_preparer', 'true'),
+    ('throttler', 'incremental_stats', 'true'),
+]}], indirect=True)
+def test_incremental_request_counters(mock_scope, root_account, connected_rse_pair, transfer_limit_factory):
+    """ THROTTLER (CORE): the request counters follow the state changes of requests """
+    source_rse, source_rse_id, dest_rse, dest_rse_id = connected_rse_pair
+    activity = 'User Subscription'
+    transfer_limit_factory(dest_rse, activity=activity, max_transfers=1, strategy='fifo')
+
+    def _counters(group_fnc, rows):
+        return {key: value for key, value in group_fnc(rows).items() if key[1] == dest_rse_id}
+
+    def _check():
+        expected = _counters(_group_request_stats, get_request_stats(state=[RequestState.QUEUED, RequestState.SUBMITTING,
+                                                                            RequestState.SUBMITTED, RequestState.WAITING]))
+        assert _counters(_group_request_counters, get_request_counters()) == expected
+        return expected
+
+    reconcile_request_counters()
+    assert _check() == {}
+
+    name1, name2, name3 = _add_test_replicas_and_request(
+        scope=mock_scope, account=root_account,
+        request_configs=[{'source_rse_id': source_rse_id, 'dest_rse_id': dest_rse_id, 'attributes': {'activity': activity}}] * 3,
+    )
+    assert _check() == {}  # requests in preparing state are not counted
+
+    preparer(once=True, transfertools=['mock'])
+    assert _check() == {(source_rse_id, dest_rse_id, activity): {root_account: [3, 0]}}
+
+    assert release_waiting_requests_fifo(dest_rse_id=dest_rse_id, count=1) == 1
+    assert _check() == {(source_rse_id, dest_rse_id, activity): {root_account: [2, 1]}}
+
+    released = [request for request in map(lambda name: get_request_by_did(mock_scope, name, dest_rse_id), (name1, name2, name3))
+                if request['state'] == RequestState.QUEUED][0]
+    set_request_state(released['id'], RequestState.NO_SOURCES)
+    waiting = get_request_by_did(mock_scope, name3 if released['name'] != name3 else name2, dest_rse_id)
+    archive_request(waiting['id'])
+    assert _check() == {(source_rse_id, dest_rse_id, activity): {root_account: [1, 0]}}
+
+    assert _count_request_counter_rows(dest_rse_id) > 1
+    compact_request_counters()
+    assert _count_request_counter_rows(dest_rse_id) == 1
+    assert _check() == {(source_rse_id, dest_rse_id, activity): {root_account: [1, 0]}}
+
+    throttler(once=True)
+    assert _check() == {(source_rse_id, dest_rse_id, activity): {root_account: [0, 1]}}
+
+    # an update which matches no request is not counted
+    update_request(generate_uuid(), state=RequestState.SUBMITTED)
+    assert _check() == {(source_rse_id, dest_rse_id, activity): {root_account: [0, 1]}}
+
+    # a change of source alone moves the request to another counter
+    queued = get_request_by_did(mock_scope, ({name1, name2, name3} - {released['name'], waiting['name']}).pop(), dest_rse_id)
+    assert queued['state'] == RequestState.QUEUED
+    update_request(queued['id'], source_rse_id=dest_rse_id)
+    assert _check() == {(dest_rse_id, dest_rse_id, activity): {root_account: [0, 1]}}
+
+
+@pytest.mark.noparallel(reason='rebuilds the request counters')
+@pytest.mark.usefixtures("core_config_mock", "file_config_mock")
+@pytest.mark.parametrize("file_config_mock", [{"overrides": [
+    ('throttler', 'incremental_stats', 'true'),
+]}], indirect=True)
+def test_request_counters_failed_intermediate_hop(root_account, connected_rse_pair):
+    """ THROTTLER (CORE): the request counters follow the requests failed with their intermediate hop """
+    source_rse, source_rse_id, dest_rse, dest_rse_id = connected_rse_pair
+    activity = 'User Subscription'
+    config = {'source_rse_id': source_rse_id, 'dest_rse_id': dest_rse_id, 'activity': activity, 'account': root_account}
+    hop_id, _, _ = _create_counted_requests(
+        [dict(config, state=RequestState.SUBMITTED), dict(config, state=RequestState.QUEUED), dict(config, state=RequestState.SUBMITTED)],
+        transfer_hops=[(0, 1, 2), (1, 2, 2)],
+    )
+    reconcile_request_counters()
+    assert _check_request_counters(dest_rse_id) == {(source_rse_id, dest_rse_id, activity): {root_account: [0, 3]}}
+
+    handle_failed_intermediate_hop({'id': hop_id})
+    assert _check_request_counters(dest_rse_id) == {(source_rse_id, dest_rse_id, activity): {root_account: [0, 1]}}
+
+
+@pytest.mark.noparallel(reason='rebuilds the request counters')
+@pytest.mark.usefixtures("core_config_mock", "file_config_mock")
+@pytest.mark.parametrize("file_config_mock", [{"overrides": [
+    ('throttler', 'incremental_stats', 'true'),
+]}], indirect=True)
+def test_request_counters_deleted_request(root_account, connected_rse_pair, did_factory):
+    """ THROTTLER (CORE): the request counters follow the requests deleted with their lost replica """
+    source_rse, source_rse_id, dest_rse, dest_rse_id = connected_rse_pair
+    activity = 'User Subscription'
+    lost_did, other_did = did_factory.random_file_did(), did_factory.random_file_did()
+    for did in (lost_did, other_did):
+        add_replica(rse_id=dest_rse_id, bytes_=1, account=root_account, **did)
+        _create_counted_requests([{'source_rse_id': source_rse_id, 'dest_rse_id': dest_rse_id, 'activity': activity, 'account': root_account,
+                                   'state': RequestState.QUEUED, **did}])
+    reconcile_request_counters()
+    assert _check_request_counters(dest_rse_id) == {(source_rse_id, dest_rse_id, activity): {root_account: [0, 2]}}
+
+    update_rules_for_lost_replica(rse_id=dest_rse_id, **lost_did)
+    assert _check_request_counters(dest_rse_id) == {(source_rse_id, dest_rse_id, activity): {root_account: [0, 1]}}